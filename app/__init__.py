@@ -2,6 +2,7 @@
 FastAPI Application Factory.
 """
 
+import asyncio
 import logging
 import time
 from contextlib import asynccontextmanager
@@ -10,6 +11,7 @@ from typing import AsyncGenerator
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
@@ -40,11 +42,32 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # - Database connections
     # - Cache initialization
     # - External API health checks
+    settings = app.state.settings
+    background_tasks = []
+    if settings.metar_snapshot_enabled:
+        from app.models.metar_snapshot import run_metar_snapshot_updates
+        background_tasks.append(asyncio.create_task(
+            run_metar_snapshot_updates(settings.metar_snapshot_interval_s)))
+    if settings.taf_snapshot_enabled:
+        from app.models.taf import run_taf_updates
+        background_tasks.append(asyncio.create_task(
+            run_taf_updates(settings.taf_snapshot_interval_s)))
+    if settings.winds_aloft_enabled:
+        from app.models.winds_aloft import run_winds_aloft_updates
+        background_tasks.append(asyncio.create_task(
+            run_winds_aloft_updates(settings.winds_aloft_interval_s)))
+    if settings.forecast_backend == 'grib':
+        from app.models.grib_forecast import run_grib_ingestion
+        background_tasks.append(asyncio.create_task(
+            run_grib_ingestion(settings.grib_rescan_interval_s)))
     
     yield
     
     # Shutdown
     logger.info("Shutting down VFR Flight Planner API...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
     
     # Cleanup any resources here
     # - Close database connections
@@ -103,6 +126,8 @@ def create_app(settings: Settings) -> FastAPI:
         },
     )
     
+    app.state.settings = settings
+    
     # Mount static files
     app.mount("/static", StaticFiles(directory="app/static"), name="static")
     
@@ -183,7 +208,8 @@ def add_exception_handlers(app: FastAPI) -> None:
             content=ErrorResponse(
                 error="ValidationError",
                 message="Invalid request data",
-                details={"errors": exc.errors()}
+                # Model validator errors carry the raised exception in their context
+                details={"errors": jsonable_encoder(exc.errors(), custom_encoder={Exception: str})}
             ).model_dump(mode='json'),
         )
     
@@ -217,7 +243,9 @@ def register_routers(app: FastAPI, settings: Settings) -> None:
     """Register API routers."""
     
     # Import routers
-    from app.routers import health, weather, airport, flight_plan, main, route_weather
+    from app.routers import (
+        health, weather, airport, flight_plan, main, route_weather, tiles, alerts, live_weather
+    )
     
     # Register API routers with prefix
     app.include_router(health.router, prefix=settings.api_prefix, tags=["health"])
@@ -225,6 +253,11 @@ def register_routers(app: FastAPI, settings: Settings) -> None:
     app.include_router(airport.router, prefix=settings.api_prefix, tags=["airport"])
     app.include_router(flight_plan.router, prefix=settings.api_prefix, tags=["flight-plan"])
     app.include_router(route_weather.router, prefix=settings.api_prefix, tags=["route-weather"])
+    app.include_router(alerts.router, prefix=settings.api_prefix, tags=["alerts"])
+    
+    # Map tiles and the live weather channel are served outside the API prefix
+    app.include_router(tiles.router, tags=["tiles"])
+    app.include_router(live_weather.router, tags=["live-weather"])
     
     # Register main router (for web interface)
     app.include_router(main.router, tags=["main"])
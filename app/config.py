@@ -45,6 +45,68 @@ class Settings(BaseSettings):
     cache_enabled: bool = Field(True, description="Enable caching")
     cache_ttl: int = Field(300, description="Cache TTL in seconds")
     redis_url: Optional[str] = Field(None, description="Redis URL for caching")
+    route_cache_size: int = Field(512, description="Maximum number of memoized route plans")
+    tile_cache_size: int = Field(2048, description="Maximum number of cached vector tiles")
+    overlay_tile_cache_dir: str = Field(
+        "/app/data/overlay_tiles", description="Directory of cached weather overlay tiles")
+    overlay_tile_cache_mb: int = Field(
+        256, description="Maximum size of the overlay tile cache in megabytes")
+    overlay_tile_bucket_s: int = Field(
+        600, description="Overlay tiles are refetched once per bucket of this many seconds")
+    forecast_backend: str = Field(
+        "open-meteo", description="Forecast source: 'open-meteo' or 'grib' (local model files)")
+    forecast_grid_deg: float = Field(0.5, description="Forecast cache grid spacing in degrees")
+    forecast_cache_ttl: int = Field(1800, description="Forecast cache TTL in seconds")
+    forecast_cache_max_nodes: int = Field(
+        5000, description="Maximum number of cached forecast grid nodes")
+    forecast_failure_ttl: int = Field(
+        60, description="Seconds before grid nodes whose forecast fetch failed are retried")
+    flight_weather_budget_s: float = Field(
+        2.0, description="Time budget for flight plan weather analysis in seconds")
+    metar_snapshot_enabled: bool = Field(
+        True, description="Serve METARs from a periodically ingested bulk snapshot")
+    metar_snapshot_url: str = Field(
+        "https://aviationweather.gov/data/cache/metars.cache.csv.gz",
+        description="Bulk METAR feed (URL or local file)")
+    metar_snapshot_interval_s: int = Field(
+        300, description="Bulk METAR refresh interval in seconds")
+    metar_snapshot_max_age_s: int = Field(
+        1800, description="Age after which the METAR snapshot is no longer served")
+    metar_history_hours: int = Field(
+        24,
+        description="Hours of METAR observations kept per station "
+                    "(longest history window served)")
+    metar_history_capacity: int = Field(
+        48, description="Maximum METAR observations kept per station (routine and special)")
+    alert_queue_size: int = Field(
+        100, description="Undelivered condition alerts buffered per client")
+    alert_keepalive_s: float = Field(
+        15.0, description="Interval of keepalive comments on idle alert streams in seconds")
+    live_weather_max_stations: int = Field(
+        200, description="Maximum stations watched per live weather connection")
+    live_weather_queue_size: int = Field(
+        32, description="Undelivered live weather messages buffered per connection")
+    metar_fallback_radius_nm: float = Field(
+        50.0, description="Search radius for nearby METAR stations in nautical miles")
+    taf_snapshot_enabled: bool = Field(
+        True, description="Serve TAFs from a periodically ingested bulk snapshot")
+    taf_snapshot_url: str = Field(
+        "https://aviationweather.gov/data/cache/tafs.cache.csv.gz",
+        description="Bulk TAF feed (URL or local file)")
+    taf_snapshot_interval_s: int = Field(600, description="Bulk TAF refresh interval in seconds")
+    taf_snapshot_max_age_s: int = Field(
+        3600, description="Age after which the TAF snapshot is no longer served")
+    winds_aloft_enabled: bool = Field(
+        True, description="Ingest the FB winds/temps aloft forecasts periodically")
+    winds_aloft_sources: List[str] = Field(
+        [f"https://aviationweather.gov/api/data/windtemp?region=all&level=low&fcst={hours}"
+         for hours in ("06", "12", "24")],
+        description="FB winds aloft products (URLs or local files)")
+    winds_aloft_interval_s: int = Field(1800, description="Winds aloft refresh interval in seconds")
+    planner_wind_source: str = Field(
+        "forecast",
+        description="Winds for route planning: 'forecast' (model winds) "
+                    "or 'fb' (winds aloft product)")
     
     # Database settings (for future use)
     database_url: Optional[str] = Field(None, description="Database URL")
@@ -59,6 +121,36 @@ class Settings(BaseSettings):
     
     # File paths
     airport_cache_file: str = Field("/app/data/airports_cache.json", description="Airport cache file path")
+    grib_data_dir: str = Field(
+        "/app/data/grib", description="Directory of GRIB2 model files placed by the model sync")
+    grib_cache_dir: Optional[str] = Field(
+        None,
+        description="Directory for decoded forecast arrays "
+                    "(defaults to a subdirectory of the GRIB directory)")
+    grib_rescan_interval_s: int = Field(
+        300, description="Interval between checks for new GRIB2 files in seconds")
+    terrain_data_dir: str = Field(
+        "/app/data/terrain", description="Directory of SRTM .hgt elevation tiles")
+    terrain_cache_dir: Optional[str] = Field(
+        None,
+        description="Directory for terrain max-pyramid caches (defaults to the tile directory)")
+    terrain_clearance_ft: int = Field(
+        1000, description="Minimum terrain clearance for terrain-avoiding routes")
+    airspace_data_file: Optional[str] = Field(
+        "/app/data/airspace.geojson", description="Airspace file (GeoJSON or OpenAIR)")
+    airspace_avoid_classes: List[str] = Field(
+        ["P", "R"], description="Airspace classes the planner routes around")
+    metar_stations_file: Optional[str] = Field(
+        "/app/data/metar_stations.json", description="Learned list of METAR-reporting stations")
+    aircraft_profiles_file: Optional[str] = Field(
+        "/app/data/aircraft_profiles.json",
+        description="Custom aircraft performance profiles (JSON)")
+    wmm_cof_file: Optional[str] = Field(
+        "/app/data/WMM.COF", description="World Magnetic Model coefficient file")
+    magnetic_grid_deg: float = Field(1.0, description="Declination grid spacing in degrees")
+    magnetic_cache_dir: Optional[str] = Field(
+        None,
+        description="Directory for cached declination grids (defaults to the WMM file directory)")
     logs_directory: str = Field("logs", description="Logs directory")
     
     class Config:
@@ -92,6 +184,9 @@ class TestingSettings(Settings):
     debug: bool = True
     log_level: str = "WARNING"
     cache_enabled: bool = False
+    metar_snapshot_enabled: bool = False
+    taf_snapshot_enabled: bool = False
+    winds_aloft_enabled: bool = False
     
     class Config:
         env_file = ".env.testing"
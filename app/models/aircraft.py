@@ -0,0 +1,258 @@
+"""
+Aircraft Performance Model.
+
+Named aircraft performance profiles (climb, cruise power settings and descent)
+compiled into dense per-altitude tables once at load time. Leg time and fuel
+for any number of legs and candidate altitudes are then a few ``np.interp``
+lookups and array arithmetic.
+
+Built-in profiles use representative handbook figures; additional or
+overriding profiles can be supplied as JSON in ``aircraft_profiles_file``.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Resolution of the precomputed climb/descent tables
+TABLE_STEP_FT = 100.0
+
+# Climb tables: (altitude_ft, rate_fpm, tas_kt, fuel_gph); cruise: (altitude_ft, tas_kt, fuel_gph)
+BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+    'C172S': {
+        'description': 'Cessna 172S Skyhawk',
+        'fuel_capacity_gal': 53.0,
+        'service_ceiling_ft': 14000,
+        'taxi_fuel_gal': 1.4,
+        'climb': [(0, 730, 74, 11.5), (4000, 580, 73, 10.5), (8000, 420, 72, 9.5),
+                  (12000, 250, 70, 8.5)],
+        'cruise': {
+            '75%': [(2000, 114, 10.4), (4000, 116, 10.0), (6000, 119, 9.7), (8000, 122, 9.4)],
+            '65%': [(2000, 106, 8.9), (4000, 109, 8.6), (6000, 111, 8.3), (8000, 113, 8.1),
+                    (10000, 115, 7.9)],
+            '55%': [(2000, 97, 7.6), (6000, 102, 7.2), (10000, 106, 6.9), (12000, 108, 6.7)],
+        },
+        'default_power': '65%',
+        'descent': {'rate_fpm': 500, 'tas_kt': 110, 'fuel_gph': 6.0},
+    },
+    'PA28-181': {
+        'description': 'Piper PA-28-181 Archer',
+        'fuel_capacity_gal': 48.0,
+        'service_ceiling_ft': 13000,
+        'taxi_fuel_gal': 1.2,
+        'climb': [(0, 667, 79, 11.0), (4000, 530, 78, 10.3), (8000, 390, 77, 9.6),
+                  (12000, 250, 76, 9.0)],
+        'cruise': {
+            '75%': [(2000, 121, 10.5), (4000, 123, 10.2), (6000, 125, 10.0), (8000, 127, 9.8)],
+            '65%': [(2000, 114, 9.2), (6000, 118, 8.8), (10000, 121, 8.4)],
+        },
+        'default_power': '65%',
+        'descent': {'rate_fpm': 500, 'tas_kt': 115, 'fuel_gph': 6.5},
+    },
+    'SR22': {
+        'description': 'Cirrus SR22',
+        'fuel_capacity_gal': 81.0,
+        'service_ceiling_ft': 17500,
+        'taxi_fuel_gal': 1.5,
+        'climb': [(0, 1200, 120, 24.0), (4000, 1050, 119, 22.0), (8000, 900, 118, 20.0),
+                  (12000, 700, 116, 18.0), (16000, 500, 114, 16.0)],
+        'cruise': {
+            '75%': [(2000, 170, 17.5), (6000, 176, 17.0), (10000, 182, 16.4), (12000, 184, 15.8)],
+            '65%': [(2000, 160, 15.0), (8000, 168, 14.4), (12000, 172, 13.6)],
+            '55%': [(2000, 148, 12.7), (8000, 155, 12.0), (14000, 160, 11.4)],
+        },
+        'default_power': '65%',
+        'descent': {'rate_fpm': 700, 'tas_kt': 160, 'fuel_gph': 10.0},
+    },
+}
+
+_profiles = None
+_profiles_mtime = None
+_profiles_lock = threading.Lock()
+
+
+class AircraftProfile:
+    """
+    Compiled performance profile.
+
+    Climb is integrated once onto a ``TABLE_STEP_FT`` grid as cumulative time,
+    fuel and air distance from sea level, so the climb between any two
+    altitudes is a difference of two table lookups. Descent uses a constant
+    rate, speed and fuel flow.
+    """
+
+    def __init__(self, name: str, data: Dict[str, Any]):
+        self.name = name
+        self.description = data.get('description', name)
+        self.fuel_capacity_gal = float(data['fuel_capacity_gal'])
+        self.service_ceiling_ft = float(data['service_ceiling_ft'])
+        self.taxi_fuel_gal = float(data.get('taxi_fuel_gal', 0.0))
+        self.cruise = {power: np.array(table, dtype=float)
+                       for power, table in data['cruise'].items()}
+        self.default_power = data.get('default_power') or next(iter(self.cruise))
+        descent = data['descent']
+        self.descent_rate_fpm = float(descent['rate_fpm'])
+        self.descent_tas_kt = float(descent['tas_kt'])
+        self.descent_fuel_gph = float(descent['fuel_gph'])
+
+        climb = np.array(data['climb'], dtype=float)
+        self.altitudes = np.arange(0.0, self.service_ceiling_ft + TABLE_STEP_FT, TABLE_STEP_FT)
+        mid = self.altitudes[:-1] + TABLE_STEP_FT / 2
+        rate = np.maximum(np.interp(mid, climb[:, 0], climb[:, 1]), 1.0)
+        step_hr = TABLE_STEP_FT / rate / 60.0
+        self.climb_time_hr = np.concatenate([[0.0], np.cumsum(step_hr)])
+        fuel_gph = np.interp(mid, climb[:, 0], climb[:, 3])
+        tas_kt = np.interp(mid, climb[:, 0], climb[:, 2])
+        self.climb_fuel_gal = np.concatenate([[0.0], np.cumsum(step_hr * fuel_gph)])
+        self.climb_dist_nm = np.concatenate([[0.0], np.cumsum(step_hr * tas_kt)])
+
+    def power(self, power_setting: Optional[str]) -> str:
+        """Validate a power setting name, defaulting to the profile's default."""
+        power_setting = power_setting or self.default_power
+        if power_setting not in self.cruise:
+            raise ValueError(f"Unknown power setting {power_setting!r} for {self.name}")
+        return power_setting
+
+    def cruise_tas(self, altitude_ft, power_setting: Optional[str] = None) -> np.ndarray:
+        table = self.cruise[self.power(power_setting)]
+        return np.interp(altitude_ft, table[:, 0], table[:, 1])
+
+    def cruise_fuel_gph(self, altitude_ft, power_setting: Optional[str] = None) -> np.ndarray:
+        table = self.cruise[self.power(power_setting)]
+        return np.interp(altitude_ft, table[:, 0], table[:, 2])
+
+    def _climb(self, table: np.ndarray, low, high) -> np.ndarray:
+        return np.interp(high, self.altitudes, table) - np.interp(low, self.altitudes, table)
+
+    def leg_performance(self, distance_nm, altitude_ft, power_setting: Optional[str] = None,
+                        departure_elevation_ft=0.0, arrival_elevation_ft=0.0,
+                        groundspeed_factor=1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Time (hours) and fuel (gallons) for legs flown at cruise altitudes.
+
+        All arguments broadcast, so a (legs, 1) distance against a (altitudes,)
+        altitude array evaluates every leg at every altitude at once.
+        ``groundspeed_factor`` (groundspeed / true airspeed, from winds) scales
+        ground distance covered in every phase. Legs too short to reach cruise
+        altitude scale climb and descent down to fit and have no cruise phase.
+        Taxi fuel is included.
+        """
+        power_setting = self.power(power_setting)
+        distance = np.asarray(distance_nm, dtype=float)
+        altitude = np.minimum(np.asarray(altitude_ft, dtype=float), self.service_ceiling_ft)
+        factor = np.asarray(groundspeed_factor, dtype=float)
+        departure = np.minimum(np.asarray(departure_elevation_ft, dtype=float), altitude)
+        arrival = np.minimum(np.asarray(arrival_elevation_ft, dtype=float), altitude)
+
+        climb_time = self._climb(self.climb_time_hr, departure, altitude)
+        climb_fuel = self._climb(self.climb_fuel_gal, departure, altitude)
+        climb_dist = self._climb(self.climb_dist_nm, departure, altitude) * factor
+        descent_time = (altitude - arrival) / self.descent_rate_fpm / 60.0
+        descent_fuel = descent_time * self.descent_fuel_gph
+        descent_dist = descent_time * self.descent_tas_kt * factor
+
+        transition = climb_dist + descent_dist
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(transition > distance, distance / transition, 1.0)
+        cruise_dist = np.maximum(distance - transition, 0.0)
+        cruise_speed = self.cruise_tas(altitude, power_setting) * factor
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cruise_time = np.where(cruise_dist > 0, cruise_dist / cruise_speed, 0.0)
+
+        time_hr = (climb_time + descent_time) * scale + cruise_time
+        cruise_fuel = cruise_time * self.cruise_fuel_gph(altitude, power_setting)
+        fuel_gal = (climb_fuel + descent_fuel) * scale + cruise_fuel + self.taxi_fuel_gal
+        infeasible = ~(factor > 0)
+        return np.where(infeasible, np.nan, time_hr), np.where(infeasible, np.nan, fuel_gal)
+
+    def at_power(self, power_setting: Optional[str] = None) -> "PerformanceModel":
+        """Bind the profile to a cruise power setting."""
+        return PerformanceModel(self, self.power(power_setting))
+
+    def summary(self) -> Dict[str, Any]:
+        """Public description of the profile for API listings."""
+        return {
+            'name': self.name,
+            'description': self.description,
+            'fuel_capacity_gal': self.fuel_capacity_gal,
+            'service_ceiling_ft': int(self.service_ceiling_ft),
+            'default_power': self.default_power,
+            'power_settings': {
+                power: [{'altitude_ft': int(alt), 'tas_kt': float(tas), 'fuel_gph': float(gph)}
+                        for alt, tas, gph in table]
+                for power, table in self.cruise.items()
+            },
+            'time_to_climb_min': {
+                int(alt): round(float(np.interp(alt, self.altitudes, self.climb_time_hr)) * 60.0, 1)
+                for alt in range(2000, int(self.service_ceiling_ft) + 1, 2000)
+            },
+        }
+
+
+class PerformanceModel:
+    """An aircraft profile flown at one cruise power setting."""
+
+    def __init__(self, profile: AircraftProfile, power_setting: str):
+        self.profile = profile
+        self.power_setting = power_setting
+        self.key = (profile.name, power_setting)
+
+    def cruise_tas(self, altitude_ft) -> np.ndarray:
+        return self.profile.cruise_tas(altitude_ft, self.power_setting)
+
+    def cruise_fuel_gph(self, altitude_ft) -> np.ndarray:
+        return self.profile.cruise_fuel_gph(altitude_ft, self.power_setting)
+
+    def leg(self, distance_nm, altitude_ft, departure_elevation_ft=0.0, arrival_elevation_ft=0.0,
+            groundspeed_factor=1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Leg time and fuel; see ``AircraftProfile.leg_performance``."""
+        return self.profile.leg_performance(distance_nm, altitude_ft, self.power_setting,
+                                            departure_elevation_ft, arrival_elevation_ft,
+                                            groundspeed_factor)
+
+
+def load_aircraft_profiles() -> Dict[str, AircraftProfile]:
+    """Return compiled profiles, reloading custom profiles when their file changes."""
+    global _profiles, _profiles_mtime
+    path = settings.aircraft_profiles_file
+    try:
+        mtime = os.path.getmtime(path) if path else None
+    except OSError:
+        mtime = None
+
+    with _profiles_lock:
+        if _profiles is None or mtime != _profiles_mtime:
+            data = dict(BUILTIN_PROFILES)
+            if mtime is not None:
+                try:
+                    with open(path, 'r') as f:
+                        data.update(json.load(f))
+                except Exception as e:
+                    logger.error(f"Error loading aircraft profiles from {path}: {e}")
+            profiles = {}
+            for name, profile in data.items():
+                try:
+                    profiles[name.upper()] = AircraftProfile(name.upper(), profile)
+                except Exception as e:
+                    logger.error(f"Invalid aircraft profile {name}: {e}")
+            _profiles = profiles
+            _profiles_mtime = mtime
+        return _profiles
+
+
+def get_aircraft_profile(name: str) -> Optional[AircraftProfile]:
+    """Look up a compiled profile by name (case-insensitive)."""
+    return load_aircraft_profiles().get((name or '').strip().upper())
+
+
+def list_aircraft_profiles() -> List[Dict[str, Any]]:
+    """Summaries of all available profiles."""
+    return [profile.summary() for profile in load_aircraft_profiles().values()]
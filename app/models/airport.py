@@ -6,6 +6,9 @@ from datetime import datetime
 import json
 import xml.etree.ElementTree as ET
 
+from app.models.flight_category import classify_metars
+from app.models.metar_snapshot import lookup_metars
+
 OPENAIP_API_KEY = os.getenv('OPENAIP_API_KEY')
 OPENAIP_API_URL = 'https://api.core.openaip.net/api/airports'
 
@@ -20,6 +23,23 @@ logger = logging.getLogger(__name__)
 _airport_cache = None
 _cache_file_mtime = None
 
+# Callbacks notified with (requested_codes, metars) after every METAR response
+_metar_listeners = []
+
+
+def add_metar_listener(listener):
+    """Register a callback for observed METAR responses."""
+    if listener not in _metar_listeners:
+        _metar_listeners.append(listener)
+
+
+def _notify_metar_listeners(requested_codes, metars):
+    for listener in list(_metar_listeners):
+        try:
+            listener(requested_codes, metars)
+        except Exception as e:
+            logger.error(f"Error in METAR listener: {e}")
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great circle distance between two points on Earth using Haversine formula.
@@ -254,6 +274,9 @@ def get_icao_from_iata(iata_code):
 def get_metar_data(icao_codes):
     """
     Fetch METAR data for a list of airports.
+
+    Served from the bulk METAR snapshot when one is loaded; the ADDS
+    dataserver is only queried when no current snapshot is available.
     
     Args:
         icao_codes (list): List of ICAO airport codes
@@ -269,6 +292,11 @@ def get_metar_data(icao_codes):
         valid_codes = [code for code in icao_codes if code and isinstance(code, str)]
         if not valid_codes:
             return {}
+
+        metars = lookup_metars(valid_codes)
+        if metars is not None:
+            _notify_metar_listeners(valid_codes, metars)
+            return metars
             
         # Join ICAO codes for the API request
         codes_str = ','.join(valid_codes)
@@ -280,6 +308,7 @@ def get_metar_data(icao_codes):
         # Check for no data response
         if response.status_code == 200 and 'No data' in response.text:
             logger.warning(f"No METAR data found for batch request: {codes_str}")
+            _notify_metar_listeners(valid_codes, {})
             return {}
             
         response.raise_for_status()
@@ -327,12 +356,6 @@ def get_metar_data(icao_codes):
                             'base': int(base)
                         })
                 
-                # Determine flight category
-                flight_category = get_flight_category({
-                    'visibility_statute_mi': visibility_statute_mi,
-                    'cloud_layers': cloud_layers
-                })
-                
                 # Build the METAR data structure
                 metar_data = {
                     'raw_text': raw_text,
@@ -349,7 +372,7 @@ def get_metar_data(icao_codes):
                     'visibility_statute_mi': visibility_statute_mi,
                     'altim_in_hg': altim_in_hg,
                     'cloud_layers': cloud_layers,
-                    'flight_category': flight_category
+                    'flight_category': None
                 }
                 
                 metars[station_id] = metar_data
@@ -358,6 +381,11 @@ def get_metar_data(icao_codes):
                 logger.error(f"Error processing METAR for {station_id}: {str(e)}")
                 continue
                 
+        # Classify all stations in one pass
+        for metar_data, category in zip(metars.values(), classify_metars(list(metars.values()))):
+            metar_data['flight_category'] = category
+
+        _notify_metar_listeners(valid_codes, metars)
         return metars
         
     except requests.exceptions.Timeout:
@@ -379,6 +407,8 @@ def get_metar_data(icao_codes):
 def get_flight_category(metar_data):
     """
     Determine flight category from METAR data.
+
+    Single-METAR wrapper around the vectorized flight category engine.
     
     Args:
         metar_data (dict): METAR data containing visibility and cloud layers
@@ -387,43 +417,7 @@ def get_flight_category(metar_data):
         str: Flight category (VFR, MVFR, IFR, LIFR) or None if unknown
     """
     try:
-        visibility = metar_data.get('visibility_statute_mi')
-        cloud_layers = metar_data.get('cloud_layers', [])
-        
-        if visibility is None:
-            return 'Unknown'
-            
-        # Find the lowest ceiling
-        ceiling = float('inf')
-        has_ceiling = False
-        for layer in cloud_layers:
-            if layer.get('cover') in ['BKN', 'OVC']:
-                base = layer.get('base')
-                if base is not None:
-                    has_ceiling = True
-                    if base < ceiling:
-                        ceiling = base
-        
-        # Determine flight category based on visibility and ceiling
-        if not has_ceiling: # Clear skies
-             if visibility >= 5:
-                return 'VFR'
-             elif visibility >= 3:
-                return 'MVFR'
-             elif visibility >= 1:
-                return 'IFR'
-             else:
-                return 'LIFR'
-
-        if visibility < 1 or ceiling < 500:
-            return 'LIFR'
-        elif visibility < 3 or ceiling < 1000:
-            return 'IFR'
-        elif visibility < 5 or ceiling < 3000:
-            return 'MVFR'
-        else:
-            return 'VFR'
-            
+        return classify_metars([metar_data])[0]
     except Exception as e:
         logger.error(f"Error determining flight category: {str(e)}")
         return 'Unknown'
@@ -0,0 +1,206 @@
+"""
+Airport Index.
+
+In-memory lookup tables built once per airport cache load: flat airport records
+keyed by ICAO/IATA code plus a coarse lat/lon grid for spatial queries.
+"""
+
+import logging
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.models.airport import load_airport_cache
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_NM = 3440.065
+NM_PER_DEG_LAT = 60.0
+
+_index = None
+_index_source = None
+_index_version = 0
+_index_lock = threading.Lock()
+
+
+def haversine_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate great-circle distance in nautical miles."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def normalize_airport(airport: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Flatten a raw airport cache entry into a planner-friendly record.
+
+    Handles the field name variations found in the cache (icao/icaoCode,
+    lat/latitude, geometry.coordinates). Returns None for entries without an
+    identifier or coordinates.
+    """
+    icao_code = airport.get('icao') or airport.get('icaoCode')
+    iata_code = airport.get('iata') or airport.get('iataCode')
+    if not icao_code and not iata_code:
+        return None
+
+    if 'geometry' in airport and 'coordinates' in airport['geometry']:
+        longitude, latitude = airport['geometry']['coordinates']
+    else:
+        latitude = airport.get('lat') or airport.get('latitude')
+        longitude = airport.get('lon') or airport.get('longitude')
+
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        return None
+
+    return {
+        'icao': (icao_code or iata_code).upper(),
+        'iata': iata_code.upper() if iata_code else None,
+        'name': airport.get('name') or '',
+        'city': airport.get('city'),
+        'country': airport.get('country'),
+        'latitude': latitude,
+        'longitude': longitude,
+        'elevation': airport.get('elevation') or 0,
+        'type': airport.get('type'),
+    }
+
+
+class AirportIndex:
+    """Code lookup and grid-bucketed spatial index over normalized airports."""
+
+    def __init__(self, airports: Iterable[Dict[str, Any]], cell_deg: float = 1.0):
+        self.cell_deg = cell_deg
+        self.records: List[Dict[str, Any]] = []
+        self.by_code: Dict[str, Dict[str, Any]] = {}
+        self.cells: Dict[Tuple[int, int], List[Dict[str, Any]]] = defaultdict(list)
+
+        for airport in airports:
+            record = normalize_airport(airport)
+            if record is not None:
+                self._insert(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _insert(self, record: Dict[str, Any]) -> None:
+        self.records.append(record)
+        self.by_code.setdefault(record['icao'], record)
+        if record['iata']:
+            self.by_code.setdefault(record['iata'], record)
+        self.cells[self._cell(record['latitude'], record['longitude'])].append(record)
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Add a normalized record unless its ICAO code is already indexed."""
+        if record['icao'] in self.by_code:
+            return False
+        self._insert(record)
+        return True
+
+    def discard(self, code: str) -> bool:
+        """Remove the record with this ICAO code, if present."""
+        record = self.by_code.get(code)
+        if record is None or record['icao'] != code:
+            return False
+        self.records.remove(record)
+        self.cells[self._cell(record['latitude'], record['longitude'])].remove(record)
+        for key in (record['icao'], record['iata']):
+            if key and self.by_code.get(key) is record:
+                del self.by_code[key]
+        return True
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """Look up an airport by ICAO or IATA code."""
+        if not code:
+            return None
+        return self.by_code.get(code.strip().upper())
+
+    def within_bbox(self, west: float, south: float, east: float,
+                    north: float) -> List[Dict[str, Any]]:
+        """
+        Return airports inside a lat/lon bounding box.
+
+        ``west`` may exceed ``east`` for boxes crossing the antimeridian.
+        """
+        lon_ranges = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+        results = []
+        row_min, row_max = self._cell(south, 0)[0], self._cell(north, 0)[0]
+        for lo, hi in lon_ranges:
+            col_min, col_max = self._cell(0, lo)[1], self._cell(0, hi)[1]
+            for row in range(row_min, row_max + 1):
+                for col in range(col_min, col_max + 1):
+                    for record in self.cells.get((row, col), ()):
+                        if south <= record['latitude'] <= north and lo <= record['longitude'] <= hi:
+                            results.append(record)
+        return results
+
+    def within_radius(self, lat: float, lon: float,
+                      radius_nm: float) -> List[Tuple[Dict[str, Any], float]]:
+        """Return (airport, distance_nm) pairs within radius_nm, nearest first."""
+        dlat = radius_nm / NM_PER_DEG_LAT
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+        dlon = min(radius_nm / (NM_PER_DEG_LAT * cos_lat), 180.0)
+        west, east = lon - dlon, lon + dlon
+        if dlon >= 180.0:
+            west, east = -180.0, 180.0
+        else:
+            west = west + 360.0 if west < -180.0 else west
+            east = east - 360.0 if east > 180.0 else east
+
+        matches = []
+        for record in self.within_bbox(west, max(lat - dlat, -90.0), east, min(lat + dlat, 90.0)):
+            distance = haversine_nm(lat, lon, record['latitude'], record['longitude'])
+            if distance <= radius_nm:
+                matches.append((record, distance))
+        matches.sort(key=lambda item: item[1])
+        return matches
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_radius_nm: float = 100.0,
+                initial_radius_nm: float = 25.0) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Return up to k (airport, distance_nm) pairs nearest to a point, nearest first.
+
+        Searches rings of doubling radius, so sparse areas cost a few grid scans
+        and dense areas stop at the first ring holding k airports.
+        """
+        radius = min(initial_radius_nm, max_radius_nm)
+        while True:
+            matches = self.within_radius(lat, lon, radius)
+            if len(matches) >= k or radius >= max_radius_nm:
+                return matches[:k]
+            radius = min(radius * 2, max_radius_nm)
+
+
+def get_airport_index() -> AirportIndex:
+    """Return the airport index, rebuilding it whenever the airport cache reloads."""
+    global _index, _index_source, _index_version
+    airports = load_airport_cache()
+    with _index_lock:
+        # A missing or unreadable cache file yields a new empty list on every load
+        unchanged = _index_source is airports or (not airports and not _index_source)
+        if _index is None or not unchanged:
+            _index = AirportIndex(airports or [])
+            _index_source = airports
+            _index_version += 1
+            logger.info(f"Built airport index with {len(_index)} airports "
+                        f"(version {_index_version})")
+        return _index
+
+
+def get_airport_dataset_version() -> int:
+    """Return a counter that changes every time the airport index is rebuilt."""
+    get_airport_index()
+    return _index_version
+
+
+def lookup_airport(code: str) -> Optional[Dict[str, Any]]:
+    """Look up a flat airport record by code without fetching METAR data."""
+    return get_airport_index().get(code)
@@ -0,0 +1,389 @@
+"""
+Airspace Model.
+
+Loads controlled and special-use airspace from a local OpenAIR or GeoJSON file
+into a packed R-tree of polygon bounding boxes. Segment queries are batched: all
+legs of a route graph descend the tree together as numpy arrays, and only the
+surviving (leg, airspace) pairs get an exact polygon intersection test.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+RTREE_NODE_CAPACITY = 16
+UNLIMITED_FT = 99999
+ARC_STEP_DEG = 10.0
+NM_PER_DEG_LAT = 60.0
+
+# OpenAIR special-use class codes
+SPECIAL_USE_LABELS = {'R': 'Restricted', 'P': 'Prohibited', 'Q': 'Danger'}
+
+_index = None
+_index_mtime = None
+_index_version = 0
+_index_lock = threading.Lock()
+
+
+def parse_altitude(value: Any) -> float:
+    """
+    Parse an airspace limit into feet.
+
+    Accepts numbers (feet), OpenAIR strings (``SFC``, ``GND``, ``3500ft MSL``,
+    ``FL125``, ``2500 AGL``, ``UNL``) and openAIP limit dicts (``value``/``unit``
+    with unit 0 = metres, 1 = feet, 6 = flight level). AGL limits are treated as
+    MSL, which is conservative for floors over low terrain.
+    """
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        amount = float(value.get('value') or 0)
+        unit = value.get('unit', 1)
+        if unit == 6:
+            return amount * 100
+        if unit == 0:
+            return amount * 3.28084
+        return amount
+
+    text = str(value).strip().upper()
+    if not text or text.startswith(('SFC', 'GND')):
+        return 0.0
+    if text.startswith('UNL'):
+        return float(UNLIMITED_FT)
+    match = re.match(r'FL\s*(\d+)', text)
+    if match:
+        return float(match.group(1)) * 100
+    match = re.match(r'(\d+(?:\.\d+)?)\s*(M\b|MSL|FT|F\b|AGL|AMSL)?', text)
+    if match:
+        amount = float(match.group(1))
+        return amount * 3.28084 if match.group(2) == 'M' else amount
+    return 0.0
+
+
+def _parse_openair_coordinate(text: str) -> Optional[Tuple[float, float]]:
+    """Parse ``37:30:00 N 122:10:30 W`` (or decimal minutes) into (lat, lon)."""
+    parts = re.findall(r'([\d:.]+)\s*([NSEW])', text.upper())
+    if len(parts) != 2:
+        return None
+    values = []
+    for number, hemisphere in parts:
+        fields = [float(field) for field in number.split(':')]
+        degrees = fields[0] + sum(field / 60 ** (i + 1) for i, field in enumerate(fields[1:]))
+        values.append(-degrees if hemisphere in 'SW' else degrees)
+    return values[0], values[1]
+
+
+def _arc_points(center, radius_nm, start_deg, end_deg, clockwise=True):
+    """Points along an arc around center (bearings in degrees true)."""
+    lat0, lon0 = center
+    sweep = (end_deg - start_deg) % 360.0 if clockwise else -((start_deg - end_deg) % 360.0)
+    if sweep == 0:
+        sweep = 360.0 if clockwise else -360.0
+    steps = max(int(abs(sweep) / ARC_STEP_DEG), 1)
+    cos_lat = max(math.cos(math.radians(lat0)), 1e-6)
+    points = []
+    for i in range(steps + 1):
+        bearing = math.radians(start_deg + sweep * i / steps)
+        points.append((lat0 + radius_nm * math.cos(bearing) / NM_PER_DEG_LAT,
+                       lon0 + radius_nm * math.sin(bearing) / (NM_PER_DEG_LAT * cos_lat)))
+    return points
+
+
+def _bearing_and_distance(center, point):
+    """Planar bearing (degrees) and distance (nm) from center to point."""
+    cos_lat = math.cos(math.radians(center[0]))
+    dy = (point[0] - center[0]) * NM_PER_DEG_LAT
+    dx = (point[1] - center[1]) * NM_PER_DEG_LAT * cos_lat
+    return math.degrees(math.atan2(dx, dy)) % 360.0, math.hypot(dx, dy)
+
+
+def parse_openair(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse OpenAIR airspace definitions.
+
+    Supports AC/AN/AL/AH records, DP polygon points, DC circles and DA/DB arcs
+    with ``V X=`` centres and ``V D=`` directions.
+    """
+    airspaces = []
+    current = None
+    center = None
+    clockwise = True
+
+    def finish():
+        if current and len(current['points']) >= 3:
+            airspaces.append(current)
+
+    for raw_line in text.splitlines():
+        line = raw_line.split('*', 1)[0].strip()
+        if not line:
+            continue
+        keyword, _, rest = line.partition(' ')
+        keyword = keyword.upper()
+        rest = rest.strip()
+        if keyword == 'AC':
+            finish()
+            current = {'name': '', 'class': rest.upper(), 'floor': 0.0,
+                       'ceiling': float(UNLIMITED_FT), 'points': []}
+            center, clockwise = None, True
+        elif current is None:
+            continue
+        elif keyword == 'AN':
+            current['name'] = rest
+        elif keyword == 'AL':
+            current['floor'] = parse_altitude(rest)
+        elif keyword == 'AH':
+            current['ceiling'] = parse_altitude(rest)
+        elif keyword == 'V':
+            name, _, value = rest.partition('=')
+            name = name.strip().upper()
+            if name == 'X':
+                center = _parse_openair_coordinate(value)
+            elif name == 'D':
+                clockwise = value.strip() != '-'
+        elif keyword == 'DP':
+            point = _parse_openair_coordinate(rest)
+            if point:
+                current['points'].append(point)
+        elif keyword == 'DC' and center:
+            current['points'].extend(_arc_points(center, float(rest), 0.0, 360.0))
+        elif keyword == 'DA' and center:
+            radius, start, end = (float(v) for v in rest.split(','))
+            current['points'].extend(_arc_points(center, radius, start, end, clockwise))
+        elif keyword == 'DB' and center:
+            ends = [_parse_openair_coordinate(part) for part in rest.split(',')]
+            if all(ends):
+                start_bearing, radius = _bearing_and_distance(center, ends[0])
+                end_bearing, _ = _bearing_and_distance(center, ends[1])
+                current['points'].extend(
+                    _arc_points(center, radius, start_bearing, end_bearing, clockwise))
+    finish()
+    return airspaces
+
+
+def parse_geojson(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Parse a GeoJSON FeatureCollection of (Multi)Polygon airspace features."""
+    icao_classes = 'ABCDEFG'
+    airspaces = []
+    for feature in data.get('features', []):
+        geometry = feature.get('geometry') or {}
+        properties = feature.get('properties') or {}
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+
+        airspace_class = properties.get('class')
+        if airspace_class is None and isinstance(properties.get('type'), str):
+            airspace_class = properties['type']
+        if airspace_class is None and isinstance(properties.get('icaoClass'), int):
+            icao_class = properties['icaoClass']
+            if 0 <= icao_class < len(icao_classes):
+                airspace_class = icao_classes[icao_class]
+        floor = properties.get('floor_ft',
+                               properties.get('lowerLimit', properties.get('lower')))
+        ceiling = properties.get('ceiling_ft',
+                                 properties.get('upperLimit', properties.get('upper')))
+        for polygon in polygons:
+            if not polygon or len(polygon[0]) < 3:
+                continue
+            airspaces.append({
+                'name': properties.get('name') or '',
+                'class': str(airspace_class or '').upper(),
+                'floor': parse_altitude(floor),
+                'ceiling': parse_altitude(ceiling) if ceiling is not None else float(UNLIMITED_FT),
+                'points': [(lat, lon) for lon, lat, *_ in polygon[0]],
+            })
+    return airspaces
+
+
+def load_airspaces(path: str) -> List[Dict[str, Any]]:
+    """Load airspaces from a GeoJSON (.json/.geojson) or OpenAIR file."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        if path.lower().endswith(('.json', '.geojson')):
+            return parse_geojson(json.load(f))
+        return parse_openair(f.read())
+
+
+def _boxes_overlap(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise overlap of (min_lon, min_lat, max_lon, max_lat) boxes."""
+    return (a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2]) & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3])
+
+
+def _str_groups(boxes: np.ndarray, capacity: int) -> List[np.ndarray]:
+    """Sort-Tile-Recursive packing: group box indices into nodes of up to capacity."""
+    count = len(boxes)
+    node_count = math.ceil(count / capacity)
+    slab_count = max(math.ceil(math.sqrt(node_count)), 1)
+    centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    order = np.argsort(centers_x, kind='stable')
+    slab_size = slab_count * capacity
+    groups = []
+    for start in range(0, count, slab_size):
+        slab = order[start:start + slab_size]
+        slab = slab[np.argsort(centers_y[slab], kind='stable')]
+        groups.extend(slab[i:i + capacity] for i in range(0, len(slab), capacity))
+    return groups
+
+
+def _segment_hits_polygon(x1, y1, x2, y2, ring: np.ndarray) -> bool:
+    """Whether a planar segment intersects or lies inside a closed (lon, lat) ring."""
+    px, py = ring[:-1, 0], ring[:-1, 1]
+    qx, qy = ring[1:, 0], ring[1:, 1]
+
+    # Start point inside (ray casting)
+    crosses = ((py > y1) != (qy > y1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at = px + (y1 - py) * (qx - px) / (qy - py)
+    if np.count_nonzero(crosses & (x1 < x_at)) % 2 == 1:
+        return True
+
+    def orientation(ax, ay, bx, by, cx, cy):
+        return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+    o1 = orientation(x1, y1, x2, y2, px, py)
+    o2 = orientation(x1, y1, x2, y2, qx, qy)
+    o3 = orientation(px, py, qx, qy, x1, y1)
+    o4 = orientation(px, py, qx, qy, x2, y2)
+    return bool(np.any((o1 != o2) & (o3 != o4)))
+
+
+class AirspaceIndex:
+    """
+    Static R-tree over airspace bounding boxes, bulk-loaded with STR packing.
+
+    Each level is stored as node boxes plus CSR child lists, so a batch of query
+    segments descends the tree level by level with vectorized overlap tests.
+    """
+
+    def __init__(self, airspaces: Sequence[Dict[str, Any]], capacity: int = RTREE_NODE_CAPACITY):
+        self.airspaces = list(airspaces)
+        self.rings = []
+        boxes = []
+        for airspace in self.airspaces:
+            ring = np.array([(lon, lat) for lat, lon in airspace['points']], dtype=float)
+            if not np.array_equal(ring[0], ring[-1]):
+                ring = np.vstack([ring, ring[:1]])
+            self.rings.append(ring)
+            boxes.append((ring[:, 0].min(), ring[:, 1].min(), ring[:, 0].max(), ring[:, 1].max()))
+        self.boxes = np.array(boxes, dtype=float).reshape(-1, 4)
+        self.floors = np.array([a['floor'] for a in self.airspaces], dtype=float)
+        self.ceilings = np.array([a['ceiling'] for a in self.airspaces], dtype=float)
+
+        # levels[k] = (node_boxes, child_ptr, child_idx); level 0 children are airspaces
+        self.levels = []
+        level_boxes = self.boxes
+        while len(level_boxes):
+            groups = _str_groups(level_boxes, capacity)
+            node_boxes = np.array([
+                (level_boxes[g, 0].min(), level_boxes[g, 1].min(),
+                 level_boxes[g, 2].max(), level_boxes[g, 3].max())
+                for g in groups
+            ])
+            child_ptr = np.concatenate([[0], np.cumsum([len(g) for g in groups])])
+            self.levels.append((node_boxes, child_ptr, np.concatenate(groups)))
+            if len(groups) == 1:
+                break
+            level_boxes = node_boxes
+
+    def __len__(self) -> int:
+        return len(self.airspaces)
+
+    def candidate_pairs(self, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (query_index, airspace_index) pairs whose bounding boxes overlap."""
+        if not self.levels or not len(boxes):
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+        roots = len(self.levels[-1][0])
+        queries = np.repeat(np.arange(len(boxes)), roots)
+        nodes = np.tile(np.arange(roots), len(boxes))
+        for node_boxes, child_ptr, child_idx in reversed(self.levels):
+            keep = _boxes_overlap(boxes[queries], node_boxes[nodes])
+            queries, nodes = queries[keep], nodes[keep]
+            counts = child_ptr[nodes + 1] - child_ptr[nodes]
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            queries = np.repeat(queries, counts)
+            nodes = child_idx[np.repeat(child_ptr[nodes], counts) + offsets]
+        keep = _boxes_overlap(boxes[queries], self.boxes[nodes])
+        return queries[keep], nodes[keep]
+
+    def query_segments(self, lat1, lon1, lat2, lon2,
+                       altitude_ft: Optional[float] = None) -> List[List[int]]:
+        """
+        Airspaces crossed by each segment.
+
+        Args:
+            lat1, lon1, lat2, lon2: Segment endpoint arrays
+            altitude_ft: Only report airspaces whose vertical limits contain this altitude
+
+        Returns:
+            One list of airspace indices per segment
+        """
+        lat1, lon1, lat2, lon2 = (np.atleast_1d(np.asarray(a, dtype=float))
+                                  for a in (lat1, lon1, lat2, lon2))
+        boxes = np.column_stack([np.minimum(lon1, lon2), np.minimum(lat1, lat2),
+                                 np.maximum(lon1, lon2), np.maximum(lat1, lat2)])
+        queries, candidates = self.candidate_pairs(boxes)
+        if altitude_ft is not None and len(candidates):
+            keep = ((self.floors[candidates] <= altitude_ft)
+                    & (altitude_ft <= self.ceilings[candidates]))
+            queries, candidates = queries[keep], candidates[keep]
+
+        results: List[List[int]] = [[] for _ in range(len(lat1))]
+        for q, a in zip(queries.tolist(), candidates.tolist()):
+            if _segment_hits_polygon(lon1[q], lat1[q], lon2[q], lat2[q], self.rings[a]):
+                results[q].append(a)
+        return results
+
+
+def get_airspace_index() -> AirspaceIndex:
+    """Return the airspace index, reloading it when the airspace file changes."""
+    global _index, _index_mtime, _index_version
+    path = settings.airspace_data_file
+    try:
+        mtime = os.path.getmtime(path) if path else None
+    except OSError:
+        mtime = None
+
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            airspaces = []
+            if mtime is not None:
+                try:
+                    airspaces = load_airspaces(path)
+                    logger.info(f"Loaded {len(airspaces)} airspaces from {path}")
+                except Exception as e:
+                    logger.error(f"Error loading airspace file {path}: {e}")
+            _index = AirspaceIndex(airspaces)
+            _index_mtime = mtime
+            _index_version += 1
+        return _index
+
+
+def get_airspace_dataset_version() -> int:
+    """Return a counter that changes every time the airspace index is rebuilt."""
+    get_airspace_index()
+    return _index_version
+
+
+def describe_airspace(airspace: Dict[str, Any]) -> str:
+    """Short human-readable airspace label, e.g. ``Class B SAN FRANCISCO``."""
+    airspace_class = airspace['class']
+    if len(airspace_class) == 1 and airspace_class in 'ABCDEFG':
+        label = f"Class {airspace_class}"
+    else:
+        label = SPECIAL_USE_LABELS.get(airspace_class, airspace_class)
+    return f"{label} {airspace['name']}".strip()
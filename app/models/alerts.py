@@ -0,0 +1,333 @@
+"""
+Condition Alerts.
+
+Pilots subscribe to conditions at stations ("KPAO below VFR", "gusts above
+20 kt at KSQL") and are notified when they start and stop holding. The
+subscription store is indexed by station, and each station's predicates are
+packed into arrays (field, sign, threshold) so evaluating them is one
+vectorized comparison. Only stations whose observation changed in a new METAR
+snapshot are evaluated, which keeps an update proportional to the changed
+stations that have subscribers, not to the number of subscriptions.
+
+Alerts are edge-triggered: an event is published when a condition starts
+holding and when it clears. Events go to per-client channels that number them,
+keep a bounded number of recent ones and wake the client's streams. A channel
+exists only while its client has subscriptions or an open stream.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.flight_category import CATEGORIES, UNKNOWN
+from app.models.metar_snapshot import MetarTable, add_snapshot_listener
+
+logger = logging.getLogger(__name__)
+
+# Observation fields predicates can test, in the order of the per-station value vector
+FIELDS = ('category', 'visibility_sm', 'ceiling_ft', 'wind_speed_kt', 'wind_gust_kt')
+
+# Condition -> (field, sign): a condition holds when sign * value > sign * threshold
+CONDITIONS = {
+    'category_below': ('category', 1.0),
+    'visibility_below_sm': ('visibility_sm', -1.0),
+    'ceiling_below_ft': ('ceiling_ft', -1.0),
+    'wind_above_kt': ('wind_speed_kt', 1.0),
+    'gust_above_kt': ('wind_gust_kt', 1.0),
+}
+
+
+def condition_threshold(condition: str, threshold: Any) -> float:
+    """
+    Numeric threshold of a condition.
+
+    ``category_below`` takes a flight category name ("below VFR" holds for
+    MVFR, IFR and LIFR); the other conditions take numbers.
+
+    Raises:
+        ValueError: If the condition or threshold is invalid
+    """
+    if condition not in CONDITIONS:
+        raise ValueError(f"Unknown condition {condition!r}")
+    if condition == 'category_below':
+        names = [name for name in CATEGORIES if name != CATEGORIES[UNKNOWN]]
+        if str(threshold).upper() not in names:
+            raise ValueError(f"Category must be one of {', '.join(names)}")
+        return float(names.index(str(threshold).upper()))
+    try:
+        return float(threshold)
+    except (TypeError, ValueError):
+        raise ValueError(f"Threshold of {condition} must be a number")
+
+
+class StationPredicates:
+    """Packed predicates of one station's subscriptions and whether each currently holds."""
+
+    def __init__(self, ids: Sequence[int], subscriptions: Dict[int, Dict[str, Any]],
+                 previous: Optional["StationPredicates"] = None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        conditions = [CONDITIONS[subscriptions[i]['condition']] for i in ids]
+        self.field = np.array([FIELDS.index(field) for field, _ in conditions], dtype=np.int64)
+        self.sign = np.array([sign for _, sign in conditions])
+        self.threshold = np.array([subscriptions[i]['threshold_value'] for i in ids])
+        # Carry over state so a rebuild does not re-trigger conditions already holding
+        held = set() if previous is None else set(previous.ids[previous.active].tolist())
+        self.active = np.array([i in held for i in ids], dtype=bool)
+
+    def evaluate(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Subscription ids whose condition started and stopped holding for new observations."""
+        with np.errstate(invalid='ignore'):
+            holds = self.sign * values[self.field] > self.sign * self.threshold
+        started = self.ids[holds & ~self.active]
+        cleared = self.ids[~holds & self.active]
+        self.active = holds
+        return started, cleared
+
+
+class AlertChannel:
+    """
+    Bounded log of one client's recent events; safe to publish to from any thread.
+
+    Events are numbered in publication order. Every stream reads from its own
+    cursor, so concurrent streams of a client each receive all events, and a
+    stream resuming after a given event id replays what followed it (as far as
+    the log reaches).
+    """
+
+    def __init__(self, max_pending: int):
+        self.events: deque = deque(maxlen=max_pending)
+        self.sequence = 0
+        self.delivered = 0
+        self.streams = 0
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self.sequence += 1
+            self.events.append((self.sequence, event))
+            waiters = list(self._waiters)
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+
+    def cursor(self, last_event_id: Optional[int] = None) -> int:
+        """Where a new stream starts: after ``last_event_id``, else after the last delivered one."""
+        with self._lock:
+            if last_event_id is None:
+                return self.delivered
+            return min(max(last_event_id, 0), self.sequence)
+
+    def acknowledge(self, sequence: int) -> None:
+        """Record that events up to ``sequence`` reached a stream."""
+        with self._lock:
+            self.delivered = max(self.delivered, sequence)
+
+    def events_after(self, cursor: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """(id, event) pairs published after ``cursor`` that are still in the log."""
+        with self._lock:
+            return [(sequence, event) for sequence, event in self.events if sequence > cursor]
+
+    async def next_events(self, cursor: int, timeout: float) -> List[Tuple[int, Dict[str, Any]]]:
+        """Events after ``cursor``, waiting up to ``timeout`` seconds (empty on timeout)."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+            empty = self.sequence <= cursor
+        try:
+            if empty:
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return self.events_after(cursor)
+
+
+class AlertEngine:
+    """Subscription store indexed by station, evaluated against METAR snapshots."""
+
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self.evaluations = 0
+        self._subscriptions: Dict[int, Dict[str, Any]] = {}
+        self._by_station: Dict[str, Set[int]] = {}
+        self._by_client: Dict[str, Set[int]] = {}
+        self._predicates: Dict[str, StationPredicates] = {}
+        self._dirty: Set[str] = set()
+        self._channels: Dict[str, AlertChannel] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, client_id: str, station: str, condition: str,
+                  threshold: Any) -> Dict[str, Any]:
+        """
+        Add a subscription.
+
+        Raises:
+            ValueError: If the condition or threshold is invalid
+        """
+        threshold_value = condition_threshold(condition, threshold)
+        station = station.strip().upper()
+        with self._lock:
+            subscription = {
+                'id': next(self._ids),
+                'client_id': client_id,
+                'station': station,
+                'condition': condition,
+                'threshold': (str(threshold).upper() if condition == 'category_below'
+                              else threshold_value),
+                'threshold_value': threshold_value,
+                'created': datetime.now(timezone.utc),
+            }
+            self._subscriptions[subscription['id']] = subscription
+            self._by_station.setdefault(station, set()).add(subscription['id'])
+            self._by_client.setdefault(client_id, set()).add(subscription['id'])
+            self._dirty.add(station)
+            if client_id not in self._channels:
+                self._channels[client_id] = AlertChannel(self.max_pending)
+        return _public(subscription)
+
+    def unsubscribe(self, subscription_id: int, client_id: Optional[str] = None) -> bool:
+        """Remove a subscription (only the owner's when ``client_id`` is given)."""
+        with self._lock:
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None or (client_id is not None
+                                        and subscription['client_id'] != client_id):
+                return False
+            del self._subscriptions[subscription_id]
+            station = subscription['station']
+            self._by_station[station].discard(subscription_id)
+            if not self._by_station[station]:
+                del self._by_station[station]
+                self._predicates.pop(station, None)
+                self._dirty.discard(station)
+            else:
+                self._dirty.add(station)
+            owned = self._by_client[subscription['client_id']]
+            owned.discard(subscription_id)
+            if not owned:
+                del self._by_client[subscription['client_id']]
+            self._release(subscription['client_id'])
+        return True
+
+    def subscriptions(self, client_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [_public(self._subscriptions[i])
+                    for i in sorted(self._by_client.get(client_id, ()))]
+
+    def channel(self, client_id: str) -> Optional[AlertChannel]:
+        """The client's channel, or None when it has no subscriptions and no open stream."""
+        with self._lock:
+            return self._channels.get(client_id)
+
+    def open_stream(self, client_id: str) -> Optional[AlertChannel]:
+        """Attach a stream to the client's channel (None when the client has none)."""
+        with self._lock:
+            channel = self._channels.get(client_id)
+            if channel is not None:
+                channel.streams += 1
+            return channel
+
+    def close_stream(self, client_id: str, channel: AlertChannel) -> None:
+        with self._lock:
+            channel.streams -= 1
+            self._release(client_id)
+
+    def _release(self, client_id: str) -> None:
+        # Drop a channel nobody can read from or publish to any more
+        channel = self._channels.get(client_id)
+        if channel is not None and not channel.streams and client_id not in self._by_client:
+            del self._channels[client_id]
+
+    def _station_predicates(self, station: str) -> Optional[StationPredicates]:
+        if station in self._dirty:
+            self._dirty.discard(station)
+            ids = sorted(self._by_station.get(station, ()))
+            self._predicates[station] = StationPredicates(ids, self._subscriptions,
+                                                          self._predicates.get(station))
+        return self._predicates.get(station)
+
+    def evaluate(self, table: MetarTable, rows: Optional[np.ndarray] = None) -> int:
+        """
+        Evaluate the subscriptions of changed stations against a snapshot.
+
+        Args:
+            table: New METAR snapshot
+            rows: Rows whose observation changed (defaults to all rows)
+
+        Returns:
+            int: Number of events published
+        """
+        rows = np.arange(len(table)) if rows is None else rows
+        category = table.category.astype(float)
+        category[table.category == UNKNOWN] = np.nan
+        columns = np.stack([category] + [getattr(table, field) for field in FIELDS[1:]])
+
+        events = []
+        with self._lock:
+            for row in rows.tolist():
+                station = table.stations[row]
+                if station not in self._by_station:
+                    continue
+                self.evaluations += 1
+                started, cleared = self._station_predicates(station).evaluate(columns[:, row])
+                for state, ids in (('triggered', started), ('cleared', cleared)):
+                    for subscription_id in ids.tolist():
+                        subscription = self._subscriptions[subscription_id]
+                        events.append((self._channels[subscription['client_id']],
+                                       _event(state, subscription, table, row)))
+        for channel, event in events:
+            channel.publish(event)
+        return len(events)
+
+
+def _public(subscription: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in subscription.items() if key != 'threshold_value'}
+
+
+def _event(state: str, subscription: Dict[str, Any], table: MetarTable, row: int) -> Dict[str, Any]:
+    metar = table.record(row)
+    return {
+        'event': state,
+        'subscription_id': subscription['id'],
+        'station': subscription['station'],
+        'condition': subscription['condition'],
+        'threshold': subscription['threshold'],
+        'observation_time': metar['observation_time'],
+        'flight_category': metar['flight_category'],
+        'visibility_sm': metar['visibility_statute_mi'],
+        'ceiling_ft': metar['ceiling_ft'],
+        'wind_speed_kt': metar['wind_speed_kt'],
+        'wind_gust_kt': metar['wind_gust_kt'],
+        'raw_text': metar['raw_text'],
+    }
+
+
+_engine = AlertEngine(settings.alert_queue_size)
+
+
+def get_alert_engine() -> AlertEngine:
+    """Return the process-wide alert engine."""
+    return _engine
+
+
+def evaluate_metar_snapshot(table: MetarTable, previous: Optional[MetarTable]) -> None:
+    """Snapshot listener: evaluate subscriptions of stations with a new observation."""
+    published = _engine.evaluate(table, table.changed_rows(previous))
+    if published:
+        logger.info(f"Published {published} condition alerts")
+
+
+add_snapshot_listener(evaluate_metar_snapshot)
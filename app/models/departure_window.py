@@ -0,0 +1,144 @@
+"""
+Departure Window Model.
+
+Scores every candidate departure time in a window for a planned route in one
+array computation: route samples get ETA offsets, the (departures, samples) ETA
+matrix indexes the hourly forecasts already cached per grid node, and headwind,
+ceiling/visibility and precipitation risk are reduced per departure.
+"""
+
+import logging
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.forecast_cache import get_forecast_cache
+from app.models.navigation import great_circle_nm, sample_legs, true_course, wind_triangle
+
+logger = logging.getLogger(__name__)
+
+# Spacing of forecast samples along the route (nautical miles)
+SAMPLE_SPACING_NM = 25.0
+
+# Ground time assumed at each intermediate fuel stop
+FUEL_STOP_MINUTES = 30
+
+# Visibility risk ramps from 0 at MARGINAL to 1 at MINIMUM (statute miles)
+MARGINAL_VISIBILITY_SM = 5.0
+MINIMUM_VISIBILITY_SM = 3.0
+METERS_PER_SM = 1609.34
+
+# Ceiling risk ramps with low cloud cover from scattered to overcast (percent)
+LOW_CLOUD_SCATTERED_PCT = 50.0
+LOW_CLOUD_OVERCAST_PCT = 87.5
+
+# Average headwind (knots) that earns the full wind penalty
+MAX_HEADWIND_PENALTY_KT = 30.0
+
+# Weights of the risk components in the 0-100 score
+SCORE_WEIGHTS = {'wind': 0.3, 'ceiling_visibility': 0.4, 'precipitation': 0.3}
+
+SURFACE_VARIABLES = ['visibility', 'cloudcover_low', 'precipitation_probability']
+
+
+def _route_samples(waypoints: Sequence[Tuple[float, float]], tas_kt: float):
+    """
+    Sample the route.
+
+    Returns per-sample position, course, segment length and no-wind ETA offset (hours).
+    """
+    coords = np.asarray(waypoints, dtype=float)
+    lat1, lon1 = coords[:-1, 0], coords[:-1, 1]
+    lat2, lon2 = coords[1:, 0], coords[1:, 1]
+    distances = great_circle_nm(lat1, lon1, lat2, lon2)
+    lats, lons, leg_index, segment_nm = sample_legs(lat1, lon1, lat2, lon2, SAMPLE_SPACING_NM,
+                                                    distances)
+    courses = true_course(lat1, lon1, lat2, lon2)[leg_index]
+    along_nm = np.cumsum(segment_nm) - segment_nm / 2
+    offset_hr = along_nm / tas_kt + leg_index * FUEL_STOP_MINUTES / 60.0
+    return lats, lons, leg_index, segment_nm, courses, offset_hr
+
+
+def score_departure_window(
+    waypoints: Sequence[Tuple[float, float]],
+    tas_kt: float,
+    altitudes_ft: Sequence[float],
+    start_time: Optional[float] = None,
+    window_hours: float = 48,
+    step_minutes: int = 30,
+    forecast_cache=None,
+) -> Dict[str, Any]:
+    """
+    Score departure times across a window for a fixed route.
+
+    Args:
+        waypoints: (latitude, longitude) of the departure, stops and destination
+        tas_kt: True airspeed in knots
+        altitudes_ft: Cruise altitude for each leg
+        start_time: Earliest departure (unix seconds, defaults to now)
+        window_hours: Length of the window in hours
+        step_minutes: Spacing of candidate departure times in minutes
+        forecast_cache: Optional forecast cache (defaults to the shared cache)
+
+    Returns:
+        dict: One entry per candidate departure, in time order, and the best departures
+    """
+    cache = get_forecast_cache() if forecast_cache is None else forecast_cache
+    start_time = time.time() if start_time is None else start_time
+    lats, lons, leg_index, segment_nm, courses, offset_hr = _route_samples(waypoints, tas_kt)
+    departures = start_time + np.arange(0, window_hours * 60 + 1e-9, step_minutes) * 60.0
+    etas = departures[:, None] + offset_hr[None, :] * 3600.0  # (departures, samples)
+
+    altitude = np.asarray(altitudes_ft, dtype=float)[leg_index]
+    u, v = cache.winds_aloft_timeseries(lats, lons, altitude, etas)
+    groundspeed, _, headwind, _ = wind_triangle(courses[None, :], tas_kt, u, v)
+    total_nm = segment_nm.sum()
+    flight_time_hr = (segment_nm / groundspeed).sum(axis=1)
+    average_headwind = (headwind * segment_nm).sum(axis=1) / total_nm
+
+    surface = cache.surface_timeseries(lats, lons, SURFACE_VARIABLES, etas)
+    visibility_sm = surface['visibility'] / METERS_PER_SM
+    visibility_risk = np.clip((MARGINAL_VISIBILITY_SM - visibility_sm)
+                              / (MARGINAL_VISIBILITY_SM - MINIMUM_VISIBILITY_SM), 0.0, 1.0)
+    ceiling_risk = np.clip((surface['cloudcover_low'] - LOW_CLOUD_SCATTERED_PCT)
+                           / (LOW_CLOUD_OVERCAST_PCT - LOW_CLOUD_SCATTERED_PCT), 0.0, 1.0)
+    precipitation_risk = np.clip(surface['precipitation_probability'] / 100.0, 0.0, 1.0)
+    covered = ~np.isnan(visibility_risk) | ~np.isnan(ceiling_risk) | ~np.isnan(precipitation_risk)
+
+    with warnings.catch_warnings():
+        # All-NaN rows (no forecast coverage) are expected; the worst point governs go/no-go
+        warnings.simplefilter('ignore', RuntimeWarning)
+        weather_risk = np.nan_to_num(np.nanmax(np.fmax(visibility_risk, ceiling_risk), axis=1))
+        precip_risk = np.nan_to_num(np.nanmax(precipitation_risk, axis=1))
+        min_visibility = np.nanmin(visibility_sm, axis=1)
+        max_low_cloud = np.nanmax(surface['cloudcover_low'], axis=1)
+        max_precip_probability = np.nanmax(surface['precipitation_probability'], axis=1)
+    wind_risk = np.clip(average_headwind / MAX_HEADWIND_PENALTY_KT, 0.0, 1.0)
+    penalty = (SCORE_WEIGHTS['wind'] * wind_risk
+               + SCORE_WEIGHTS['ceiling_visibility'] * weather_risk
+               + SCORE_WEIGHTS['precipitation'] * precip_risk)
+    flyable = ~np.isnan(flight_time_hr)
+    score = np.where(flyable, 100.0 * (1.0 - penalty), 0.0)
+    coverage = covered.mean(axis=1)
+
+    slots = []
+    for w, departure in enumerate(departures):
+        slots.append({
+            'departure_time': datetime.fromtimestamp(departure, tz=timezone.utc),
+            'score': round(float(score[w]), 1),
+            'estimated_time_hr': float(flight_time_hr[w]) if flyable[w] else None,
+            'average_headwind_kt': round(float(average_headwind[w]), 1),
+            'min_visibility_sm': _optional_round(min_visibility[w]),
+            'max_low_cloud_pct': _optional_round(max_low_cloud[w]),
+            'max_precipitation_probability': _optional_round(max_precip_probability[w]),
+            'forecast_coverage': round(float(coverage[w]), 2),
+        })
+    best = sorted(slots, key=lambda slot: (-slot['score'], slot['departure_time']))
+    return {'departures': slots, 'best': best[:3]}
+
+
+def _optional_round(value, digits: int = 1) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
@@ -0,0 +1,127 @@
+"""
+Flight Category Engine.
+
+Classifies visibility and ceiling into VFR/MVFR/IFR/LIFR for whole arrays of
+stations at once. Ceilings come from the lowest broken or overcast layer (or a
+vertical visibility), reduced over a (stations, layers) matrix, so category
+maps over thousands of METARs or forecast points cost a few array operations.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Category codes index into this tuple; higher codes are worse conditions
+CATEGORIES = ('VFR', 'MVFR', 'IFR', 'LIFR', 'Unknown')
+UNKNOWN = CATEGORIES.index('Unknown')
+
+# Conditions below each threshold fall into MVFR, IFR and LIFR respectively
+VISIBILITY_THRESHOLDS_SM = (5.0, 3.0, 1.0)
+CEILING_THRESHOLDS_FT = (3000.0, 1000.0, 500.0)
+
+# Sky covers that form a ceiling
+CEILING_COVERS = ('BKN', 'OVC')
+
+# Forecast cloud cover that counts as a broken layer (5 oktas)
+BROKEN_COVER_PCT = 62.5
+
+
+def classify(visibility_sm, ceiling_ft) -> np.ndarray:
+    """
+    Category codes for arrays of visibility and ceiling.
+
+    Args:
+        visibility_sm: Visibility in statute miles (NaN when missing)
+        ceiling_ft: Ceiling in feet AGL (NaN when there is no ceiling)
+
+    Returns:
+        np.ndarray: int8 indices into ``CATEGORIES``; Unknown where visibility is missing
+    """
+    visibility = np.asarray(visibility_sm, dtype=float)
+    ceiling = np.asarray(ceiling_ft, dtype=float)
+    with np.errstate(invalid='ignore'):
+        by_visibility = sum((visibility < threshold).astype(np.int8)
+                            for threshold in VISIBILITY_THRESHOLDS_SM)
+        by_ceiling = sum((ceiling < threshold).astype(np.int8)
+                         for threshold in CEILING_THRESHOLDS_FT)
+    codes = np.maximum(by_visibility, by_ceiling).astype(np.int8)
+    return np.where(np.isnan(visibility), np.int8(UNKNOWN), codes)
+
+
+def category_names(codes) -> np.ndarray:
+    """Category names for an array of category codes."""
+    return np.asarray(CATEGORIES, dtype=object)[np.asarray(codes, dtype=int)]
+
+
+def worst_category(codes) -> str:
+    """The worst known category among codes, or Unknown."""
+    codes = np.asarray(codes, dtype=int)
+    known = codes[codes != UNKNOWN]
+    return CATEGORIES[int(known.max())] if known.size else CATEGORIES[UNKNOWN]
+
+
+def layer_matrix(cloud_layers: Sequence[Iterable[Dict[str, Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack per-station cloud layer lists into (stations, layers) cover and base arrays."""
+    width = max((len(layers) for layers in cloud_layers), default=0)
+    covers = np.full((len(cloud_layers), width), '', dtype=object)
+    bases = np.full((len(cloud_layers), width), np.nan)
+    for row, layers in enumerate(cloud_layers):
+        for col, layer in enumerate(layers):
+            covers[row, col] = layer.get('cover') or ''
+            if layer.get('base') is not None:
+                bases[row, col] = float(layer['base'])
+    return covers, bases
+
+
+def lowest_ceiling(covers, bases, vertical_visibility_ft=None) -> np.ndarray:
+    """
+    Lowest broken or overcast base per station (NaN where there is no ceiling).
+
+    Args:
+        covers: (stations, layers) sky cover codes
+        bases: (stations, layers) layer bases in feet AGL
+        vertical_visibility_ft: Optional per-station vertical visibility, which
+            also counts as a ceiling
+    """
+    covers = np.asarray(covers, dtype=object)
+    bases = np.asarray(bases, dtype=float)
+    if bases.size:
+        forming = np.isin(covers, CEILING_COVERS) & ~np.isnan(bases)
+        candidates = np.where(forming, bases, np.inf).min(axis=1)
+    else:
+        candidates = np.full(bases.shape[0], np.inf)
+    if vertical_visibility_ft is not None:
+        candidates = np.fmin(candidates, np.asarray(vertical_visibility_ft, dtype=float))
+    return np.where(np.isinf(candidates), np.nan, candidates)
+
+
+def forecast_ceiling(cover_pct, bases_ft) -> np.ndarray:
+    """
+    Ceiling from forecast cloud cover per layer (NaN where no layer is broken).
+
+    Args:
+        cover_pct: (points, layers) cloud cover percent
+        bases_ft: (layers,) nominal base of each layer in feet AGL
+    """
+    cover = np.asarray(cover_pct, dtype=float)
+    bases = np.broadcast_to(np.asarray(bases_ft, dtype=float), cover.shape)
+    with np.errstate(invalid='ignore'):
+        covers = np.where(cover >= BROKEN_COVER_PCT, 'BKN', '')
+    return lowest_ceiling(covers, bases)
+
+
+def classify_metars(metars: Sequence[Dict[str, Any]]) -> List[str]:
+    """Flight categories for decoded METARs (``visibility_statute_mi`` and ``cloud_layers``)."""
+    visibility = np.array([np.nan if metar.get('visibility_statute_mi') is None
+                           else float(metar['visibility_statute_mi']) for metar in metars])
+    covers, bases = layer_matrix([metar.get('cloud_layers') or [] for metar in metars])
+    return category_names(classify(visibility, lowest_ceiling(covers, bases))).tolist()
+
+
+def metar_ceiling_ft(metar: Dict[str, Any]) -> Optional[float]:
+    """Ceiling of one decoded METAR in feet AGL, or None when there is no ceiling."""
+    if metar.get('ceiling_ft') is not None:
+        return float(metar['ceiling_ft'])
+    covers, bases = layer_matrix([metar.get('cloud_layers') or []])
+    ceiling = lowest_ceiling(covers, bases)[0]
+    return None if np.isnan(ceiling) else float(ceiling)
@@ -1,10 +1,39 @@
 import math
-import heapq
-from app.models.airport import get_airport_coordinates, get_airports, load_airport_cache
+import threading
+import time
+import numpy as np
+from app.config import settings
+from app.models.aircraft import get_aircraft_profile
+from app.models.airport_index import get_airport_index, get_airport_dataset_version
+from app.models.airspace import get_airspace_index, get_airspace_dataset_version, describe_airspace
+from app.models.forecast_cache import get_forecast_cache
+from app.models.lru_cache import VersionedLRUCache
+from app.models.magnetic import magnetic_variation
+from app.models.navigation import sample_legs, true_course, wind_triangle
+from app.models.route_search import (
+    SearchLimitExceeded, shortest_path, fuel_constrained_path, k_shortest_paths
+)
+from app.models.terrain import get_terrain_engine
+from app.models.winds_aloft import get_wind_source
+
+# Spacing of wind samples along each leg (nautical miles)
+WIND_SAMPLE_SPACING_NM = 25.0
+
+# Corridor selection: candidate stops per along-track bucket and overall cap
+CORRIDOR_DETOUR_RATIO = 1.5
+CORRIDOR_STOPS_PER_BUCKET = 4
+CORRIDOR_MAX_STOPS = 80
+
+# Work cap for alternate route enumeration (candidate paths generated)
+ALTERNATE_MAX_CANDIDATES = 200
+
+# Airport types where fuel is not expected to be sold
+NO_FUEL_AIRPORT_TYPES = {'heliport', 'seaplane_base', 'balloonport', 'closed'}
 
 # Constants for VFR altitudes (in feet)
 VFR_EAST_ODD = [3500, 5500, 7500, 9500, 11500]  # Odd thousands + 500
 VFR_WEST_EVEN = [4500, 6500, 8500, 10500, 12500]  # Even thousands + 500
+VFR_HEMISPHERIC_MIN_FT = 3000  # Hemispheric rule applies above 3,000 ft AGL
 
 
 
@@ -19,18 +48,536 @@ def haversine(lat1, lon1, lat2, lon2):
     return R * c
 
 
-def get_vfr_altitude(lat1, lon1, lat2, lon2):
-    """Return appropriate VFR cruising altitude for direction (East/West)."""
-    course = math.degrees(math.atan2(lon2 - lon1, lat2 - lat1)) % 360
-    if 0 <= course < 180:
-        return VFR_EAST_ODD[0]  # Simplified: always lowest legal
-    else:
-        return VFR_WEST_EVEN[0]
+def vfr_altitudes_for_course(magnetic_course):
+    """Hemispheric VFR cruising altitudes for a magnetic course (east odd, west even, + 500)."""
+    return VFR_EAST_ODD if 0 <= magnetic_course % 360 < 180 else VFR_WEST_EVEN
+
+
+def get_vfr_altitude(lat1, lon1, lat2, lon2, preferred_altitude_ft=None):
+    """
+    Return the legal VFR cruising altitude for a leg's direction.
+
+    Uses the magnetic course (true great-circle course corrected for variation
+    when the magnetic model is available) and picks the legal altitude closest
+    to ``preferred_altitude_ft``, or the lowest one when no preference is given.
+    """
+    course = float(true_course(lat1, lon1, lat2, lon2))
+    variation = magnetic_variation((lat1 + lat2) / 2, (lon1 + lon2) / 2)
+    if variation is not None:
+        course -= float(variation)
+    altitudes = vfr_altitudes_for_course(course)
+    if preferred_altitude_ft is None:
+        return altitudes[0]
+    return min(altitudes, key=lambda altitude: (abs(altitude - preferred_altitude_ft), altitude))
+
+
+class RoutePlanCache(VersionedLRUCache):
+    """
+    LRU cache of searched routes keyed by normalized request.
+
+    Entries are tagged with the airport dataset version and dropped as soon as
+    the airport cache reloads. Cached routes hold legs and stop records only, so
+    fuel planning can be rebuilt for any fuel parameters without a new search.
+    """
+
+    def __init__(self, max_size=512):
+        super().__init__(max_size)
+
+
+_route_plan_cache = RoutePlanCache(settings.route_cache_size)
+
+
+def get_route_plan_cache():
+    """Return the process-wide route plan cache."""
+    return _route_plan_cache
+
+
+class PlanningContext:
+    """
+    Shared memo for planning many routes at once.
+
+    Batch requests with overlapping geometry reuse airport lookups, candidate
+    corridors, pairwise distances and route graphs instead of recomputing them
+    for every request.
+
+    Airport, corridor and graph lookups are guarded by a lock. The distance and
+    ``leg_*`` memos are read and written without it: every entry is a pure
+    function of its key, so concurrent planners at worst compute the same entry
+    twice and store equal values (single dict operations are atomic).
+    """
+
+    def __init__(self, airport_index=None):
+        self.airport_index = airport_index or get_airport_index()
+        self.airspace_index = get_airspace_index()
+        self.dataset_version = (get_airport_dataset_version(), get_airspace_dataset_version())
+        self._lock = threading.Lock()
+        self._airports = {}
+        self._corridors = {}
+        self._graphs = {}
+        self._distances = {}
+        self._winds = {}
+        self._terrain = {}
+        self._airspace = {}
+        self._altitudes = {}
+        self._performance = {}
+        self.forecast_cache = get_forecast_cache()
+        self.wind_source = get_wind_source(self.forecast_cache)
+        self.terrain_engine = get_terrain_engine()
+        self.departure_time = time.time()
+
+    def airport(self, code):
+        """Look up a flat airport record (icao, latitude, longitude, ...) by code."""
+        code = code.strip().upper()
+        with self._lock:
+            if code not in self._airports:
+                self._airports[code] = self.airport_index.get(code)
+            return self._airports[code]
+
+    def distance(self, a1, a2):
+        """Great-circle distance between two airport records, memoized per pair."""
+        key = (a1['icao'], a2['icao']) if a1['icao'] <= a2['icao'] else (a2['icao'], a1['icao'])
+        dist = self._distances.get(key)
+        if dist is None:
+            dist = haversine(a1['latitude'], a1['longitude'], a2['latitude'], a2['longitude'])
+            self._distances[key] = dist
+        return dist
+
+    def corridor(self, start, end, aircraft_range_nm, direct_ok=True):
+        """
+        Return candidate route nodes between start and end for the given range.
+
+        With ``direct_ok`` False, stops are selected even when the destination is
+        within range, for when the direct leg turns out to be unusable.
+        """
+        key = (start['icao'], end['icao'], aircraft_range_nm, direct_ok)
+        with self._lock:
+            nodes = self._corridors.get(key)
+        if nodes is None:
+            nodes = _candidate_nodes(self, start, end, aircraft_range_nm, direct_ok)
+            with self._lock:
+                self._corridors[key] = nodes
+        return nodes
+
+    def graph(self, nodes, aircraft_range_nm):
+        """Return the range-limited adjacency graph over nodes."""
+        key = (frozenset(nodes), aircraft_range_nm)
+        with self._lock:
+            graph = self._graphs.get(key)
+        if graph is None:
+            graph = _build_graph(self, nodes, aircraft_range_nm)
+            with self._lock:
+                self._graphs[key] = graph
+        return graph
+
+    def leg_winds(self, pairs, tas_kt, altitude_ft):
+        """
+        Wind-corrected time, heading and wind components for many directed legs.
+
+        Winds aloft for every leg are sampled from the forecast cache in one
+        batched, vectorized lookup. Returns a dict keyed by (from_icao, to_icao);
+        ``time_hr`` is None where the wind makes the leg unflyable, and
+        ``forecast`` is False where part of the leg had no forecast (calm wind).
+        """
+        results = {}
+        pending = []
+        for a1, a2 in pairs:
+            key = (a1['icao'], a2['icao'], tas_kt, altitude_ft)
+            cached = self._winds.get(key)
+            if cached is not None:
+                results[(a1['icao'], a2['icao'])] = cached
+            else:
+                pending.append((a1, a2))
+        if not pending:
+            return results
+
+        lat1 = np.array([a1['latitude'] for a1, _ in pending])
+        lon1 = np.array([a1['longitude'] for a1, _ in pending])
+        lat2 = np.array([a2['latitude'] for _, a2 in pending])
+        lon2 = np.array([a2['longitude'] for _, a2 in pending])
+        distances = np.array([self.distance(a1, a2) for a1, a2 in pending])
+        courses = true_course(lat1, lon1, lat2, lon2)
+
+        lats, lons, leg_index, segment_nm = sample_legs(
+            lat1, lon1, lat2, lon2, WIND_SAMPLE_SPACING_NM, distances)
+        u, v = self.wind_source.winds_aloft(lats, lons, altitude_ft, self.departure_time)
+        groundspeed, heading, headwind, crosswind = wind_triangle(courses[leg_index], tas_kt, u, v)
+        forecast = self._leg_forecast(lats, lons, leg_index, len(pending))
+
+        count = len(pending)
+        time_hr = np.bincount(leg_index, weights=segment_nm / groundspeed, minlength=count)
+        weights = np.where(distances > 0, distances, 1.0)
+
+        def leg_sum(values):
+            return np.bincount(leg_index, weights=values * segment_nm, minlength=count)
+
+        mean_headwind = leg_sum(headwind) / weights
+        mean_crosswind = leg_sum(crosswind) / weights
+        heading_x = leg_sum(np.sin(np.radians(heading)))
+        heading_y = leg_sum(np.cos(np.radians(heading)))
+        mean_heading = np.degrees(np.arctan2(heading_x, heading_y)) % 360.0
+
+        for i, (a1, a2) in enumerate(pending):
+            wind = {
+                'time_hr': None if np.isnan(time_hr[i]) else float(time_hr[i]),
+                'true_course': float(courses[i]),
+                'true_heading': float(mean_heading[i]),
+                'headwind': float(mean_headwind[i]),
+                'crosswind': float(mean_crosswind[i]),
+                'forecast': bool(forecast[i]),
+            }
+            self._winds[(a1['icao'], a2['icao'], tas_kt, altitude_ft)] = wind
+            results[(a1['icao'], a2['icao'])] = wind
+        return results
+
+    def _leg_forecast(self, lats, lons, leg_index, count):
+        """Whether every wind sample of each leg had forecast data."""
+        missing = ~self.wind_source.has_forecast(lats, lons, self.departure_time)
+        return np.bincount(leg_index, weights=missing, minlength=count) == 0
+
+    def leg_terrain(self, pairs, altitude_ft, clearance_ft):
+        """
+        Terrain clearance for many legs in one vectorized query.
+
+        Returns a dict keyed by (from_icao, to_icao) with ``clear`` (False when the
+        leg passes within clearance_ft of terrain at altitude_ft) and
+        ``max_elevation_ft`` (None where no terrain data covers the leg).
+        """
+        results = {}
+        pending = []
+        for a1, a2 in pairs:
+            key = (a1['icao'], a2['icao'], altitude_ft, clearance_ft)
+            cached = self._terrain.get(key)
+            if cached is not None:
+                results[(a1['icao'], a2['icao'])] = cached
+            else:
+                pending.append((a1, a2))
+        if not pending:
+            return results
+
+        clear, max_elevation = self.terrain_engine.segments_clear(
+            [a1['latitude'] for a1, _ in pending], [a1['longitude'] for a1, _ in pending],
+            [a2['latitude'] for _, a2 in pending], [a2['longitude'] for _, a2 in pending],
+            altitude_ft, clearance_ft)
+        for i, (a1, a2) in enumerate(pending):
+            terrain = {
+                'clear': bool(clear[i]),
+                'max_elevation_ft': None if np.isnan(max_elevation[i]) else float(max_elevation[i]),
+            }
+            # Terrain along a leg is the same in both directions
+            self._terrain[(a1['icao'], a2['icao'], altitude_ft, clearance_ft)] = terrain
+            self._terrain[(a2['icao'], a1['icao'], altitude_ft, clearance_ft)] = terrain
+            results[(a1['icao'], a2['icao'])] = terrain
+        return results
+
+    def leg_airspace(self, pairs, altitude_ft):
+        """
+        Airspaces crossed at altitude_ft by many legs, from one batched R-tree query.
+
+        Returns a dict keyed by (from_icao, to_icao) with lists of airspace records.
+        """
+        results = {}
+        pending = []
+        for a1, a2 in pairs:
+            cached = self._airspace.get((a1['icao'], a2['icao'], altitude_ft))
+            if cached is not None:
+                results[(a1['icao'], a2['icao'])] = cached
+            else:
+                pending.append((a1, a2))
+        if not pending:
+            return results
+
+        hits = self.airspace_index.query_segments(
+            [a1['latitude'] for a1, _ in pending], [a1['longitude'] for a1, _ in pending],
+            [a2['latitude'] for _, a2 in pending], [a2['longitude'] for _, a2 in pending],
+            altitude_ft)
+        for (a1, a2), indices in zip(pending, hits):
+            crossed = [self.airspace_index.airspaces[i] for i in indices]
+            self._airspace[(a1['icao'], a2['icao'], altitude_ft)] = crossed
+            self._airspace[(a2['icao'], a1['icao'], altitude_ft)] = crossed
+            results[(a1['icao'], a2['icao'])] = crossed
+        return results
+
+    def leg_performance(self, pairs, performance, altitude_ft, winds=None):
+        """
+        Aircraft-profile time and fuel for many legs flown at altitude_ft.
+
+        Climb, cruise and descent come from the profile's precomputed tables in
+        one vectorized evaluation; ``winds`` (from ``leg_winds``) scale ground
+        distance by groundspeed / true airspeed. Returns a dict keyed by
+        (from_icao, to_icao) with ``time_hr`` and ``fuel_gal``, both None where
+        the leg is unflyable.
+        """
+        results = {}
+        pending = []
+        for a1, a2 in pairs:
+            key = (a1['icao'], a2['icao'], performance.key, altitude_ft, winds is not None)
+            cached = self._performance.get(key)
+            if cached is not None:
+                results[(a1['icao'], a2['icao'])] = cached
+            else:
+                pending.append((a1, a2))
+        if not pending:
+            return results
+
+        distances = np.array([self.distance(a1, a2) for a1, a2 in pending])
+        factor = np.ones(len(pending))
+        if winds is not None:
+            tas = float(performance.cruise_tas(altitude_ft))
+            wind_times = np.array([winds[(a1['icao'], a2['icao'])]['time_hr']
+                                   for a1, a2 in pending], dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                factor = np.where(wind_times > 0, distances / wind_times / tas, 1.0)
+        time_hr, fuel_gal = performance.leg(
+            distances, altitude_ft,
+            [_elevation_ft(a1) for a1, _ in pending], [_elevation_ft(a2) for _, a2 in pending],
+            factor)
+
+        for i, (a1, a2) in enumerate(pending):
+            feasible = not np.isnan(time_hr[i])
+            leg = {
+                'time_hr': float(time_hr[i]) if feasible else None,
+                'fuel_gal': float(fuel_gal[i]) if feasible else None,
+            }
+            key = (a1['icao'], a2['icao'], performance.key, altitude_ft, winds is not None)
+            self._performance[key] = leg
+            results[(a1['icao'], a2['icao'])] = leg
+        return results
+
+    def leg_altitudes(self, pairs, tas_kt, clearance_ft, performance=None):
+        """
+        Evaluate every legal hemispheric VFR altitude for many legs in one pass.
+
+        Winds for all legs and all VFR altitudes come from a single forecast
+        profile lookup; the wind triangle is solved on a (samples, altitudes)
+        array. Altitudes below terrain clearance (where terrain data exists) or
+        inside avoided airspace are unusable. With an aircraft ``performance``
+        model, true airspeed varies with altitude, time and fuel include climb
+        and descent from the profile tables, and altitudes above the service
+        ceiling are unusable.
+
+        Returns a dict keyed by (from_icao, to_icao) with ``options`` (one entry
+        per legal altitude for the leg's direction), ``best``, the fastest
+        usable option or None, and ``forecast`` as in ``leg_winds``.
+        """
+        results = {}
+        pending = []
+        performance_key = _performance_key(performance)
+        for a1, a2 in pairs:
+            key = (a1['icao'], a2['icao'], tas_kt, clearance_ft, performance_key)
+            cached = self._altitudes.get(key)
+            if cached is not None:
+                results[(a1['icao'], a2['icao'])] = cached
+            else:
+                pending.append((a1, a2))
+        if not pending:
+            return results
+
+        altitudes = np.array(sorted(VFR_EAST_ODD + VFR_WEST_EVEN), dtype=float)
+        lat1 = np.array([a1['latitude'] for a1, _ in pending])
+        lon1 = np.array([a1['longitude'] for a1, _ in pending])
+        lat2 = np.array([a2['latitude'] for _, a2 in pending])
+        lon2 = np.array([a2['longitude'] for _, a2 in pending])
+        distances = np.array([self.distance(a1, a2) for a1, a2 in pending])
+        courses = true_course(lat1, lon1, lat2, lon2)
+        variation = magnetic_variation((lat1 + lat2) / 2, (lon1 + lon2) / 2)
+        magnetic = courses - (variation if variation is not None else 0.0)
+        eastbound = (magnetic % 360.0) < 180.0
+        hemispheric = np.where(eastbound[:, None], np.isin(altitudes, VFR_EAST_ODD),
+                               np.isin(altitudes, VFR_WEST_EVEN))
+
+        lats, lons, leg_index, segment_nm = sample_legs(
+            lat1, lon1, lat2, lon2, WIND_SAMPLE_SPACING_NM, distances)
+        u, v = self.wind_source.winds_aloft_profile(lats, lons, altitudes, self.departure_time)
+        forecast = self._leg_forecast(lats, lons, leg_index, len(pending))
+        tas = performance.cruise_tas(altitudes)[None, :] if performance is not None else tas_kt
+        groundspeed, heading, headwind, crosswind = wind_triangle(courses[leg_index][:, None], tas,
+                                                                  u, v)
+
+        shape = (len(pending), len(altitudes))
+        segment = segment_nm[:, None]
+        time_hr = np.zeros(shape)
+        np.add.at(time_hr, leg_index, segment / groundspeed)
+        sums = {name: np.zeros(shape)
+                for name in ('headwind', 'crosswind', 'heading_x', 'heading_y')}
+        np.add.at(sums['headwind'], leg_index, headwind * segment)
+        np.add.at(sums['crosswind'], leg_index, crosswind * segment)
+        np.add.at(sums['heading_x'], leg_index, np.sin(np.radians(heading)) * segment)
+        np.add.at(sums['heading_y'], leg_index, np.cos(np.radians(heading)) * segment)
+        weights = np.where(distances > 0, distances, 1.0)[:, None]
+        mean_heading = np.degrees(np.arctan2(sums['heading_x'], sums['heading_y'])) % 360.0
+
+        fuel_gal = np.full(shape, np.nan)
+        if performance is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                factor = np.where(time_hr > 0, distances[:, None] / time_hr / tas, 1.0)
+            time_hr, fuel_gal = performance.leg(
+                distances[:, None], altitudes[None, :],
+                np.array([_elevation_ft(a1) for a1, _ in pending])[:, None],
+                np.array([_elevation_ft(a2) for _, a2 in pending])[:, None], factor)
+
+        usable = hemispheric & ~np.isnan(time_hr)
+        if performance is not None:
+            usable &= altitudes[None, :] <= performance.profile.service_ceiling_ft
+        terrain = self.leg_terrain(pending, float(altitudes.min()), clearance_ft)
+        max_elevation = np.array([terrain[(a1['icao'], a2['icao'])]['max_elevation_ft'] or -np.inf
+                                  for a1, a2 in pending])
+        usable &= altitudes[None, :] >= max_elevation[:, None] + clearance_ft
+        if len(self.airspace_index):
+            avoid_classes = {c.upper() for c in settings.airspace_avoid_classes}
+            for k, altitude in enumerate(altitudes):
+                crossed = self.leg_airspace(pending, float(altitude))
+                usable[:, k] &= [not any(a['class'] in avoid_classes
+                                         for a in crossed[(a1['icao'], a2['icao'])])
+                                 for a1, a2 in pending]
+
+        for i, (a1, a2) in enumerate(pending):
+            options = []
+            for k in np.flatnonzero(hemispheric[i]):
+                feasible = not np.isnan(time_hr[i, k])
+                moving = feasible and time_hr[i, k] > 0
+                options.append({
+                    'altitude_ft': int(altitudes[k]),
+                    'time_hr': float(time_hr[i, k]) if feasible else None,
+                    'fuel_gal': None if np.isnan(fuel_gal[i, k]) else float(fuel_gal[i, k]),
+                    'groundspeed_kt': (round(float(distances[i] / time_hr[i, k]), 1)
+                                       if moving else None),
+                    'true_heading': float(mean_heading[i, k]),
+                    'headwind': float(sums['headwind'][i, k] / weights[i, 0]),
+                    'crosswind': float(sums['crosswind'][i, k] / weights[i, 0]),
+                    'usable': bool(usable[i, k]),
+                })
+            candidates = [option for option in options if option['usable']]
+            best = None
+            if candidates:
+                best = min(candidates, key=lambda o: (o['time_hr'], o['altitude_ft']))
+            profile = {'options': options, 'best': best, 'forecast': bool(forecast[i])}
+            key = (a1['icao'], a2['icao'], tas_kt, clearance_ft, performance_key)
+            self._altitudes[key] = profile
+            results[(a1['icao'], a2['icao'])] = profile
+        return results
+
+
+def _elevation_ft(airport):
+    """Field elevation in feet, 0 when unknown."""
+    try:
+        return float(airport.get('elevation') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _performance_key(performance):
+    return None if performance is None else performance.key
+
+
+def _candidate_nodes(context, start, end, aircraft_range_nm, direct_ok=True):
+    """
+    Select start, end and candidate stop airports as graph nodes.
+
+    Candidates lie inside an ellipse around the direct route (bounded detour) and
+    are bucketed by along-track progress so that multi-stop routes always have
+    stops spread over the whole route, while the graph stays small.
+    """
+    direct_distance = context.distance(start, end)
+    nodes = {start['icao']: start, end['icao']: end}
+
+    # If direct distance is within range, use direct route
+    if direct_ok and direct_distance <= aircraft_range_nm:
+        return nodes
+
+    max_total = direct_distance * CORRIDOR_DETOUR_RATIO
+    mid_lat = (start['latitude'] + end['latitude']) / 2
+    mid_lon = (start['longitude'] + end['longitude']) / 2
+    bucket_nm = max(aircraft_range_nm / 4.0, 1.0)
+    buckets = {}
+    search_radius_nm = max_total / 2 + bucket_nm
+    for airport, _ in context.airport_index.within_radius(mid_lat, mid_lon, search_radius_nm):
+        if airport['icao'] in nodes:
+            continue
+        dist_to_start = context.distance(start, airport)
+        dist_to_end = context.distance(airport, end)
+        total = dist_to_start + dist_to_end
+        if total >= max_total:  # Reasonable routing efficiency
+            continue
+        progress = dist_to_start / total * direct_distance
+        buckets.setdefault(int(progress // bucket_nm), []).append((total, airport))
+
+    # Keep the most efficient stops in each bucket
+    selected = []
+    for candidates in buckets.values():
+        candidates.sort(key=lambda x: x[0])
+        selected.extend(candidates[:CORRIDOR_STOPS_PER_BUCKET])
+    selected.sort(key=lambda x: x[0])
+    for _, airport in selected[:CORRIDOR_MAX_STOPS]:
+        nodes[airport['icao']] = airport
+    return nodes
+
+
+def _build_graph(context, nodes, aircraft_range_nm):
+    """Connect airports within aircraft range."""
+    graph = {icao: [] for icao in nodes}
+    icaos = list(nodes)
+    for i, icao1 in enumerate(icaos):
+        for icao2 in icaos[i + 1:]:
+            dist = context.distance(nodes[icao1], nodes[icao2])
+            if dist <= aircraft_range_nm:
+                graph[icao1].append({'to': icao2, 'distance': dist})
+                graph[icao2].append({'to': icao1, 'distance': dist})
+    return graph
+
+
+def sells_fuel(airport):
+    """Whether fuel can be bought at an airport (explicit 'fuel' data wins over airport type)."""
+    if 'fuel' in airport and airport['fuel'] is not None:
+        return bool(airport['fuel'])
+    return airport.get('type') not in NO_FUEL_AIRPORT_TYPES
+
+
+def _fuel_policy(fuel_capacity_gal, fuel_burn_gph, reserve_minutes, departure_fuel_gal):
+    """Normalize fuel parameters into capacity, burn, reserve and departure fuel (gallons)."""
+    departure = fuel_capacity_gal
+    if departure_fuel_gal is not None:
+        departure = min(departure_fuel_gal, fuel_capacity_gal)
+    return {
+        'capacity_gal': fuel_capacity_gal,
+        'burn_gph': fuel_burn_gph,
+        'reserve_gal': fuel_burn_gph * reserve_minutes / 60.0,
+        'departure_gal': departure,
+    }
+
+
+def _leg_fuel(leg, policy):
+    """Fuel burned on a leg: from the aircraft profile when planned with one, else time x burn."""
+    if leg.get('fuel_burn_gal') is not None:
+        return leg['fuel_burn_gal']
+    return leg['estimated_time_hr'] * policy['burn_gph']
+
+
+def _simulate_fuel(route, policy):
+    """
+    Fly the fuel state along a route, refuelling to full at stops that sell fuel.
+
+    Returns (arrival_gal, departure_gal) per stop, or None if any leg would land
+    below the reserve.
+    """
+    states = [(policy['departure_gal'], policy['departure_gal'])]
+    fuel = policy['departure_gal']
+    stops = route['stops']
+    for i, leg in enumerate(route['legs']):
+        arrival = fuel - _leg_fuel(leg, policy)
+        if arrival < policy['reserve_gal'] - 1e-9:
+            return None
+        is_destination = i + 1 == len(route['legs'])
+        refuels = not is_destination and sells_fuel(stops[i + 1])
+        fuel = policy['capacity_gal'] if refuels else arrival
+        states.append((arrival, fuel))
+    return states
 
 
 def plan_route(start_code, end_code, aircraft_range_nm, groundspeed_kt, 
                fuel_capacity_gal=50, fuel_burn_gph=12, avoid_terrain=False, plan_fuel_stops=True,
-               cruising_altitude_ft=6500):
+               cruising_altitude_ft=6500, optimize_for='distance', reserve_minutes=30,
+               departure_fuel_gal=None, alternates=0, optimize_altitude=False, aircraft=None,
+               power_setting=None, context=None):
     """
     Plan a VFR route between two airports with advanced fuel planning, terrain avoidance, and wind analysis.
     
@@ -39,156 +586,495 @@ def plan_route(start_code, end_code, aircraft_range_nm, groundspeed_kt,
         end_code (str): Destination airport ICAO code
         aircraft_range_nm (int): Aircraft range in nautical miles
         groundspeed_kt (int): Ground speed in knots
-        fuel_capacity_gal (float): Aircraft fuel capacity in gallons
+        fuel_capacity_gal (float): Aircraft fuel capacity in gallons (None: the aircraft profile's)
         fuel_burn_gph (float): Fuel burn rate in gallons per hour
         avoid_terrain (bool): Whether to avoid high terrain routes (up to 20% longer)
-        plan_fuel_stops (bool): Whether to plan fuel stops with 30-minute reserves
+        plan_fuel_stops (bool): Whether to plan fuel stops so every leg lands with reserves
         cruising_altitude_ft (int): Planned cruising altitude in feet
+        optimize_for (str): 'distance' for the shortest route, or 'time' to minimize
+            flight time using forecast winds aloft (groundspeed_kt is then the true airspeed)
+        reserve_minutes (int): Minimum fuel reserve on landing, in minutes at fuel_burn_gph
+        departure_fuel_gal (float): Fuel on board at departure (defaults to full tanks)
+        alternates (int): Number of distinct alternate routes to return besides the best one
+        optimize_altitude (bool): Pick the fastest legal hemispheric VFR altitude per leg
+            instead of flying every leg at cruising_altitude_ft
+        aircraft (str): Optional aircraft performance profile name; leg time and fuel then
+            come from its climb, cruise and descent tables and groundspeed_kt and
+            fuel_burn_gph are taken from its cruise table at cruising_altitude_ft
+        power_setting (str): Cruise power setting of the profile (defaults to the profile's)
+        context (PlanningContext): Optional shared memo when planning several routes
     
     Returns:
         dict: Route legs, total distance, estimated time, fuel stops, fuel planning details, wind data
     """
+    context = context or PlanningContext()
+
     # Get airport coordinates
-    start = get_airport_coordinates(start_code)
-    end = get_airport_coordinates(end_code)
+    start = context.airport(start_code)
+    end = context.airport(end_code)
     if not start or not end:
         return {'error': 'Invalid airport code(s)'}
-    
-    # Get intermediate airports from cache instead of API (fallback for DNS/SSL issues)
-    mid_lat = (start['latitude'] + end['latitude']) / 2
-    mid_lon = (start['longitude'] + end['longitude']) / 2
-    direct_distance = haversine(start['latitude'], start['longitude'], end['latitude'], end['longitude'])
-    
-    # If direct distance is within range, use direct route
-    if direct_distance <= aircraft_range_nm:
-        nodes = {start['icao']: start, end['icao']: end}
-    else:
-        # For longer routes, use a simplified approach with key intermediate airports
-        # Focus on major airports that are likely to be useful for routing
-        cached_airports = load_airport_cache()
-        intermediate_airports = []
-        
-        for airport in cached_airports:
-            icao_code = airport.get('icao') or airport.get('icaoCode')
-            if not icao_code or icao_code in [start['icao'], end['icao']]:
-                continue
-                
-            # Handle coordinate field variations
-            if 'geometry' in airport and 'coordinates' in airport['geometry']:
-                longitude, latitude = airport['geometry']['coordinates']
-            else:
-                latitude = airport.get('lat') or airport.get('latitude')
-                longitude = airport.get('lon') or airport.get('longitude')
-            
-            if latitude is None or longitude is None:
-                continue
-                
-            # Calculate distances to start and end
-            dist_to_start = haversine(latitude, longitude, start['latitude'], start['longitude'])
-            dist_to_end = haversine(latitude, longitude, end['latitude'], end['longitude'])
-            
-            # Include airport if it can serve as an intermediate stop
-            if (dist_to_start <= aircraft_range_nm and 
-                dist_to_end <= aircraft_range_nm and
-                dist_to_start + dist_to_end < direct_distance * 1.5):  # Reasonable routing efficiency
-                
-                intermediate_airports.append({
-                    'icao': icao_code,
-                    'latitude': latitude,
-                    'longitude': longitude,
-                    'name': airport.get('name', ''),
-                    'elevation': airport.get('elevation', 0),
-                    'dist_to_start': dist_to_start,
-                    'dist_to_end': dist_to_end,
-                    'total_distance': dist_to_start + dist_to_end
-                })
-        
-        # Sort by total distance (most efficient routing first)
-        intermediate_airports.sort(key=lambda x: x['total_distance'])
-        
-        # Build nodes with start, end, and best intermediate airports
-        nodes = {start['icao']: start, end['icao']: end}
-        
-        # Add the best intermediate airports (limit to 10 for performance)
-        for airport in intermediate_airports[:10]:
-            nodes[airport['icao']] = {
-                'icao': airport['icao'],
-                'latitude': airport['latitude'],
-                'longitude': airport['longitude'],
-                'name': airport['name'],
-                'elevation': airport['elevation']
-            }
-    
-    # Build graph: connect airports within aircraft range
-    graph = {icao: [] for icao in nodes}
-    for icao1, a1 in nodes.items():
-        for icao2, a2 in nodes.items():
-            if icao1 == icao2:
-                continue
-            dist = haversine(a1['latitude'], a1['longitude'], a2['latitude'], a2['longitude'])
-            if dist <= aircraft_range_nm:
-                cruise_alt = cruising_altitude_ft  # Use provided cruising altitude
-                graph[icao1].append({'to': icao2, 'distance': dist, 'cruise_altitude': cruise_alt})
-                graph[icao2].append({'to': icao1, 'distance': dist, 'cruise_altitude': cruise_alt})  # Add reverse edge
-
-    # Dijkstra's algorithm
-    heap = [(0, start['icao'], [])]  # (distance, current, path)
-    visited = set()
-    while heap:
-        total_dist, current, path = heapq.heappop(heap)
-        if current == end['icao']:
-            full_path = path + [current]
-            break
-        if current in visited:
+
+    performance = None
+    if aircraft:
+        profile = get_aircraft_profile(aircraft)
+        if profile is None:
+            return {'error': f"Unknown aircraft profile '{aircraft}'"}
+        try:
+            performance = profile.at_power(power_setting)
+        except ValueError as e:
+            return {'error': str(e)}
+        groundspeed_kt = float(performance.cruise_tas(cruising_altitude_ft))
+        fuel_burn_gph = float(performance.cruise_fuel_gph(cruising_altitude_ft))
+        if fuel_capacity_gal is None:
+            fuel_capacity_gal = profile.fuel_capacity_gal
+    elif fuel_capacity_gal is None:
+        fuel_capacity_gal = 50
+
+    cache_key = (start['icao'], end['icao'], int(aircraft_range_nm), int(round(groundspeed_kt)),
+                 int(cruising_altitude_ft), bool(avoid_terrain), optimize_for,
+                 bool(optimize_altitude), _performance_key(performance))
+    if optimize_for == 'time' or optimize_altitude:
+        # Wind-optimal routes follow the forecast, so they expire with the forecast hour
+        cache_key += (int(context.departure_time // 3600),)
+    route = _cached_route(cache_key, context, lambda: _search_route(
+        context, start, end, aircraft_range_nm, groundspeed_kt, cruising_altitude_ft, optimize_for,
+        avoid_terrain, optimize_altitude, performance))
+    if 'error' in route:
+        return route
+
+    fuel_states = None
+    policy = None
+    if plan_fuel_stops:
+        policy = _fuel_policy(fuel_capacity_gal, fuel_burn_gph, reserve_minutes, departure_fuel_gal)
+        fuel_states = _simulate_fuel(route, policy)
+        if fuel_states is None:
+            # The unconstrained best route runs below reserves: search with fuel state
+            fuel_key = cache_key + ('fuel', round(fuel_capacity_gal, 1), round(fuel_burn_gph, 1),
+                                    int(reserve_minutes), round(policy['departure_gal'], 1))
+            route = _cached_route(fuel_key, context, lambda: _search_fuel_route(
+                context, start, end, aircraft_range_nm, groundspeed_kt, cruising_altitude_ft,
+                optimize_for, policy, avoid_terrain, optimize_altitude, performance))
+            if 'error' in route:
+                return route
+            fuel_states = _simulate_fuel(route, policy)
+
+    plan = _assemble_plan(route, fuel_states, policy)
+    if route.get('warnings'):
+        plan['warnings'] = list(route['warnings'])
+
+    if alternates:
+        candidates = _cached_route(cache_key + ('alternates', int(alternates)), context, lambda: {
+            'routes': _search_alternates(context, start, end, aircraft_range_nm, groundspeed_kt,
+                                         cruising_altitude_ft, optimize_for, alternates,
+                                         avoid_terrain, optimize_altitude, performance)
+        })
+        plan['alternate_routes'] = _summarize_alternates(route, plan, candidates['routes'],
+                                                         alternates, policy)
+
+    return plan
+
+
+def _cached_route(cache_key, context, search):
+    """
+    Return a memoized route for cache_key, running search() on a miss.
+
+    Routes searched while forecast winds were missing are not memoized, so they
+    are planned again once the forecast is available.
+    """
+    route = None
+    if settings.cache_enabled:
+        route = _route_plan_cache.get(cache_key, context.dataset_version)
+    if route is None:
+        route = search()
+        routes = route.get('routes', [route])
+        complete = not any(r.get('incomplete_forecast') for r in routes)
+        if settings.cache_enabled and 'error' not in route and complete:
+            _route_plan_cache.put(cache_key, context.dataset_version, route)
+    return route
+
+
+def _edge_model(context, nodes, graph, groundspeed_kt, cruising_altitude_ft, optimize_for,
+                avoid_terrain=False, optimize_altitude=False, performance=None):
+    """
+    Return (cost, leg_time, annotations) for a graph.
+
+    ``cost`` and ``leg_time`` take (from_icao, edge) and return None for unusable
+    edges. ``annotations`` holds per-edge ``winds`` (time mode), ``terrain`` (when
+    avoiding terrain), ``airspace``, ``altitudes`` (altitude sweep) and
+    ``performance`` (aircraft profile time and fuel) lookups, each None when not
+    computed.
+    """
+    pairs = [(nodes[icao], nodes[edge['to']]) for icao, edges in graph.items() for edge in edges]
+    annotations = {'winds': None, 'terrain': None, 'airspace': None, 'altitudes': None,
+                   'performance': None}
+    if optimize_altitude:
+        return _altitude_edge_model(context, pairs, groundspeed_kt, optimize_for, avoid_terrain,
+                                    annotations, performance)
+    winds = legs = None
+    if optimize_for == 'time':
+        winds = annotations['winds'] = context.leg_winds(pairs, groundspeed_kt,
+                                                         cruising_altitude_ft)
+    if performance is not None:
+        legs = annotations['performance'] = context.leg_performance(
+            pairs, performance, cruising_altitude_ft, winds)
+
+    def leg_time(icao, edge):
+        if legs is not None:
+            return legs[(icao, edge['to'])]['time_hr']
+        if winds is not None:
+            return winds[(icao, edge['to'])]['time_hr']
+        return edge['distance'] / groundspeed_kt
+
+    def cost(icao, edge):
+        return leg_time(icao, edge) if optimize_for == 'time' else edge['distance']
+
+    blocked = set()
+    if avoid_terrain:
+        # Legs without the required terrain clearance at cruise altitude are unusable
+        terrain = annotations['terrain'] = context.leg_terrain(
+            pairs, cruising_altitude_ft, settings.terrain_clearance_ft)
+        blocked.update(key for key, value in terrain.items() if not value['clear'])
+    if len(context.airspace_index):
+        airspace = annotations['airspace'] = context.leg_airspace(pairs, cruising_altitude_ft)
+        avoid_classes = {c.upper() for c in settings.airspace_avoid_classes}
+        blocked.update(key for key, crossed in airspace.items()
+                       if any(a['class'] in avoid_classes for a in crossed))
+
+    if not blocked:
+        return cost, leg_time, annotations
+
+    def clear_cost(icao, edge):
+        return None if (icao, edge['to']) in blocked else cost(icao, edge)
+
+    def clear_time(icao, edge):
+        return None if (icao, edge['to']) in blocked else leg_time(icao, edge)
+
+    return clear_cost, clear_time, annotations
+
+
+def _altitude_edge_model(context, pairs, groundspeed_kt, optimize_for, avoid_terrain, annotations,
+                         performance=None):
+    """Edge model flying every edge at its fastest usable VFR altitude."""
+    clearance_ft = settings.terrain_clearance_ft
+    profiles = context.leg_altitudes(pairs, groundspeed_kt, clearance_ft, performance)
+    annotations['altitudes'] = profiles
+    winds = annotations['winds'] = {key: profile['best'] for key, profile in profiles.items()}
+    if performance is not None:
+        annotations['performance'] = {
+            key: {'time_hr': best['time_hr'], 'fuel_gal': best['fuel_gal']} if best is not None else
+            {'time_hr': None, 'fuel_gal': None}
+            for key, best in winds.items()
+        }
+    if avoid_terrain:
+        lowest_altitude = min(VFR_EAST_ODD + VFR_WEST_EVEN)
+        annotations['terrain'] = context.leg_terrain(pairs, lowest_altitude, clearance_ft)
+    if len(context.airspace_index):
+        # Report airspace crossed at each edge's chosen altitude
+        airspace = annotations['airspace'] = {}
+        by_altitude = {}
+        for a1, a2 in pairs:
+            best = winds[(a1['icao'], a2['icao'])]
+            if best is not None:
+                by_altitude.setdefault(best['altitude_ft'], []).append((a1, a2))
+        for altitude, group in by_altitude.items():
+            airspace.update(context.leg_airspace(group, altitude))
+
+    def leg_time(icao, edge):
+        best = winds[(icao, edge['to'])]
+        return None if best is None else best['time_hr']
+
+    def cost(icao, edge):
+        time_hr = leg_time(icao, edge)
+        if time_hr is None:
+            return None
+        return time_hr if optimize_for == 'time' else edge['distance']
+
+    return cost, leg_time, annotations
+
+
+def _search_route(context, start, end, aircraft_range_nm, groundspeed_kt, cruising_altitude_ft,
+                  optimize_for='distance', avoid_terrain=False, optimize_altitude=False,
+                  performance=None):
+    """Search the airport graph and build legs for the best route."""
+    nodes = context.corridor(start, end, aircraft_range_nm)
+    graph = context.graph(nodes, aircraft_range_nm)
+    cost, _, annotations = _edge_model(context, nodes, graph, groundspeed_kt, cruising_altitude_ft,
+                                       optimize_for, avoid_terrain, optimize_altitude, performance)
+
+    full_path = shortest_path(graph, start['icao'], end['icao'], cost)
+    if full_path is None and len(nodes) == 2:
+        # The direct leg is blocked: look for a detour through intermediate airports
+        nodes = context.corridor(start, end, aircraft_range_nm, direct_ok=False)
+        graph = context.graph(nodes, aircraft_range_nm)
+        cost, _, annotations = _edge_model(context, nodes, graph, groundspeed_kt,
+                                           cruising_altitude_ft, optimize_for, avoid_terrain,
+                                           optimize_altitude, performance)
+        full_path = shortest_path(graph, start['icao'], end['icao'], cost)
+    if full_path is None:
+        return {'error': _no_route_message(avoid_terrain, annotations)}
+    return _build_route(context, nodes, full_path, groundspeed_kt, cruising_altitude_ft,
+                        annotations)
+
+
+def _search_fuel_route(context, start, end, aircraft_range_nm, groundspeed_kt, cruising_altitude_ft,
+                       optimize_for, policy, avoid_terrain=False, optimize_altitude=False,
+                       performance=None):
+    """Search with fuel on board as a resource so that no leg lands below reserves."""
+    if policy['capacity_gal'] <= policy['reserve_gal']:
+        return {'error': 'Fuel capacity does not cover the required reserve'}
+
+    # Size the corridor for the most limiting leg: the first, flown on departure fuel
+    usable_hr = max(policy['departure_gal'] - policy['reserve_gal'], 0) / policy['burn_gph']
+    effective_range = max(min(aircraft_range_nm, usable_hr * groundspeed_kt), 1.0)
+
+    # The direct route already failed the fuel check (winds or climb fuel can make a leg
+    # within still-air range fall short), so candidate stops are always needed
+    nodes = context.corridor(start, end, effective_range, direct_ok=False)
+    graph = context.graph(nodes, aircraft_range_nm)
+    cost, leg_time, annotations = _edge_model(context, nodes, graph, groundspeed_kt,
+                                              cruising_altitude_ft, optimize_for, avoid_terrain,
+                                              optimize_altitude, performance)
+
+    def fuel_burn(icao, edge):
+        if annotations['performance'] is not None:
+            return annotations['performance'][(icao, edge['to'])]['fuel_gal']
+        time_hr = leg_time(icao, edge)
+        return None if time_hr is None else time_hr * policy['burn_gph']
+
+    try:
+        result = fuel_constrained_path(
+            graph, start['icao'], end['icao'],
+            cost,
+            fuel_burn,
+            departure_fuel=policy['departure_gal'],
+            capacity=policy['capacity_gal'],
+            reserve=policy['reserve_gal'],
+            can_refuel=lambda icao: sells_fuel(nodes[icao]),
+        )
+    except SearchLimitExceeded:
+        return {'error': 'Route search too complex; try a shorter route or fewer constraints'}
+    if result is None:
+        return {'error': 'No route found within fuel limits'}
+    full_path, _ = result
+    return _build_route(context, nodes, full_path, groundspeed_kt, cruising_altitude_ft,
+                        annotations)
+
+
+def _search_alternates(context, start, end, aircraft_range_nm, groundspeed_kt, cruising_altitude_ft,
+                       optimize_for, alternates, avoid_terrain=False, optimize_altitude=False,
+                       performance=None):
+    """
+    Enumerate distinct candidate routes in cost order with a bounded k-shortest search.
+
+    Over-generates so that alternates failing fuel checks can be dropped later
+    without searching again.
+    """
+    nodes = context.corridor(start, end, aircraft_range_nm)
+    graph = context.graph(nodes, aircraft_range_nm)
+    cost, _, annotations = _edge_model(context, nodes, graph, groundspeed_kt, cruising_altitude_ft,
+                                       optimize_for, avoid_terrain, optimize_altitude, performance)
+    paths = k_shortest_paths(graph, start['icao'], end['icao'], 2 * alternates + 1, cost,
+                             max_candidates=ALTERNATE_MAX_CANDIDATES)
+    return [_build_route(context, nodes, path, groundspeed_kt, cruising_altitude_ft, annotations)
+            for _, path in paths]
+
+
+def _summarize_alternates(route, plan, candidates, alternates, policy=None):
+    """Summarize up to ``alternates`` fuel-feasible candidate routes other than the chosen one."""
+    summaries = []
+    for candidate in candidates:
+        if candidate['path'] == route['path']:
             continue
-        visited.add(current)
-        for neighbor in graph[current]:
-            if neighbor['to'] not in visited:
-                heapq.heappush(heap, (total_dist + neighbor['distance'], neighbor['to'], path + [current]))
-    else:
-        return {'error': 'No route found'}
-    # Build legs
+        if policy is not None and _simulate_fuel(candidate, policy) is None:
+            continue
+        distance = sum(leg['distance_nm'] for leg in candidate['legs'])
+        time_hr = sum(leg['estimated_time_hr'] for leg in candidate['legs'])
+        summaries.append({
+            'route': candidate['path'],
+            'fuel_stops': candidate['path'][1:-1],
+            'total_distance_nm': distance,
+            'estimated_time_hr': time_hr,
+            'extra_distance_nm': distance - plan['total_distance_nm'],
+            'extra_time_hr': time_hr - plan['estimated_time_hr'],
+        })
+        if len(summaries) >= alternates:
+            break
+    return summaries
+
+
+def _no_route_message(avoid_terrain, annotations):
+    """Explain a failed search, naming the constraints that removed legs."""
+    constraints = []
+    if avoid_terrain:
+        constraints.append('terrain clearance')
+    if annotations['airspace'] is not None:
+        constraints.append('airspace restrictions')
+    if annotations['altitudes'] is not None:
+        constraints.append('legal VFR altitudes')
+    return f"No route found within {' and '.join(constraints)}" if constraints else 'No route found'
+
+
+def _leg_headings(stops, winds=None):
+    """
+    True course, true heading and magnetic heading for every leg along stops.
+
+    Headings include wind correction when wind solutions are available; magnetic
+    variation at each leg midpoint comes from the cached declination grid.
+    """
+    if len(stops) < 2:
+        return []
+    lats = np.array([stop['latitude'] for stop in stops])
+    lons = np.array([stop['longitude'] for stop in stops])
+    courses = true_course(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    headings = courses.copy()
+    if winds is not None:
+        headings = np.array([winds[(a['icao'], b['icao'])]['true_heading']
+                             for a, b in zip(stops, stops[1:])])
+    mid_lats = (lats[:-1] + lats[1:]) / 2
+    mid_lons = (lons[:-1] + lons[1:]) / 2
+    variation = magnetic_variation(mid_lats, mid_lons)
+
+    results = []
+    for i in range(len(courses)):
+        result = {
+            'true_course': int(round(courses[i])) % 360,
+            'true_heading': int(round(headings[i])) % 360,
+        }
+        if variation is not None:
+            # East variation is subtracted, west is added
+            result['magnetic_variation'] = round(float(variation[i]), 1)
+            result['magnetic_heading'] = int(round(headings[i] - variation[i])) % 360
+        results.append(result)
+    return results
+
+
+def _build_route(context, nodes, full_path, groundspeed_kt, cruising_altitude_ft, annotations=None):
+    """Build legs along a node path, with any wind, terrain and airspace annotations."""
+    annotations = annotations or {}
+    winds = annotations.get('winds')
+    terrain = annotations.get('terrain')
+    airspace = annotations.get('airspace')
+    altitudes = annotations.get('altitudes')
+    performance = annotations.get('performance')
     legs = []
-    total_time_hr = 0
+    warnings = []
+    unverified = []
+    calm = []
+    headings = _leg_headings([nodes[icao] for icao in full_path], winds)
     for i in range(len(full_path) - 1):
         a1 = nodes[full_path[i]]
         a2 = nodes[full_path[i+1]]
-        dist = haversine(a1['latitude'], a1['longitude'], a2['latitude'], a2['longitude'])
-        cruise_alt = cruising_altitude_ft  # Use provided cruising altitude
-        time_hr = dist / groundspeed_kt
-        total_time_hr += time_hr
-        legs.append({
+        dist = context.distance(a1, a2)
+        leg = {
             'from': a1['icao'],
             'to': a2['icao'],
             'distance_nm': dist,
-            'cruise_altitude_ft': cruise_alt,
-            'estimated_time_hr': time_hr,
-        })
+            'cruise_altitude_ft': cruising_altitude_ft,  # Use provided cruising altitude
+            'estimated_time_hr': dist / groundspeed_kt,
+        }
+        leg.update(headings[i])
+        if altitudes is not None:
+            profile = altitudes[(a1['icao'], a2['icao'])]
+            leg['cruise_altitude_ft'] = profile['best']['altitude_ft']
+            leg['altitude_options'] = [
+                {
+                    'altitude_ft': option['altitude_ft'],
+                    'estimated_time_hr': option['time_hr'],
+                    'fuel_burn_gal': option['fuel_gal'],
+                    'groundspeed_kt': option['groundspeed_kt'],
+                    'headwind': round(option['headwind'], 1),
+                    'usable': option['usable'],
+                }
+                for option in profile['options']
+            ]
+        elif cruising_altitude_ft >= VFR_HEMISPHERIC_MIN_FT:
+            legal_altitude = get_vfr_altitude(a1['latitude'], a1['longitude'],
+                                              a2['latitude'], a2['longitude'], cruising_altitude_ft)
+            if legal_altitude != cruising_altitude_ft:
+                warnings.append(f"Leg {a1['icao']}-{a2['icao']}: {cruising_altitude_ft} ft is not "
+                                "a VFR cruising altitude for this direction; "
+                                f"consider {legal_altitude} ft")
+        if winds is not None:
+            wind = winds[(a1['icao'], a2['icao'])]
+            leg['estimated_time_hr'] = wind['time_hr']
+            leg['wind_component'] = {
+                'headwind': round(wind['headwind'], 1),
+                'crosswind': round(wind['crosswind'], 1),
+            }
+            if not (altitudes or winds)[(a1['icao'], a2['icao'])]['forecast']:
+                calm.append(f"{a1['icao']}-{a2['icao']}")
+        if performance is not None:
+            leg_performance = performance[(a1['icao'], a2['icao'])]
+            leg['estimated_time_hr'] = leg_performance['time_hr']
+            leg['fuel_burn_gal'] = leg_performance['fuel_gal']
+        if terrain is not None:
+            max_elevation = terrain[(a1['icao'], a2['icao'])]['max_elevation_ft']
+            if max_elevation is None:
+                unverified.append(f"{a1['icao']}-{a2['icao']}")
+            else:
+                leg['max_terrain_ft'] = int(math.ceil(max_elevation))
+        if airspace is not None:
+            crossed = [describe_airspace(a) for a in airspace[(a1['icao'], a2['icao'])]]
+            if crossed:
+                leg['airspace'] = crossed
+                warnings.append(f"Leg {a1['icao']}-{a2['icao']} crosses {', '.join(crossed)}")
+        legs.append(leg)
+
+    route = {
+        'path': full_path,
+        'stops': [nodes[icao] for icao in full_path],
+        'legs': legs,
+    }
+    if unverified:
+        warnings.append(f"No terrain data for leg(s) {', '.join(unverified)}; "
+                        "terrain clearance not verified")
+    if calm:
+        warnings.append(f"No forecast winds for leg(s) {', '.join(calm)}; "
+                        "planned in calm wind")
+    if winds is not None:
+        # Any edge searched without forecast winds may have changed the chosen route
+        searched = (altitudes or winds).values()
+        if not all(leg is None or leg['forecast'] for leg in searched):
+            route['incomplete_forecast'] = True
+    if warnings:
+        route['warnings'] = warnings
+    return route
+
+
+def _assemble_plan(route, fuel_states=None, policy=None):
+    """Build the planner result from a (possibly cached) route and its fuel states."""
+    legs = [dict(leg) for leg in route['legs']]
+    stops = route['stops']
+
     # Fuel stops are all intermediate airports
-    fuel_stops = full_path[1:-1]
+    fuel_stops = route['path'][1:-1]
     
     # Fuel planning
-    if plan_fuel_stops:
+    if fuel_states is not None:
         fuel_stops_with_details = []
         total_fuel_burn = 0
-        for i in range(len(full_path) - 1):
-            a1 = nodes[full_path[i]]
-            a2 = nodes[full_path[i+1]]
-            dist = haversine(a1['latitude'], a1['longitude'], a2['latitude'], a2['longitude'])
-            time_hr = dist / groundspeed_kt
-            fuel_burn = time_hr * fuel_burn_gph
+        for i, leg in enumerate(legs):
+            a2 = stops[i+1]
+            fuel_burn = _leg_fuel(leg, policy)
             total_fuel_burn += fuel_burn
-            if full_path[i+1] in fuel_stops:
+            arrival_fuel, departure_fuel = fuel_states[i + 1]
+            if i + 1 < len(legs):
                 fuel_stops_with_details.append({
                     'icao': a2['icao'],
                     'name': a2['name'],
+                    'latitude': a2['latitude'],
+                    'longitude': a2['longitude'],
                     'fuel_burn_gal': fuel_burn,
                     'total_fuel_burn_gal': total_fuel_burn,
-                    'fuel_reserve_gal': fuel_capacity_gal - total_fuel_burn,
+                    'fuel_reserve_gal': arrival_fuel,
+                    'refuel_gal': departure_fuel - arrival_fuel,
                 })
         fuel_planning = {
             'total_fuel_burn_gal': total_fuel_burn,
             'fuel_stops': fuel_stops_with_details,
+            'reserve_fuel_gal': policy['reserve_gal'],
+            'landing_fuel_gal': fuel_states[-1][0],
         }
     else:
         fuel_planning = {}
@@ -196,7 +1082,7 @@ def plan_route(start_code, end_code, aircraft_range_nm, groundspeed_kt,
     return {
         'legs': legs,
         'total_distance_nm': sum(l['distance_nm'] for l in legs),
-        'estimated_time_hr': total_time_hr,
+        'estimated_time_hr': sum(l['estimated_time_hr'] for l in legs),
         'fuel_stops': fuel_stops,
         'fuel_planning': fuel_planning,
     }
@@ -0,0 +1,296 @@
+"""
+Flight Plan Weather Analysis.
+
+Builds the ``weather_analysis`` of a flight plan from forecasts sampled along
+the planned legs at each point's ETA, from METARs at and near the route, and
+from the TAFs of the fuel stops and destination at their arrival times.
+Forecasts come from the shared forecast cache (batched multi-location fetches),
+METARs from one batched request with a short-lived cache and TAFs from the
+in-memory TAF store. Forecasts and METARs are fetched
+concurrently under a strict time budget; whatever has arrived when the budget
+runs out is used, and the plan is returned without weather if nothing has.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.airport import get_metar_data
+from app.models.airport_index import get_airport_index
+from app.models.flight_category import CATEGORIES, UNKNOWN, classify
+from app.models.forecast_cache import get_forecast_cache
+from app.models.navigation import great_circle_nm, sample_legs
+from app.models.taf import lookup_tafs
+
+logger = logging.getLogger(__name__)
+
+# Spacing of forecast samples along the route (nautical miles)
+SAMPLE_SPACING_NM = 25.0
+
+# METAR stations considered: route stops plus the nearest airports to the route
+METAR_CORRIDOR_NM = 20.0
+MAX_METAR_STATIONS = 40
+METAR_CACHE_TTL = 600
+
+METERS_PER_SM = 1609.34
+CATEGORY_ORDER = list(CATEGORIES[:UNKNOWN])
+OVERALL_CONDITIONS = {
+    'VFR': 'VFR conditions expected',
+    'MVFR': 'Marginal VFR conditions along route',
+    'IFR': 'IFR conditions along route',
+    'LIFR': 'Low IFR conditions along route',
+}
+
+# Thresholds for reporting significant weather
+PRECIPITATION_PROBABILITY_PCT = 60.0
+LOW_CLOUD_PCT = 87.5
+GUST_KT = 25.0
+
+FORECAST_VARIABLES = ['visibility', 'cloudcover_low', 'precipitation_probability', 'windgusts_10m']
+
+_metar_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+_metar_lock = threading.Lock()
+
+
+def cached_metars(codes: Sequence[str], fetcher=None) -> Dict[str, Dict[str, Any]]:
+    """
+    METARs for stations, fetching only those not seen within ``METAR_CACHE_TTL``.
+
+    Stations that reported nothing are remembered too, so they are not asked
+    for again on every plan.
+    """
+    fetcher = fetcher or get_metar_data
+    now = time.time()
+    with _metar_lock:
+        fresh = {code: _metar_cache[code] for code in codes
+                 if code in _metar_cache and now - _metar_cache[code][0] <= METAR_CACHE_TTL}
+    missing = [code for code in codes if code not in fresh]
+    if missing:
+        fetched = fetcher(missing) or {}
+        with _metar_lock:
+            for code in missing:
+                _metar_cache[code] = (now, fetched.get(code))
+                fresh[code] = _metar_cache[code]
+    return {code: metar for code, (_, metar) in fresh.items() if metar}
+
+
+def clear_metar_cache() -> None:
+    with _metar_lock:
+        _metar_cache.clear()
+
+
+def route_samples(stops: Sequence[Dict[str, Any]], legs: Sequence[Dict[str, Any]],
+                  departure_time: float) -> Dict[str, np.ndarray]:
+    """Sample points along the legs with their ETAs from the planned leg times."""
+    lat1 = np.array([stop['latitude'] for stop in stops[:-1]])
+    lon1 = np.array([stop['longitude'] for stop in stops[:-1]])
+    lat2 = np.array([stop['latitude'] for stop in stops[1:]])
+    lon2 = np.array([stop['longitude'] for stop in stops[1:]])
+    distances = great_circle_nm(lat1, lon1, lat2, lon2)
+    lats, lons, leg_index, segment_nm = sample_legs(lat1, lon1, lat2, lon2, SAMPLE_SPACING_NM,
+                                                    distances)
+
+    leg_hours = np.array([leg.get('estimated_time_hr') or 0.0 for leg in legs], dtype=float)
+    leg_start = np.concatenate([[0.0], np.cumsum(leg_hours)[:-1]])
+    counts = np.bincount(leg_index, minlength=len(legs))
+    position = np.arange(len(leg_index)) - np.repeat(np.cumsum(counts) - counts, counts)
+    fraction = (position + 0.5) / counts[leg_index]
+    etas = departure_time + (leg_start[leg_index] + fraction * leg_hours[leg_index]) * 3600.0
+    return {'lats': lats, 'lons': lons, 'leg_index': leg_index, 'etas': etas}
+
+
+def stop_arrivals(legs: Sequence[Dict[str, Any]], departure_time: float) -> List[float]:
+    """Arrival time (unix seconds) at the end of each leg."""
+    leg_hours = np.array([leg.get('estimated_time_hr') or 0.0 for leg in legs], dtype=float)
+    return (departure_time + np.cumsum(leg_hours) * 3600.0).tolist()
+
+
+def metar_stations(stops: Sequence[Dict[str, Any]], samples: Dict[str, np.ndarray],
+                   airport_index) -> List[str]:
+    """Route stops plus the airports nearest to the route, up to ``MAX_METAR_STATIONS``."""
+    nearest: Dict[str, float] = {stop['icao']: -1.0 for stop in stops}
+    for lat, lon in zip(samples['lats'].tolist(), samples['lons'].tolist()):
+        for airport, distance in airport_index.within_radius(lat, lon, METAR_CORRIDOR_NM):
+            icao = airport['icao']
+            if len(icao) == 4 and icao.isalnum() and distance < nearest.get(icao, np.inf):
+                nearest[icao] = distance
+    return sorted(nearest, key=nearest.get)[:MAX_METAR_STATIONS]
+
+
+def summarize_weather(stops: Sequence[Dict[str, Any]], samples: Dict[str, np.ndarray],
+                      forecast: Optional[Dict[str, np.ndarray]],
+                      metars: Optional[Dict[str, Dict[str, Any]]],
+                      tafs: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Combine forecasts at ETA, METARs and arrival TAFs into a weather analysis.
+
+    Args:
+        tafs: TAF conditions at the arrival time of stops after the departure
+            (``TafStore.lookup`` results by station)
+
+    Returns None when no source has any data.
+    """
+    has_forecast = forecast is not None and not np.isnan(forecast['visibility']).all()
+    if not has_forecast and not metars and not tafs:
+        return None
+
+    categories = []
+    significant = []
+    concerns = []
+    visibilities = []
+    max_gust = None
+
+    for icao, metar in sorted((metars or {}).items()):
+        category = metar.get('flight_category')
+        if category in CATEGORY_ORDER:
+            categories.append(category)
+            if category != 'VFR':
+                raw_text = metar.get('raw_text', '').strip()
+                significant.append(f"{category} reported at {icao}: {raw_text}")
+                concerns.append(icao)
+        if metar.get('visibility_statute_mi') is not None:
+            visibilities.append(float(metar['visibility_statute_mi']))
+        if metar.get('wind_gust_kt'):
+            max_gust = max(max_gust or 0, metar['wind_gust_kt'])
+
+    if has_forecast:
+        leg_names = [f"{a['icao']}-{b['icao']}" for a, b in zip(stops, stops[1:])]
+        visibility_sm = forecast['visibility'] / METERS_PER_SM
+        for leg, name in enumerate(leg_names):
+            on_leg = samples['leg_index'] == leg
+            with np.errstate(invalid='ignore'):
+                leg_visibility = np.nanmin(visibility_sm[on_leg], initial=np.inf)
+                precipitation = np.nanmax(forecast['precipitation_probability'][on_leg],
+                                          initial=-np.inf)
+                low_cloud = np.nanmax(forecast['cloudcover_low'][on_leg], initial=-np.inf)
+                gust = np.nanmax(forecast['windgusts_10m'][on_leg], initial=-np.inf)
+            if np.isfinite(leg_visibility):
+                visibilities.append(float(leg_visibility))
+                category = CATEGORIES[int(classify(leg_visibility, np.nan))]
+                categories.append(category)
+                if category != 'VFR':
+                    significant.append(f"Forecast visibility {leg_visibility:.1f} sm on leg {name}")
+                    concerns.append(name)
+            if precipitation >= PRECIPITATION_PROBABILITY_PCT:
+                significant.append(f"Precipitation likely on leg {name} ({precipitation:.0f}%)")
+            if low_cloud >= LOW_CLOUD_PCT:
+                significant.append(f"Low overcast forecast on leg {name}")
+                if name not in concerns:
+                    concerns.append(name)
+            if gust >= GUST_KT:
+                significant.append(f"Surface gusts to {gust:.0f} kt on leg {name}")
+            if np.isfinite(gust):
+                max_gust = max(max_gust or 0, round(float(gust)))
+
+    arrivals = []
+    for stop in stops[1:]:
+        taf = (tafs or {}).get(stop['icao'])
+        if taf is None:
+            continue
+        icao, category, prevailing = taf['station'], taf['flight_category'], taf['prevailing']
+        if category in CATEGORY_ORDER:
+            categories.append(category)
+            if category != 'VFR':
+                groups = sorted({period['change'] for period in taf['temporary']
+                                 if period['flight_category'] == category})
+                source = ''
+                if prevailing['flight_category'] != category:
+                    source = f" ({'/'.join(groups)})"
+                significant.append(f"{category} forecast at {icao} on arrival at "
+                                   f"{taf['time']:%H%MZ}{source}")
+                if icao not in concerns:
+                    concerns.append(icao)
+        if prevailing['visibility_statute_mi'] is not None:
+            visibilities.append(float(prevailing['visibility_statute_mi']))
+        gusts = [period['wind_gust_kt'] for period in [prevailing, *taf['temporary']]
+                 if period['wind_gust_kt']]
+        if gusts:
+            max_gust = max(max_gust or 0, *gusts)
+        arrivals.append({
+            'icao': icao,
+            'eta': taf['time'].isoformat(),
+            'flight_category': category,
+            'prevailing_category': prevailing['flight_category'],
+            'raw_text': taf['raw_text'],
+        })
+
+    worst = max(categories, key=CATEGORY_ORDER.index) if categories else None
+    return {
+        'overall_conditions': OVERALL_CONDITIONS.get(worst, 'Conditions unknown'),
+        'significant_weather': significant,
+        'wind_analysis': {'max_surface_gust_kt': max_gust},
+        'visibility_forecast': {
+            'minimum_visibility': round(min(visibilities), 1) if visibilities else None,
+            'areas_of_concern': concerns,
+        },
+        'arrival_forecasts': arrivals,
+    }
+
+
+async def analyze_route_weather(route_data: Dict[str, Any], departure_time: Optional[float] = None,
+                                budget_s: Optional[float] = None, airport_index=None,
+                                forecast_cache=None,
+                                metar_fetcher=None) -> Optional[Dict[str, Any]]:
+    """
+    Weather analysis for a planned route within a latency budget.
+
+    Forecast grid nodes and METARs are fetched concurrently in worker threads.
+    After ``budget_s`` seconds the analysis is built from whatever is cached;
+    fetches still running keep warming the caches for later requests.
+
+    Args:
+        route_data: Result of ``plan_route``
+        departure_time: Departure (unix seconds, defaults to now)
+        budget_s: Time budget in seconds (defaults to ``settings.flight_weather_budget_s``)
+
+    Returns:
+        dict: Weather analysis, or None when no weather data arrived in time
+    """
+    legs = route_data.get('legs') or []
+    if not legs:
+        return None
+    index = airport_index or get_airport_index()
+    cache = get_forecast_cache() if forecast_cache is None else forecast_cache
+    budget_s = settings.flight_weather_budget_s if budget_s is None else budget_s
+    departure_time = time.time() if departure_time is None else departure_time
+
+    stops = [index.get(code) for code in [legs[0]['from']] + [leg['to'] for leg in legs]]
+    if not all(stops):
+        return None
+    samples = route_samples(stops, legs, departure_time)
+    stations = metar_stations(stops, samples, index)
+    # Local lookups in the TAF store: no upstream request, no budget needed
+    tafs = lookup_tafs([stop['icao'] for stop in stops[1:]], stop_arrivals(legs, departure_time))
+
+    nodes = cache.nodes_for(samples['lats'], samples['lons'])
+    forecast_task = asyncio.ensure_future(asyncio.to_thread(cache.ensure, nodes))
+    metar_task = asyncio.ensure_future(asyncio.to_thread(cached_metars, stations, metar_fetcher))
+    done, pending = await asyncio.wait({forecast_task, metar_task}, timeout=budget_s)
+    if pending:
+        logger.info(f"Route weather budget of {budget_s}s exhausted; using cached data")
+        for task in pending:
+            task.add_done_callback(_log_late_failure)
+
+    metars = None
+    if metar_task in done and metar_task.exception() is None:
+        metars = metar_task.result()
+    elif metar_task in done:
+        logger.warning(f"METAR fetch for route weather failed: {metar_task.exception()}")
+    if forecast_task in done and forecast_task.exception() is not None:
+        logger.warning(f"Forecast fetch for route weather failed: {forecast_task.exception()}")
+
+    # Only what is already cached: never block past the budget
+    forecast = await asyncio.to_thread(
+        cache.surface_timeseries, samples['lats'], samples['lons'], FORECAST_VARIABLES,
+        samples['etas'], False)
+    return summarize_weather(stops, samples, forecast, metars, tafs)
+
+
+def _log_late_failure(task: "asyncio.Future") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background route weather fetch failed: {task.exception()}")
@@ -0,0 +1,449 @@
+"""
+Forecast Cache.
+
+Hourly forecasts cached per lat/lon grid node and fetched in batched
+multi-location requests (from Open-Meteo, or from local model files when the
+GRIB backend is selected). Provides vectorized lookups of winds aloft and surface
+conditions for many points at once, so planners never make per-edge HTTP calls.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+from app.config import settings
+from app.models.navigation import wind_components_from_direction
+
+logger = logging.getLogger(__name__)
+
+# Pressure levels sampled for winds aloft and their standard-atmosphere altitudes (feet)
+PRESSURE_LEVELS_HPA = [1000, 925, 850, 700, 600, 500]
+PRESSURE_LEVEL_ALTITUDES_FT = np.array([364.0, 2500.0, 4781.0, 9882.0, 13801.0, 18289.0])
+
+SURFACE_VARIABLES = [
+    'temperature_2m', 'dewpoint_2m', 'cloudcover', 'cloudcover_low', 'visibility',
+    'precipitation_probability', 'precipitation', 'windspeed_10m', 'winddirection_10m',
+    'windgusts_10m', 'weathercode',
+]
+LEVEL_VARIABLES = (
+    [f'windspeed_{level}hPa' for level in PRESSURE_LEVELS_HPA]
+    + [f'winddirection_{level}hPa' for level in PRESSURE_LEVELS_HPA]
+)
+HOURLY_VARIABLES = SURFACE_VARIABLES + LEVEL_VARIABLES
+
+# Open-Meteo accepts comma-separated coordinate lists; keep URLs a sensible length
+MAX_LOCATIONS_PER_REQUEST = 50
+
+Node = Tuple[int, int]
+
+
+def fetch_hourly(points: Sequence[Tuple[float, float]],
+                 forecast_days: int = 3) -> List[Dict[str, Any]]:
+    """
+    Fetch hourly forecasts from the configured ``forecast_backend``.
+
+    The GRIB backend answers from local model files; Open-Meteo is used when it
+    is selected or when no model data is loaded.
+    """
+    if settings.forecast_backend == 'grib':
+        from app.models.grib_forecast import fetch_grib_hourly
+        results = fetch_grib_hourly(points, forecast_days)
+        if results is not None:
+            return results
+        logger.warning("No GRIB forecast loaded, falling back to Open-Meteo")
+    return fetch_open_meteo_hourly(points, forecast_days)
+
+
+def fetch_open_meteo_hourly(points: Sequence[Tuple[float, float]],
+                            forecast_days: int = 3) -> List[Dict[str, Any]]:
+    """
+    Fetch hourly forecasts for several locations in a single Open-Meteo request.
+
+    Args:
+        points: (latitude, longitude) pairs
+        forecast_days: Number of forecast days
+
+    Returns:
+        List of ``hourly`` dicts, one per point, in request order
+    """
+    params = {
+        'latitude': ','.join(f"{lat:.4f}" for lat, _ in points),
+        'longitude': ','.join(f"{lon:.4f}" for _, lon in points),
+        'hourly': ','.join(HOURLY_VARIABLES),
+        'windspeed_unit': 'kn',
+        'timeformat': 'unixtime',
+        'timezone': 'GMT',
+        'forecast_days': forecast_days,
+    }
+    response = requests.get(f"{settings.openmeteo_base_url}/forecast", params=params, timeout=15)
+    response.raise_for_status()
+    data = response.json()
+    results = data if isinstance(data, list) else [data]
+    return [result.get('hourly', {}) for result in results]
+
+
+def level_weights(altitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bracketing pressure level indices and interpolation weight for altitudes (feet)."""
+    upper = np.clip(np.searchsorted(PRESSURE_LEVEL_ALTITUDES_FT, altitude), 1,
+                    len(PRESSURE_LEVELS_HPA) - 1)
+    lower = upper - 1
+    span = PRESSURE_LEVEL_ALTITUDES_FT[upper] - PRESSURE_LEVEL_ALTITUDES_FT[lower]
+    weight = np.clip((altitude - PRESSURE_LEVEL_ALTITUDES_FT[lower]) / span, 0.0, 1.0)
+    return lower, upper, weight
+
+
+class ForecastCache:
+    """
+    Grid-node forecast cache with TTL and LRU bounds.
+
+    Forecasts are stored per grid node (multiples of ``grid_deg``) as arrays of
+    hourly values. Point queries bilinearly interpolate between the four
+    surrounding nodes and linearly between pressure levels. Nodes whose fetch
+    failed are not requested again for ``failure_ttl`` seconds, so an outage of
+    the forecast source does not stall every lookup on request timeouts.
+    """
+
+    def __init__(self, grid_deg: float = 0.5, ttl: float = 1800, max_nodes: int = 5000,
+                 fetcher=None, failure_ttl: float = 60):
+        self.grid_deg = grid_deg
+        self.ttl = ttl
+        self.max_nodes = max_nodes
+        self.failure_ttl = failure_ttl
+        self.fetcher = fetcher or fetch_hourly
+        self._nodes: "OrderedDict[Node, Tuple[float, Dict[str, np.ndarray]]]" = OrderedDict()
+        self._failures: Dict[Node, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._nodes.clear()
+            self._failures.clear()
+
+    def node_position(self, node: Node) -> Tuple[float, float]:
+        return node[0] * self.grid_deg, node[1] * self.grid_deg
+
+    def _missing(self, nodes: Iterable[Node]) -> List[Node]:
+        now = time.time()
+        with self._lock:
+            return [node for node in nodes
+                    if (node not in self._nodes or now - self._nodes[node][0] > self.ttl)
+                    and now - self._failures.get(node, -np.inf) > self.failure_ttl]
+
+    def _store(self, node: Node, hourly: Dict[str, Any]) -> None:
+        arrays = {}
+        for key, values in hourly.items():
+            arrays[key] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        with self._lock:
+            self._nodes[node] = (time.time(), arrays)
+            self._nodes.move_to_end(node)
+            self._failures.pop(node, None)
+            while len(self._nodes) > self.max_nodes:
+                self._nodes.popitem(last=False)
+
+    def missing_nodes(self, nodes: Iterable[Node]) -> List[Node]:
+        """Return the nodes that need fetching (absent or expired, and not recently failed)."""
+        return self._missing(set(nodes))
+
+    def store_batch(self, nodes: Sequence[Node], hourly_results: Sequence[Dict[str, Any]]) -> None:
+        """Store fetched hourly forecasts for nodes (results in node order)."""
+        for node, hourly in zip(nodes, hourly_results):
+            self._store(node, hourly or {})
+
+    def ensure(self, nodes: Iterable[Node]) -> None:
+        """
+        Fetch any absent or expired nodes in batched multi-location requests.
+
+        A failed request marks its nodes and those of the remaining batches as
+        failed, instead of waiting on the source once per batch.
+        """
+        missing = self.missing_nodes(nodes)
+        for i in range(0, len(missing), MAX_LOCATIONS_PER_REQUEST):
+            batch = missing[i:i + MAX_LOCATIONS_PER_REQUEST]
+            try:
+                results = self.fetcher([self.node_position(node) for node in batch])
+            except Exception as e:
+                logger.error(f"Error fetching forecast for {len(missing) - i} grid nodes: {e}")
+                now = time.time()
+                with self._lock:
+                    self._failures.update((node, now) for node in missing[i:])
+                return
+            self.store_batch(batch, results)
+
+    def has_forecast(self, lats, lons, when: Optional[float] = None) -> np.ndarray:
+        """
+        Whether forecast data is cached for all grid nodes around each point.
+
+        Points without it get calm wind and missing surface values from lookups.
+        ``when`` is accepted for compatibility with the winds aloft grid.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        i0 = np.floor(lats / self.grid_deg).astype(int)
+        j0 = np.floor(lons / self.grid_deg).astype(int)
+
+        def known(node):
+            entry = self._nodes.get(node)
+            return entry is not None and len(entry[1].get('time', ())) > 0
+
+        covered = np.ones(len(lats), dtype=bool)
+        with self._lock:
+            for di in (0, 1):
+                for dj in (0, 1):
+                    covered &= [known(node)
+                                for node in zip((i0 + di).tolist(), (j0 + dj).tolist())]
+        return covered
+
+    def nodes_for(self, lats, lons) -> List[Node]:
+        """Grid nodes needed to interpolate at the given points."""
+        i0 = np.floor(np.asarray(lats, dtype=float) / self.grid_deg).astype(int)
+        j0 = np.floor(np.asarray(lons, dtype=float) / self.grid_deg).astype(int)
+        nodes = set()
+        for di in (0, 1):
+            for dj in (0, 1):
+                nodes.update(zip((i0 + di).tolist(), (j0 + dj).tolist()))
+        return list(nodes)
+
+    def _stack(self, nodes: Sequence[Node], variables: Sequence[str], when: float) -> np.ndarray:
+        """Return values[node, variable] at the forecast hour nearest to ``when``."""
+        values = np.full((len(nodes), len(variables)), np.nan)
+        with self._lock:
+            entries = [self._nodes.get(node) for node in nodes]
+        for n, entry in enumerate(entries):
+            if entry is None:
+                continue
+            arrays = entry[1]
+            times = arrays.get('time')
+            if times is None or not len(times):
+                continue
+            hour = int(np.clip(np.rint((when - times[0]) / 3600.0), 0, len(times) - 1))
+            for v, variable in enumerate(variables):
+                series = arrays.get(variable)
+                if series is not None and hour < len(series):
+                    values[n, v] = series[hour]
+        return values
+
+    def _interpolate(self, lats, lons, variables: Sequence[str], when: float,
+                     fetch: bool = True) -> np.ndarray:
+        """Bilinearly interpolate variables at points; returns array[point, variable]."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        nodes = self.nodes_for(lats, lons)
+        if fetch:
+            self.ensure(nodes)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        grid = self._stack(nodes, variables, when)
+
+        y = lats / self.grid_deg
+        x = lons / self.grid_deg
+        i0, j0 = np.floor(y).astype(int), np.floor(x).astype(int)
+        fy, fx = (y - i0)[:, None], (x - j0)[:, None]
+
+        def corner(di, dj):
+            keys = zip((i0 + di).tolist(), (j0 + dj).tolist())
+            idx = np.array([node_index[key] for key in keys], dtype=int)
+            return grid[idx] if len(idx) else np.empty((0, len(variables)))
+
+        v00, v01, v10, v11 = corner(0, 0), corner(0, 1), corner(1, 0), corner(1, 1)
+        return (v00 * (1 - fy) * (1 - fx) + v01 * (1 - fy) * fx
+                + v10 * fy * (1 - fx) + v11 * fy * fx)
+
+    def winds_aloft(self, lats, lons, altitude_ft, when: Optional[float] = None,
+                    fetch: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wind vectors (u east, v north, knots, direction of travel) at points and altitudes.
+
+        ``altitude_ft`` may be a scalar or an array broadcastable against the points.
+        Missing data yields calm (zero) wind.
+        """
+        when = time.time() if when is None else when
+        u_levels, v_levels = self._level_winds(lats, lons, when, fetch)
+        altitude = np.broadcast_to(np.asarray(altitude_ft, dtype=float), u_levels.shape[:1])
+        lower, upper, weight = level_weights(altitude)
+        rows = np.arange(len(altitude))
+        u = u_levels[rows, lower] * (1 - weight) + u_levels[rows, upper] * weight
+        v = v_levels[rows, lower] * (1 - weight) + v_levels[rows, upper] * weight
+        return np.nan_to_num(u), np.nan_to_num(v)
+
+    def winds_aloft_profile(self, lats, lons, altitudes_ft: Sequence[float],
+                            when: Optional[float] = None,
+                            fetch: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wind vectors at every point for each of several altitudes.
+
+        The horizontal interpolation is done once; only the vertical interpolation
+        is repeated per altitude. Returns (u, v) arrays shaped (points, altitudes).
+        """
+        when = time.time() if when is None else when
+        u_levels, v_levels = self._level_winds(lats, lons, when, fetch)
+        lower, upper, weight = level_weights(np.asarray(altitudes_ft, dtype=float))
+        u = u_levels[:, lower] * (1 - weight) + u_levels[:, upper] * weight
+        v = v_levels[:, lower] * (1 - weight) + v_levels[:, upper] * weight
+        return np.nan_to_num(u), np.nan_to_num(v)
+
+    def _level_winds(self, lats, lons, when, fetch):
+        """Wind components at every pressure level, shaped (points, levels)."""
+        speeds = [f'windspeed_{level}hPa' for level in PRESSURE_LEVELS_HPA]
+        directions = [f'winddirection_{level}hPa' for level in PRESSURE_LEVELS_HPA]
+        # Interpolate vector components, not speed/direction, between nodes
+        return self._interpolate_vectors(lats, lons, speeds, directions, when, fetch)
+
+    def _interpolate_vectors(self, lats, lons, speeds, directions, when, fetch):
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        nodes = self.nodes_for(lats, lons)
+        if fetch:
+            self.ensure(nodes)
+        grid = self._stack(nodes, list(speeds) + list(directions), when)
+        n = len(speeds)
+        u_nodes, v_nodes = wind_components_from_direction(grid[:, :n], grid[:, n:])
+        node_index = {node: i for i, node in enumerate(nodes)}
+
+        y = lats / self.grid_deg
+        x = lons / self.grid_deg
+        i0, j0 = np.floor(y).astype(int), np.floor(x).astype(int)
+        fy, fx = (y - i0)[:, None], (x - j0)[:, None]
+        weights = [((0, 0), (1 - fy) * (1 - fx)), ((0, 1), (1 - fy) * fx),
+                   ((1, 0), fy * (1 - fx)), ((1, 1), fy * fx)]
+        u = np.zeros((len(lats), n))
+        v = np.zeros((len(lats), n))
+        for (di, dj), weight in weights:
+            keys = zip((i0 + di).tolist(), (j0 + dj).tolist())
+            idx = np.array([node_index[key] for key in keys], dtype=int)
+            if len(idx):
+                u += u_nodes[idx] * weight
+                v += v_nodes[idx] * weight
+        return u, v
+
+    def _hourly_grid(self, nodes: Sequence[Node],
+                     variables: Sequence[str]) -> Tuple[Optional[float], np.ndarray]:
+        """Return (base_time, values[node, variable, hour]) on an hourly axis shared by nodes."""
+        with self._lock:
+            entries = [self._nodes.get(node) for node in nodes]
+        starts = [entry[1]['time'][0] for entry in entries
+                  if entry is not None and len(entry[1].get('time', ()))]
+        if not starts:
+            return None, np.full((len(nodes), len(variables), 1), np.nan)
+        base = min(starts)
+        spans = [(int(np.rint((entry[1]['time'][0] - base) / 3600.0)), len(entry[1]['time']))
+                 if entry is not None and len(entry[1].get('time', ())) else (0, 0)
+                 for entry in entries]
+        hours = max(offset + length for offset, length in spans)
+        values = np.full((len(nodes), len(variables), hours), np.nan)
+        for n, entry in enumerate(entries):
+            offset, length = spans[n]
+            if not length:
+                continue
+            for v, variable in enumerate(variables):
+                series = entry[1].get(variable)
+                if series is not None:
+                    count = min(len(series), length)
+                    values[n, v, offset:offset + count] = series[:count]
+        return base, values
+
+    def _sample_hourly(self, lats, lons, nodes: Sequence[Node], base: Optional[float],
+                       values: np.ndarray, times) -> np.ndarray:
+        """
+        Interpolate hourly node values at points and per-point times.
+
+        ``times`` broadcasts against the points (e.g. (departures, points) ETAs).
+        Bilinear in space, linear in time; returns array[..., point, variable].
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        times = np.broadcast_to(np.asarray(times, dtype=float),
+                                np.broadcast_shapes(np.shape(times), lats.shape))
+        if base is None:
+            return np.full(times.shape + (values.shape[1],), np.nan)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        y = lats / self.grid_deg
+        x = lons / self.grid_deg
+        i0, j0 = np.floor(y).astype(int), np.floor(x).astype(int)
+        fy, fx = y - i0, x - j0
+
+        def corner(di, dj):
+            keys = zip((i0 + di).tolist(), (j0 + dj).tolist())
+            return np.array([node_index[key] for key in keys], dtype=int)
+
+        corners = np.stack([corner(di, dj) for di, dj in ((0, 0), (0, 1), (1, 0), (1, 1))],
+                           axis=1).reshape(len(lats), 4)
+        weights = np.stack([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx], axis=1)
+
+        hours = values.shape[2]
+        position = np.clip((times - base) / 3600.0, 0.0, hours - 1)
+        h0 = np.clip(np.floor(position).astype(int), 0, max(hours - 2, 0))
+        h1 = np.minimum(h0 + 1, hours - 1)
+        frac = (position - h0)[..., None, None]
+        point_values = values[corners]  # (points, corners, variables, hours)
+        points = np.arange(len(lats))
+        at_time = (point_values[points, :, :, h0] * (1 - frac)
+                   + point_values[points, :, :, h1] * frac)  # (..., points, corners, variables)
+        return (at_time * weights[..., None]).sum(axis=-2)
+
+    def surface_timeseries(self, lats, lons, variables: Sequence[str], times,
+                           fetch: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Surface variables at points for many times in one vectorized lookup.
+
+        ``times`` (unix seconds) broadcasts against the points, so an array of
+        ETAs shaped (departures, points) returns values shaped the same way.
+        """
+        nodes = self.nodes_for(lats, lons)
+        if fetch:
+            self.ensure(nodes)
+        base, values = self._hourly_grid(nodes, variables)
+        sampled = self._sample_hourly(lats, lons, nodes, base, values, times)
+        return {variable: sampled[..., i] for i, variable in enumerate(variables)}
+
+    def winds_aloft_timeseries(self, lats, lons, altitude_ft, times,
+                               fetch: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wind vectors (u, v) at points for many times; see ``surface_timeseries``.
+
+        ``altitude_ft`` is a scalar or one altitude per point.
+        """
+        nodes = self.nodes_for(lats, lons)
+        if fetch:
+            self.ensure(nodes)
+        speeds = [f'windspeed_{level}hPa' for level in PRESSURE_LEVELS_HPA]
+        directions = [f'winddirection_{level}hPa' for level in PRESSURE_LEVELS_HPA]
+        base, values = self._hourly_grid(nodes, speeds + directions)
+        n = len(speeds)
+        u_nodes, v_nodes = wind_components_from_direction(values[:, :n], values[:, n:])
+        sampled = self._sample_hourly(lats, lons, nodes, base,
+                                      np.concatenate([u_nodes, v_nodes], axis=1), times)
+
+        altitude = np.broadcast_to(np.asarray(altitude_ft, dtype=float), np.shape(lats))
+        lower, upper, weight = level_weights(altitude)
+        points = np.arange(altitude.size)
+        u = sampled[..., points, lower] * (1 - weight) + sampled[..., points, upper] * weight
+        v = (sampled[..., points, n + lower] * (1 - weight)
+             + sampled[..., points, n + upper] * weight)
+        return np.nan_to_num(u), np.nan_to_num(v)
+
+    def surface(self, lats, lons, variables: Sequence[str], when: Optional[float] = None,
+                fetch: bool = True) -> Dict[str, np.ndarray]:
+        """Interpolated surface variables at points, keyed by variable name."""
+        when = time.time() if when is None else when
+        values = self._interpolate(lats, lons, variables, when, fetch)
+        return {variable: values[:, i] for i, variable in enumerate(variables)}
+
+
+_forecast_cache = ForecastCache(
+    grid_deg=settings.forecast_grid_deg,
+    ttl=settings.forecast_cache_ttl,
+    max_nodes=settings.forecast_cache_max_nodes,
+    failure_ttl=settings.forecast_failure_ttl,
+)
+
+
+def get_forecast_cache() -> ForecastCache:
+    """Return the process-wide forecast cache."""
+    return _forecast_cache
@@ -0,0 +1,762 @@
+"""
+GRIB2 Forecast Backend.
+
+Answers forecast queries from model output (GFS, or HRRR regridded to a
+regular lat/lon grid) that an external sync places in ``grib_data_dir``,
+instead of per-point Open-Meteo requests. Messages are decoded once into one
+float32 array per variable and level, shaped (valid times, rows, columns),
+written as ``.npy`` files under ``grib_cache_dir`` and memory-mapped, so point,
+multi-point and along-route queries are array indexing with bilinear (space)
+and linear (time) interpolation.
+
+The decoder covers what NCEP publishes for these models: regular lat/lon grids
+(grid template 3.0) with simple packing or complex packing with spatial
+differencing (data templates 5.0, 5.2 and 5.3). Messages in other encodings
+are skipped. Where several model runs cover the same valid time, the newest
+run wins.
+
+Selected with ``forecast_backend = "grib"``; ``get_weather_data_async`` and the
+forecast cache then read from here and fall back to Open-Meteo only when no
+model data is loaded.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.forecast_cache import PRESSURE_LEVELS_HPA, level_weights
+from app.models.navigation import sample_legs
+
+logger = logging.getLogger(__name__)
+
+GRIB_SUFFIXES = ('.grib2', '.grb2')
+MANIFEST_NAME = 'manifest.json'
+
+MS_TO_KT = 1.94384
+MS_TO_MPH = 2.23694
+MM_PER_INCH = 25.4
+
+# (discipline, category, number, first surface type, surface value) -> variable
+SURFACE_FIELDS = {
+    (0, 0, 0, 103, 2): 'temperature_2m',
+    (0, 0, 6, 103, 2): 'dewpoint_2m',
+    (0, 2, 2, 103, 10): 'u_10m',
+    (0, 2, 3, 103, 10): 'v_10m',
+    (0, 2, 22, 1, 0): 'windgusts_10m',
+    (0, 6, 1, 10, 0): 'cloudcover',
+    (0, 6, 1, 200, 0): 'cloudcover',
+    (0, 6, 1, 214, 0): 'cloudcover_low',
+    (0, 6, 1, 224, 0): 'cloudcover_mid',
+    (0, 6, 1, 234, 0): 'cloudcover_high',
+    (0, 6, 3, 214, 0): 'cloudcover_low',
+    (0, 6, 4, 224, 0): 'cloudcover_mid',
+    (0, 6, 5, 234, 0): 'cloudcover_high',
+    (0, 19, 0, 1, 0): 'visibility',
+    (0, 1, 7, 1, 0): 'precipitation',
+}
+# (discipline, category, number) on isobaric surfaces -> variable prefix (``u_850hPa``)
+ISOBARIC_FIELDS = {
+    (0, 2, 2): 'u',
+    (0, 2, 3): 'v',
+}
+ISOBARIC_SURFACE = 100
+HEIGHT_SURFACE = 103
+
+# Stored units: degC, m/s, percent, metres and mm/h; (scale, offset) from the GRIB units
+UNIT_CONVERSIONS = {
+    'temperature_2m': (1.0, -273.15),
+    'dewpoint_2m': (1.0, -273.15),
+    'precipitation': (3600.0, 0.0),
+}
+
+# Seconds per unit of the product definition's time range indicator
+TIME_UNITS_S = {0: 60, 1: 3600, 2: 86400, 10: 3 * 3600, 11: 6 * 3600, 12: 12 * 3600, 13: 1}
+
+Grid = Tuple[int, int, int, int, int, int, int]
+
+
+def _uint(data, octet: int, length: int) -> int:
+    """Unsigned big-endian integer at a 1-based octet of a section."""
+    return int.from_bytes(data[octet - 1:octet - 1 + length], 'big')
+
+
+def _sint(data, octet: int, length: int) -> int:
+    """GRIB2 signed integer (sign bit followed by magnitude)."""
+    value = _uint(data, octet, length)
+    sign = 1 << (8 * length - 1)
+    return -(value & (sign - 1)) if value & sign else value
+
+
+def _timestamp(data, octet: int) -> float:
+    """Unix time of a UTC date (year, month, day, hour, minute, second) at a 1-based octet."""
+    fields = [_uint(data, octet + 2 + i, 1) for i in range(5)]
+    return datetime(_uint(data, octet, 2), *fields, tzinfo=timezone.utc).timestamp()
+
+
+def _read_bits(bits: np.ndarray, offset: int, widths: np.ndarray) -> np.ndarray:
+    """Unsigned integers of the given bit widths packed back to back from a bit offset."""
+    widths = np.asarray(widths, dtype=np.int64)
+    values = np.zeros(widths.size, dtype=np.int64)
+    starts = offset + np.cumsum(widths) - widths
+    for width in np.unique(widths[widths > 0]).tolist():
+        rows = np.flatnonzero(widths == width)
+        chunk = bits[starts[rows, None] + np.arange(width)].astype(np.int64)
+        values[rows] = chunk @ (np.int64(1) << np.arange(width - 1, -1, -1, dtype=np.int64))
+    return values
+
+
+def _byte_aligned(bit_offset: int) -> int:
+    return (bit_offset + 7) // 8 * 8
+
+
+def _scale_values(section5, packed: np.ndarray) -> np.ndarray:
+    reference = struct.unpack('>f', bytes(section5[11:15]))[0]
+    binary_scale = _sint(section5, 16, 2)
+    decimal_scale = _sint(section5, 18, 2)
+    return ((reference + packed * 2.0 ** binary_scale) / 10.0 ** decimal_scale).astype(np.float32)
+
+
+def _unpack_simple(section5, data, count: int) -> np.ndarray:
+    nbits = _uint(section5, 20, 1)
+    if nbits == 0:
+        return _scale_values(section5, np.zeros(count))
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    return _scale_values(section5, _read_bits(bits, 0, np.full(count, nbits)))
+
+
+def _unpack_complex(section5, data, count: int, template: int) -> np.ndarray:
+    """Complex packing (5.2), optionally with spatial differencing (5.3)."""
+    nbits = _uint(section5, 20, 1)
+    if _uint(section5, 23, 1) != 0:
+        raise ValueError("Complex packing with missing value management is not supported")
+    groups = _uint(section5, 32, 4)
+    width_reference, width_bits = _uint(section5, 36, 1), _uint(section5, 37, 1)
+    length_reference, length_increment = _uint(section5, 38, 4), _uint(section5, 42, 1)
+    last_length, length_bits = _uint(section5, 43, 4), _uint(section5, 47, 1)
+    order = _uint(section5, 48, 1) if template == 3 else 0
+    extra_octets = _uint(section5, 49, 1) if template == 3 else 0
+
+    # Spatial differencing leads with the first values and the minimum difference
+    extras = []
+    if order:
+        extras = [_sint(data, 1 + i * extra_octets, extra_octets) for i in range(order + 1)]
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    offset = len(extras) * extra_octets * 8
+
+    references = _read_bits(bits, offset, np.full(groups, nbits))
+    offset = _byte_aligned(offset + groups * nbits)
+    widths = width_reference + _read_bits(bits, offset, np.full(groups, width_bits))
+    offset = _byte_aligned(offset + groups * width_bits)
+    lengths = length_reference + length_increment * _read_bits(bits, offset,
+                                                               np.full(groups, length_bits))
+    offset = _byte_aligned(offset + groups * length_bits)
+    if groups:
+        lengths[-1] = last_length
+    if int(lengths.sum()) != count:
+        raise ValueError(f"Complex packing groups hold {int(lengths.sum())} values, "
+                         f"expected {count}")
+
+    values = np.repeat(references, lengths) + _read_bits(bits, offset, np.repeat(widths, lengths))
+    if order == 1:
+        first, minimum = extras
+        values[0] = first
+        values[1:] += minimum
+        values = np.cumsum(values)
+    elif order == 2:
+        first, second, minimum = extras
+        steps = values + minimum
+        steps[1] = second - first
+        values = np.cumsum(np.concatenate([[first], np.cumsum(steps[1:])]))
+    elif order:
+        raise ValueError(f"Unsupported spatial differencing order {order}")
+    return _scale_values(section5, values)
+
+
+class GribField:
+    """One decoded-on-demand field of a GRIB2 message."""
+
+    def __init__(self, variable: str, reference_time: float, valid_time: float, grid: Grid,
+                 decode: Callable[[], np.ndarray]):
+        self.variable = variable
+        self.reference_time = reference_time
+        self.valid_time = valid_time
+        self.grid = grid
+        self.decode = decode
+
+
+def _grid(section3) -> Grid:
+    """(ni, nj, lat1, lon1, di, dj, scanning mode) of a regular lat/lon grid, in microdegrees."""
+    template = _uint(section3, 13, 2)
+    if template != 0:
+        raise ValueError(f"Unsupported grid template 3.{template}")
+    basic_angle, subdivisions = _uint(section3, 39, 4), _uint(section3, 43, 4)
+    if basic_angle not in (0, 0xFFFFFFFF) or subdivisions not in (0, 0xFFFFFFFF):
+        raise ValueError("Grids with a non-default angle unit are not supported")
+    return (_uint(section3, 31, 4), _uint(section3, 35, 4),
+            _sint(section3, 47, 4), _sint(section3, 51, 4),
+            _uint(section3, 64, 4), _uint(section3, 68, 4), _uint(section3, 72, 1))
+
+
+def _field_variable(discipline: int, section4) -> Optional[str]:
+    category, number = _uint(section4, 10, 1), _uint(section4, 11, 1)
+    surface = _uint(section4, 23, 1)
+    scale, value = _sint(section4, 24, 1), _sint(section4, 25, 4)
+    if surface == ISOBARIC_SURFACE:
+        prefix = ISOBARIC_FIELDS.get((discipline, category, number))
+        return f"{prefix}_{round(value / 10.0 ** scale / 100.0)}hPa" if prefix else None
+    level = round(value / 10.0 ** scale) if surface == HEIGHT_SURFACE else 0
+    return SURFACE_FIELDS.get((discipline, category, number, surface, level))
+
+
+def _valid_time(reference_time: float, section4) -> float:
+    template = _uint(section4, 8, 2)
+    if template == 8:
+        # Statistically processed fields are valid at the end of their interval
+        return _timestamp(section4, 35)
+    if template not in (0, 1):
+        raise ValueError(f"Unsupported product template 4.{template}")
+    return reference_time + _sint(section4, 19, 4) * TIME_UNITS_S[_uint(section4, 18, 1)]
+
+
+def _decoder(section3, section5, section7,
+             bitmap: Optional[np.ndarray]) -> Callable[[], np.ndarray]:
+    ni, nj, _, _, _, _, scan = _grid(section3)
+    template = _uint(section5, 10, 2)
+    count = _uint(section5, 6, 4)
+    if template not in (0, 2, 3):
+        raise ValueError(f"Unsupported data template 5.{template}")
+    if scan & 0x30:
+        raise ValueError(f"Unsupported scanning mode {scan:#04x}")
+
+    def decode() -> np.ndarray:
+        data = section7[5:]
+        values = (_unpack_simple(section5, data, count) if template == 0
+                  else _unpack_complex(section5, data, count, template))
+        if bitmap is not None:
+            field = np.full(ni * nj, np.nan, dtype=np.float32)
+            field[bitmap[:ni * nj].astype(bool)] = values
+        else:
+            field = values
+        # Normalize to rows from south to north and columns from west to east
+        field = field.reshape(nj, ni)
+        if scan & 0x80:
+            field = field[:, ::-1]
+        if not scan & 0x40:
+            field = field[::-1]
+        return np.ascontiguousarray(field)
+
+    return decode
+
+
+def read_grib_fields(path: str) -> Iterator[GribField]:
+    """
+    Yield the supported fields of a GRIB2 file without decoding their data.
+
+    Messages that are not GRIB edition 2, or use unsupported grids, products or
+    packings, are skipped.
+    """
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+    position = 0
+    while True:
+        start = buffer.find(b'GRIB', position)
+        if start < 0 or start + 16 > len(buffer):
+            return
+        discipline, edition = buffer[start + 6], buffer[start + 7]
+        length = int.from_bytes(buffer[start + 8:start + 16], 'big')
+        position = start + max(length, 16) if edition == 2 else start + 4
+        if edition != 2:
+            continue
+        message = memoryview(buffer)[start:start + length]
+        try:
+            yield from _message_fields(message, discipline)
+        except (ValueError, IndexError, KeyError, struct.error) as e:
+            logger.warning(f"Skipping GRIB message at {path}:{start}: {e}")
+
+
+def _message_fields(message, discipline: int) -> Iterator[GribField]:
+    offset = 16
+    section3 = section4 = section5 = None
+    bitmap = None
+    reference_time = None
+    while offset + 4 <= len(message) and bytes(message[offset:offset + 4]) != b'7777':
+        length = _uint(message, offset + 1, 4)
+        number = message[offset + 4]
+        section = message[offset:offset + length]
+        if length < 5:
+            raise ValueError("Corrupt section length")
+        offset += length
+        if number == 1:
+            reference_time = _timestamp(section, 13)
+        elif number == 3:
+            section3 = section
+        elif number == 4:
+            section4 = section
+        elif number == 5:
+            section5 = section
+        elif number == 6:
+            indicator = section[5]
+            if indicator == 0:
+                bitmap = np.unpackbits(np.frombuffer(section[6:], dtype=np.uint8))
+            elif indicator == 255:
+                bitmap = None
+            # 254 reuses the bitmap of the previous field in this message
+        elif number == 7:
+            variable = _field_variable(discipline, section4)
+            if variable is None:
+                continue
+            try:
+                grid = _grid(section3)
+                decode = _decoder(section3, section5, section, bitmap)
+            except ValueError as e:
+                logger.debug(f"Skipping {variable}: {e}")
+                continue
+            yield GribField(variable, reference_time, _valid_time(reference_time, section4),
+                            grid, decode)
+
+
+class GribForecast:
+    """
+    Memory-mapped forecast arrays on one regular lat/lon grid.
+
+    Each variable is a (times, rows, columns) float32 array with rows from south
+    to north; missing times and points are NaN.
+    """
+
+    def __init__(self, directory: str, manifest: Dict[str, Any]):
+        self.directory = directory
+        self.manifest = manifest
+        self.times = np.asarray(manifest['times'], dtype=float)
+        grid = manifest['grid']
+        self.lat0, self.lon0 = grid['lat0'], grid['lon0']
+        self.dlat, self.dlon = grid['dlat'], grid['dlon']
+        self.nj, self.ni = grid['nj'], grid['ni']
+        self.is_global = abs(self.ni * self.dlon - 360.0) < self.dlon / 2
+        self.arrays = {variable: np.load(os.path.join(directory, f"{variable}.npy"), mmap_mode='r')
+                       for variable in manifest['variables']}
+
+    def __contains__(self, variable: str) -> bool:
+        return variable in self.arrays
+
+    @property
+    def start(self) -> float:
+        return float(self.times[0])
+
+    @property
+    def end(self) -> float:
+        return float(self.times[-1])
+
+    def _cells(self, lats: np.ndarray, lons: np.ndarray):
+        """Corner indices, fractions and an in-grid mask for bilinear interpolation."""
+        y = (lats - self.lat0) / self.dlat
+        x = np.mod(lons - self.lon0, 360.0) / self.dlon
+        inside = (y >= 0) & (y <= self.nj - 1)
+        j0 = np.clip(np.floor(y).astype(int), 0, max(self.nj - 2, 0))
+        j1 = np.minimum(j0 + 1, self.nj - 1)
+        if self.is_global:
+            i0 = np.floor(x).astype(int) % self.ni
+            i1 = (i0 + 1) % self.ni
+            fx = x - np.floor(x)
+        else:
+            inside &= x <= self.ni - 1
+            i0 = np.clip(np.floor(x).astype(int), 0, max(self.ni - 2, 0))
+            i1 = np.minimum(i0 + 1, self.ni - 1)
+            fx = x - i0
+        return j0, j1, i0, i1, y - j0, fx, inside
+
+    def _time_steps(self, times: np.ndarray):
+        position = np.interp(times, self.times, np.arange(len(self.times)))
+        t0 = np.clip(np.floor(position).astype(int), 0, max(len(self.times) - 2, 0))
+        t1 = np.minimum(t0 + 1, len(self.times) - 1)
+        return t0, t1, np.where(t1 > t0, position - t0, 0.0)
+
+    def sample(self, variables: Sequence[str], lats, lons, times) -> Dict[str, np.ndarray]:
+        """
+        Variables at points and times, bilinear in space and linear in time.
+
+        ``times`` (unix seconds, clamped to the forecast range) broadcasts against
+        the points, so (hours, 1) times return (hours, points) arrays. Points
+        outside the grid and variables that are not loaded are NaN.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        times = np.asarray(times, dtype=float)
+        shape = np.broadcast_shapes(times.shape, lats.shape)
+        j0, j1, i0, i1, fy, fx, inside = self._cells(lats, lons)
+        t0, t1, ft = self._time_steps(np.broadcast_to(times, shape))
+
+        results = {}
+        for variable in variables:
+            array = self.arrays.get(variable)
+            if array is None:
+                results[variable] = np.full(shape, np.nan)
+                continue
+            at = [array[t, j0, i0] * (1 - fy) * (1 - fx) + array[t, j0, i1] * (1 - fy) * fx
+                  + array[t, j1, i0] * fy * (1 - fx) + array[t, j1, i1] * fy * fx for t in (t0, t1)]
+            results[variable] = np.where(inside, at[0] * (1 - ft) + at[1] * ft, np.nan)
+        return results
+
+    def winds_aloft(self, lats, lons, altitude_ft, times) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wind (u east, v north, knots, direction of travel) at points, altitudes and times.
+
+        ``altitude_ft`` is a scalar or one altitude per point; missing data is calm.
+        """
+        names = [f'{c}_{level}hPa' for c in 'uv' for level in PRESSURE_LEVELS_HPA]
+        levels = self.sample(names, lats, lons, times)
+        u_levels = np.stack([levels[f'u_{level}hPa'] for level in PRESSURE_LEVELS_HPA], axis=-1)
+        v_levels = np.stack([levels[f'v_{level}hPa'] for level in PRESSURE_LEVELS_HPA], axis=-1)
+        altitude = np.broadcast_to(np.asarray(altitude_ft, dtype=float), u_levels.shape[:-1])
+        lower, upper, weight = level_weights(altitude)
+        u = np.take_along_axis(u_levels, lower[..., None], -1)[..., 0] * (1 - weight) + \
+            np.take_along_axis(u_levels, upper[..., None], -1)[..., 0] * weight
+        v = np.take_along_axis(v_levels, lower[..., None], -1)[..., 0] * (1 - weight) + \
+            np.take_along_axis(v_levels, upper[..., None], -1)[..., 0] * weight
+        return np.nan_to_num(u * MS_TO_KT), np.nan_to_num(v * MS_TO_KT)
+
+    def along_route(self, lats, lons, times, altitude_ft: float, variables: Sequence[str],
+                    spacing_nm: float = 25.0) -> Dict[str, np.ndarray]:
+        """
+        Conditions sampled along a route at the time each sample is flown.
+
+        Args:
+            lats, lons: Route waypoints
+            times: Time over each waypoint (unix seconds); samples between
+                waypoints are timed by linear interpolation along the leg
+            altitude_ft: Cruise altitude for the winds aloft
+            variables: Surface variables to include
+
+        Returns:
+            dict: Per-sample ``lat``, ``lon``, ``leg_index``, ``time``, ``wind_u_kt``,
+            ``wind_v_kt`` and the requested variables
+        """
+        lats, lons, times = (np.asarray(a, dtype=float) for a in (lats, lons, times))
+        sample_lats, sample_lons, leg_index, segment_nm = sample_legs(
+            lats[:-1], lons[:-1], lats[1:], lons[1:], spacing_nm)
+        counts = np.bincount(leg_index, minlength=len(lats) - 1)
+        position = np.arange(len(leg_index)) - np.repeat(np.cumsum(counts) - counts, counts)
+        fraction = (position + 0.5) / counts[leg_index]
+        sample_times = times[leg_index] + (times[leg_index + 1] - times[leg_index]) * fraction
+
+        result = self.sample(variables, sample_lats, sample_lons, sample_times)
+        result['wind_u_kt'], result['wind_v_kt'] = self.winds_aloft(
+            sample_lats, sample_lons, altitude_ft, sample_times)
+        result.update(lat=sample_lats, lon=sample_lons, leg_index=leg_index, time=sample_times)
+        return result
+
+
+def _cache_directory() -> str:
+    return settings.grib_cache_dir or os.path.join(settings.grib_data_dir, '.arrays')
+
+
+def _grib_files(data_dir: str) -> List[str]:
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir)
+                  if name.lower().endswith(GRIB_SUFFIXES))
+
+
+def _fingerprint(paths: Sequence[str]) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _read_manifest(cache_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_grib_forecast(cache_dir: Optional[str] = None) -> Optional[GribForecast]:
+    """Open the arrays of the last ingestion, or None if there are none."""
+    cache_dir = cache_dir or _cache_directory()
+    manifest = _read_manifest(cache_dir)
+    if manifest is None:
+        return None
+    try:
+        return GribForecast(os.path.join(cache_dir, manifest['generation']), manifest)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable GRIB arrays in {cache_dir}: {e}")
+        return None
+
+
+def ingest_grib_directory(data_dir: Optional[str] = None,
+                          cache_dir: Optional[str] = None) -> Optional[GribForecast]:
+    """
+    Decode the GRIB2 files of a directory into memory-mapped arrays.
+
+    Nothing is decoded when the files are unchanged since the last ingestion.
+    Each ingestion writes a new generation directory and then switches the
+    manifest to it, so arrays mapped by readers are never modified.
+
+    Returns:
+        GribForecast: The ingested forecast, or None if no supported fields were found
+    """
+    data_dir = data_dir or settings.grib_data_dir
+    cache_dir = cache_dir or _cache_directory()
+    paths = _grib_files(data_dir)
+    if not paths:
+        return None
+    fingerprint = _fingerprint(paths)
+    manifest = _read_manifest(cache_dir)
+    if manifest is not None and manifest.get('fingerprint') == fingerprint:
+        return load_grib_forecast(cache_dir)
+
+    # Newest model run per variable and valid time, all on the grid of the first field
+    latest: Dict[Tuple[str, float], GribField] = {}
+    grid = None
+    for path in paths:
+        for field in read_grib_fields(path):
+            if grid is None:
+                grid = field.grid
+            if field.grid != grid:
+                logger.warning(f"Skipping {field.variable} in {path}: grid differs from {grid}")
+                continue
+            key = (field.variable, field.valid_time)
+            if key not in latest or field.reference_time > latest[key].reference_time:
+                latest[key] = field
+    if not latest:
+        logger.warning(f"No supported GRIB2 fields in {data_dir}")
+        return None
+
+    ni, nj, lat1, lon1, di, dj, scan = grid
+    lat_first, lat_last = lat1 / 1e6, lat1 / 1e6 + (nj - 1) * dj / 1e6 * (1 if scan & 0x40 else -1)
+    lon_first = lon1 / 1e6 - (ni - 1) * di / 1e6 if scan & 0x80 else lon1 / 1e6
+    times = sorted({valid_time for _, valid_time in latest})
+    time_index = {valid_time: i for i, valid_time in enumerate(times)}
+    variables = sorted({variable for variable, _ in latest})
+
+    generation = fingerprint
+    directory = os.path.join(cache_dir, generation)
+    os.makedirs(directory, exist_ok=True)
+    for variable in variables:
+        array = np.lib.format.open_memmap(os.path.join(directory, f"{variable}.npy"), mode='w+',
+                                          dtype=np.float32, shape=(len(times), nj, ni))
+        array[:] = np.nan
+        scale, offset = UNIT_CONVERSIONS.get(variable, (1.0, 0.0))
+        for (name, valid_time), field in latest.items():
+            if name == variable:
+                array[time_index[valid_time]] = field.decode() * scale + offset
+        array.flush()
+        del array
+
+    manifest = {
+        'fingerprint': fingerprint,
+        'generation': generation,
+        'times': times,
+        'variables': variables,
+        'grid': {
+            'lat0': min(lat_first, lat_last),
+            'lon0': lon_first,
+            'dlat': dj / 1e6,
+            'dlon': di / 1e6,
+            'nj': nj,
+            'ni': ni,
+        },
+        'ingested_at': time.time(),
+    }
+    temp_path = os.path.join(cache_dir, f"{MANIFEST_NAME}.tmp")
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, os.path.join(cache_dir, MANIFEST_NAME))
+
+    for name in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, name)
+        if name != generation and os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+    logger.info(f"Ingested {len(latest)} GRIB fields ({len(variables)} variables, "
+                f"{len(times)} times) from {len(paths)} files")
+    return GribForecast(directory, manifest)
+
+
+_forecast = None
+_forecast_loaded = False
+_forecast_lock = threading.Lock()
+
+
+def refresh_grib_forecast() -> Optional[GribForecast]:
+    """Ingest new or changed GRIB2 files and swap the forecast in (keeping the old on failure)."""
+    global _forecast, _forecast_loaded
+    try:
+        forecast = ingest_grib_directory()
+    except Exception as e:
+        logger.error(f"Error ingesting GRIB forecast: {e}")
+        return None
+    if forecast is not None:
+        with _forecast_lock:
+            _forecast, _forecast_loaded = forecast, True
+    return forecast
+
+
+def get_grib_forecast() -> Optional[GribForecast]:
+    """The current GRIB forecast, opening the last ingestion's arrays on first use."""
+    global _forecast, _forecast_loaded
+    with _forecast_lock:
+        if not _forecast_loaded:
+            _forecast, _forecast_loaded = load_grib_forecast(), True
+        return _forecast
+
+
+async def run_grib_ingestion(interval_s: float) -> None:
+    """Check for new GRIB2 files every ``interval_s`` seconds (run as a background task)."""
+    while True:
+        await asyncio.to_thread(refresh_grib_forecast)
+        await asyncio.sleep(interval_s)
+
+
+def _direction_from(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Meteorological direction (blowing from, degrees) of toward components."""
+    return np.mod(np.degrees(np.arctan2(-u, -v)), 360.0)
+
+
+def _series(values: np.ndarray, digits: int = 1) -> list:
+    return [None if math.isnan(value) else round(float(value), digits) for value in values]
+
+
+def _reduce(func, values: np.ndarray, digits: int = 1) -> Optional[float]:
+    """Reduce the known values of a series, or None when all are missing."""
+    known = values[~np.isnan(values)]
+    return round(float(func(known)), digits) if known.size else None
+
+
+def fetch_grib_hourly(points: Sequence[Tuple[float, float]],
+                      forecast_days: int = 3) -> Optional[List[Dict[str, Any]]]:
+    """
+    Hourly forecasts at points in the format of ``fetch_open_meteo_hourly``.
+
+    Returns:
+        list: One ``hourly`` dict per point (knots, metres, percent), or None when
+        no GRIB forecast is loaded
+    """
+    forecast = get_grib_forecast()
+    if forecast is None:
+        return None
+    lats = np.array([lat for lat, _ in points], dtype=float)
+    lons = np.array([lon for _, lon in points], dtype=float)
+    first = math.ceil(forecast.start / 3600.0) * 3600.0
+    hours = np.arange(first, min(forecast.end, first + forecast_days * 86400.0) + 1.0, 3600.0)
+    surface = ['temperature_2m', 'dewpoint_2m', 'cloudcover', 'cloudcover_low', 'visibility',
+               'precipitation', 'u_10m', 'v_10m', 'windgusts_10m']
+    levels = [f'{c}_{level}hPa' for c in 'uv' for level in PRESSURE_LEVELS_HPA]
+    values = forecast.sample(surface + levels, lats, lons, hours[:, None])
+
+    columns = {
+        'temperature_2m': values['temperature_2m'],
+        'dewpoint_2m': values['dewpoint_2m'],
+        'cloudcover': values['cloudcover'],
+        'cloudcover_low': values['cloudcover_low'],
+        'visibility': values['visibility'],
+        'precipitation': values['precipitation'],
+        'windspeed_10m': np.hypot(values['u_10m'], values['v_10m']) * MS_TO_KT,
+        'winddirection_10m': _direction_from(values['u_10m'], values['v_10m']),
+        'windgusts_10m': values['windgusts_10m'] * MS_TO_KT,
+    }
+    for level in PRESSURE_LEVELS_HPA:
+        u, v = values[f'u_{level}hPa'], values[f'v_{level}hPa']
+        columns[f'windspeed_{level}hPa'] = np.hypot(u, v) * MS_TO_KT
+        columns[f'winddirection_{level}hPa'] = _direction_from(u, v)
+
+    times = hours.astype(int).tolist()
+    return [{'time': times, **{name: _series(column[:, p]) for name, column in columns.items()}}
+            for p in range(len(points))]
+
+
+def grib_weather_data(lat: float, lon: float, days: int = 7) -> Optional[Dict[str, Any]]:
+    """
+    Point forecast in the format returned by ``get_weather_data_async``.
+
+    Current conditions are interpolated to now; hourly series use the units of
+    the Open-Meteo request (degC, mph, inches, metres) and daily summaries are
+    per UTC day.
+
+    Returns:
+        dict: Forecast without overlays, or None if no forecast covers the point
+        and the coming hours
+    """
+    forecast = get_grib_forecast()
+    if forecast is None:
+        return None
+    now = time.time()
+    first = max(math.floor(now / 3600.0) * 3600.0, math.ceil(forecast.start / 3600.0) * 3600.0)
+    hours = np.arange(first, min(forecast.end, now + days * 86400.0) + 1.0, 3600.0)
+    if not hours.size:
+        return None
+    variables = ['temperature_2m', 'dewpoint_2m', 'cloudcover', 'cloudcover_low', 'cloudcover_mid',
+                 'cloudcover_high', 'visibility', 'precipitation', 'u_10m', 'v_10m',
+                 'windgusts_10m']
+    values = forecast.sample(variables, [lat], [lon], np.concatenate([[now], hours])[:, None])
+    values = {name: column[:, 0] for name, column in values.items()}
+    if np.isnan(values['temperature_2m']).all() and np.isnan(values['u_10m']).all():
+        return None
+
+    windspeed = np.hypot(values['u_10m'], values['v_10m']) * MS_TO_MPH
+    columns = {
+        'temperature_2m': values['temperature_2m'],
+        'dewpoint_2m': values['dewpoint_2m'],
+        'cloudcover': values['cloudcover'],
+        'cloudcover_low': values['cloudcover_low'],
+        'cloudcover_mid': values['cloudcover_mid'],
+        'cloudcover_high': values['cloudcover_high'],
+        'visibility': values['visibility'],
+        'precipitation': values['precipitation'] / MM_PER_INCH,
+        'windspeed_10m': windspeed,
+        'winddirection_10m': _direction_from(values['u_10m'], values['v_10m']),
+        'windgusts_10m': values['windgusts_10m'] * MS_TO_MPH,
+    }
+    hourly = {'time': hours.astype(int).tolist()}
+    for name, column in columns.items():
+        if name in forecast or name in ('windspeed_10m', 'winddirection_10m'):
+            hourly[name] = _series(column[1:])
+
+    current = {
+        'temperature': columns['temperature_2m'][0],
+        'windspeed': windspeed[0],
+        'winddirection': columns['winddirection_10m'][0],
+        'time': int(now),
+    }
+    current = {key: round(float(value), 1) for key, value in current.items() if not np.isnan(value)}
+
+    daily = []
+    dates = np.array([datetime.fromtimestamp(t, tz=timezone.utc).date().isoformat() for t in hours])
+    for date in dict.fromkeys(dates.tolist()):
+        rows = np.flatnonzero(dates == date) + 1
+        strongest = rows[np.argmax(np.nan_to_num(windspeed[rows], nan=-1.0))]
+        daily.append({
+            'date': date,
+            'temp_max': _reduce(np.max, columns['temperature_2m'][rows]),
+            'temp_min': _reduce(np.min, columns['temperature_2m'][rows]),
+            'windspeed_max': _reduce(np.max, windspeed[rows]),
+            'windgusts_max': _reduce(np.max, columns['windgusts_10m'][rows]),
+            'winddirection': _reduce(np.max, columns['winddirection_10m'][[strongest]], 0),
+            'precipitation_sum': _reduce(np.sum, columns['precipitation'][rows], 2),
+        })
+
+    return {
+        'location': {'latitude': lat, 'longitude': lon},
+        'current': current,
+        'hourly': hourly,
+        'daily': {},
+        'forecast': daily,
+        'source': 'grib',
+    }
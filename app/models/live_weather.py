@@ -0,0 +1,195 @@
+"""
+Live Weather Push.
+
+Fans METAR changes out to WebSocket clients watching sets of stations. Each
+new METAR snapshot is diffed against the previous one for the changed stations
+that have watchers only; every station's delta (the fields that changed) is
+serialized once and spliced into one message per subscriber, so an update
+costs one pass over the watched changes instead of N clients polling M
+airports.
+
+Subscribers own an asyncio queue on their connection's event loop; snapshot
+ingestion runs in a worker thread and hands messages over thread-safely. A
+subscriber that falls behind drops messages rather than growing its queue.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.config import settings
+from app.models.metar_snapshot import MetarTable, add_snapshot_listener, get_metar_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Fields of a station's METAR pushed to clients (names as in ``get_metar_data`` results)
+PUSHED_FIELDS = (
+    'raw_text',
+    'observation_time',
+    'flight_category',
+    'visibility_statute_mi',
+    'ceiling_ft',
+    'wind_dir_degrees',
+    'wind_speed_kt',
+    'wind_gust_kt',
+    'temperature_c',
+    'dewpoint_c',
+    'altim_in_hg',
+    'wx_string',
+)
+
+
+def station_weather(table: MetarTable, station: str) -> Optional[Dict[str, Any]]:
+    """Pushed fields of a station's METAR in a snapshot, or None when it has none."""
+    row = table.index.get(station)
+    if row is None:
+        return None
+    record = table.record(row)
+    return {field: record[field] for field in PUSHED_FIELDS}
+
+
+def weather_delta(before: Optional[Dict[str, Any]], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of ``after`` that differ from ``before`` (all of them when there is no ``before``)."""
+    if before is None:
+        return dict(after)
+    return {field: value for field, value in after.items() if before.get(field) != value}
+
+
+class WeatherSubscriber:
+    """One client connection: its watched stations and outgoing message queue."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.stations: Set[str] = set()
+        self.dropped = 0
+
+    def offer(self, message: str) -> None:
+        """Queue a message from any thread."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class WeatherHub:
+    """Subscribers indexed by watched station."""
+
+    def __init__(self, max_stations: int = 200, queue_size: int = 32):
+        self.max_stations = max_stations
+        self.queue_size = queue_size
+        self.updates = 0
+        self._watchers: Dict[str, Set[WeatherSubscriber]] = {}
+        self._lock = threading.Lock()
+
+    def connect(self) -> WeatherSubscriber:
+        """Create a subscriber bound to the running event loop."""
+        return WeatherSubscriber(asyncio.get_running_loop(), self.queue_size)
+
+    def disconnect(self, subscriber: WeatherSubscriber) -> None:
+        self.unsubscribe(subscriber, list(subscriber.stations))
+
+    def watched(self) -> List[str]:
+        with self._lock:
+            return sorted(self._watchers)
+
+    def subscribe(self, subscriber: WeatherSubscriber, stations: Iterable[str]) -> Dict[str, Any]:
+        """
+        Watch stations and return a message with their current weather.
+
+        Raises:
+            ValueError: If the subscriber would watch more than ``max_stations`` stations
+        """
+        codes = {code.strip().upper() for code in stations if code and code.strip()}
+        with self._lock:
+            if len(subscriber.stations | codes) > self.max_stations:
+                raise ValueError(f"At most {self.max_stations} stations can be watched "
+                                 "per connection")
+            subscriber.stations |= codes
+            for code in codes:
+                self._watchers.setdefault(code, set()).add(subscriber)
+
+        table = get_metar_snapshot()
+        current = {}
+        if table is not None:
+            for code in sorted(codes):
+                weather = station_weather(table, code)
+                if weather is not None:
+                    current[code] = weather
+        return {'type': 'snapshot', 'snapshot_time': _snapshot_time(table), 'stations': current}
+
+    def unsubscribe(self, subscriber: WeatherSubscriber, stations: Iterable[str]) -> None:
+        codes = {code.strip().upper() for code in stations if code}
+        with self._lock:
+            for code in codes & subscriber.stations:
+                watchers = self._watchers.get(code)
+                if watchers is not None:
+                    watchers.discard(subscriber)
+                    if not watchers:
+                        del self._watchers[code]
+            subscriber.stations -= codes
+
+    def publish(self, table: MetarTable, previous: Optional[MetarTable]) -> int:
+        """
+        Push deltas of watched stations that changed between two snapshots.
+
+        Returns:
+            int: Number of messages queued
+        """
+        with self._lock:
+            watched = {station: set(watchers) for station, watchers in self._watchers.items()}
+        if not watched:
+            return 0
+
+        # Serialize each station's delta once; subscribers get their stations spliced together
+        encoded: Dict[str, str] = {}
+        for row in table.changed_rows(previous).tolist():
+            station = table.stations[row]
+            if station not in watched:
+                continue
+            before = station_weather(previous, station) if previous is not None else None
+            delta = weather_delta(before, station_weather(table, station))
+            if delta:
+                encoded[station] = json.dumps(delta)
+        if not encoded:
+            return 0
+
+        batches: Dict[WeatherSubscriber, List[str]] = {}
+        for station in sorted(encoded):
+            for subscriber in watched[station]:
+                part = f"{json.dumps(station)}:{encoded[station]}"
+                batches.setdefault(subscriber, []).append(part)
+        snapshot_time = json.dumps(_snapshot_time(table))
+        header = f'{{"type":"delta","snapshot_time":{snapshot_time},"stations":{{'
+        for subscriber, parts in batches.items():
+            subscriber.offer(header + ','.join(parts) + '}}')
+        self.updates += 1
+        return len(batches)
+
+
+def _snapshot_time(table: Optional[MetarTable]) -> Optional[str]:
+    if table is None:
+        return None
+    return datetime.fromtimestamp(table.fetched_at, tz=timezone.utc).isoformat()
+
+
+_hub = WeatherHub(settings.live_weather_max_stations, settings.live_weather_queue_size)
+
+
+def get_weather_hub() -> WeatherHub:
+    """Return the process-wide live weather hub."""
+    return _hub
+
+
+def publish_metar_snapshot(table: MetarTable, previous: Optional[MetarTable]) -> None:
+    """Snapshot listener: push changes of watched stations to their subscribers."""
+    _hub.publish(table, previous)
+
+
+add_snapshot_listener(publish_metar_snapshot)
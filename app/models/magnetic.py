@@ -0,0 +1,211 @@
+"""
+Magnetic Variation Model.
+
+Evaluates the World Magnetic Model (WMM) spherical harmonic expansion once per
+model epoch and year onto a lat/lon grid of declination, caches the grid on
+disk, and answers vectorized bilinear lookups for any number of points.
+
+The model coefficients are read from the standard ``WMM.COF`` file. When the
+file is missing, lookups return None and headings are left magnetic-less.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# WGS-84 ellipsoid and WMM reference radius (km)
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WMM_REFERENCE_RADIUS = 6371.2
+
+_model = None
+_model_key = None
+_model_lock = threading.Lock()
+
+
+def load_cof(path: str) -> Tuple[float, Dict[Tuple[int, int], Tuple[float, float, float, float]]]:
+    """
+    Read a WMM coefficient file.
+
+    Returns:
+        (epoch, coefficients) where coefficients maps (n, m) to (g, h, g_dot, h_dot)
+    """
+    coefficients = {}
+    epoch = None
+    with open(path, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0].startswith('9999'):
+                break
+            if epoch is None:
+                epoch = float(fields[0])
+                continue
+            n, m = int(fields[0]), int(fields[1])
+            coefficients[(n, m)] = tuple(float(v) for v in fields[2:6])
+    if epoch is None or not coefficients:
+        raise ValueError(f"No WMM coefficients found in {path}")
+    return epoch, coefficients
+
+
+def decimal_year(when: Optional[float] = None) -> float:
+    """Decimal year for a unix timestamp (default now)."""
+    moment = datetime.fromtimestamp(time.time() if when is None else when, tz=timezone.utc)
+    start = datetime(moment.year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(moment.year + 1, 1, 1, tzinfo=timezone.utc)
+    return moment.year + (moment - start).total_seconds() / (end - start).total_seconds()
+
+
+def declination(lats, lons, epoch: float, coefficients, year: float,
+                altitude_km: float = 0.0) -> np.ndarray:
+    """
+    Evaluate magnetic declination (degrees, east positive) at geodetic points.
+
+    Fully vectorized over points: associated Legendre functions (Schmidt
+    semi-normalized) and their derivatives are built by recursion for all points
+    at once.
+    """
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    dt = year - epoch
+    degree = max(n for n, _ in coefficients)
+
+    # Geodetic to geocentric spherical coordinates
+    e2 = WGS84_F * (2 - WGS84_F)
+    sin_lat = np.sin(lats)
+    rc = WGS84_A / np.sqrt(1 - e2 * sin_lat ** 2)
+    p = (rc + altitude_km) * np.cos(lats)
+    z = (rc * (1 - e2) + altitude_km) * sin_lat
+    r = np.hypot(p, z)
+    lat_gc = np.arcsin(z / r)
+    cos_theta = np.sin(lat_gc)
+    sin_theta = np.cos(lat_gc)
+
+    P = {(0, 0): np.ones_like(r)}
+    dP = {(0, 0): np.zeros_like(r)}
+    for m in range(1, degree + 1):
+        scale = 1.0 if m == 1 else np.sqrt((2 * m - 1) / (2 * m))
+        P[(m, m)] = scale * sin_theta * P[(m - 1, m - 1)]
+        dP[(m, m)] = scale * (cos_theta * P[(m - 1, m - 1)] + sin_theta * dP[(m - 1, m - 1)])
+    for m in range(degree + 1):
+        for n in range(m + 1, degree + 1):
+            k = np.sqrt((n - 1) ** 2 - m ** 2) if n - 1 > m else 0.0
+            previous2 = P.get((n - 2, m), 0.0)
+            dprevious2 = dP.get((n - 2, m), 0.0)
+            norm = np.sqrt(n ** 2 - m ** 2)
+            P[(n, m)] = ((2 * n - 1) * cos_theta * P[(n - 1, m)] - k * previous2) / norm
+            dP[(n, m)] = ((2 * n - 1) * (cos_theta * dP[(n - 1, m)] - sin_theta * P[(n - 1, m)])
+                          - k * dprevious2) / norm
+
+    x = np.zeros_like(r)
+    y = np.zeros_like(r)
+    z_field = np.zeros_like(r)
+    safe_sin = np.where(np.abs(sin_theta) < 1e-10, 1e-10, sin_theta)
+    for (n, m), (g, h, g_dot, h_dot) in coefficients.items():
+        if n == 0:
+            continue
+        g_t = g + dt * g_dot
+        h_t = h + dt * h_dot
+        ratio = (WMM_REFERENCE_RADIUS / r) ** (n + 2)
+        cos_m, sin_m = np.cos(m * lons), np.sin(m * lons)
+        x += ratio * (g_t * cos_m + h_t * sin_m) * dP[(n, m)]
+        y += ratio * m * (g_t * sin_m - h_t * cos_m) * P[(n, m)] / safe_sin
+        z_field -= ratio * (n + 1) * (g_t * cos_m + h_t * sin_m) * P[(n, m)]
+
+    # Rotate the north component from geocentric to geodetic
+    psi = lat_gc - lats
+    x_geodetic = x * np.cos(psi) - z_field * np.sin(psi)
+    return np.degrees(np.arctan2(y, x_geodetic))
+
+
+class MagneticModel:
+    """Declination grid for one model epoch and year, with vectorized bilinear lookup."""
+
+    def __init__(self, grid: np.ndarray, grid_deg: float, epoch: float, year: int):
+        self.grid = grid
+        self.grid_deg = grid_deg
+        self.epoch = epoch
+        self.year = year
+
+    @classmethod
+    def build(cls, cof_path: str, grid_deg: float = 1.0, year: Optional[int] = None,
+              cache_dir: Optional[str] = None) -> "MagneticModel":
+        """Load the grid from the disk cache, or evaluate the model and cache it."""
+        epoch, coefficients = load_cof(cof_path)
+        year = int(decimal_year()) if year is None else year
+        cache_dir = cache_dir or os.path.dirname(os.path.abspath(cof_path))
+        cache_path = os.path.join(cache_dir, f"declination_{epoch:.1f}_{year}_{grid_deg:g}.npy")
+
+        if (os.path.exists(cache_path)
+                and os.path.getmtime(cache_path) >= os.path.getmtime(cof_path)):
+            try:
+                return cls(np.load(cache_path), grid_deg, epoch, year)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable declination grid {cache_path}: {e}")
+
+        lats = np.arange(-90.0, 90.0 + grid_deg / 2, grid_deg)
+        lons = np.arange(-180.0, 180.0 + grid_deg / 2, grid_deg)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        # Evaluate mid-year so the grid is within half a year of secular change
+        grid = declination(lat_grid, lon_grid, epoch, coefficients, year + 0.5)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(cache_path, grid)
+        except OSError as e:
+            logger.warning(f"Could not cache declination grid {cache_path}: {e}")
+        logger.info(f"Built {grid.shape[0]}x{grid.shape[1]} declination grid "
+                    f"for WMM {epoch} ({year})")
+        return cls(grid, grid_deg, epoch, year)
+
+    def variation(self, lats, lons) -> np.ndarray:
+        """Magnetic variation (degrees, east positive) at points by bilinear interpolation."""
+        y = (np.clip(np.asarray(lats, dtype=float), -90.0, 90.0) + 90.0) / self.grid_deg
+        x = (((np.asarray(lons, dtype=float) + 180.0) % 360.0)) / self.grid_deg
+        i0 = np.clip(np.floor(y).astype(int), 0, self.grid.shape[0] - 2)
+        j0 = np.clip(np.floor(x).astype(int), 0, self.grid.shape[1] - 2)
+        fy, fx = y - i0, x - j0
+
+        # Interpolate unit vectors so values near +/-180 degrees blend correctly
+        angles = np.radians(self.grid)
+        result = np.zeros((2,) + np.shape(y))
+        for di, dj, weight in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                               (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+            corner = angles[i0 + di, j0 + dj]
+            result[0] += np.sin(corner) * weight
+            result[1] += np.cos(corner) * weight
+        return np.degrees(np.arctan2(result[0], result[1]))
+
+
+def get_magnetic_model() -> Optional[MagneticModel]:
+    """Return the declination grid for the current year, or None without a WMM file."""
+    global _model, _model_key
+    path = settings.wmm_cof_file
+    if not path or not os.path.exists(path):
+        return None
+    key = (path, os.path.getmtime(path), int(decimal_year()))
+    with _model_lock:
+        if _model is None or _model_key != key:
+            try:
+                _model = MagneticModel.build(path, settings.magnetic_grid_deg,
+                                             cache_dir=settings.magnetic_cache_dir)
+                _model_key = key
+            except Exception as e:
+                logger.error(f"Error building magnetic model from {path}: {e}")
+                return None
+        return _model
+
+
+def magnetic_variation(lats, lons) -> Optional[np.ndarray]:
+    """Magnetic variation (degrees, east positive) at points, or None if unavailable."""
+    model = get_magnetic_model()
+    return None if model is None else model.variation(lats, lons)
@@ -0,0 +1,284 @@
+"""
+METAR History.
+
+Keeps the recent observations of every station in fixed-size, array-backed
+ring buffers, so trends can be reported without asking upstream for past
+METARs. Observations are recorded from every METAR response (through the
+METAR listener hook) and from every bulk snapshot; an observation is only
+appended when it is newer than the station's latest, so the same report seen
+through both feeds is stored once. Observations older than the retention
+window (``metar_history_hours``) are discarded, whichever limit is hit first.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.models.airport import add_metar_listener
+from app.models.flight_category import CATEGORIES, UNKNOWN, metar_ceiling_ft
+from app.models.metar_snapshot import add_snapshot_listener
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns of each observation, and the keys of decoded METAR dicts they come from
+COLUMNS = {
+    'visibility_sm': 'visibility_statute_mi',
+    'ceiling_ft': 'ceiling_ft',
+    'wind_dir': 'wind_dir_degrees',
+    'wind_speed_kt': 'wind_speed_kt',
+    'wind_gust_kt': 'wind_gust_kt',
+    'temperature_c': 'temperature_c',
+    'dewpoint_c': 'dewpoint_c',
+    'altimeter_in_hg': 'altim_in_hg',
+}
+
+# Trend thresholds: a change of one step counts as improving or deteriorating.
+# Visibility above the cap and the absence of a ceiling are treated as the cap.
+VISIBILITY_CAP_SM = 10.0
+CEILING_CAP_FT = 12000.0
+VISIBILITY_STEP_SM = 1.0
+CEILING_STEP_FT = 500.0
+
+
+class StationHistory:
+    """Ring buffer of one station's observations, oldest overwritten or expired first."""
+
+    def __init__(self, capacity: int, max_age_s: float = math.inf):
+        self.capacity = capacity
+        self.max_age_s = max_age_s
+        self.observed = np.full(capacity, np.nan)
+        self.values = np.full((len(COLUMNS), capacity), np.nan, dtype=np.float32)
+        self.category = np.full(capacity, UNKNOWN, dtype=np.int8)
+        self.raw_text = np.empty(capacity, dtype=object)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def latest(self) -> float:
+        """Time of the newest observation (NaN when empty)."""
+        return self.observed[(self.head - 1) % self.capacity] if self.count else math.nan
+
+    def expire(self, before: float) -> None:
+        """Discard observations older than ``before``."""
+        while self.count and self.observed[(self.head - self.count) % self.capacity] < before:
+            self.count -= 1
+
+    def append(self, observed: float, values: Iterable[float], category: int,
+               raw_text: str) -> bool:
+        """Add an observation; returns False if it is not newer than the latest one."""
+        if self.count and not observed > self.latest:
+            return False
+        self.expire(observed - self.max_age_s)
+        slot = self.head
+        self.observed[slot] = observed
+        self.values[:, slot] = list(values)
+        self.category[slot] = category
+        self.raw_text[slot] = raw_text
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def window(self, since: float, now: float) -> Dict[str, Any]:
+        """Observations at or after ``since`` still retained at ``now``, oldest first."""
+        self.expire(now - self.max_age_s)
+        slots = (self.head - self.count + np.arange(self.count)) % self.capacity
+        slots = slots[self.observed[slots] >= since]
+        columns = {name: self.values[i, slots].astype(float) for i, name in enumerate(COLUMNS)}
+        return {'observed': self.observed[slots], 'category': self.category[slots],
+                'raw_text': self.raw_text[slots].tolist(), **columns}
+
+
+class MetarHistory:
+    """Ring buffers of all stations seen, created on a station's first observation."""
+
+    def __init__(self, capacity: int, max_hours: float = math.inf):
+        self.capacity = capacity
+        self.max_hours = max_hours
+        self._stations: Dict[str, StationHistory] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._stations
+
+    def _append(self, station: str, observed: float, values, category: int, raw_text: str) -> bool:
+        history = self._stations.get(station)
+        if history is None:
+            history = StationHistory(self.capacity, self.max_hours * 3600.0)
+            self._stations[station] = history
+        return history.append(observed, values, category, raw_text)
+
+    def record_metars(self, metars: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Record decoded METARs (the ``get_metar_data`` format).
+
+        Returns:
+            int: Number of new observations
+        """
+        added = 0
+        with self._lock:
+            for station, metar in metars.items():
+                observed = _observation_time(metar.get('observation_time'))
+                if observed is None or not metar.get('raw_text'):
+                    continue
+                values = [_value(metar.get(key)) for key in COLUMNS.values()]
+                values[list(COLUMNS).index('ceiling_ft')] = _value(metar_ceiling_ft(metar))
+                category = metar.get('flight_category')
+                code = CATEGORIES.index(category) if category in CATEGORIES else UNKNOWN
+                added += self._append(station.upper(), observed, values, code, metar['raw_text'])
+        return added
+
+    def record_table(self, table, rows: Optional[np.ndarray] = None) -> int:
+        """
+        Record the stations of a METAR snapshot table.
+
+        Args:
+            table: Snapshot table
+            rows: Only record these rows (defaults to all)
+
+        Returns:
+            int: Number of new observations
+        """
+        rows = np.arange(len(table)) if rows is None else rows
+        values = np.stack([getattr(table, column)[rows] for column in COLUMNS]).T.tolist()
+        observed = table.observed[rows].tolist()
+        categories = table.category[rows].tolist()
+        added = 0
+        with self._lock:
+            for i, row in enumerate(rows.tolist()):
+                if not math.isnan(observed[i]):
+                    added += self._append(table.stations[row], observed[i], values[i],
+                                          categories[i], table.raw_text[row])
+        return added
+
+    def history(self, code: str, hours: float,
+                now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Observations of a station in the last ``hours`` hours (None if it was never seen)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            history = self._stations.get(code.strip().upper())
+            return None if history is None else history.window(now - hours * 3600.0, now)
+
+
+def observation_records(history: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Observations of a ``MetarHistory.history`` window as dicts, oldest first."""
+    records = []
+    for row, observed in enumerate(history['observed'].tolist()):
+        records.append({
+            'observation_time': datetime.fromtimestamp(observed, tz=timezone.utc),
+            'flight_category': CATEGORIES[history['category'][row]],
+            'visibility_sm': _optional(history['visibility_sm'][row]),
+            'ceiling_ft': _optional(history['ceiling_ft'][row], int),
+            'wind_dir_deg': _optional(history['wind_dir'][row], int),
+            'wind_speed_kt': _optional(history['wind_speed_kt'][row], int),
+            'wind_gust_kt': _optional(history['wind_gust_kt'][row], int),
+            'temperature_c': _optional(history['temperature_c'][row]),
+            'dewpoint_c': _optional(history['dewpoint_c'][row]),
+            'altimeter_in_hg': _optional(history['altimeter_in_hg'][row]),
+            'raw_text': history['raw_text'][row],
+        })
+    return records
+
+
+def _optional(value: float, cast=float):
+    # Columns are stored as float32: round away the representation error
+    return None if math.isnan(value) else cast(round(float(value), 2))
+
+
+def _value(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _observation_time(text: Optional[str]) -> Optional[float]:
+    if not text:
+        return None
+    for pattern in ("%Y-%m-%d %H:%M UTC", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            return datetime.strptime(text, pattern).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def _change(hours: np.ndarray, values: np.ndarray) -> float:
+    """Change over the window from a least-squares line through the known values."""
+    known = ~np.isnan(values)
+    if known.sum() < 2 or np.ptp(hours[known]) == 0:
+        return 0.0
+    slope = np.polyfit(hours[known], values[known], 1)[0]
+    return float(slope * np.ptp(hours[known]))
+
+
+def metar_trend(history: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Whether conditions in a station's history are improving or deteriorating.
+
+    A change of flight category between the oldest and newest observation
+    decides the trend; within one category, the fitted change in visibility
+    and ceiling does (one ``VISIBILITY_STEP_SM`` or ``CEILING_STEP_FT`` counts).
+
+    Returns:
+        dict: ``trend`` (improving, deteriorating, steady, or unknown with fewer
+        than two observations), the first and last known categories and the
+        fitted visibility and ceiling changes
+    """
+    categories = history['category'][history['category'] != UNKNOWN]
+    first = CATEGORIES[int(categories[0])] if categories.size else None
+    last = CATEGORIES[int(categories[-1])] if categories.size else None
+    if len(history['observed']) < 2:
+        return {'trend': 'unknown', 'from_category': first, 'to_category': last,
+                'visibility_change_sm': None, 'ceiling_change_ft': None}
+
+    hours = (history['observed'] - history['observed'][-1]) / 3600.0
+    visibility = np.minimum(history['visibility_sm'], VISIBILITY_CAP_SM)
+    ceiling = np.where(np.isnan(history['ceiling_ft']), CEILING_CAP_FT,
+                       np.minimum(history['ceiling_ft'], CEILING_CAP_FT))
+    visibility_change = _change(hours, visibility)
+    ceiling_change = _change(hours, ceiling)
+
+    if categories.size and categories[-1] != categories[0]:
+        trend = 'improving' if categories[-1] < categories[0] else 'deteriorating'
+    else:
+        score = visibility_change / VISIBILITY_STEP_SM + ceiling_change / CEILING_STEP_FT
+        trend = 'improving' if score >= 1.0 else 'deteriorating' if score <= -1.0 else 'steady'
+    return {
+        'trend': trend,
+        'from_category': first,
+        'to_category': last,
+        'visibility_change_sm': round(visibility_change, 1),
+        'ceiling_change_ft': int(round(ceiling_change, -1)),
+    }
+
+
+_history = MetarHistory(settings.metar_history_capacity, settings.metar_history_hours)
+
+
+def get_metar_history() -> MetarHistory:
+    """Return the process-wide METAR history."""
+    return _history
+
+
+def record_metar_response(requested_codes: Iterable[str], metars: Dict[str, Any]) -> None:
+    """METAR listener: keep every observation returned by a METAR request."""
+    _history.record_metars(metars)
+
+
+def record_metar_snapshot(table, previous) -> None:
+    """Snapshot listener: keep the new observations of every ingested snapshot."""
+    added = _history.record_table(table, table.changed_rows(previous))
+    logger.debug(f"Recorded {added} new METAR observations from snapshot")
+
+
+add_metar_listener(record_metar_response)
+add_snapshot_listener(record_metar_snapshot)
@@ -0,0 +1,104 @@
+"""
+METAR Category Map.
+
+Bounding-box queries over the in-memory METAR snapshot for flight-category
+maps. Station positions come from the bulk feed, with gaps filled from the
+airport index once per snapshot, so a viewport query is a vectorized mask
+over the station table. Results are returned column-wise (one list per field)
+to keep payloads for thousands of stations compact.
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.models.airport_index import get_airport_index
+from app.models.flight_category import CATEGORIES
+from app.models.metar_snapshot import MetarTable, get_metar_snapshot
+
+logger = logging.getLogger(__name__)
+
+_positions = None
+_positions_lock = threading.Lock()
+
+
+def station_positions(table: MetarTable, airport_index=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Latitude and longitude of every station in a snapshot.
+
+    Stations the feed reports without a position are placed at the matching
+    airport. The join is computed once per (snapshot, airport index) pair.
+    """
+    global _positions
+    airport_index = get_airport_index() if airport_index is None else airport_index
+    with _positions_lock:
+        if _positions is not None and _positions[0] is table and _positions[1] is airport_index:
+            return _positions[2], _positions[3]
+
+    lats, lons = table.latitude.copy(), table.longitude.copy()
+    for row in np.flatnonzero(np.isnan(lats) | np.isnan(lons)).tolist():
+        airport = airport_index.get(table.stations[row])
+        if airport is not None and airport['icao'] == table.stations[row]:
+            lats[row], lons[row] = airport['latitude'], airport['longitude']
+    with _positions_lock:
+        _positions = (table, airport_index, lats, lons)
+    return lats, lons
+
+
+def _column(values: np.ndarray, digits: Optional[int] = None) -> list:
+    """JSON-ready column: rounded floats (or ints when ``digits`` is None) with None for NaN."""
+    missing = np.isnan(values)
+    if digits is None:
+        data = np.nan_to_num(values).astype(np.int64).astype(object)
+    else:
+        data = np.round(values, digits).astype(object)
+    data[missing] = None
+    return data.tolist()
+
+
+def query_metar_bbox(west: float, south: float, east: float, north: float,
+                     categories: Optional[Iterable[str]] = None, table: Optional[MetarTable] = None,
+                     airport_index=None) -> Optional[Dict[str, Any]]:
+    """
+    Stations with a METAR inside a bounding box, as parallel arrays.
+
+    Args:
+        west, south, east, north: Bounds in degrees (west may exceed east across the antimeridian)
+        categories: Only include these flight categories
+        table: Snapshot to query (defaults to the current snapshot)
+
+    Returns:
+        dict: Column arrays for the matching stations, or None when no snapshot is loaded
+    """
+    table = get_metar_snapshot() if table is None else table
+    if table is None:
+        return None
+    lats, lons = station_positions(table, airport_index)
+
+    with np.errstate(invalid='ignore'):
+        if west <= east:
+            in_lon = (lons >= west) & (lons <= east)
+        else:
+            in_lon = (lons >= west) | (lons <= east)
+        mask = (lats >= south) & (lats <= north) & in_lon
+    if categories is not None:
+        mask &= np.isin(table.category, [CATEGORIES.index(category) for category in categories])
+    rows = np.flatnonzero(mask)
+
+    return {
+        'categories': list(CATEGORIES),
+        'snapshot_time': datetime.fromtimestamp(table.fetched_at, tz=timezone.utc).isoformat(),
+        'count': int(rows.size),
+        'station': table.stations[rows].tolist(),
+        'lat': _column(lats[rows], 4),
+        'lon': _column(lons[rows], 4),
+        'category': table.category[rows].tolist(),
+        'visibility_sm': _column(table.visibility_sm[rows], 1),
+        'ceiling_ft': _column(table.ceiling_ft[rows]),
+        'wind_dir_deg': _column(table.wind_dir[rows]),
+        'wind_speed_kt': _column(table.wind_speed_kt[rows]),
+        'observed': _column(table.observed[rows]),
+    }
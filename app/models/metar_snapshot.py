@@ -0,0 +1,315 @@
+"""
+Bulk METAR Snapshot.
+
+Holds the latest METAR of every reporting station in memory, ingested from the
+aviationweather.gov bulk cache file (``metars.cache.csv.gz``) instead of
+per-request ADDS queries. The feed is parsed as a stream into a columnar
+station table (numpy arrays indexed by station row) and swapped in atomically,
+so readers always see one complete snapshot. A background task started with
+the application refreshes it every ``metar_snapshot_interval_s`` seconds.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import logging
+import math
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import requests
+
+from app.config import settings
+from app.models.flight_category import CATEGORIES, classify, layer_matrix, lowest_ceiling
+
+logger = logging.getLogger(__name__)
+
+
+NUMERIC_COLUMNS = {
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'temp_c': 'temperature_c',
+    'dewpoint_c': 'dewpoint_c',
+    'wind_dir_degrees': 'wind_dir',
+    'wind_speed_kt': 'wind_speed_kt',
+    'wind_gust_kt': 'wind_gust_kt',
+    'visibility_statute_mi': 'visibility_sm',
+    'altim_in_hg': 'altimeter_in_hg',
+}
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+# Callbacks notified with (new snapshot, previous snapshot) after every swap
+_snapshot_listeners = []
+
+
+def add_snapshot_listener(listener) -> None:
+    """Register a callback for newly ingested snapshots."""
+    if listener not in _snapshot_listeners:
+        _snapshot_listeners.append(listener)
+
+
+class MetarTable:
+    """
+    Columnar table of the latest METAR per station.
+
+    Numeric columns are float arrays with NaN for missing values. Ceilings and
+    ``category`` (indices into ``CATEGORIES``) are computed for all stations in
+    one pass of the flight category engine. Raw text, weather strings and cloud
+    layers stay as per-row Python lists.
+    """
+
+    def __init__(self, columns: Dict[str, Any], fetched_at: Optional[float] = None):
+        self.stations = np.asarray(columns['station'], dtype=object)
+        self.index = {station: row for row, station in enumerate(columns['station'])}
+        self.observed = np.asarray(columns['observed'], dtype=float)
+        for column in NUMERIC_COLUMNS.values():
+            setattr(self, column, np.asarray(columns[column], dtype=float))
+        self.ceiling_ft = lowest_ceiling(*layer_matrix(columns['cloud_layers']),
+                                         columns['vertical_visibility_ft'])
+        self.category = classify(self.visibility_sm, self.ceiling_ft)
+        self.raw_text: List[str] = columns['raw_text']
+        self.wx_string: List[Optional[str]] = columns['wx_string']
+        self.cloud_layers: List[List[Dict[str, Any]]] = columns['cloud_layers']
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self._changed = None
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """One row in the dict format returned by ``get_metar_data``."""
+        temp_c = _optional(self.temperature_c[row])
+        dewpoint_c = _optional(self.dewpoint_c[row])
+        wind_speed = _optional(self.wind_speed_kt[row], int)
+        wind_gust = _optional(self.wind_gust_kt[row], int)
+        observed = self.observed[row]
+        return {
+            'raw_text': self.raw_text[row],
+            'observation_time': (datetime.fromtimestamp(observed, tz=timezone.utc)
+                                 .strftime("%Y-%m-%d %H:%M UTC")
+                                 if not np.isnan(observed) else None),
+            'temperature_c': temp_c,
+            'temperature_f': round(temp_c * 9 / 5 + 32, 1) if temp_c is not None else None,
+            'dewpoint_c': dewpoint_c,
+            'dewpoint_f': round(dewpoint_c * 9 / 5 + 32, 1) if dewpoint_c is not None else None,
+            'wind_dir_degrees': _optional(self.wind_dir[row], int),
+            'wind_speed_kt': wind_speed,
+            'wind_speed_mph': round(wind_speed * 1.15078, 1) if wind_speed is not None else None,
+            'wind_gust_kt': wind_gust,
+            'wind_gust_mph': round(wind_gust * 1.15078, 1) if wind_gust is not None else None,
+            'visibility_statute_mi': _optional(self.visibility_sm[row]),
+            'altim_in_hg': _optional(self.altimeter_in_hg[row]),
+            'cloud_layers': [dict(layer) for layer in self.cloud_layers[row]],
+            'ceiling_ft': _optional(self.ceiling_ft[row], int),
+            'wx_string': self.wx_string[row],
+            'flight_category': CATEGORIES[self.category[row]],
+        }
+
+    def changed_rows(self, previous: Optional["MetarTable"]) -> np.ndarray:
+        """
+        Rows whose station is new or has a different observation than in ``previous``.
+
+        The result for the last ``previous`` is kept, as every snapshot listener asks for it.
+        """
+        if self._changed is not None and self._changed[0]() is previous:
+            return self._changed[1]
+        if previous is None or not len(previous):
+            changed = np.arange(len(self))
+        else:
+            rows = np.array([previous.index.get(station, -1) for station in self.stations.tolist()],
+                            dtype=np.int64)
+            before = np.where(rows >= 0, previous.observed[rows], np.nan)
+            changed = np.flatnonzero(~(before == self.observed))
+        # Weakly, so snapshots do not keep their whole chain of predecessors alive
+        self._changed = (weakref.ref(previous) if previous is not None else lambda: None, changed)
+        return changed
+
+    def lookup(self, codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """METARs for the requested stations that are in the snapshot."""
+        metars = {}
+        for code in codes:
+            row = self.index.get(code.strip().upper())
+            if row is not None:
+                metars[self.stations[row]] = self.record(row)
+        return metars
+
+
+def _optional(value: float, cast=float):
+    return None if math.isnan(value) else cast(value)
+
+
+def _number(text: str) -> float:
+    """Parse a numeric CSV cell; blanks, ``VRB`` and other non-numbers are NaN."""
+    text = text.strip().rstrip('+')
+    if not text:
+        return math.nan
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def _timestamp(text: str) -> float:
+    try:
+        return datetime.fromisoformat(text.strip().replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def parse_metar_csv(lines: Iterable[str], fetched_at: Optional[float] = None) -> MetarTable:
+    """
+    Parse the bulk METAR CSV feed into a station table.
+
+    The feed starts with a few status lines before the header row; rows are
+    consumed one at a time and only the newest observation per station is kept.
+
+    Args:
+        lines: Text lines of the feed (a file object or a streamed response)
+        fetched_at: Ingestion time (unix seconds, defaults to now)
+
+    Returns:
+        MetarTable: One row per station
+    """
+    reader = csv.reader(lines)
+    header = None
+    for row in reader:
+        if row and row[0] == 'raw_text':
+            header = row
+            break
+    if header is None:
+        raise ValueError("METAR feed has no header row")
+
+    position = {}
+    for i, name in enumerate(header):
+        position.setdefault(name, i)
+    sky_cover = [i for i, name in enumerate(header) if name == 'sky_cover']
+    cloud_base = [i for i, name in enumerate(header) if name == 'cloud_base_ft_agl']
+    width = len(header)
+
+    names = ['station', 'observed', 'vertical_visibility_ft', 'raw_text', 'wx_string',
+             'cloud_layers'] + list(NUMERIC_COLUMNS.values())
+    columns: Dict[str, list] = {name: [] for name in names}
+    rows: Dict[str, int] = {}
+    for row in reader:
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        station = row[position['station_id']].strip().upper()
+        raw_text = row[position['raw_text']].strip()
+        if not station or not raw_text:
+            continue
+        observed = _timestamp(row[position['observation_time']])
+        existing = rows.get(station)
+        if existing is not None and not observed > columns['observed'][existing]:
+            continue
+
+        layers = []
+        for cover_i, base_i in zip(sky_cover, cloud_base):
+            cover = row[cover_i].strip()
+            base = _number(row[base_i])
+            if cover and not math.isnan(base):
+                layers.append({'cover': cover, 'base': int(base)})
+        vertical_visibility = (_number(row[position['vert_vis_ft']])
+                               if 'vert_vis_ft' in position else math.nan)
+
+        values = {column: _number(row[position[name]]) if name in position else math.nan
+                  for name, column in NUMERIC_COLUMNS.items()}
+        wx_string = row[position['wx_string']].strip() if 'wx_string' in position else ''
+
+        record = {
+            'station': station, 'observed': observed, 'vertical_visibility_ft': vertical_visibility,
+            'raw_text': raw_text, 'wx_string': wx_string or None, 'cloud_layers': layers, **values,
+        }
+        if existing is None:
+            rows[station] = len(columns['station'])
+            for name, value in record.items():
+                columns[name].append(value)
+        else:
+            for name, value in record.items():
+                columns[name][existing] = value
+
+    return MetarTable(columns, fetched_at)
+
+
+def load_metar_snapshot(source: Optional[str] = None) -> MetarTable:
+    """
+    Download (or read) and parse the bulk METAR feed.
+
+    Args:
+        source: Feed URL or local file path, gzip-compressed if it ends in ``.gz``
+            (defaults to ``settings.metar_snapshot_url``)
+    """
+    source = source or settings.metar_snapshot_url
+    compressed = source.endswith('.gz')
+    if not source.startswith(('http://', 'https://')):
+        opener = gzip.open if compressed else open
+        with opener(source, 'rt', encoding='utf-8', newline='') as f:
+            return parse_metar_csv(f)
+
+    with requests.get(source, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream = gzip.GzipFile(fileobj=response.raw) if compressed else response.raw
+        return parse_metar_csv(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+
+
+def refresh_metar_snapshot(source: Optional[str] = None) -> Optional[MetarTable]:
+    """
+    Ingest a new snapshot and swap it in.
+
+    Returns:
+        MetarTable: The new snapshot, or None if ingestion failed (the previous
+        snapshot is kept)
+    """
+    global _snapshot
+    started = time.monotonic()
+    try:
+        table = load_metar_snapshot(source)
+    except Exception as e:
+        logger.error(f"Error refreshing METAR snapshot: {e}")
+        return None
+    with _snapshot_lock:
+        previous, _snapshot = _snapshot, table
+    logger.info(f"Loaded METAR snapshot with {len(table)} stations "
+                f"in {time.monotonic() - started:.2f}s")
+    for listener in list(_snapshot_listeners):
+        try:
+            listener(table, previous)
+        except Exception as e:
+            logger.error(f"Error in METAR snapshot listener: {e}")
+    return table
+
+
+def get_metar_snapshot() -> Optional[MetarTable]:
+    """
+    The current snapshot.
+
+    None if none has loaded or it is older than ``metar_snapshot_max_age_s``.
+    """
+    with _snapshot_lock:
+        table = _snapshot
+    if table is None or time.time() - table.fetched_at > settings.metar_snapshot_max_age_s:
+        return None
+    return table
+
+
+def lookup_metars(codes: Sequence[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """METARs from the snapshot, or None when no current snapshot is loaded."""
+    table = get_metar_snapshot()
+    return None if table is None else table.lookup(codes)
+
+
+async def run_metar_snapshot_updates(interval_s: float) -> None:
+    """Refresh the snapshot forever, every ``interval_s`` seconds (run as a background task)."""
+    while True:
+        await asyncio.to_thread(refresh_metar_snapshot)
+        await asyncio.sleep(interval_s)
@@ -0,0 +1,141 @@
+"""
+METAR Station Index.
+
+A spatial index over the airports known to report METARs, used to fall back to
+the nearest reporting stations for airports without their own observations.
+
+The set of reporting stations is learned from METAR responses: a station that
+returns a METAR is added, and one that stays silent for ``STATION_MISS_LIMIT``
+consecutive requests is dropped. Until a station list has been observed, large
+and medium airports are assumed to report. The learned list is persisted to
+``metar_stations_file`` so it survives restarts.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.models.airport import add_metar_listener
+from app.models.airport_index import AirportIndex, get_airport_index, get_airport_dataset_version
+
+logger = logging.getLogger(__name__)
+
+# Consecutive silent responses before a station is dropped
+STATION_MISS_LIMIT = 3
+
+# Airport types assumed to report METARs before any observations
+LIKELY_REPORTING_TYPES = {'large_airport', 'medium_airport'}
+
+_station_index = None
+_station_index_lock = threading.Lock()
+
+
+class MetarStationIndex:
+    """Spatial index of METAR-reporting airports, updated from observed responses."""
+
+    def __init__(self, airport_index: AirportIndex, stations: Optional[Iterable[str]] = None,
+                 path: Optional[str] = None):
+        self.airport_index = airport_index
+        self.path = path
+        self.index = AirportIndex([])
+        self.misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if stations is None:
+            stations = (record['icao'] for record in airport_index.records
+                        if record.get('type') in LIKELY_REPORTING_TYPES)
+        for code in stations:
+            record = airport_index.get(code)
+            if record is not None:
+                self.index.add(record)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.index.by_code
+
+    def stations(self) -> Set[str]:
+        with self._lock:
+            return {record['icao'] for record in self.index.records}
+
+    def observe(self, requested_codes: Iterable[str], metars: Dict[str, Any]) -> bool:
+        """
+        Update the station set from one METAR response.
+
+        Returns True when the set of reporting stations changed.
+        """
+        changed = False
+        with self._lock:
+            for code in requested_codes:
+                code = code.strip().upper()
+                if code in metars:
+                    self.misses.pop(code, None)
+                    record = self.airport_index.get(code)
+                    if record is not None and record['icao'] == code:
+                        changed |= self.index.add(record)
+                elif code in self.index.by_code:
+                    self.misses[code] = self.misses.get(code, 0) + 1
+                    if self.misses[code] >= STATION_MISS_LIMIT:
+                        changed |= self.index.discard(code)
+                        del self.misses[code]
+        if changed:
+            self.save()
+        return changed
+
+    def nearest(self, lat: float, lon: float, k: int = 2, max_radius_nm: float = 50.0,
+                exclude: Iterable[str] = ()) -> List[Tuple[Dict[str, Any], float]]:
+        """Up to k reporting stations nearest to a point, as (airport, distance_nm) pairs."""
+        exclude = set(exclude)
+        with self._lock:
+            matches = self.index.nearest(lat, lon, k + len(exclude), max_radius_nm)
+        return [(record, distance) for record, distance in matches
+                if record['icao'] not in exclude][:k]
+
+    def save(self) -> None:
+        """Persist the learned station list (atomic replace); skipped without a directory."""
+        if not self.path or not os.path.isdir(os.path.dirname(os.path.abspath(self.path))):
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(sorted(self.stations()), f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save METAR station list to {self.path}: {e}")
+
+
+def _load_stations(path: Optional[str]) -> Optional[List[str]]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return [str(code).upper() for code in json.load(f)]
+    except Exception as e:
+        logger.error(f"Error loading METAR station list from {path}: {e}")
+        return None
+
+
+def get_metar_station_index() -> MetarStationIndex:
+    """Return the station index, rebuilding it on the current airports when they reload."""
+    global _station_index
+    airport_index = get_airport_index()
+    with _station_index_lock:
+        if _station_index is None or _station_index.airport_index is not airport_index:
+            known = _station_index.stations() if _station_index is not None else None
+            stations = known if known is not None else _load_stations(settings.metar_stations_file)
+            _station_index = MetarStationIndex(airport_index, stations,
+                                               settings.metar_stations_file)
+            logger.info(f"Built METAR station index with {len(_station_index)} stations "
+                        f"(airport version {get_airport_dataset_version()})")
+        return _station_index
+
+
+def record_metar_observations(requested_codes: Iterable[str], metars: Dict[str, Any]) -> None:
+    """METAR listener: learn reporting stations from every METAR response."""
+    get_metar_station_index().observe(requested_codes, metars)
+
+
+add_metar_listener(record_metar_observations)
@@ -0,0 +1,87 @@
+"""
+Navigation Math.
+
+Vectorized great-circle courses, leg sampling and wind triangle solutions used by
+the route planner.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def true_course(lat1, lon1, lat2, lon2):
+    """Initial great-circle true course in degrees (0-360) for scalars or arrays."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    y = np.sin(dlambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def sample_legs(lat1, lon1, lat2, lon2, spacing_nm: float = 25.0, distances=None):
+    """
+    Sample points along many legs at once.
+
+    Each leg is split into equal segments no longer than spacing_nm and sampled at
+    segment midpoints (linear in lat/lon, which is adequate at leg lengths).
+
+    Returns:
+        Tuple of (lats, lons, leg_index, segment_nm) arrays, one entry per sample.
+    """
+    lat1, lon1, lat2, lon2 = (np.asarray(a, dtype=float) for a in (lat1, lon1, lat2, lon2))
+    if distances is None:
+        distances = great_circle_nm(lat1, lon1, lat2, lon2)
+    distances = np.asarray(distances, dtype=float)
+    counts = np.maximum(1, np.ceil(distances / spacing_nm)).astype(int)
+
+    leg_index = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    position = np.arange(counts.sum()) - np.repeat(starts, counts)
+    fraction = (position + 0.5) / counts[leg_index]
+
+    lats = lat1[leg_index] + (lat2[leg_index] - lat1[leg_index]) * fraction
+    lons = lon1[leg_index] + (lon2[leg_index] - lon1[leg_index]) * fraction
+    segment_nm = distances[leg_index] / counts[leg_index]
+    return lats, lons, leg_index, segment_nm
+
+
+def great_circle_nm(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance in nautical miles."""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def wind_triangle(course_deg, tas_kt, wind_u_kt,
+                  wind_v_kt) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Solve the wind triangle for arrays of courses and winds.
+
+    Winds are vectors the air moves toward (u east, v north), in knots.
+
+    Returns:
+        Tuple of (groundspeed_kt, heading_deg, headwind_kt, crosswind_kt). Groundspeed
+        is NaN where the crosswind exceeds the true airspeed. Crosswind is positive
+        from the left (pushing the aircraft right of course).
+    """
+    course = np.radians(course_deg)
+    along = wind_u_kt * np.sin(course) + wind_v_kt * np.cos(course)
+    cross = wind_u_kt * np.cos(course) - wind_v_kt * np.sin(course)
+    ratio = cross / tas_kt
+    with np.errstate(invalid='ignore'):
+        groundspeed = np.sqrt(tas_kt ** 2 - cross ** 2) + along
+        wca = np.degrees(np.arcsin(np.clip(ratio, -1.0, 1.0)))
+    groundspeed = np.where((np.abs(ratio) < 1.0) & (groundspeed > 0), groundspeed, np.nan)
+    heading = (np.degrees(course) - wca) % 360.0
+    return groundspeed, heading, -along, cross
+
+
+def wind_components_from_direction(speed_kt, direction_from_deg):
+    """Convert meteorological wind (speed, direction blowing from) to (u, v) toward components."""
+    direction = np.radians(direction_from_deg)
+    return -speed_kt * np.sin(direction), -speed_kt * np.cos(direction)
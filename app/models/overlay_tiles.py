@@ -0,0 +1,239 @@
+"""
+Weather Overlay Tile Proxy.
+
+Serves OpenWeatherMap map tiles through the API so the key never reaches the
+browser and clients share fetched tiles. Tiles are cached on disk under
+time-bucketed keys (a new bucket every ``overlay_tile_bucket_s`` seconds, so
+overlays refresh without explicit invalidation) with least-recently-used
+eviction once the cache exceeds its size limit. Concurrent requests for the
+same tile and bucket wait on a single upstream fetch.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OWM_TILE_URL = "https://tile.openweathermap.org/map/{layer}/{z}/{x}/{y}.png?appid={api_key}"
+PROXY_TILE_PATH = "/tiles/overlay/{overlay}/{z}/{x}/{y}.png"
+
+# Overlay names accepted by the API and their OpenWeatherMap layers
+OVERLAY_LAYERS = {
+    'clouds': 'clouds_new',
+    'precipitation': 'precipitation_new',
+    'pressure': 'pressure_new',
+    'wind': 'wind_new',
+    'temp': 'temp_new',
+    'temperature': 'temp_new',
+}
+
+MAX_OVERLAY_ZOOM = 18
+MAX_LATITUDE = 85.0511287798
+
+TileKey = Tuple[str, int, int, int, int]
+
+
+def lat_lon_to_tile(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """Slippy-map (web mercator) tile containing a point."""
+    n = 2 ** zoom
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def overlay_tile_urls(lat: float, lon: float, overlays, zoom: int) -> Dict[str, str]:
+    """Proxy tile URLs of the requested overlays for the tile containing a point."""
+    x, y = lat_lon_to_tile(lat, lon, zoom)
+    return {overlay: PROXY_TILE_PATH.format(overlay=overlay, z=zoom, x=x, y=y)
+            for overlay in overlays or [] if overlay in OVERLAY_LAYERS}
+
+
+class OverlayTileCache:
+    """
+    Size-bounded on-disk LRU cache of tile images.
+
+    Recency is tracked in memory and rebuilt from file modification times on
+    startup; hits touch the file so the order survives restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path(self, key: TileKey) -> str:
+        layer, z, x, y, bucket = key
+        return os.path.join(self.directory, layer, str(z), f"{x}_{y}_{bucket}.png")
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        path = self.path(key)
+        with self._lock:
+            if path not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(path, 0)
+            return None
+
+    def put(self, key: TileKey, data: bytes) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.total_bytes += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'tiles': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class OverlayTileProxy:
+    """Fetches overlay tiles through the disk cache, coalescing concurrent misses."""
+
+    def __init__(self, cache: OverlayTileCache, bucket_s: int,
+                 fetcher: Optional[Callable[[str, int, int, int], Awaitable[bytes]]] = None):
+        self.cache = cache
+        self.bucket_s = bucket_s
+        self.fetcher = fetcher or self._fetch_upstream
+        self._needs_api_key = fetcher is None
+        self.upstream_fetches = 0
+        self._inflight: Dict[TileKey, "asyncio.Task"] = {}
+
+    def available(self) -> bool:
+        """Whether tiles can be fetched (an API key is configured for the upstream provider)."""
+        return not self._needs_api_key or bool(overlay_api_key())
+
+    def bucket(self, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // self.bucket_s)
+
+    def seconds_until_refresh(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return int(self.bucket_s - now % self.bucket_s)
+
+    async def get_tile(self, overlay: str, z: int, x: int, y: int,
+                       now: Optional[float] = None) -> bytes:
+        """
+        PNG bytes of an overlay tile for the current time bucket.
+
+        Raises:
+            ValueError: If the overlay is unknown
+            httpx.HTTPError: If the upstream fetch fails
+        """
+        layer = OVERLAY_LAYERS.get(overlay)
+        if layer is None:
+            raise ValueError(f"Unknown overlay {overlay!r}")
+        key = (layer, z, x, y, self.bucket(now))
+
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            return data
+
+        # One upstream fetch per tile and bucket; it runs as its own task so a
+        # disconnecting client does not cancel it for the others waiting on it
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: TileKey) -> bytes:
+        layer, z, x, y, _ = key
+        self.upstream_fetches += 1
+        data = await self.fetcher(layer, z, x, y)
+        await asyncio.to_thread(self.cache.put, key, data)
+        return data
+
+    def _fetch_done(self, key: TileKey, task: "asyncio.Task") -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Overlay tile fetch {key} failed: {task.exception()}")
+
+    @staticmethod
+    async def _fetch_upstream(layer: str, z: int, x: int, y: int) -> bytes:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            url = OWM_TILE_URL.format(layer=layer, z=z, x=x, y=y, api_key=overlay_api_key())
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.content
+
+
+def overlay_api_key() -> Optional[str]:
+    """OpenWeatherMap API key used for upstream tile requests."""
+    return settings.openweather_api_key or os.getenv('OPENWEATHERMAP_API_KEY')
+
+
+_proxy = None
+_proxy_lock = threading.Lock()
+
+
+def get_overlay_proxy() -> OverlayTileProxy:
+    """Return the process-wide overlay tile proxy."""
+    global _proxy
+    with _proxy_lock:
+        if _proxy is None:
+            cache = OverlayTileCache(settings.overlay_tile_cache_dir,
+                                     settings.overlay_tile_cache_mb * 1024 * 1024)
+            _proxy = OverlayTileProxy(cache, settings.overlay_tile_bucket_s)
+        return _proxy
@@ -0,0 +1,175 @@
+"""
+Reachability Model.
+
+Answers "where can I get to from here?" with one bounded multi-hop search over
+the airport spatial index: every airport reachable within a time budget and a
+stop budget, with the fuel it takes, plus an optional simplified range polygon.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.airport_index import get_airport_index, haversine_nm
+from app.models.flight_planner import sells_fuel
+
+logger = logging.getLogger(__name__)
+
+NM_PER_DEG_LAT = 60.0
+POLYGON_BEARINGS = 72
+
+
+def reachable_airports(
+    start_code: str,
+    groundspeed_kt: float,
+    fuel_capacity_gal: float = 50.0,
+    fuel_burn_gph: float = 12.0,
+    reserve_minutes: int = 30,
+    departure_fuel_gal: Optional[float] = None,
+    max_time_hr: Optional[float] = None,
+    max_stops: int = 0,
+    include_polygon: bool = False,
+    airport_index=None,
+) -> Dict[str, Any]:
+    """
+    Find every airport reachable from a departure airport.
+
+    A Dijkstra search on flight time where neighbours come from radius queries
+    on the airport spatial index instead of a prebuilt graph. Each hop may use
+    the fuel on board down to the reserve; intermediate stops (at most
+    ``max_stops``, only at airports selling fuel) refuel to capacity. Labels are
+    (time, stops) pairs and a label is dropped when another at the same airport
+    is no slower with no more stops.
+
+    Args:
+        start_code: Departure airport ICAO/IATA code
+        groundspeed_kt: Ground speed in knots
+        fuel_capacity_gal: Fuel capacity in gallons
+        fuel_burn_gph: Fuel burn in gallons per hour
+        reserve_minutes: Fuel reserve on landing, in minutes
+        departure_fuel_gal: Fuel on board at departure (defaults to full tanks)
+        max_time_hr: Optional total flight time budget in hours
+        max_stops: Maximum number of intermediate fuel stops
+        include_polygon: Whether to return a simplified range polygon
+
+    Returns:
+        dict: departure record, reachable airports (fastest first) and range polygon
+    """
+    index = airport_index or get_airport_index()
+    start = index.get(start_code)
+    if not start:
+        return {'error': 'Invalid airport code'}
+
+    reserve_gal = fuel_burn_gph * reserve_minutes / 60.0
+    departure_fuel = fuel_capacity_gal
+    if departure_fuel_gal is not None:
+        departure_fuel = min(departure_fuel_gal, fuel_capacity_gal)
+
+    def hop_range(fuel_gal, elapsed_hr):
+        range_nm = max(fuel_gal - reserve_gal, 0.0) / fuel_burn_gph * groundspeed_kt
+        if max_time_hr is not None:
+            range_nm = min(range_nm, max(max_time_hr - elapsed_hr, 0.0) * groundspeed_kt)
+        return range_nm
+
+    counter = itertools.count()
+    # (time, stops, tiebreak, icao, fuel on departure, via stops)
+    heap = [(0.0, 0, next(counter), start['icao'], departure_fuel, ())]
+    labels: Dict[str, List[Tuple[float, int]]] = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    circles = []
+
+    def dominated(icao, time_hr, stops):
+        return any(t <= time_hr + 1e-9 and s <= stops for t, s in labels.get(icao, ()))
+
+    while heap:
+        time_hr, stops, _, icao, fuel, via = heapq.heappop(heap)
+        if dominated(icao, time_hr, stops):
+            continue
+        labels.setdefault(icao, []).append((time_hr, stops))
+        airport = index.get(icao)
+
+        if icao != start['icao']:
+            if icao not in results:
+                results[icao] = {
+                    'icao': icao,
+                    'name': airport['name'],
+                    'latitude': airport['latitude'],
+                    'longitude': airport['longitude'],
+                    'distance_nm': haversine_nm(start['latitude'], start['longitude'],
+                                                airport['latitude'], airport['longitude']),
+                    'time_hr': time_hr,
+                    'fuel_burn_gal': time_hr * fuel_burn_gph,
+                    'landing_fuel_gal': fuel,
+                    'stops': stops,
+                    'via': list(via),
+                }
+            # Continuing from here makes it a fuel stop
+            if stops >= max_stops or not sells_fuel(airport):
+                continue
+            fuel = fuel_capacity_gal
+            via = via + (icao,)
+            next_stops = stops + 1
+        else:
+            next_stops = 0
+
+        range_nm = hop_range(fuel, time_hr)
+        if range_nm <= 0:
+            continue
+        circles.append((airport['latitude'], airport['longitude'], range_nm))
+        nearby = index.within_radius(airport['latitude'], airport['longitude'], range_nm)
+        for neighbor, distance in nearby:
+            if neighbor['icao'] == icao or neighbor['icao'] == start['icao']:
+                continue
+            hop_hr = distance / groundspeed_kt
+            arrival_time = time_hr + hop_hr
+            if dominated(neighbor['icao'], arrival_time, next_stops):
+                continue
+            heapq.heappush(heap, (arrival_time, next_stops, next(counter), neighbor['icao'],
+                                  fuel - hop_hr * fuel_burn_gph, via))
+
+    airports = sorted(results.values(), key=lambda r: (r['time_hr'], r['icao']))
+    polygon = None
+    if include_polygon:
+        polygon = range_polygon(start['latitude'], start['longitude'], circles)
+    return {
+        'departure': start,
+        'airports': airports,
+        'range_polygon': polygon,
+    }
+
+
+def range_polygon(lat0: float, lon0: float, circles,
+                  bearings: int = POLYGON_BEARINGS) -> Optional[Dict[str, Any]]:
+    """
+    Simplified reach envelope as a GeoJSON Polygon.
+
+    Each circle is (lat, lon, radius_nm) of remaining reach from the departure or
+    a fuel stop. For evenly spaced bearings from the departure, the envelope
+    radius is the farthest point along the ray inside any circle (solved for all
+    rays and circles at once on a local flat projection).
+    """
+    if not circles:
+        return None
+    cos_lat = max(math.cos(math.radians(lat0)), 1e-6)
+    centers = np.array([((lon - lon0) * NM_PER_DEG_LAT * cos_lat, (lat - lat0) * NM_PER_DEG_LAT)
+                        for lat, lon, _ in circles])
+    radii = np.array([radius for _, _, radius in circles])
+
+    angles = np.radians(np.arange(bearings) * 360.0 / bearings)
+    directions = np.column_stack([np.sin(angles), np.cos(angles)])  # (east, north)
+    projection = directions @ centers.T  # (bearings, circles)
+    offset_sq = (centers ** 2).sum(axis=1)[None, :] - projection ** 2
+    discriminant = radii[None, :] ** 2 - offset_sq
+    with np.errstate(invalid='ignore'):
+        far = np.where(discriminant >= 0, projection + np.sqrt(discriminant), 0.0)
+    reach = np.clip(far.max(axis=1), 0.0, None)
+
+    lats = lat0 + reach * directions[:, 1] / NM_PER_DEG_LAT
+    lons = lon0 + reach * directions[:, 0] / (NM_PER_DEG_LAT * cos_lat)
+    ring = [[round(float(lon), 4), round(float(lat), 4)] for lat, lon in zip(lats, lons)]
+    ring.append(ring[0])
+    return {'type': 'Polygon', 'coordinates': [ring]}
@@ -0,0 +1,255 @@
+"""
+Route Search.
+
+Graph search algorithms used by the flight planner. Graphs are adjacency dicts
+mapping an airport code to a list of edges (``{'to': code, 'distance': nm}``);
+edge costs are supplied by callers so the same searches serve distance- and
+time-optimal planning.
+"""
+
+import heapq
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Graph = Dict[str, List[Dict[str, Any]]]
+CostFn = Callable[[str, Dict[str, Any]], Optional[float]]
+
+
+class SearchLimitExceeded(RuntimeError):
+    """A bounded search ran out of work budget before it could decide the answer."""
+
+
+def _distance_cost(_: str, edge: Dict[str, Any]) -> float:
+    return edge['distance']
+
+
+def shortest_path(graph: Graph, start: str, end: str,
+                  cost: Optional[CostFn] = None) -> Optional[List[str]]:
+    """
+    Dijkstra's algorithm; returns the node path or None.
+
+    ``cost(from_node, edge)`` returns the edge cost, or None if the edge is unusable.
+    Defaults to edge distance.
+    """
+    cost = cost or _distance_cost
+    heap = [(0, start, [])]  # (cost, current, path)
+    visited = set()
+    while heap:
+        total_cost, current, path = heapq.heappop(heap)
+        if current == end:
+            return path + [current]
+        if current in visited:
+            continue
+        visited.add(current)
+        for neighbor in graph[current]:
+            if neighbor['to'] not in visited:
+                edge_cost = cost(current, neighbor)
+                if edge_cost is not None:
+                    heapq.heappush(heap, (total_cost + edge_cost, neighbor['to'], path + [current]))
+    return None
+
+
+class _Label:
+    """Search label: a partial path ending at ``node`` with accumulated cost and fuel on board."""
+
+    __slots__ = ('cost', 'fuel', 'node', 'parent', 'arrival_fuel', 'alive')
+
+    def __init__(self, cost, fuel, node, parent, arrival_fuel):
+        self.cost = cost
+        self.fuel = fuel
+        self.node = node
+        self.parent = parent
+        self.arrival_fuel = arrival_fuel
+        self.alive = True
+
+
+def fuel_constrained_path(
+    graph: Graph,
+    start: str,
+    end: str,
+    cost: CostFn,
+    fuel_burn: CostFn,
+    departure_fuel: float,
+    capacity: float,
+    reserve: float,
+    can_refuel: Callable[[str], bool],
+    max_labels: int = 50000,
+) -> Optional[Tuple[List[str], List[Tuple[float, float]]]]:
+    """
+    Resource-constrained shortest path with fuel on board as the resource.
+
+    A label-setting search over (node, cost, fuel) labels. Every leg must land with
+    at least ``reserve`` fuel; airports where ``can_refuel`` is true top the tanks
+    back up to ``capacity``. Labels at a node that are no better in both cost and
+    fuel than an existing label are pruned (Pareto dominance), which keeps the
+    label sets small even on large candidate graphs.
+
+    Returns:
+        (path, fuel_states) where fuel_states holds (arrival_fuel, departure_fuel)
+        per path node, or None if no feasible path exists.
+
+    Raises:
+        SearchLimitExceeded: If more than ``max_labels`` labels are created before
+            the search finishes
+    """
+    counter = itertools.count()
+    root = _Label(0.0, departure_fuel, start, None, departure_fuel)
+    labels: Dict[str, List[_Label]] = {start: [root]}
+    heap = [(0.0, -departure_fuel, next(counter), root)]
+    created = 1
+
+    while heap:
+        _, _, _, label = heapq.heappop(heap)
+        if not label.alive:
+            continue
+        if label.node == end:
+            return _unwind(label)
+
+        for edge in graph[label.node]:
+            neighbor = edge['to']
+            edge_cost = cost(label.node, edge)
+            burn = fuel_burn(label.node, edge)
+            if edge_cost is None or burn is None:
+                continue
+            arrival = label.fuel - burn
+            if arrival < reserve - 1e-9:
+                continue
+            fuel = capacity if neighbor != end and can_refuel(neighbor) else arrival
+            new_cost = label.cost + edge_cost
+
+            node_labels = labels.setdefault(neighbor, [])
+            if any(other.alive and other.cost <= new_cost and other.fuel >= fuel
+                   for other in node_labels):
+                continue
+            for other in node_labels:
+                if other.alive and new_cost <= other.cost and fuel >= other.fuel:
+                    other.alive = False
+            node_labels[:] = [other for other in node_labels if other.alive]
+
+            new_label = _Label(new_cost, fuel, neighbor, label, arrival)
+            node_labels.append(new_label)
+            heapq.heappush(heap, (new_cost, -fuel, next(counter), new_label))
+            created += 1
+            if created > max_labels:
+                raise SearchLimitExceeded(f"Fuel-constrained search exceeded {max_labels} labels")
+    return None
+
+
+def _unwind(label: _Label) -> Tuple[List[str], List[Tuple[float, float]]]:
+    path = []
+    states = []
+    while label is not None:
+        path.append(label.node)
+        states.append((label.arrival_fuel, label.fuel))
+        label = label.parent
+    return path[::-1], states[::-1]
+
+
+def shortest_path_tree(graph: Graph, target: str,
+                       cost: Optional[CostFn] = None) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """
+    Dijkstra towards ``target`` over reversed edges.
+
+    Returns (cost_to_target, successor) maps; following successors from any
+    reached node traces its shortest path to the target.
+    """
+    cost = cost or _distance_cost
+    reverse: Dict[str, List[Tuple[str, float]]] = {node: [] for node in graph}
+    for node, edges in graph.items():
+        for edge in edges:
+            edge_cost = cost(node, edge)
+            if edge_cost is not None and edge['to'] in reverse:
+                reverse[edge['to']].append((node, edge_cost))
+
+    cost_to = {target: 0.0}
+    successor: Dict[str, str] = {}
+    heap = [(0.0, target)]
+    done = set()
+    while heap:
+        total, node = heapq.heappop(heap)
+        if node in done:
+            continue
+        done.add(node)
+        for previous, edge_cost in reverse[node]:
+            candidate = total + edge_cost
+            if candidate < cost_to.get(previous, float('inf')):
+                cost_to[previous] = candidate
+                successor[previous] = node
+                heapq.heappush(heap, (candidate, previous))
+    return cost_to, successor
+
+
+def k_shortest_paths(
+    graph: Graph,
+    start: str,
+    end: str,
+    k: int,
+    cost: Optional[CostFn] = None,
+    max_candidates: int = 500,
+) -> List[Tuple[float, List[str]]]:
+    """
+    Up to k distinct loopless paths in increasing cost order.
+
+    A deviation-path variant of Yen's algorithm: a single reverse shortest-path
+    tree is built once, and every candidate is a prefix of an accepted path, one
+    sidetrack edge, then the tree path to the target. No per-candidate searches
+    are run. Candidates that would loop back over their prefix are dropped, and
+    ``max_candidates`` bounds the total work.
+
+    Returns:
+        List of (cost, path) tuples, shortest first.
+    """
+    cost = cost or _distance_cost
+    cost_to, successor = shortest_path_tree(graph, end, cost)
+    if start not in cost_to:
+        return []
+
+    def tree_path(node):
+        path = [node]
+        while node != end:
+            node = successor[node]
+            path.append(node)
+        return path
+
+    counter = itertools.count()
+    heap = [(cost_to[start], next(counter), tree_path(start), 0)]
+    seen = {tuple(heap[0][2])}
+    results = []
+    generated = 1
+
+    while heap and len(results) < k:
+        total, _, path, deviation = heapq.heappop(heap)
+        results.append((total, path))
+
+        prefix_cost = 0.0
+        for i in range(len(path) - 1):
+            node = path[i]
+            edges = graph[node]
+            if i >= deviation:
+                prefix_nodes = set(path[:i + 1])
+                for edge in edges:
+                    neighbor = edge['to']
+                    if (neighbor == path[i + 1] or neighbor in prefix_nodes
+                            or neighbor not in cost_to):
+                        continue
+                    edge_cost = cost(node, edge)
+                    if edge_cost is None:
+                        continue
+                    tail = tree_path(neighbor)
+                    if prefix_nodes.intersection(tail):
+                        continue
+                    candidate = path[:i + 1] + tail
+                    key = tuple(candidate)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    candidate_cost = prefix_cost + edge_cost + cost_to[neighbor]
+                    heapq.heappush(heap, (candidate_cost, next(counter), candidate, i + 1))
+                    generated += 1
+                    if generated >= max_candidates:
+                        break
+            if generated >= max_candidates:
+                break
+            step = next(edge for edge in edges if edge['to'] == path[i + 1])
+            prefix_cost += cost(node, step)
+    return results
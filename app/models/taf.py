@@ -0,0 +1,496 @@
+"""
+TAF Forecast Store.
+
+Terminal aerodrome forecasts of every station, ingested from the
+aviationweather.gov bulk cache file (``tafs.cache.csv.gz``) and decoded into
+time intervals. Per station, the prevailing conditions form a sorted sequence
+of intervals (the base forecast, replaced by each FM group and changed at the
+end of each BECMG window) and TEMPO/PROB groups overlay them, so the forecast
+at an ETA is a binary search plus a scan of the few overlapping temporary
+groups. Flight categories of all prevailing intervals are computed in one
+pass of the flight category engine when a snapshot is built. A background
+task refreshes the store every ``taf_snapshot_interval_s`` seconds.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import logging
+import re
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+from app.config import settings
+from app.models.flight_category import CATEGORIES, UNKNOWN, classify, layer_matrix, lowest_ceiling
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_SM = 1609.344
+
+# Conditions a forecast group replaces entirely; groups only list what changes
+EMPTY_CONDITIONS = {
+    'wind_dir_degrees': None,
+    'wind_speed_kt': None,
+    'wind_gust_kt': None,
+    'visibility_statute_mi': None,
+    'wx_string': None,
+    'cloud_layers': [],
+    'vertical_visibility_ft': None,
+}
+
+WIND_PATTERN = re.compile(r'^(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?(KT|MPS)$')
+VISIBILITY_SM_PATTERN = re.compile(r'^(P)?(\d+)?(?:(\d)/(\d{1,2}))?SM$')
+CLOUD_PATTERN = re.compile(r'^(FEW|SCT|BKN|OVC)(\d{3})(CB|TCU)?$')
+VERTICAL_VISIBILITY_PATTERN = re.compile(r'^VV(\d{3})$')
+WEATHER_PATTERN = re.compile(r'^(?:[+-]|VC)?(?:MI|PR|BC|DR|BL|SH|TS|FZ)?'
+                             r'(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|'
+                             r'FC|SS|DS)*$')
+PERIOD_PATTERN = re.compile(r'^(\d{2})(\d{2})/(\d{2})(\d{2})$')
+FROM_PATTERN = re.compile(r'^FM(\d{2})(\d{2})(\d{2})$')
+ISSUE_PATTERN = re.compile(r'^(\d{2})(\d{2})(\d{2})Z$')
+PROBABILITY_PATTERN = re.compile(r'^PROB(\d{2})$')
+
+KNOTS_PER_MPS = 1.943844
+CAVOK_VISIBILITY_SM = round(10000 / METERS_PER_SM, 2)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _resolve(day: int, hour: int, minute: int, reference: datetime) -> datetime:
+    """Datetime of a day-of-month time group, in the month that puts it closest to ``reference``."""
+    rollover = timedelta(days=1) if hour == 24 else timedelta(0)
+    hour = 0 if hour == 24 else hour
+    candidates = []
+    for offset in (-1, 0, 1):
+        year, month = divmod(reference.year * 12 + reference.month - 1 + offset, 12)
+        try:
+            candidate = datetime(year, month + 1, day, hour, minute, tzinfo=timezone.utc)
+            candidates.append(candidate + rollover)
+        except ValueError:
+            continue
+    if not candidates:
+        raise ValueError(f"Invalid TAF time {day:02d}{hour:02d}{minute:02d}")
+    return min(candidates, key=lambda candidate: abs(candidate - reference))
+
+
+def _period(token: str, reference: datetime) -> Tuple[float, float]:
+    match = PERIOD_PATTERN.match(token)
+    start = _resolve(int(match.group(1)), int(match.group(2)), 0, reference)
+    end = _resolve(int(match.group(3)), int(match.group(4)), 0, start)
+    return start.timestamp(), end.timestamp()
+
+
+def parse_elements(tokens: Sequence[str]) -> Dict[str, Any]:
+    """
+    Decode the weather elements of one forecast group.
+
+    Only elements present in the group are returned, so a change group can be
+    laid over the conditions it modifies. A cloud group replaces all layers.
+    """
+    elements: Dict[str, Any] = {}
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+        wind = WIND_PATTERN.match(token)
+        if wind:
+            scale = KNOTS_PER_MPS if wind.group(4) == 'MPS' else 1.0
+            elements['wind_dir_degrees'] = None if wind.group(1) == 'VRB' else int(wind.group(1))
+            elements['wind_speed_kt'] = round(int(wind.group(2)) * scale)
+            elements['wind_gust_kt'] = round(int(wind.group(3)) * scale) if wind.group(3) else None
+            continue
+        if token == 'CAVOK':
+            elements.update(visibility_statute_mi=CAVOK_VISIBILITY_SM, wx_string=None,
+                            cloud_layers=[], vertical_visibility_ft=None)
+            continue
+        visibility = VISIBILITY_SM_PATTERN.match(token)
+        if visibility and (visibility.group(2) or visibility.group(3)):
+            miles = float(visibility.group(2) or 0)
+            if visibility.group(3):
+                miles += int(visibility.group(3)) / int(visibility.group(4))
+            elements['visibility_statute_mi'] = miles
+            continue
+        if token.isdigit() and len(token) == 4:
+            elements['visibility_statute_mi'] = round(int(token) / METERS_PER_SM, 2)
+            continue
+        # Whole miles written apart from the fraction: "1 1/2SM"
+        if (token.isdigit() and len(token) == 1 and i < len(tokens)
+                and re.match(r'^\d/\d{1,2}SM$', tokens[i])):
+            numerator, denominator = tokens[i][:-2].split('/')
+            elements['visibility_statute_mi'] = int(token) + int(numerator) / int(denominator)
+            i += 1
+            continue
+        cloud = CLOUD_PATTERN.match(token)
+        vertical = VERTICAL_VISIBILITY_PATTERN.match(token)
+        if cloud or vertical or token in ('SKC', 'CLR', 'NSC'):
+            if 'cloud_layers' not in elements:
+                elements['cloud_layers'] = []
+                elements['vertical_visibility_ft'] = None
+            if cloud:
+                layer = {'cover': cloud.group(1), 'base': int(cloud.group(2)) * 100}
+                if cloud.group(3):
+                    layer['type'] = cloud.group(3)
+                elements['cloud_layers'].append(layer)
+            elif vertical:
+                elements['vertical_visibility_ft'] = int(vertical.group(1)) * 100
+            continue
+        if token == 'NSW':
+            elements['wx_string'] = None
+            continue
+        if WEATHER_PATTERN.match(token) and len(token) >= 2:
+            wx = elements.get('wx_string')
+            elements['wx_string'] = f"{wx} {token}" if wx else token
+    return elements
+
+
+def parse_taf(raw_text: str, issue_time: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Decode a TAF into prevailing and temporary forecast intervals.
+
+    Args:
+        raw_text: TAF text, with or without the leading ``TAF``/``AMD``/``COR``
+        issue_time: Issue time (resolves the day-of-month time groups; defaults
+            to the issue group in the text, relative to now)
+
+    Returns:
+        dict: ``station``, ``raw_text``, ``issue_time``, ``valid_from`` and
+        ``valid_to`` (unix seconds), ``prevailing`` (contiguous intervals with
+        complete conditions) and ``temporary`` (TEMPO/PROB/BECMG windows with
+        only the elements they change)
+
+    Raises:
+        ValueError: If the text has no station or valid period
+    """
+    tokens = raw_text.replace('=', ' ').split()
+    while tokens and tokens[0] in ('TAF', 'AMD', 'COR'):
+        tokens.pop(0)
+    if not tokens or not re.match(r'^[A-Z0-9]{3,4}$', tokens[0]):
+        raise ValueError("TAF has no station identifier")
+    station = tokens.pop(0)
+
+    issued = issue_time or datetime.now(timezone.utc)
+    if tokens and ISSUE_PATTERN.match(tokens[0]):
+        issue = ISSUE_PATTERN.match(tokens.pop(0))
+        if issue_time is None:
+            issued = _resolve(int(issue.group(1)), int(issue.group(2)), int(issue.group(3)), issued)
+    if not tokens or not PERIOD_PATTERN.match(tokens[0]):
+        raise ValueError(f"TAF for {station} has no valid period")
+    valid_from, valid_to = _period(tokens.pop(0), issued)
+    reference = datetime.fromtimestamp(valid_from, tz=timezone.utc)
+
+    # Split into the base forecast and change groups
+    groups = [{'change': 'BASE', 'probability': None, 'start': valid_from, 'end': valid_to,
+               'tokens': []}]
+    for token in tokens:
+        if token == 'RMK':
+            break
+        current = groups[-1]
+        from_group = FROM_PATTERN.match(token)
+        probability = PROBABILITY_PATTERN.match(token)
+        if from_group:
+            day, hour, minute = (int(part) for part in from_group.groups())
+            start = _resolve(day, hour, minute, reference)
+            groups.append({'change': 'FM', 'probability': None, 'start': start.timestamp(),
+                           'end': valid_to, 'tokens': []})
+        elif (token == 'TEMPO' and current['change'] == 'PROB' and not current['tokens']
+              and current['start'] is None):
+            current['change'] = 'TEMPO'
+        elif token in ('TEMPO', 'BECMG') or probability:
+            groups.append({'change': 'PROB' if probability else token,
+                           'probability': int(probability.group(1)) if probability else None,
+                           'start': None, 'end': None, 'tokens': []})
+        elif PERIOD_PATTERN.match(token) and current['start'] is None:
+            current['start'], current['end'] = _period(token, reference)
+        else:
+            current['tokens'].append(token)
+
+    prevailing = []
+    temporary = []
+    for group in groups:
+        if group['start'] is None:
+            continue
+        elements = parse_elements(group['tokens'])
+        if group['change'] in ('BASE', 'FM'):
+            prevailing.append({'change': group['change'], 'start': group['start'],
+                               'conditions': {**EMPTY_CONDITIONS, **elements}})
+            continue
+        temporary.append({'change': group['change'], 'probability': group['probability'],
+                          'start': group['start'], 'end': group['end'], 'conditions': elements})
+        if group['change'] == 'BECMG':
+            # The change is complete at the end of the window and persists
+            prevailing.append({'change': 'BECMG', 'start': group['end'], 'conditions': elements})
+
+    # Contiguous prevailing intervals: BECMG changes build on whatever prevails before them
+    prevailing.sort(key=lambda period: period['start'])
+    intervals: List[Dict[str, Any]] = []
+    for period in prevailing:
+        if period['start'] >= valid_to:
+            continue
+        if period['change'] == 'BECMG':
+            before = intervals[-1]['conditions'] if intervals else EMPTY_CONDITIONS
+            period['conditions'] = {**before, **period['conditions']}
+        if intervals and intervals[-1]['start'] == period['start']:
+            intervals.pop()
+        intervals.append(period)
+    for period, following in zip(intervals, intervals[1:] + [None]):
+        period['end'] = following['start'] if following is not None else valid_to
+
+    return {
+        'station': station,
+        'raw_text': raw_text.strip(),
+        'issue_time': issued.timestamp(),
+        'valid_from': valid_from,
+        'valid_to': valid_to,
+        'prevailing': intervals,
+        'temporary': sorted(temporary, key=lambda group: group['start']),
+    }
+
+
+def classify_conditions(conditions: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Ceilings (NaN when unlimited) and category codes for a batch of forecast conditions."""
+    visibility = np.array([_float(c.get('visibility_statute_mi')) for c in conditions])
+    vertical = np.array([_float(c.get('vertical_visibility_ft')) for c in conditions])
+    covers, bases = layer_matrix([c.get('cloud_layers') or [] for c in conditions])
+    ceilings = lowest_ceiling(covers, bases, vertical)
+    return ceilings, classify(visibility, ceilings)
+
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _timestamp(text: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _time(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class TafStore:
+    """
+    Decoded TAFs of all stations, indexed for lookups by time.
+
+    Prevailing interval start times are kept in sorted per-station lists for
+    ``bisect``; temporary groups are sorted by start time, so only groups that
+    started before the ETA are checked for overlap.
+    """
+
+    def __init__(self, tafs: Iterable[Dict[str, Any]], fetched_at: Optional[float] = None):
+        self.tafs: Dict[str, Dict[str, Any]] = {taf['station']: taf for taf in tafs}
+        self._starts = {station: [period['start'] for period in taf['prevailing']]
+                        for station, taf in self.tafs.items()}
+        self._temporary_starts = {station: [group['start'] for group in taf['temporary']]
+                                  for station, taf in self.tafs.items()}
+
+        periods = [period for taf in self.tafs.values() for period in taf['prevailing']]
+        ceilings, codes = classify_conditions([period['conditions'] for period in periods])
+        for period, ceiling, code in zip(periods, ceilings.tolist(), codes.tolist()):
+            period['ceiling_ft'] = None if np.isnan(ceiling) else int(ceiling)
+            period['category'] = code
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    def __len__(self) -> int:
+        return len(self.tafs)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self.tafs
+
+    def lookup(self, code: str, when: float) -> Optional[Dict[str, Any]]:
+        """
+        Forecast conditions at a station at a time.
+
+        Args:
+            code: Station identifier
+            when: Time (unix seconds)
+
+        Returns:
+            dict: The TAF, the prevailing interval at ``when``, any overlapping
+            temporary groups (laid over the prevailing conditions) and the worst
+            ``flight_category`` among them; None when the station has no TAF or
+            ``when`` is outside its valid period
+        """
+        station = code.strip().upper()
+        taf = self.tafs.get(station)
+        if taf is None or not taf['valid_from'] <= when < taf['valid_to']:
+            return None
+        index = bisect_right(self._starts[station], when) - 1
+        if index < 0:
+            return None
+        prevailing = taf['prevailing'][index]
+
+        started = bisect_right(self._temporary_starts[station], when)
+        overlapping = [group for group in taf['temporary'][:started] if group['end'] > when]
+        merged = [{**prevailing['conditions'], **group['conditions']} for group in overlapping]
+        ceilings, codes = classify_conditions(merged) if merged else ([], [])
+
+        known = [int(category) for category in [prevailing['category'], *codes]
+                 if category != UNKNOWN]
+        return {
+            'station': station,
+            'raw_text': taf['raw_text'],
+            'issue_time': _time(taf['issue_time']),
+            'valid_from': _time(taf['valid_from']),
+            'valid_to': _time(taf['valid_to']),
+            'time': _time(when),
+            'prevailing': _period_record(prevailing, prevailing['conditions'],
+                                         prevailing['ceiling_ft'], prevailing['category']),
+            'temporary': [_period_record(group, conditions,
+                                         None if np.isnan(ceiling) else int(ceiling), code)
+                          for group, conditions, ceiling, code
+                          in zip(overlapping, merged, ceilings, codes)],
+            'flight_category': CATEGORIES[max(known)] if known else CATEGORIES[UNKNOWN],
+        }
+
+
+def _period_record(period: Dict[str, Any], conditions: Dict[str, Any], ceiling_ft: Optional[int],
+                   code: int) -> Dict[str, Any]:
+    return {
+        'change': period['change'],
+        'probability': period.get('probability'),
+        'start': _time(period['start']),
+        'end': _time(period['end']),
+        **{name: conditions[name] for name in EMPTY_CONDITIONS},
+        'cloud_layers': [dict(layer) for layer in conditions['cloud_layers']],
+        'ceiling_ft': ceiling_ft,
+        'flight_category': CATEGORIES[int(code)],
+    }
+
+
+def parse_taf_csv(lines: Iterable[str], fetched_at: Optional[float] = None) -> TafStore:
+    """
+    Parse the bulk TAF CSV feed into a store.
+
+    Only the raw text and issue time of each row are used; the decoded forecast
+    groups come from the raw text. The newest TAF per station is kept, and TAFs
+    that fail to decode are skipped.
+
+    Args:
+        lines: Text lines of the feed (a file object or a streamed response)
+        fetched_at: Ingestion time (unix seconds, defaults to now)
+    """
+    reader = csv.reader(lines)
+    header = None
+    for row in reader:
+        if row and row[0] == 'raw_text':
+            header = row
+            break
+    if header is None:
+        raise ValueError("TAF feed has no header row")
+    position = {}
+    for i, name in enumerate(header):
+        position.setdefault(name, i)
+
+    tafs: Dict[str, Dict[str, Any]] = {}
+    skipped = 0
+    for row in reader:
+        if not row or not row[0].strip():
+            continue
+        issue_time = None
+        if len(row) > position['issue_time']:
+            issue_time = _timestamp(row[position['issue_time']])
+        try:
+            taf = parse_taf(row[0], issue_time)
+        except ValueError:
+            skipped += 1
+            continue
+        existing = tafs.get(taf['station'])
+        if existing is None or taf['issue_time'] > existing['issue_time']:
+            tafs[taf['station']] = taf
+    if skipped:
+        logger.debug(f"Skipped {skipped} undecodable TAFs")
+    return TafStore(tafs.values(), fetched_at)
+
+
+def load_taf_store(source: Optional[str] = None) -> TafStore:
+    """
+    Download (or read) and parse the bulk TAF feed.
+
+    Args:
+        source: Feed URL or local file path, gzip-compressed if it ends in ``.gz``
+            (defaults to ``settings.taf_snapshot_url``)
+    """
+    source = source or settings.taf_snapshot_url
+    compressed = source.endswith('.gz')
+    if not source.startswith(('http://', 'https://')):
+        opener = gzip.open if compressed else open
+        with opener(source, 'rt', encoding='utf-8', newline='') as f:
+            return parse_taf_csv(f)
+
+    with requests.get(source, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream = gzip.GzipFile(fileobj=response.raw) if compressed else response.raw
+        return parse_taf_csv(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+
+
+def refresh_taf_store(source: Optional[str] = None) -> Optional[TafStore]:
+    """
+    Ingest new TAFs and swap them in.
+
+    Returns:
+        TafStore: The new store, or None if ingestion failed (the previous
+        store is kept)
+    """
+    global _store
+    started = time.monotonic()
+    try:
+        store = load_taf_store(source)
+    except Exception as e:
+        logger.error(f"Error refreshing TAF store: {e}")
+        return None
+    with _store_lock:
+        _store = store
+    logger.info(f"Loaded {len(store)} TAFs in {time.monotonic() - started:.2f}s")
+    return store
+
+
+def get_taf_store() -> Optional[TafStore]:
+    """
+    The current store.
+
+    None if none has loaded or it is older than ``taf_snapshot_max_age_s``.
+    """
+    with _store_lock:
+        store = _store
+    if store is None or time.time() - store.fetched_at > settings.taf_snapshot_max_age_s:
+        return None
+    return store
+
+
+def lookup_tafs(codes: Sequence[str],
+                times: Sequence[float]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Forecast conditions at several stations, each at its own time.
+
+    Returns:
+        dict: Station -> ``TafStore.lookup`` result for stations with a TAF
+        valid at the time, or None when no current store is loaded
+    """
+    store = get_taf_store()
+    if store is None:
+        return None
+    forecasts = {}
+    for code, when in zip(codes, times):
+        forecast = store.lookup(code, when)
+        if forecast is not None:
+            forecasts[forecast['station']] = forecast
+    return forecasts
+
+
+async def run_taf_updates(interval_s: float) -> None:
+    """Refresh the store forever, every ``interval_s`` seconds (run as a background task)."""
+    while True:
+        await asyncio.to_thread(refresh_taf_store)
+        await asyncio.sleep(interval_s)
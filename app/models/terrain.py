@@ -0,0 +1,216 @@
+"""
+Terrain Model.
+
+Reads SRTM-style ``.hgt`` elevation tiles from the data volume through memory
+maps and answers vectorized "maximum elevation along a segment" queries from a
+precomputed per-tile max-pyramid, so whole tiles are never loaded into memory.
+
+Tiles are 1x1 degree, named by their south-west corner (``N37W123.hgt``), and
+hold big-endian int16 metres in rows from north to south (1201 or 3601 samples
+per side). Pyramids are cached next to the tiles (or in ``terrain_cache_dir``).
+"""
+
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.navigation import great_circle_nm, sample_legs
+
+logger = logging.getLogger(__name__)
+
+FEET_PER_METER = 3.28084
+VOID_ELEVATION = -32768
+
+# Finest pyramid cell, in tile samples; level n cells are PYRAMID_FACTOR**n times larger
+PYRAMID_BASE_BLOCK = 30
+PYRAMID_FACTOR = 4
+PYRAMID_LEVELS = 3
+
+# Densest supported tile (1 arc-second SRTM); segment sampling is sized for it
+MAX_TILE_INTERVALS = 3600
+
+
+def tile_name(lat: int, lon: int) -> str:
+    """SRTM tile name for the tile whose south-west corner is (lat, lon)."""
+    return f"{'N' if lat >= 0 else 'S'}{abs(lat):02d}{'E' if lon >= 0 else 'W'}{abs(lon):03d}.hgt"
+
+
+class TerrainTile:
+    """A memory-mapped elevation tile and its max-pyramid (metres)."""
+
+    def __init__(self, path: str, lat: int, lon: int, cache_dir: Optional[str] = None):
+        self.path = path
+        self.lat = lat
+        self.lon = lon
+        samples = int(round(math.sqrt(os.path.getsize(path) / 2)))
+        if samples * samples * 2 != os.path.getsize(path):
+            raise ValueError(f"Unexpected elevation tile size: {path}")
+        self.samples = samples
+        self.data = np.memmap(path, dtype='>i2', mode='r', shape=(samples, samples))
+        self.pyramid = self._load_pyramid(cache_dir)
+
+    def _pyramid_path(self, cache_dir: Optional[str]) -> str:
+        directory = cache_dir or os.path.dirname(self.path)
+        base = os.path.splitext(os.path.basename(self.path))[0]
+        return os.path.join(directory, f"{base}.max{PYRAMID_BASE_BLOCK}.npz")
+
+    def _load_pyramid(self, cache_dir: Optional[str]) -> List[np.ndarray]:
+        cache_path = self._pyramid_path(cache_dir)
+        try:
+            if (os.path.exists(cache_path)
+                    and os.path.getmtime(cache_path) >= os.path.getmtime(self.path)):
+                with np.load(cache_path) as cached:
+                    return [cached[f'level{i}'] for i in range(len(cached.files))]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable terrain pyramid {cache_path}: {e}")
+
+        pyramid = self._build_pyramid()
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            np.savez(cache_path, **{f'level{i}': level for i, level in enumerate(pyramid)})
+        except OSError as e:
+            logger.warning(f"Could not cache terrain pyramid {cache_path}: {e}")
+        return pyramid
+
+    def _build_pyramid(self) -> List[np.ndarray]:
+        """Reduce the tile to block maxima one band of rows at a time."""
+        block = PYRAMID_BASE_BLOCK
+        cells = math.ceil(self.samples / block)
+        level0 = np.full((cells, cells), VOID_ELEVATION, dtype=np.int16)
+        padded_width = cells * block
+        for row in range(cells):
+            band = np.asarray(self.data[row * block:(row + 1) * block], dtype=np.int16)
+            band = np.pad(band, ((0, block - band.shape[0]), (0, padded_width - band.shape[1])),
+                          constant_values=VOID_ELEVATION)
+            level0[row] = band.reshape(block, cells, block).max(axis=(0, 2))
+
+        pyramid = [level0]
+        for _ in range(1, PYRAMID_LEVELS):
+            previous = pyramid[-1]
+            size = math.ceil(previous.shape[0] / PYRAMID_FACTOR)
+            padded = np.pad(previous, ((0, size * PYRAMID_FACTOR - previous.shape[0]),) * 2,
+                            constant_values=VOID_ELEVATION)
+            blocks = padded.reshape(size, PYRAMID_FACTOR, size, PYRAMID_FACTOR)
+            pyramid.append(blocks.max(axis=(1, 3)))
+        return pyramid
+
+    def max_at(self, lats: np.ndarray, lons: np.ndarray, level: int) -> np.ndarray:
+        """Pyramid maximum (metres) of the cells containing the points."""
+        grid = self.pyramid[level]
+        scale = (self.samples - 1) / (PYRAMID_BASE_BLOCK * PYRAMID_FACTOR ** level)
+        rows = np.clip(((self.lat + 1 - lats) * scale).astype(int), 0, grid.shape[0] - 1)
+        cols = np.clip(((lons - self.lon) * scale).astype(int), 0, grid.shape[1] - 1)
+        return grid[rows, cols]
+
+
+class TerrainEngine:
+    """Vectorized terrain queries over a directory of elevation tiles."""
+
+    def __init__(self, data_dir: str, cache_dir: Optional[str] = None):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self._tiles: Dict[Tuple[int, int], Optional[TerrainTile]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return os.path.isdir(self.data_dir) and any(
+            name.lower().endswith('.hgt') for name in os.listdir(self.data_dir))
+
+    def tile(self, lat: int, lon: int) -> Optional[TerrainTile]:
+        """Open (once) the tile with the given south-west corner, or None if absent."""
+        key = (lat, lon)
+        with self._lock:
+            if key not in self._tiles:
+                path = os.path.join(self.data_dir, tile_name(lat, lon))
+                tile = None
+                if os.path.exists(path):
+                    try:
+                        tile = TerrainTile(path, lat, lon, self.cache_dir)
+                    except Exception as e:
+                        logger.error(f"Error opening terrain tile {path}: {e}")
+                self._tiles[key] = tile
+            return self._tiles[key]
+
+    def max_elevation_at(self, lats, lons, level: int = 0) -> np.ndarray:
+        """Conservative maximum elevation (feet) around points; NaN where no tile exists."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        result = np.full(lats.shape, np.nan)
+        tile_lats = np.floor(lats).astype(int)
+        tile_lons = np.floor(lons).astype(int)
+        for tile_lat, tile_lon in set(zip(tile_lats.tolist(), tile_lons.tolist())):
+            tile = self.tile(tile_lat, tile_lon)
+            if tile is None:
+                continue
+            mask = (tile_lats == tile_lat) & (tile_lons == tile_lon)
+            level_used = min(level, len(tile.pyramid) - 1)
+            elevations = tile.max_at(lats[mask], lons[mask], level_used).astype(float)
+            elevations[elevations == VOID_ELEVATION] = np.nan
+            result[mask] = elevations * FEET_PER_METER
+        return result
+
+    def max_elevation_along(self, lat1, lon1, lat2, lon2, level: int = 0) -> np.ndarray:
+        """
+        Maximum terrain elevation (feet) along many segments at once.
+
+        Segments are sampled at half the pyramid cell size so every cell they cross
+        is visited; results are conservative (cell maxima). NaN where no terrain
+        data covers a segment.
+        """
+        lat1, lon1, lat2, lon2 = (np.atleast_1d(np.asarray(a, dtype=float))
+                                  for a in (lat1, lon1, lat2, lon2))
+        if not len(lat1):
+            return np.empty(0)
+        cell_nm = PYRAMID_BASE_BLOCK * PYRAMID_FACTOR ** level / MAX_TILE_INTERVALS * 60.0
+        distances = great_circle_nm(lat1, lon1, lat2, lon2)
+        lats, lons, leg_index, _ = sample_legs(lat1, lon1, lat2, lon2, cell_nm / 2, distances)
+        lats = np.concatenate([lats, lat1, lat2])
+        lons = np.concatenate([lons, lon1, lon2])
+        leg_index = np.concatenate([leg_index, np.arange(len(lat1)), np.arange(len(lat1))])
+
+        elevations = self.max_elevation_at(lats, lons, level)
+        result = np.full(len(lat1), -np.inf)
+        valid = ~np.isnan(elevations)
+        np.maximum.at(result, leg_index[valid], elevations[valid])
+        result[np.isinf(result)] = np.nan
+        return result
+
+    def segments_clear(self, lat1, lon1, lat2, lon2, altitude_ft: float,
+                       clearance_ft: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Check segments against a minimum terrain clearance.
+
+        Starts at the coarsest pyramid level and refines only segments that fail
+        there, so typical queries touch a handful of coarse cells.
+
+        Returns:
+            (clear, max_elevation_ft) arrays; segments without terrain data count as clear.
+        """
+        lat1, lon1, lat2, lon2 = (np.atleast_1d(np.asarray(a, dtype=float))
+                                  for a in (lat1, lon1, lat2, lon2))
+        max_elevation = np.full(len(lat1), np.nan)
+        pending = np.arange(len(lat1))
+        for level in range(PYRAMID_LEVELS - 1, -1, -1):
+            if not len(pending):
+                break
+            elevation = self.max_elevation_along(lat1[pending], lon1[pending],
+                                                 lat2[pending], lon2[pending], level)
+            max_elevation[pending] = elevation
+            failing = ~np.isnan(elevation) & (elevation + clearance_ft > altitude_ft)
+            pending = pending[failing]
+        clear = np.isnan(max_elevation) | (max_elevation + clearance_ft <= altitude_ft)
+        return clear, max_elevation
+
+
+_terrain_engine = TerrainEngine(settings.terrain_data_dir, settings.terrain_cache_dir)
+
+
+def get_terrain_engine() -> TerrainEngine:
+    """Return the process-wide terrain engine."""
+    return _terrain_engine
@@ -0,0 +1,242 @@
+"""
+Airport Vector Tiles.
+
+Mapbox Vector Tiles (MVT 2.1) of airports for the map, cut from the spatial
+airport index. Low zooms only show larger airports and thin them to one per
+screen cell; every feature carries its current flight category from the METAR
+snapshot. Encoded tiles are kept in an LRU cache that is invalidated when the
+airport dataset or the METAR snapshot changes, so panning over cached areas
+costs a dictionary lookup per tile.
+
+Only point layers are needed, so tiles are encoded directly in protobuf wire
+format rather than through a vector tile library.
+"""
+
+import logging
+import math
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.models.airport_index import get_airport_dataset_version, get_airport_index
+from app.models.flight_category import CATEGORIES
+from app.models.lru_cache import VersionedLRUCache
+from app.models.metar_snapshot import get_metar_snapshot
+
+logger = logging.getLogger(__name__)
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_ZOOM = 22
+MAX_LATITUDE = 85.0511287798
+
+# Lowest zoom at which each airport type appears, and its drawing priority
+MIN_ZOOM_BY_TYPE = {
+    'large_airport': 0,
+    'medium_airport': 5,
+    'small_airport': 8,
+    'seaplane_base': 9,
+    'heliport': 11,
+}
+DEFAULT_MIN_ZOOM = 10
+TYPE_RANK = ['large_airport', 'medium_airport', 'small_airport', 'seaplane_base', 'heliport']
+
+# Below this zoom airports are thinned to one per cell of this many screen pixels (of 256)
+FULL_DETAIL_ZOOM = 10
+THINNING_CELL_PX = 16
+
+MVT_POINT = 1
+MOVE_TO = 1
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a web mercator tile in degrees."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def _tile_coordinates(lat: float, lon: float, z: int, x: int, y: int) -> Tuple[int, int]:
+    """Integer tile-local coordinates (0..TILE_EXTENT, y down) of a point."""
+    n = 2 ** z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    world_x = (lon + 180.0) / 360.0 * n
+    phi = math.radians(lat)
+    world_y = (1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2 * n
+    return round((world_x - x) * TILE_EXTENT), round((world_y - y) * TILE_EXTENT)
+
+
+def airport_tile_features(z: int, x: int, y: int, airport_index=None,
+                          metar_table=None) -> List[Dict[str, Any]]:
+    """
+    Airport features of one tile, before encoding.
+
+    Returns:
+        list: Dicts with tile coordinates ``x``/``y`` and ``properties``
+    """
+    airport_index = get_airport_index() if airport_index is None else airport_index
+    west, south, east, north = tile_bounds(z, x, y)
+    pad_lon = (east - west) * TILE_BUFFER / TILE_EXTENT
+    pad_lat = (north - south) * TILE_BUFFER / TILE_EXTENT
+    candidates = airport_index.within_bbox(max(west - pad_lon, -180.0), max(south - pad_lat, -90.0),
+                                           min(east + pad_lon, 180.0), min(north + pad_lat, 90.0))
+
+    visible = [a for a in candidates if MIN_ZOOM_BY_TYPE.get(a.get('type'), DEFAULT_MIN_ZOOM) <= z]
+    visible.sort(key=lambda a: (TYPE_RANK.index(a['type']) if a.get('type') in TYPE_RANK
+                                else len(TYPE_RANK), a['icao']))
+
+    cell = TILE_EXTENT * THINNING_CELL_PX // 256
+    occupied = set()
+    features = []
+    for airport in visible:
+        px, py = _tile_coordinates(airport['latitude'], airport['longitude'], z, x, y)
+        if z < FULL_DETAIL_ZOOM:
+            key = (px // cell, py // cell)
+            if key in occupied:
+                continue
+            occupied.add(key)
+        properties = {
+            'icao': airport['icao'],
+            'name': airport.get('name') or '',
+            'type': airport.get('type') or '',
+        }
+        elevation = _elevation_ft(airport.get('elevation'))
+        if elevation is not None:
+            properties['elevation'] = elevation
+        if metar_table is not None:
+            row = metar_table.index.get(airport['icao'])
+            if row is not None:
+                properties['flight_category'] = CATEGORIES[metar_table.category[row]]
+        features.append({'x': px, 'y': py, 'properties': properties})
+    return features
+
+
+def _elevation_ft(value: Any) -> Optional[int]:
+    """Field elevation as whole feet, None when missing or not numeric."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _value(value: Any) -> bytes:
+    """Encode a feature property as an MVT Value message."""
+    if isinstance(value, bool):
+        return _uint_field(7, int(value))
+    if isinstance(value, int):
+        return _uint_field(6, _zigzag(value))
+    if isinstance(value, float):
+        return _varint(3 << 3 | 1) + struct.pack('<d', value)
+    return _field(1, str(value).encode('utf-8'))
+
+
+def encode_point_layer(name: str, features: Sequence[Dict[str, Any]],
+                       extent: int = TILE_EXTENT) -> bytes:
+    """
+    Encode point features as one MVT layer message.
+
+    Property keys and values are deduplicated into the layer's key/value tables.
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    encoded_features = []
+    for feature_id, feature in enumerate(features, start=1):
+        tags = []
+        for key, value in feature['properties'].items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        # One MoveTo command with a single (dx, dy) from the tile origin
+        geometry = [(MOVE_TO & 0x7) | (1 << 3),
+                    _zigzag(int(feature['x'])), _zigzag(int(feature['y']))]
+        message = b''.join([
+            _uint_field(1, feature_id),
+            _field(2, b''.join(_varint(tag) for tag in tags)),
+            _uint_field(3, MVT_POINT),
+            _field(4, b''.join(_varint(command) for command in geometry)),
+        ])
+        encoded_features.append(_field(2, message))
+
+    return b''.join([
+        _uint_field(15, 2),
+        _field(1, name.encode('utf-8')),
+        *encoded_features,
+        *(_field(3, key.encode('utf-8')) for key in keys),
+        *(_field(4, _value(value)) for _, value in values),
+        _uint_field(5, extent),
+    ])
+
+
+def encode_tile(layers: Dict[str, Sequence[Dict[str, Any]]]) -> bytes:
+    """Encode a tile from point layers (name -> features)."""
+    return b''.join(_field(3, encode_point_layer(name, features))
+                    for name, features in layers.items())
+
+
+class VectorTileCache(VersionedLRUCache):
+    """
+    LRU cache of encoded tiles.
+
+    Entries are tagged with the (airport dataset version, METAR snapshot time)
+    they were built from and dropped as soon as either changes.
+    """
+
+    def __init__(self, max_size=2048):
+        super().__init__(max_size)
+
+
+_tile_cache = VectorTileCache(settings.tile_cache_size)
+
+
+def get_tile_cache() -> VectorTileCache:
+    """Return the process-wide vector tile cache."""
+    return _tile_cache
+
+
+def get_airport_tile(z: int, x: int, y: int) -> bytes:
+    """
+    Encoded airport tile, from the cache when the data it was built from is unchanged.
+
+    Args:
+        z, x, y: Tile coordinates (validated by the caller)
+
+    Returns:
+        bytes: MVT tile with an ``airports`` layer (empty bytes for an empty tile)
+    """
+    airport_index = get_airport_index()
+    metar_table = get_metar_snapshot()
+    version = (get_airport_dataset_version(),
+               metar_table.fetched_at if metar_table is not None else None)
+    tile = _tile_cache.get((z, x, y), version)
+    if tile is None:
+        features = airport_tile_features(z, x, y, airport_index, metar_table)
+        tile = encode_tile({'airports': features}) if features else b''
+        _tile_cache.put((z, x, y), version, tile)
+    return tile
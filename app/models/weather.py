@@ -3,6 +3,8 @@ import os
 import logging
 from datetime import datetime, timedelta
 
+from app.models.overlay_tiles import overlay_tile_urls
+
 logger = logging.getLogger(__name__)
 
 def get_weather_data(lat, lon, days=7, overlays=None):
@@ -215,39 +217,16 @@ def get_overlay_urls(lat, lon, overlays, api_key):
         lat (float): Latitude
         lon (float): Longitude
         overlays (list): List of active overlays
-        api_key (str): OpenWeatherMap API key
+        api_key (str): OpenWeatherMap API key (overlays are only offered when configured)
         
     Returns:
-        dict: URLs for each requested overlay
+        dict: Proxy tile URLs for each requested overlay
     """
     if not api_key:
         return {}
-        
-    # Base zoom level - can be adjusted based on user preference
-    zoom = 10
-    
-    # Calculate tile coordinates
-    n = 2.0 ** zoom
-    x_tile = int((lon + 180.0) / 360.0 * n)
-    y_tile = int((1.0 - (lat + 90.0) / 360.0) * n)
-    
-    overlay_urls = {}
-    
-    # Map overlay types to their OpenWeatherMap layer codes
-    overlay_types = {
-        'clouds': 'clouds_new',
-        'precipitation': 'precipitation_new',
-        'wind': 'wind_new',
-        'temp': 'temp_new'
-    }
-    
-    # Generate URLs for each requested overlay
-    for overlay in overlays:
-        if overlay in overlay_types:
-            layer = overlay_types[overlay]
-            overlay_urls[overlay] = f"https://tile.openweathermap.org/map/{layer}/{zoom}/{x_tile}/{y_tile}.png?appid={api_key}"
-    
-    return overlay_urls
+
+    # Tiles are served through the overlay proxy, which holds the API key
+    return overlay_tile_urls(lat, lon, overlays, zoom=10)
 
 def get_fallback_weather_data(lat, lon, days=7):
     """
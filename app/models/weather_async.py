@@ -11,6 +11,10 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 
+from app.config import settings
+from app.models.grib_forecast import grib_weather_data
+from app.models.overlay_tiles import overlay_tile_urls
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +40,17 @@ async def get_weather_data_async(
         # Ensure days is within valid range
         days = max(1, min(16, days))
         
+        # Local model files answer without any external request when selected
+        if settings.forecast_backend == 'grib':
+            grib_data = await asyncio.to_thread(grib_weather_data, lat, lon, days)
+            if grib_data is not None:
+                api_key = os.getenv('OPENWEATHERMAP_API_KEY')
+                grib_data['overlays'] = {}
+                if api_key:
+                    grib_data['overlays'] = await get_overlay_urls_async(None, lat, lon, overlays,
+                                                                         api_key)
+                return grib_data
+        
         # Create async HTTP client
         async with httpx.AsyncClient(timeout=30.0) as client:
             # Fetch data from multiple sources concurrently
@@ -208,41 +223,16 @@ async def get_overlay_urls_async(
         lat: Latitude
         lon: Longitude
         overlays: List of requested overlays
-        api_key: OpenWeatherMap API key
+        api_key: OpenWeatherMap API key (overlays are only offered when configured)
         
     Returns:
-        Dictionary of overlay URLs
+        Dictionary of proxy tile URLs
     """
     if not overlays or not api_key:
         return {}
     
-    overlay_urls = {}
-    
-    try:
-        # OpenWeatherMap map layers
-        zoom = 6
-        x = int((lon + 180) / 360 * (2 ** zoom))
-        y = int((1 - (lat + 90) / 180) * (2 ** zoom))
-        
-        layer_map = {
-            'precipitation': 'precipitation_new',
-            'clouds': 'clouds_new',
-            'pressure': 'pressure_new',
-            'wind': 'wind_new',
-            'temperature': 'temp_new'
-        }
-        
-        for overlay in overlays:
-            if overlay in layer_map:
-                layer = layer_map[overlay]
-                url = f"https://tile.openweathermap.org/map/{layer}/{zoom}/{x}/{y}.png?appid={api_key}"
-                overlay_urls[overlay] = url
-        
-        return overlay_urls
-        
-    except Exception as e:
-        logger.error(f"Error generating overlay URLs: {e}")
-        return {}
+    # Tiles are served through the overlay proxy, which holds the API key
+    return overlay_tile_urls(lat, lon, overlays, zoom=6)
 
 
 async def get_fallback_weather_data_async(
@@ -0,0 +1,371 @@
+"""
+Winds and Temperatures Aloft.
+
+Ingests the FB (formerly FD) winds/temps aloft forecast text product into a
+station x altitude x valid-time table and interpolates it for any points and
+cruise altitudes: inverse-distance weighting over the nearest forecast
+stations, then linearly in altitude and valid time, all as array operations.
+The table is refreshed in the background, so planners and route summaries
+query cruise-level winds without upstream calls.
+
+``WindsAloftGrid`` offers the same ``winds_aloft``/``winds_aloft_profile``
+interface as the forecast cache, so either can drive wind-aware planning
+(``planner_wind_source``).
+"""
+
+import asyncio
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+from app.config import settings
+from app.models.airport_index import get_airport_index
+from app.models.navigation import great_circle_nm, wind_components_from_direction
+
+logger = logging.getLogger(__name__)
+
+# Stations blended for each query point
+NEIGHBOURS = 4
+# Within this distance a station's forecast is used as is
+EXACT_DISTANCE_NM = 1.0
+# A forecast stays usable this long after its valid time
+USE_WINDOW_S = 6 * 3600
+# Standard lapse rate used to extend temperatures below the lowest forecast level
+LAPSE_RATE_C_PER_FT = 0.00198
+
+_HEADER = re.compile(r'^FT\s')
+_DAY_TIME = re.compile(r'(\d{2})(\d{2})(\d{2})Z')
+_STATION = re.compile(r'^([A-Z0-9]{3})\s')
+
+
+def decode_wind_group(group: str) -> Tuple[float, float, float]:
+    """
+    Decode one FB group such as ``2315+14``, ``266038`` or ``9900``.
+
+    Returns:
+        tuple: (direction from, degrees true; speed, knots; temperature, degC),
+        NaN where not forecast. Light and variable is calm (direction 0, speed 0).
+    """
+    group = group.strip()
+    if len(group) < 4 or not group[:4].isdigit():
+        return math.nan, math.nan, math.nan
+    direction, speed = int(group[:2]), int(group[2:4])
+    temperature = math.nan
+    if len(group) > 4:
+        sign = group[4]
+        # Temperatures above 24000 ft are always negative and carry no sign
+        if sign in '+-':
+            temperature = float(group[5:]) * (-1 if sign == '-' else 1)
+        else:
+            temperature = -float(group[4:])
+    if direction == 99 and speed == 0:
+        return 0.0, 0.0, temperature
+    if direction > 36:
+        # Speeds of 100 kt and more add 50 to the direction code
+        direction, speed = direction - 50, speed + 100
+    return float(direction * 10 % 360), float(speed), temperature
+
+
+def _resolve(day_time: str, reference: datetime) -> Optional[float]:
+    """Unix time of a ``DDHHMMZ`` group, in the month closest to the reference time."""
+    match = _DAY_TIME.search(day_time)
+    if match is None:
+        return None
+    day, hour, minute = (int(part) for part in match.groups())
+    candidates = []
+    for months in (-1, 0, 1):
+        year, month = divmod(reference.year * 12 + reference.month - 1 + months, 12)
+        month += 1
+        try:
+            candidates.append(datetime(year, month, day, hour, minute, tzinfo=timezone.utc))
+        except ValueError:
+            continue
+    return min(candidates, key=lambda dt: abs(dt - reference)).timestamp() if candidates else None
+
+
+def parse_winds_aloft(text: str, reference_time: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Parse FB winds/temps aloft bulletins.
+
+    Columns are located from the ``FT`` header line (each altitude label ends
+    where its column ends), so stations with blank levels parse correctly.
+
+    Args:
+        text: Product text, possibly several concatenated bulletins
+        reference_time: Time near issuance (unix seconds, defaults to now) used to
+            resolve the day-of-month timestamps
+
+    Returns:
+        list: Bulletins with ``based_on``, ``valid``, ``altitudes`` and per-station
+        decoded ``(direction, speed, temperature)`` lists
+    """
+    reference_time = time.time() if reference_time is None else reference_time
+    reference = datetime.fromtimestamp(reference_time, tz=timezone.utc)
+    bulletins = []
+    bulletin = None
+    columns = None
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line.startswith('DATA BASED ON'):
+            bulletin = {
+                'based_on': _resolve(line, reference),
+                'valid': None,
+                'altitudes': [],
+                'stations': {},
+            }
+            bulletins.append(bulletin)
+            columns = None
+        elif bulletin is None:
+            continue
+        elif line.startswith('VALID'):
+            bulletin['valid'] = _resolve(line.split()[1], reference)
+        elif _HEADER.match(line):
+            columns = [(match.end(), int(match.group())) for match in re.finditer(r'\d+', line)]
+            bulletin['altitudes'] = [altitude for _, altitude in columns]
+        elif columns and _STATION.match(line):
+            start = 3
+            groups = []
+            for end, _ in columns:
+                groups.append(decode_wind_group(line[start:end]))
+                start = end
+            bulletin['stations'][line[:3]] = groups
+    return [b for b in bulletins
+            if b['valid'] is not None and len(b['altitudes']) > 1 and b['stations']]
+
+
+class WindsAloftGrid:
+    """
+    Forecast winds and temperatures per station, altitude and valid time.
+
+    ``u``/``v`` (knots, direction of travel) and ``temperature`` (degC) are
+    arrays shaped (stations, altitudes, times) with NaN where not forecast.
+    """
+
+    def __init__(self, stations: Sequence[str], lats, lons, altitudes_ft, times, u, v, temperature):
+        self.stations = list(stations)
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.altitudes = np.asarray(altitudes_ft, dtype=float)
+        self.times = np.asarray(times, dtype=float)
+        self.u = np.asarray(u, dtype=float)
+        self.v = np.asarray(v, dtype=float)
+        self.temperature = np.asarray(temperature, dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    @property
+    def expires(self) -> float:
+        return float(self.times[-1]) + USE_WINDOW_S
+
+    def _at_time(self, when: float) -> np.ndarray:
+        """(field, stations, altitudes) values at a time, falling back to a known neighbour."""
+        fields = np.stack([self.u, self.v, self.temperature])
+        position = float(np.interp(when, self.times, np.arange(len(self.times))))
+        t0 = int(math.floor(position))
+        t1 = min(t0 + 1, len(self.times) - 1)
+        frac = position - t0
+        a, b = fields[..., t0], fields[..., t1]
+        blended = a * (1 - frac) + b * frac
+        return np.where(np.isnan(a), b, np.where(np.isnan(b), a, blended))
+
+    def _levels(self, lats, lons, when: Optional[float]) -> np.ndarray:
+        """(field, points, altitudes) values at every forecast altitude, missing levels filled."""
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        fields = self._at_time(time.time() if when is None else when)
+
+        distance = great_circle_nm(lats[:, None], lons[:, None],
+                                   self.lats[None, :], self.lons[None, :])
+        k = min(NEIGHBOURS, len(self.stations))
+        nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+        nearest_nm = np.take_along_axis(distance, nearest, axis=1)
+        weights = 1.0 / np.maximum(nearest_nm, EXACT_DISTANCE_NM) ** 2
+        exact = nearest_nm <= EXACT_DISTANCE_NM
+        weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), weights)
+
+        values = fields[:, nearest]  # (field, points, neighbours, altitudes)
+        known = ~np.isnan(values)
+        total = (weights[None, :, :, None] * known).sum(axis=2)
+        with np.errstate(invalid='ignore'):
+            levels = (np.nan_to_num(values) * weights[None, :, :, None]).sum(axis=2) / total
+
+        # Low levels are omitted near high terrain and 3000 ft carries no temperature:
+        # take the nearest level above (or below), with a lapse-rate correction for temperature
+        source = np.where(np.isnan(levels), -1, np.arange(len(self.altitudes)))
+        for i in range(len(self.altitudes) - 2, -1, -1):
+            source[..., i] = np.where(source[..., i] < 0, source[..., i + 1], source[..., i])
+        for i in range(1, len(self.altitudes)):
+            source[..., i] = np.where(source[..., i] < 0, source[..., i - 1], source[..., i])
+        filled = np.take_along_axis(levels, np.maximum(source, 0), axis=-1)
+        source_altitude = self.altitudes[np.maximum(source[2], 0)]
+        filled[2] += (source_altitude - self.altitudes) * LAPSE_RATE_C_PER_FT
+        return np.where(source < 0, np.nan, filled)
+
+    def _vertical(self, levels: np.ndarray, altitude_ft) -> np.ndarray:
+        """Interpolate (field, points, altitudes) levels at point altitudes -> (field, points)."""
+        altitude = np.broadcast_to(np.asarray(altitude_ft, dtype=float), levels.shape[1:2])
+        upper = np.clip(np.searchsorted(self.altitudes, altitude), 1, len(self.altitudes) - 1)
+        lower = upper - 1
+        span = self.altitudes[upper] - self.altitudes[lower]
+        weight = np.clip((altitude - self.altitudes[lower]) / span, 0.0, 1.0)
+        rows = np.arange(levels.shape[1])
+        return levels[:, rows, lower] * (1 - weight) + levels[:, rows, upper] * weight
+
+    def winds_aloft(self, lats, lons, altitude_ft, when: Optional[float] = None,
+                    fetch: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wind vectors (u east, v north, knots, direction of travel) at points and altitudes.
+
+        ``altitude_ft`` may be a scalar or one altitude per point. Missing data
+        yields calm wind. ``fetch`` is accepted for compatibility with the
+        forecast cache; the table never fetches.
+        """
+        u, v, _ = self._vertical(self._levels(lats, lons, when), altitude_ft)
+        return np.nan_to_num(u), np.nan_to_num(v)
+
+    def winds_aloft_profile(self, lats, lons, altitudes_ft: Sequence[float],
+                            when: Optional[float] = None,
+                            fetch: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Wind vectors at every point for each of several altitudes, shaped (points, altitudes)."""
+        levels = self._levels(lats, lons, when)
+        profile = np.stack([self._vertical(levels, altitude) for altitude in altitudes_ft], axis=-1)
+        return np.nan_to_num(profile[0]), np.nan_to_num(profile[1])
+
+    def has_forecast(self, lats, lons, when: Optional[float] = None) -> np.ndarray:
+        """Whether any nearby station forecasts winds at some altitude for each point."""
+        u = self._levels(lats, lons, when)[0]
+        return ~np.isnan(u).all(axis=-1)
+
+    def conditions(self, lats, lons, altitude_ft,
+                   when: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Wind direction (from), speed (knots) and temperature (degC) at points and altitudes."""
+        u, v, temperature = self._vertical(self._levels(lats, lons, when), altitude_ft)
+        return {
+            'wind_direction_deg': np.mod(np.degrees(np.arctan2(-u, -v)), 360.0),
+            'wind_speed_kt': np.hypot(u, v),
+            'temperature_c': temperature,
+        }
+
+
+def _station_position(station: str, airport_index) -> Optional[Tuple[float, float]]:
+    for code in (station, f'K{station}', f'P{station}'):
+        airport = airport_index.get(code)
+        if airport is not None:
+            return airport['latitude'], airport['longitude']
+    return None
+
+
+def build_winds_aloft_grid(bulletins: Iterable[Dict[str, Any]],
+                           airport_index=None) -> Optional[WindsAloftGrid]:
+    """
+    Combine parsed bulletins into a grid.
+
+    Stations are placed at the matching airport (FB identifiers are IATA-style);
+    unknown stations are skipped. Where bulletins overlap, the newest wins.
+
+    Returns:
+        WindsAloftGrid: The grid, or None if no station could be placed
+    """
+    airport_index = get_airport_index() if airport_index is None else airport_index
+    bulletins = sorted(bulletins, key=lambda b: b['based_on'] or 0)
+    altitudes = sorted({altitude for b in bulletins for altitude in b['altitudes']})
+    times = sorted({b['valid'] for b in bulletins})
+    positions = {}
+    for bulletin in bulletins:
+        for station in bulletin['stations']:
+            if station not in positions:
+                positions[station] = _station_position(station, airport_index)
+    stations = sorted(station for station, position in positions.items() if position is not None)
+    if not stations:
+        return None
+    skipped = sorted(station for station, position in positions.items() if position is None)
+    if skipped:
+        logger.debug(f"Skipping winds aloft stations without a position: {', '.join(skipped)}")
+
+    row = {station: i for i, station in enumerate(stations)}
+    column = {altitude: i for i, altitude in enumerate(altitudes)}
+    values = np.full((3, len(stations), len(altitudes), len(times)), np.nan)
+    for bulletin in bulletins:
+        t = times.index(bulletin['valid'])
+        cols = [column[altitude] for altitude in bulletin['altitudes']]
+        for station, groups in bulletin['stations'].items():
+            if station in row:
+                values[:, row[station], cols, t] = np.array(groups, dtype=float).T
+
+    u, v = wind_components_from_direction(values[1], values[0])
+    return WindsAloftGrid(stations, [positions[s][0] for s in stations],
+                          [positions[s][1] for s in stations], altitudes, times, u, v, values[2])
+
+
+def load_winds_aloft(sources: Optional[Sequence[str]] = None,
+                     reference_time: Optional[float] = None,
+                     airport_index=None) -> Optional[WindsAloftGrid]:
+    """
+    Read (or download) FB products and build the grid.
+
+    Args:
+        sources: URLs or local file paths (defaults to ``settings.winds_aloft_sources``)
+    """
+    bulletins = []
+    for source in sources or settings.winds_aloft_sources:
+        if source.startswith(('http://', 'https://')):
+            response = requests.get(source, timeout=15)
+            response.raise_for_status()
+            text = response.text
+        else:
+            with open(source, encoding='utf-8') as f:
+                text = f.read()
+        bulletins.extend(parse_winds_aloft(text, reference_time))
+    return build_winds_aloft_grid(bulletins, airport_index) if bulletins else None
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def refresh_winds_aloft(sources: Optional[Sequence[str]] = None) -> Optional[WindsAloftGrid]:
+    """Ingest the FB products and swap the grid in (the old grid is kept on failure)."""
+    global _grid
+    try:
+        grid = load_winds_aloft(sources)
+    except Exception as e:
+        logger.error(f"Error refreshing winds aloft: {e}")
+        return None
+    if grid is not None:
+        with _grid_lock:
+            _grid = grid
+        logger.info(f"Loaded winds aloft for {len(grid)} stations at {len(grid.times)} valid times")
+    return grid
+
+
+def get_winds_aloft() -> Optional[WindsAloftGrid]:
+    """The current winds aloft grid, or None if none is loaded or its forecasts have expired."""
+    with _grid_lock:
+        grid = _grid
+    if grid is None or time.time() > grid.expires:
+        return None
+    return grid
+
+
+def get_wind_source(forecast_cache):
+    """Winds for planning: the FB grid when selected and current, otherwise the forecast cache."""
+    if settings.planner_wind_source == 'fb':
+        grid = get_winds_aloft()
+        if grid is not None:
+            return grid
+    return forecast_cache
+
+
+async def run_winds_aloft_updates(interval_s: float) -> None:
+    """Refresh the winds aloft grid every ``interval_s`` seconds (run as a background task)."""
+    while True:
+        await asyncio.to_thread(refresh_winds_aloft)
+        await asyncio.sleep(interval_s)
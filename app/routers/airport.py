@@ -6,22 +6,33 @@ Provides endpoints for airport information, search, and METAR data.
 
 import asyncio
 import logging
-from typing import Dict, Any, List
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 
 from fastapi import APIRouter, HTTPException, Body, Query, Request, Path
+from fastapi.responses import JSONResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from app.config import settings
 from app.schemas import (
     AirportSearchRequest,
     AirportSearchResponse,
     AirportResponse,
     MetarRequest,
     MetarResponse,
+    MetarData,
+    MetarMapResponse,
+    MetarHistoryResponse,
+    TafResponse,
     AirportInfo,
     AirportBasic,
 )
 from app.models.airport import get_airports, get_airport_coordinates, get_metar_data, load_airport_cache
+from app.models.flight_category import CATEGORIES
+from app.models.metar_history import get_metar_history, metar_trend, observation_records
+from app.models.metar_map import query_metar_bbox
+from app.models.taf import get_taf_store
 
 logger = logging.getLogger(__name__)
 
@@ -303,7 +314,9 @@ async def get_metar_weather(
                 detail="Failed to fetch METAR data"
             )
         
-        return MetarResponse(metar_data=metar_data)
+        return MetarResponse(
+            metar_data={icao: _metar_data(icao, metar) for icao, metar in metar_data.items()}
+        )
         
     except HTTPException:
         raise
@@ -315,6 +328,158 @@ async def get_metar_weather(
         )
 
 
+@router.get("/metar/bbox", response_model=MetarMapResponse)
+@limiter.limit("60/minute")
+async def get_metar_bbox(
+    request: Request,
+    west: float = Query(..., ge=-180, le=180, description="Western longitude"),
+    south: float = Query(..., ge=-90, le=90, description="Southern latitude"),
+    east: float = Query(..., ge=-180, le=180, description="Eastern longitude"),
+    north: float = Query(..., ge=-90, le=90, description="Northern latitude"),
+    category: Optional[str] = Query(None, description="Comma-separated flight categories "
+                                                      "to include (e.g. IFR,LIFR)"),
+) -> JSONResponse:
+    """
+    Flight categories of all METAR stations in a bounding box.
+
+    Served from the in-memory METAR snapshot with no upstream requests. The
+    payload is column-oriented (one array per field) and is serialized
+    directly, bypassing per-item model validation, so viewport-sized maps of
+    thousands of stations stay fast.
+    """
+    try:
+        if south > north:
+            raise HTTPException(status_code=400, detail="south must not exceed north")
+        categories = None
+        if category:
+            names = {name.upper(): name for name in CATEGORIES}
+            requested = [name.strip().upper() for name in category.split(',') if name.strip()]
+            unknown = [name for name in requested if name not in names]
+            if unknown:
+                raise HTTPException(status_code=400,
+                                    detail=f"Unknown flight category: {', '.join(unknown)}")
+            categories = [names[name] for name in requested]
+
+        result = await asyncio.to_thread(query_metar_bbox, west, south, east, north, categories)
+        if result is None:
+            raise HTTPException(status_code=503, detail="METAR snapshot not loaded")
+        return JSONResponse(content=result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_metar_bbox: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="METAR map service temporarily unavailable"
+        )
+
+
+@router.get("/metar/{icao}/history", response_model=MetarHistoryResponse)
+@limiter.limit("60/minute")
+async def get_metar_history_trend(
+    request: Request,
+    icao: str = Path(..., description="ICAO station identifier"),
+    hours: float = Query(6, gt=0, le=settings.metar_history_hours,
+                         description="Hours of history to include"),
+) -> MetarHistoryResponse:
+    """
+    Recent METAR observations of a station and whether conditions are improving.
+
+    Served from the in-memory observation history, which is fed by the bulk
+    METAR snapshot and METAR requests, so no upstream request is made.
+
+    Raises:
+        HTTPException: 404 if no observations of the station were recorded
+    """
+    try:
+        history = get_metar_history().history(icao, hours)
+        if history is None or not len(history['observed']):
+            raise HTTPException(status_code=404, detail=f"No METAR history for {icao.upper()}")
+
+        observations = observation_records(history)
+        return MetarHistoryResponse(icao=icao.upper(), hours=hours, count=len(observations),
+                                    trend=metar_trend(history), observations=observations)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_metar_history_trend: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="METAR history service temporarily unavailable"
+        )
+
+
+@router.get("/taf/{code}", response_model=TafResponse)
+@limiter.limit("60/minute")
+async def get_taf(
+    request: Request,
+    code: str = Path(..., description="ICAO station identifier"),
+    at: Optional[datetime] = Query(None, description="Time the forecast applies to, e.g. an ETA "
+                                                     "(defaults to now)"),
+) -> TafResponse:
+    """
+    TAF conditions at a station at a given time.
+
+    Served from the in-memory TAF store: the prevailing forecast interval at
+    the time, any TEMPO/PROB/BECMG groups in effect, and the worst flight
+    category among them.
+
+    Raises:
+        HTTPException: 404 if the station has no TAF valid at the time, 503 if
+        no TAFs are loaded
+    """
+    try:
+        store = get_taf_store()
+        if store is None:
+            raise HTTPException(status_code=503, detail="TAF snapshot not loaded")
+        if at is None:
+            when = datetime.now(timezone.utc)
+        else:
+            when = at if at.tzinfo is not None else at.replace(tzinfo=timezone.utc)
+        forecast = store.lookup(code, when.timestamp())
+        if forecast is None:
+            raise HTTPException(status_code=404,
+                                detail=f"No TAF for {code.upper()} valid at {when.isoformat()}")
+        return TafResponse(**forecast)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_taf: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="TAF service temporarily unavailable"
+        )
+
+
+def _metar_data(icao: str, metar: Dict[str, Any]) -> MetarData:
+    """Map a decoded METAR from the model layer onto the MetarData schema."""
+    observation_time = metar.get('observation_time')
+    try:
+        observed = datetime.strptime(observation_time, "%Y-%m-%d %H:%M UTC")
+        observed = observed.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        observed = None
+    return MetarData(
+        icao=icao,
+        raw_text=metar.get('raw_text') or '',
+        observation_time=observed,
+        temperature=metar.get('temperature_c'),
+        dewpoint=metar.get('dewpoint_c'),
+        wind_speed=metar.get('wind_speed_kt'),
+        wind_direction=metar.get('wind_dir_degrees'),
+        wind_gust=metar.get('wind_gust_kt'),
+        visibility=metar.get('visibility_statute_mi'),
+        altimeter=metar.get('altim_in_hg'),
+        sky_conditions=[f"{layer['cover']}{int(layer['base']) // 100:03d}"
+                        for layer in metar.get('cloud_layers') or []],
+        weather_phenomena=(metar.get('wx_string') or '').split(),
+        flight_category=metar.get('flight_category'),
+    )
+
+
 # Additional airport-related endpoints can be added here
 # Examples:
 # - Airport details with runway information
@@ -0,0 +1,149 @@
+"""
+Condition Alerts Router.
+
+Provides endpoints to manage condition alert subscriptions and a
+server-sent events stream delivering the alerts.
+"""
+
+import json
+import logging
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Body, Header, Query, Request, Path
+from fastapi.responses import StreamingResponse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.config import settings
+from app.models.alerts import get_alert_engine
+from app.schemas import (
+    AlertSubscription,
+    AlertSubscriptionList,
+    AlertSubscriptionRequest,
+    SuccessResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+limiter = Limiter(key_func=get_remote_address)
+
+
+@router.post("/alerts/subscriptions", response_model=AlertSubscription)
+@limiter.limit("60/minute")
+async def create_alert_subscription(
+    request: Request,
+    subscription_request: AlertSubscriptionRequest = Body(..., description="Alert subscription")
+) -> AlertSubscription:
+    """
+    Subscribe to a condition at a station.
+
+    Alerts are published to the client's stream when the condition starts
+    holding in a new METAR and again when it clears.
+
+    Raises:
+        HTTPException: 400 if the condition or threshold is invalid
+    """
+    try:
+        subscription = get_alert_engine().subscribe(
+            subscription_request.client_id,
+            subscription_request.station,
+            subscription_request.condition,
+            subscription_request.threshold,
+        )
+        return AlertSubscription(**subscription)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in create_alert_subscription: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Alert service temporarily unavailable"
+        )
+
+
+@router.get("/alerts/subscriptions", response_model=AlertSubscriptionList)
+@limiter.limit("60/minute")
+async def list_alert_subscriptions(
+    request: Request,
+    client_id: str = Query(..., description="Client identifier")
+) -> AlertSubscriptionList:
+    """List the subscriptions of a client."""
+    try:
+        subscriptions = get_alert_engine().subscriptions(client_id)
+        return AlertSubscriptionList(client_id=client_id,
+                                     subscriptions=[AlertSubscription(**s) for s in subscriptions])
+    except Exception as e:
+        logger.error(f"Error in list_alert_subscriptions: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Alert service temporarily unavailable"
+        )
+
+
+@router.delete("/alerts/subscriptions/{subscription_id}", response_model=SuccessResponse)
+@limiter.limit("60/minute")
+async def delete_alert_subscription(
+    request: Request,
+    subscription_id: int = Path(..., description="Subscription identifier"),
+    client_id: str = Query(..., description="Client identifier owning the subscription")
+) -> SuccessResponse:
+    """
+    Remove a subscription.
+
+    Raises:
+        HTTPException: 404 if the client has no such subscription
+    """
+    if not get_alert_engine().unsubscribe(subscription_id, client_id):
+        raise HTTPException(status_code=404, detail=f"Subscription {subscription_id} not found")
+    return SuccessResponse(message=f"Subscription {subscription_id} removed")
+
+
+@router.get("/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    client_id: str = Query(..., description="Client identifier"),
+    last_event_id: Optional[int] = Header(None, description="Id of the last alert received, "
+                                                            "to resume after it")
+) -> StreamingResponse:
+    """
+    Server-sent events stream of a client's condition alerts.
+
+    Each alert is an ``alert`` event with a JSON payload and an id numbering
+    the client's alerts. Alerts published while the client was disconnected
+    are delivered on reconnect (or after ``Last-Event-ID``), up to
+    ``alert_queue_size`` of them; every open stream of a client receives every
+    alert, and idle streams carry periodic keepalive comments.
+
+    Raises:
+        HTTPException: 404 if the client has no subscriptions
+    """
+    if get_alert_engine().channel(client_id) is None:
+        raise HTTPException(status_code=404,
+                            detail=f"No alert subscriptions for client {client_id}")
+    return StreamingResponse(
+        _event_stream(request, client_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _event_stream(request: Request, client_id: str,
+                        last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+    engine = get_alert_engine()
+    channel = engine.open_stream(client_id)
+    if channel is None:
+        return
+    try:
+        cursor = channel.cursor(last_event_id)
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            events = await channel.next_events(cursor, settings.alert_keepalive_s)
+            if not events:
+                yield ": keepalive\n\n"
+            for sequence, event in events:
+                cursor = sequence
+                yield f"event: alert\nid: {sequence}\ndata: {json.dumps(event)}\n\n"
+            channel.acknowledge(cursor)
+    finally:
+        engine.close_stream(client_id, channel)
@@ -5,15 +5,31 @@ Provides endpoints for VFR route planning, optimization, and flight plan generat
 """
 
 import asyncio
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, AsyncGenerator, List, Optional
 
 from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from app.schemas import FlightPlanRequest, FlightPlanResponse
-from app.models.flight_planner import plan_route
+from app.schemas import (
+    FlightPlanRequest,
+    FlightPlanResponse,
+    BatchFlightPlanRequest,
+    ReachabilityRequest,
+    ReachabilityResponse,
+    AircraftProfileInfo,
+    DepartureWindowRequest,
+    DepartureWindowResponse,
+)
+from app.models.aircraft import get_aircraft_profile, list_aircraft_profiles
+from app.models.airport_index import get_airport_index
+from app.models.departure_window import score_departure_window
+from app.models.flight_weather import analyze_route_weather
+from app.models.flight_planner import plan_route, PlanningContext
+from app.models.reachability import reachable_airports
 
 logger = logging.getLogger(__name__)
 
@@ -44,18 +60,7 @@ async def plan_vfr_route(
         logger.info(f"Flight planning request: {flight_request.start_code} -> {flight_request.end_code}")
         
         # Plan the route asynchronously
-        route_data = await asyncio.to_thread(
-            plan_route,
-            flight_request.start_code,
-            flight_request.end_code,
-            flight_request.aircraft_range_nm,
-            flight_request.groundspeed_kt,
-            flight_request.fuel_capacity_gal,
-            flight_request.fuel_burn_gph,
-            flight_request.avoid_terrain,
-            flight_request.plan_fuel_stops,
-            flight_request.cruising_altitude_ft
-        )
+        route_data = await asyncio.to_thread(_plan_route_for_request, flight_request)
         
         if not route_data:
             raise HTTPException(
@@ -70,8 +75,11 @@ async def plan_vfr_route(
                 detail=route_data['error']
             )
         
+        # Weather along the planned legs, within the latency budget
+        weather = await _route_weather(route_data)
+        
         # Transform the route data to match our response schema
-        response_data = _transform_route_data(route_data, flight_request)
+        response_data = _transform_route_data(route_data, flight_request, weather)
         
         return FlightPlanResponse(**response_data)
         
@@ -85,13 +93,283 @@ async def plan_vfr_route(
         )
 
 
-def _transform_route_data(route_data: Dict[str, Any], flight_request: FlightPlanRequest) -> Dict[str, Any]:
+# Maximum number of batch requests planned concurrently
+BATCH_CONCURRENCY = 8
+
+
+@router.post("/plan_routes")
+@limiter.limit("5/minute")
+async def plan_vfr_routes(
+    request: Request,
+    batch_request: BatchFlightPlanRequest = Body(..., description="Batch flight plan request")
+) -> StreamingResponse:
+    """
+    Plan many VFR routes in one call, streaming each result as it finishes.
+    
+    Requests share airport lookups, candidate corridors and route graphs, and are
+    planned in parallel. The response is newline-delimited JSON: one object per
+    request with its ``index`` in the batch and either a ``plan`` or an ``error``.
+    
+    Args:
+        request: FastAPI request object
+        batch_request: Flight planning parameters for each route
+        
+    Returns:
+        StreamingResponse: NDJSON stream of per-request results in completion order
+    """
+    flight_requests = batch_request.requests
+    logger.info(f"Batch flight planning request for {len(flight_requests)} routes")
+    
+    try:
+        context = await asyncio.to_thread(PlanningContext)
+    except Exception as e:
+        logger.error(f"Error preparing batch planning context: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Flight planning service temporarily unavailable"
+        )
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def plan_one(index: int, flight_request: FlightPlanRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                route_data = await asyncio.to_thread(_plan_route_for_request, flight_request,
+                                                     context)
+                if not route_data:
+                    return {"index": index, "error": "Failed to generate flight plan"}
+                if 'error' in route_data:
+                    return {"index": index, "error": route_data['error']}
+                weather = await _route_weather(route_data)
+                plan = FlightPlanResponse(**_transform_route_data(route_data, flight_request,
+                                                                  weather))
+                return {"index": index, "plan": plan.model_dump(mode='json')}
+            except Exception as e:
+                logger.error(f"Error planning batch route {index}: {e}")
+                return {"index": index, "error": "Flight planning service temporarily unavailable"}
+    
+    async def stream_results() -> AsyncGenerator[str, None]:
+        tasks = [asyncio.create_task(plan_one(i, fr)) for i, fr in enumerate(flight_requests)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                yield json.dumps(result) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@router.post("/reachable", response_model=ReachabilityResponse)
+@limiter.limit("10/minute")
+async def reachable(
+    request: Request,
+    reach_request: ReachabilityRequest = Body(..., description="Reachability request")
+) -> ReachabilityResponse:
+    """
+    List every airport reachable from a departure within a time, fuel and stop budget.
+    
+    Args:
+        request: FastAPI request object
+        reach_request: Departure, aircraft performance and search limits
+        
+    Returns:
+        ReachabilityResponse: Reachable airports with time, fuel and stops, and an optional
+        range polygon
+        
+    Raises:
+        HTTPException: If the search fails
+    """
+    try:
+        logger.info(f"Reachability request from {reach_request.start_code}")
+        
+        result = await asyncio.to_thread(
+            reachable_airports,
+            reach_request.start_code,
+            reach_request.groundspeed_kt,
+            fuel_capacity_gal=reach_request.fuel_capacity_gal,
+            fuel_burn_gph=reach_request.fuel_burn_gph,
+            reserve_minutes=reach_request.reserve_minutes,
+            departure_fuel_gal=reach_request.departure_fuel_gal,
+            max_time_hr=reach_request.max_time_hr,
+            max_stops=reach_request.max_stops,
+            include_polygon=reach_request.include_polygon
+        )
+        
+        if 'error' in result:
+            raise HTTPException(
+                status_code=400,
+                detail=result['error']
+            )
+        
+        return ReachabilityResponse(
+            departure=result['departure']['icao'],
+            airport_count=len(result['airports']),
+            airports=result['airports'],
+            range_polygon=result['range_polygon']
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in reachable: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Reachability service temporarily unavailable"
+        )
+
+
+@router.post("/departure_window", response_model=DepartureWindowResponse)
+@limiter.limit("10/minute")
+async def departure_window(
+    request: Request,
+    window_request: DepartureWindowRequest = Body(..., description="Departure window request")
+) -> DepartureWindowResponse:
+    """
+    Score candidate departure times for a planned route from cached hourly forecasts.
+    
+    The route is planned once; every departure in the window is then scored for
+    headwind, ceiling/visibility and precipitation risk at each point's ETA.
+    
+    Args:
+        request: FastAPI request object
+        window_request: Flight plan parameters and the departure window
+        
+    Returns:
+        DepartureWindowResponse: Scores for every departure time and the best ones
+        
+    Raises:
+        HTTPException: If planning or scoring fails
+    """
+    try:
+        logger.info(f"Departure window request: {window_request.start_code} -> "
+                    f"{window_request.end_code}")
+        
+        result = await asyncio.to_thread(_departure_window_for_request, window_request)
+        
+        if 'error' in result:
+            raise HTTPException(
+                status_code=400,
+                detail=result['error']
+            )
+        
+        return DepartureWindowResponse(**result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in departure_window: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Departure window service temporarily unavailable"
+        )
+
+
+@router.get("/aircraft_profiles", response_model=List[AircraftProfileInfo])
+@limiter.limit("30/minute")
+async def aircraft_profiles(request: Request) -> List[AircraftProfileInfo]:
+    """
+    List the aircraft performance profiles available for route planning.
+    
+    Args:
+        request: FastAPI request object
+        
+    Returns:
+        List[AircraftProfileInfo]: Profiles with cruise tables and time to climb
+    """
+    try:
+        profiles = await asyncio.to_thread(list_aircraft_profiles)
+        return [AircraftProfileInfo(**profile) for profile in profiles]
+    except Exception as e:
+        logger.error(f"Error in aircraft_profiles: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Aircraft profile service temporarily unavailable"
+        )
+
+
+def _plan_route_for_request(
+    flight_request: FlightPlanRequest,
+    context: Optional[PlanningContext] = None
+) -> Dict[str, Any]:
+    """Run the synchronous route planner for a flight request."""
+    # With an aircraft profile, tank size defaults to the profile's unless given
+    fuel_capacity_gal = flight_request.fuel_capacity_gal
+    if flight_request.aircraft and 'fuel_capacity_gal' not in flight_request.model_fields_set:
+        fuel_capacity_gal = None
+    return plan_route(
+        flight_request.start_code,
+        flight_request.end_code,
+        flight_request.aircraft_range_nm,
+        flight_request.groundspeed_kt,
+        fuel_capacity_gal,
+        flight_request.fuel_burn_gph,
+        flight_request.avoid_terrain,
+        flight_request.plan_fuel_stops,
+        flight_request.cruising_altitude_ft,
+        optimize_for=flight_request.optimize_for,
+        reserve_minutes=flight_request.reserve_minutes,
+        departure_fuel_gal=flight_request.departure_fuel_gal,
+        alternates=flight_request.alternates,
+        optimize_altitude=flight_request.optimize_altitude,
+        aircraft=flight_request.aircraft,
+        power_setting=flight_request.power_setting,
+        context=context
+    )
+
+
+def _departure_window_for_request(window_request: DepartureWindowRequest) -> Dict[str, Any]:
+    """Plan the route and score the departure window (synchronous)."""
+    route_data = _plan_route_for_request(window_request)
+    if 'error' in route_data:
+        return route_data
+    legs = route_data['legs']
+    path = [legs[0]['from']] + [leg['to'] for leg in legs]
+    index = get_airport_index()
+    waypoints = [(airport['latitude'], airport['longitude']) for airport in map(index.get, path)]
+
+    tas_kt = window_request.groundspeed_kt
+    if window_request.aircraft:
+        profile = get_aircraft_profile(window_request.aircraft)
+        tas_kt = float(profile.cruise_tas(window_request.cruising_altitude_ft,
+                                          window_request.power_setting))
+    start_time = None
+    if window_request.earliest_departure:
+        start_time = window_request.earliest_departure.timestamp()
+
+    window = score_departure_window(
+        waypoints,
+        tas_kt,
+        [leg['cruise_altitude_ft'] for leg in legs],
+        start_time=start_time,
+        window_hours=window_request.window_hours,
+        step_minutes=window_request.step_minutes
+    )
+    return {'route': path, **window}
+
+
+async def _route_weather(route_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Weather analysis for a planned route, or None if it is unavailable."""
+    try:
+        return await analyze_route_weather(route_data)
+    except Exception as e:
+        logger.error(f"Error analyzing route weather: {e}")
+        return None
+
+
+def _transform_route_data(
+    route_data: Dict[str, Any],
+    flight_request: FlightPlanRequest,
+    weather: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
     Transform route data from the flight planner to match the response schema.
     
     Args:
         route_data: Raw route data from the flight planner
         flight_request: Original flight request
+        weather: Weather analysis along the route, if available
         
     Returns:
         Dict[str, Any]: Transformed data matching FlightPlanResponse schema
@@ -113,9 +391,15 @@ def _transform_route_data(route_data: Dict[str, Any], flight_request: FlightPlan
             "distance_nm": leg.get('distance_nm', 0),
             "cruise_altitude_ft": leg.get('cruise_altitude_ft', flight_request.cruising_altitude_ft),
             "estimated_time_hr": leg.get('estimated_time_hr', 0),
+            "fuel_burn_gal": leg.get('fuel_burn_gal'),
             "magnetic_heading": leg.get('magnetic_heading'),
             "true_heading": leg.get('true_heading'),
-            "wind_component": leg.get('wind_component')
+            "true_course": leg.get('true_course'),
+            "magnetic_variation": leg.get('magnetic_variation'),
+            "wind_component": leg.get('wind_component'),
+            "max_terrain_ft": leg.get('max_terrain_ft'),
+            "airspace": leg.get('airspace'),
+            "altitude_options": leg.get('altitude_options')
         }
         legs.append(leg_data)
     
@@ -130,6 +414,7 @@ def _transform_route_data(route_data: Dict[str, Any], flight_request: FlightPlan
                 "fuel_burn_gal": stop.get('fuel_burn_gal', 0),
                 "total_fuel_burn_gal": stop.get('total_fuel_burn_gal', 0),
                 "fuel_reserve_gal": stop.get('fuel_reserve_gal', 0),
+                "refuel_gal": stop.get('refuel_gal'),
                 "coordinates": {
                     "latitude": stop.get('latitude', 0),
                     "longitude": stop.get('longitude', 0)
@@ -137,32 +422,50 @@ def _transform_route_data(route_data: Dict[str, Any], flight_request: FlightPlan
             }
             fuel_stops.append(fuel_stop)
         
+        total_fuel_burn = route_data['fuel_planning'].get('total_fuel_burn_gal', 0)
+        reserve_fuel = route_data['fuel_planning'].get('reserve_fuel_gal')
+        if reserve_fuel is None:
+            reserve_fuel = flight_request.fuel_capacity_gal * 0.25  # 25% reserve
         fuel_planning = {
-            "total_fuel_burn_gal": route_data['fuel_planning'].get('total_fuel_burn_gal', 0),
+            "total_fuel_burn_gal": total_fuel_burn,
             "fuel_stops": fuel_stops,
-            "reserve_fuel_gal": flight_request.fuel_capacity_gal * 0.25,  # 25% reserve
-            "total_fuel_required_gal": route_data['fuel_planning'].get('total_fuel_burn_gal', 0) * 1.25
+            "reserve_fuel_gal": reserve_fuel,
+            "landing_fuel_gal": route_data['fuel_planning'].get('landing_fuel_gal'),
+            "total_fuel_required_gal": total_fuel_burn + reserve_fuel
         }
     
-    # Add weather analysis (placeholder for now)
-    weather_analysis = {
-        "overall_conditions": "VFR conditions expected",
-        "significant_weather": [],
-        "wind_analysis": {
-            "average_headwind": 0,
-            "max_crosswind": 0,
-            "favorable_altitudes": [flight_request.cruising_altitude_ft]
-        },
-        "visibility_forecast": {
-            "minimum_visibility": 10.0,
-            "areas_of_concern": []
-        }
-    }
+    # Wind analysis from per-leg wind components when the planner computed them
+    wind_legs = [leg for leg in route_data.get('legs', []) if leg.get('wind_component')]
+    average_headwind = 0
+    max_crosswind = 0
+    if wind_legs:
+        total_time = sum(leg.get('estimated_time_hr', 0) for leg in wind_legs) or 1
+        average_headwind = round(sum(
+            leg['wind_component']['headwind'] * leg.get('estimated_time_hr', 0) for leg in wind_legs
+        ) / total_time, 1)
+        max_crosswind = max(abs(leg['wind_component']['crosswind']) for leg in wind_legs)
     
     # Collect any warnings
-    warnings = []
-    if flight_request.avoid_terrain:
-        warnings.append("Terrain avoidance routing enabled - may result in longer routes")
+    warnings = list(route_data.get('warnings', []))
+    
+    # Weather analysis from forecasts and METARs along the legs
+    weather_analysis = None
+    if weather is not None:
+        weather_analysis = {
+            "overall_conditions": weather['overall_conditions'],
+            "significant_weather": weather['significant_weather'],
+            "wind_analysis": {
+                "average_headwind": average_headwind,
+                "max_crosswind": max_crosswind,
+                "max_surface_gust": weather['wind_analysis'].get('max_surface_gust_kt'),
+                "favorable_altitudes": (sorted({leg['cruise_altitude_ft'] for leg in legs})
+                                        or [flight_request.cruising_altitude_ft])
+            },
+            "visibility_forecast": weather['visibility_forecast'],
+            "arrival_forecasts": weather.get('arrival_forecasts', [])
+        }
+    else:
+        warnings.append("Weather analysis unavailable; check current weather before flight")
     
     return {
         "route_summary": route_summary,
@@ -171,7 +474,7 @@ def _transform_route_data(route_data: Dict[str, Any], flight_request: FlightPlan
         "estimated_time_hr": route_data.get('estimated_time_hr', 0),
         "fuel_planning": fuel_planning,
         "weather_analysis": weather_analysis,
-        "alternate_routes": None,  # Could be added in future
+        "alternate_routes": route_data.get('alternate_routes') or None,
         "warnings": warnings
     }
 
@@ -0,0 +1,64 @@
+"""
+Live Weather Router.
+
+Provides the ``/ws/weather`` WebSocket channel pushing METAR changes of
+watched stations.
+"""
+
+import asyncio
+import json
+import logging
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.models.live_weather import WeatherSubscriber, get_weather_hub
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.websocket("/ws/weather")
+async def live_weather(websocket: WebSocket) -> None:
+    """
+    Push METAR changes of watched stations.
+
+    Clients send ``{"action": "subscribe", "stations": ["KPAO", ...]}`` (or
+    ``"unsubscribe"``). A subscribe is answered with a ``snapshot`` message
+    holding the current weather of the new stations; afterwards a ``delta``
+    message with the changed fields of each changed station follows every
+    METAR snapshot update. Invalid requests are answered with an ``error``
+    message.
+    """
+    await websocket.accept()
+    hub = get_weather_hub()
+    subscriber = hub.connect()
+    sender = asyncio.create_task(_send_updates(websocket, subscriber))
+    try:
+        while True:
+            try:
+                request = json.loads(await websocket.receive_text())
+                action = request.get('action')
+                stations = request.get('stations') or []
+                if action not in ('subscribe', 'unsubscribe') or not isinstance(stations, list):
+                    raise ValueError('Expected {"action": "subscribe" | "unsubscribe", '
+                                     '"stations": [...]}')
+                stations = [str(code) for code in stations]
+                if action == 'subscribe':
+                    await websocket.send_json(hub.subscribe(subscriber, stations))
+                else:
+                    hub.unsubscribe(subscriber, stations)
+            except (ValueError, AttributeError) as e:
+                await websocket.send_json({'type': 'error', 'detail': str(e)})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in live_weather: {e}")
+    finally:
+        hub.disconnect(subscriber)
+        sender.cancel()
+
+
+async def _send_updates(websocket: WebSocket, subscriber: WeatherSubscriber) -> None:
+    while True:
+        await websocket.send_text(await subscriber.queue.get())
@@ -9,15 +9,29 @@ import logging
 from typing import Dict, Any, List
 from datetime import datetime
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, Body, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from app.models.flight_category import category_names, classify, forecast_ceiling, worst_category
 from app.models.weather_async import get_weather_data_async
 from app.models.airport import get_airport_coordinates
+from app.models.winds_aloft import get_winds_aloft
 
 logger = logging.getLogger(__name__)
 
+# Open-Meteo reports cover per layer, not cloud bases: layers are placed at
+# conservative nominal bases (feet AGL) when estimating ceilings
+FORECAST_CLOUD_LAYERS = {
+    'cloudcover_low': 2000.0,
+    'cloudcover_mid': 10000.0,
+    'cloudcover_high': 25000.0,
+}
+
+# Altitudes (feet MSL) reported in a point's winds aloft profile
+WINDS_ALOFT_PROFILE_FT = [3000, 6000, 9000, 12000, 18000]
+
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
 
@@ -44,6 +58,7 @@ async def get_route_weather_summary(
     try:
         waypoints = route_request.get('waypoints', [])
         interval_nm = route_request.get('interval_nm', 20)  # Sample every 20nm
+        altitude_ft = route_request.get('altitude_ft', 6500)
         
         if not waypoints or len(waypoints) < 2:
             raise HTTPException(
@@ -96,6 +111,7 @@ async def get_route_weather_summary(
         cloud_covers = []
         visibilities = []
         precipitation_probabilities = []
+        layer_covers = []
         
         for i, weather_data in enumerate(weather_results):
             if isinstance(weather_data, Exception):
@@ -118,6 +134,7 @@ async def get_route_weather_summary(
             cloud_cover = 0
             visibility = 10  # Default good visibility
             precip_prob = 0
+            layers = [0.0] * len(FORECAST_CLOUD_LAYERS)
             
             if hourly and 'time' in hourly and len(hourly.get('time', [])) > 0:
                 # Use first hour as representative
@@ -128,6 +145,9 @@ async def get_route_weather_summary(
                     visibility = round(hourly['visibility'][0] / 1609.34, 1)
                 if 'precipitation_probability' in hourly and len(hourly['precipitation_probability']) > 0:
                     precip_prob = hourly['precipitation_probability'][0]
+                for k, layer in enumerate(FORECAST_CLOUD_LAYERS):
+                    if hourly.get(layer) and hourly[layer][0] is not None:
+                        layers[k] = hourly[layer][0]
             
             waypoint_weather = {
                 'lat': waypoint['lat'],
@@ -150,6 +170,25 @@ async def get_route_weather_summary(
             cloud_covers.append(cloud_cover)
             visibilities.append(visibility)
             precipitation_probabilities.append(precip_prob)
+            layer_covers.append(layers)
+        
+        # Cruise-level winds for every waypoint in one lookup
+        winds_grid = get_winds_aloft()
+        if winds_grid is not None and route_weather:
+            aloft = winds_grid.conditions([wp['lat'] for wp in route_weather],
+                                          [wp['lon'] for wp in route_weather], altitude_ft)
+            for i, waypoint_weather in enumerate(route_weather):
+                waypoint_weather['cruise_wind_speed_kt'] = round(float(aloft['wind_speed_kt'][i]))
+                direction = round(float(aloft['wind_direction_deg'][i])) % 360
+                waypoint_weather['cruise_wind_direction_deg'] = direction
+                temperature = aloft['temperature_c'][i]
+                waypoint_weather['cruise_temperature_c'] = (None if np.isnan(temperature)
+                                                            else round(float(temperature)))
+        
+        # Classify every waypoint in one pass
+        categories = _classify_waypoints(visibilities, layer_covers)
+        for waypoint_weather, category in zip(route_weather, category_names(categories)):
+            waypoint_weather['flight_category'] = category
         
         # Calculate overall summary statistics
         summary = {
@@ -159,12 +198,12 @@ async def get_route_weather_summary(
             'avg_cloud_cover_percent': round(sum(cloud_covers) / len(cloud_covers), 1) if cloud_covers else 0,
             'min_visibility_sm': min(visibilities) if visibilities else 10,
             'max_precipitation_probability': max(precipitation_probabilities) if precipitation_probabilities else 0,
-            'overall_conditions': _determine_flight_conditions(
-                min(visibilities) if visibilities else 10,
-                max(cloud_covers) if cloud_covers else 0
-            ),
+            'overall_conditions': worst_category(categories) if route_weather else 'VFR',
             'significant_weather': _identify_significant_weather(route_weather)
         }
+        if winds_grid is not None and route_weather:
+            summary['cruise_altitude_ft'] = altitude_ft
+            summary['max_cruise_wind_kt'] = max(wp['cruise_wind_speed_kt'] for wp in route_weather)
         
         return {
             'summary': summary,
@@ -255,22 +294,20 @@ async def get_point_weather_detail(
                 }
                 hourly_forecast.append(hour_data)
         
-        # Get winds aloft if available (using different altitude wind data)
+        # Winds aloft from the FB forecast, at standard levels and the requested altitude
         winds_aloft = []
-        if hourly:
-            for alt_field, alt_ft in [
-                ('windspeed_10m', 30),
-                ('windspeed_80m', 250),
-                ('windspeed_120m', 400),
-                ('windspeed_180m', 600)
-            ]:
-                if alt_field in hourly and len(hourly[alt_field]) > 0:
-                    wind_dir_field = alt_field.replace('windspeed', 'winddirection')
-                    winds_aloft.append({
-                        'altitude_ft': alt_ft,
-                        'wind_speed_kt': round(hourly[alt_field][0] * 1.94384),
-                        'wind_direction_deg': round(hourly[wind_dir_field][0]) if wind_dir_field in hourly and len(hourly[wind_dir_field]) > 0 else 0
-                    })
+        winds_grid = get_winds_aloft()
+        if winds_grid is not None:
+            altitudes = sorted(set(WINDS_ALOFT_PROFILE_FT) | {int(altitude_ft)})
+            aloft = winds_grid.conditions([lat] * len(altitudes), [lon] * len(altitudes), altitudes)
+            for i, alt_ft in enumerate(altitudes):
+                winds_aloft.append({
+                    'altitude_ft': alt_ft,
+                    'wind_speed_kt': round(float(aloft['wind_speed_kt'][i])),
+                    'wind_direction_deg': round(float(aloft['wind_direction_deg'][i])) % 360,
+                    'temperature_c': (round(float(aloft['temperature_c'][i]))
+                                      if not np.isnan(aloft['temperature_c'][i]) else None)
+                })
         
         # Extract cloud layers from hourly data
         cloud_layers = []
@@ -334,16 +371,12 @@ def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> f
     return R * c
 
 
-def _determine_flight_conditions(visibility_sm: float, cloud_cover_percent: float) -> str:
-    """Determine flight conditions based on visibility and cloud cover."""
-    if visibility_sm >= 5 and cloud_cover_percent < 50:
-        return "VFR"
-    elif visibility_sm >= 3 and cloud_cover_percent < 75:
-        return "MVFR"
-    elif visibility_sm >= 1:
-        return "IFR"
-    else:
-        return "LIFR"
+def _classify_waypoints(visibilities: List[float], layer_covers: List[List[float]]) -> np.ndarray:
+    """Flight category codes for waypoints from forecast visibility and layered cloud cover."""
+    cover = np.array(layer_covers, dtype=float).reshape(len(layer_covers),
+                                                        len(FORECAST_CLOUD_LAYERS))
+    ceiling = forecast_ceiling(cover, list(FORECAST_CLOUD_LAYERS.values()))
+    return classify(np.array(visibilities, dtype=float), ceiling)
 
 
 def _identify_significant_weather(route_weather: List[Dict[str, Any]]) -> List[str]:
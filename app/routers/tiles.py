@@ -0,0 +1,110 @@
+"""
+Map Tiles Router.
+
+Provides vector tiles of airports and their flight categories for the map,
+and proxies weather overlay image tiles.
+"""
+
+import asyncio
+import logging
+
+import httpx
+
+from fastapi import APIRouter, HTTPException, Request, Path, Response
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.models.overlay_tiles import MAX_OVERLAY_ZOOM, OVERLAY_LAYERS, get_overlay_proxy
+from app.models.vector_tiles import MAX_ZOOM, get_airport_tile
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+limiter = Limiter(key_func=get_remote_address)
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get("/tiles/airports/{z}/{x}/{y}.mvt", response_class=Response)
+@limiter.limit("600/minute")
+async def get_airport_tile_mvt(
+    request: Request,
+    z: int = Path(..., ge=0, le=MAX_ZOOM, description="Zoom level"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row"),
+) -> Response:
+    """
+    Get a Mapbox Vector Tile of airports.
+
+    The ``airports`` layer holds one point per airport with ``icao``, ``name``,
+    ``type``, ``elevation`` and, where a METAR is available, ``flight_category``.
+    Smaller airport types only appear at higher zooms.
+    """
+    try:
+        if x >= 2 ** z or y >= 2 ** z:
+            raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} does not exist")
+
+        tile = await asyncio.to_thread(get_airport_tile, z, x, y)
+        return Response(
+            content=tile,
+            media_type=MVT_MEDIA_TYPE,
+            headers={"Cache-Control": "public, max-age=300"},
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in get_airport_tile_mvt: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Airport tile service temporarily unavailable"
+        )
+
+
+@router.get("/tiles/overlay/{overlay}/{z}/{x}/{y}.png", response_class=Response)
+@limiter.limit("600/minute")
+async def get_overlay_tile_png(
+    request: Request,
+    overlay: str = Path(..., description="Overlay name "
+                                         "(clouds, precipitation, pressure, wind, temp)"),
+    z: int = Path(..., ge=0, le=MAX_OVERLAY_ZOOM, description="Zoom level"),
+    x: int = Path(..., ge=0, description="Tile column"),
+    y: int = Path(..., ge=0, description="Tile row"),
+) -> Response:
+    """
+    Get a weather overlay image tile.
+
+    Tiles are fetched from OpenWeatherMap once per refresh interval and served
+    from a shared disk cache; clients may cache them until the next refresh.
+    """
+    try:
+        if overlay not in OVERLAY_LAYERS:
+            raise HTTPException(status_code=404, detail=f"Unknown overlay {overlay}")
+        if x >= 2 ** z or y >= 2 ** z:
+            raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} does not exist")
+
+        proxy = get_overlay_proxy()
+        if not proxy.available():
+            raise HTTPException(status_code=503, detail="Weather overlays are not configured")
+
+        tile = await proxy.get_tile(overlay, z, x, y)
+        return Response(
+            content=tile,
+            media_type="image/png",
+            headers={"Cache-Control": f"public, max-age={proxy.seconds_until_refresh()}"},
+        )
+
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.warning(f"Upstream error in get_overlay_tile_png: {e}")
+        raise HTTPException(
+            status_code=502,
+            detail="Weather overlay provider unavailable"
+        )
+    except Exception as e:
+        logger.error(f"Error in get_overlay_tile_png: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Overlay tile service temporarily unavailable"
+        )
@@ -17,9 +17,17 @@ from app.schemas import WeatherRequest, WeatherResponse, AreaForecastRequest, We
 from app.schemas.common import Coordinates
 from app.models.weather_async import get_weather_data_async
 from app.models.airport import get_airport_coordinates, get_metar_data
+from app.models.flight_category import metar_ceiling_ft
+from app.models.metar_stations import get_metar_station_index
+from app.models.navigation import true_course
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Reporting stations queried, and reported, when an airport has no METAR
+FALLBACK_CANDIDATES = 4
+FALLBACK_STATIONS = 2
+
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
 
@@ -107,22 +115,21 @@ async def get_airport_weather(
                 metar_map = await asyncio.to_thread(get_metar_data, [icao])
                 metar = metar_map.get(icao)
 
+        # Fall back to the nearest stations that do report
+        nearby = None
+        if not metar:
+            nearby = await asyncio.to_thread(_nearby_station_metars, airport_data, code)
+            if nearby:
+                metar = nearby[0]["metar_data"]
+
         if not metar:
             raise HTTPException(
                 status_code=503,
                 detail="METAR data unavailable for this airport",
             )
 
-        # Derive ceiling from cloud layers (lowest BKN/OVC layer)
-        ceiling_ft = 0.0
-        cloud_layers = metar.get("cloud_layers") or []
-        for layer in cloud_layers:
-            cover = layer.get("cover")
-            base = layer.get("base")
-            if cover in ("BKN", "OVC") and base is not None:
-                base_val = float(base)
-                if ceiling_ft == 0.0 or base_val < ceiling_ft:
-                    ceiling_ft = base_val
+        # Ceiling from the lowest BKN/OVC layer (0 when unlimited)
+        ceiling_ft = metar_ceiling_ft(metar) or 0.0
 
         # Build human-readable conditions string
         flight_category = metar.get("flight_category") or "Unknown"
@@ -142,6 +149,14 @@ async def get_airport_weather(
             ceiling=ceiling_ft,
             metar=metar.get("raw_text") or "",
         )
+        if nearby:
+            response.station = nearby[0]["station"]
+            response.station_distance_nm = nearby[0]["distance_nm"]
+            response.station_bearing_deg = nearby[0]["bearing_deg"]
+            response.nearby_stations = [
+                {key: value for key, value in station.items() if key != "metar_data"}
+                for station in nearby
+            ]
 
         return response
 
@@ -155,6 +170,45 @@ async def get_airport_weather(
         )
 
 
+def _nearby_station_metars(airport_data: Dict[str, Any], code: str) -> List[Dict[str, Any]]:
+    """
+    METARs from the nearest reporting stations to an airport, nearest first.
+
+    Candidates come from the METAR station index and are fetched in one batch;
+    the first ``FALLBACK_STATIONS`` that report are returned with their
+    distance and true bearing from the airport.
+    """
+    coordinates = airport_data.get("coordinates") or {}
+    lat, lon = coordinates.get("latitude"), coordinates.get("longitude")
+    if lat is None or lon is None:
+        return []
+    exclude = {code, airport_data.get("icao") or code}
+    candidates = get_metar_station_index().nearest(
+        lat, lon, FALLBACK_CANDIDATES, settings.metar_fallback_radius_nm, exclude=exclude)
+    if not candidates:
+        return []
+
+    metar_map = get_metar_data([station["icao"] for station, _ in candidates]) or {}
+    nearby = []
+    for station, distance in candidates:
+        station_metar = metar_map.get(station["icao"])
+        if not station_metar:
+            continue
+        bearing = true_course(lat, lon, station["latitude"], station["longitude"])
+        nearby.append({
+            "station": station["icao"],
+            "name": station.get("name"),
+            "distance_nm": round(float(distance), 1),
+            "bearing_deg": round(float(bearing)) % 360,
+            "flight_category": station_metar.get("flight_category"),
+            "metar": station_metar.get("raw_text") or "",
+            "metar_data": station_metar,
+        })
+        if len(nearby) == FALLBACK_STATIONS:
+            break
+    return nearby
+
+
 def _build_weather_response(weather_data: Dict[str, Any], request: WeatherRequest) -> WeatherResponse:
     """
     Normalize raw weather data from the model layer into the WeatherResponse schema.
@@ -11,9 +11,26 @@ from .airport import (
     AirportInfo,
     MetarRequest,
     MetarResponse,
+    MetarData,
+    MetarMapResponse,
+    MetarObservation,
+    MetarTrend,
+    MetarHistoryResponse,
+    TafPeriod,
+    TafResponse,
     AirportBasic,
 )
-from .flight_plan import FlightPlanRequest, FlightPlanResponse
+from .flight_plan import (
+    FlightPlanRequest,
+    FlightPlanResponse,
+    BatchFlightPlanRequest,
+    ReachabilityRequest,
+    ReachabilityResponse,
+    AircraftProfileInfo,
+    DepartureWindowRequest,
+    DepartureWindowResponse,
+)
+from .alerts import AlertSubscriptionRequest, AlertSubscription, AlertSubscriptionList
 from .health import HealthResponse, CacheStatusResponse, ServiceHealth
 from .common import ErrorResponse, SuccessResponse
 
@@ -31,8 +48,24 @@ __all__ = [
     "AirportBasic",
     "MetarRequest",
     "MetarResponse",
+    "MetarData",
+    "MetarMapResponse",
+    "MetarObservation",
+    "MetarTrend",
+    "MetarHistoryResponse",
+    "TafPeriod",
+    "TafResponse",
     "FlightPlanRequest",
     "FlightPlanResponse",
+    "BatchFlightPlanRequest",
+    "ReachabilityRequest",
+    "ReachabilityResponse",
+    "AircraftProfileInfo",
+    "DepartureWindowRequest",
+    "DepartureWindowResponse",
+    "AlertSubscriptionRequest",
+    "AlertSubscription",
+    "AlertSubscriptionList",
     "HealthResponse",
     "CacheStatusResponse",
     "ServiceHealth",
@@ -50,6 +50,10 @@ class MetarData(BaseModel):
     altimeter: Optional[float] = Field(None, description="Altimeter setting in inHg")
     sky_conditions: List[str] = Field(default_factory=list, description="Sky condition reports")
     weather_phenomena: List[str] = Field(default_factory=list, description="Weather phenomena")
+    flight_category: Optional[str] = Field(
+        None,
+        description="Flight category (VFR, MVFR, IFR, LIFR)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -231,4 +235,214 @@ class MetarResponse(BaseModel):
                 },
                 "timestamp": "2023-12-01T12:55:00Z"
             }
-        } 
\ No newline at end of file
+        }
+
+
+class MetarMapResponse(BaseModel):
+    """Flight categories of stations in a bounding box, as parallel arrays (one per station)."""
+    categories: List[str] = Field(
+        ...,
+        description="Category names; entries of `category` index into this list"
+    )
+    snapshot_time: datetime = Field(..., description="Time the METAR snapshot was ingested")
+    count: int = Field(..., description="Number of stations")
+    station: List[str] = Field(..., description="Station identifiers")
+    lat: List[float] = Field(..., description="Station latitudes")
+    lon: List[float] = Field(..., description="Station longitudes")
+    category: List[int] = Field(..., description="Flight category codes")
+    visibility_sm: List[Optional[float]] = Field(..., description="Visibility in statute miles")
+    ceiling_ft: List[Optional[int]] = Field(
+        ...,
+        description="Ceiling in feet AGL (null when unlimited)"
+    )
+    wind_dir_deg: List[Optional[int]] = Field(
+        ...,
+        description="Wind direction in degrees (null when variable)"
+    )
+    wind_speed_kt: List[Optional[int]] = Field(..., description="Wind speed in knots")
+    observed: List[Optional[int]] = Field(..., description="Observation times (unix seconds)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "categories": ["VFR", "MVFR", "IFR", "LIFR", "Unknown"],
+                "snapshot_time": "2023-12-01T12:55:00Z",
+                "count": 2,
+                "station": ["KSJC", "KFAT"],
+                "lat": [37.3626, 36.7762],
+                "lon": [-121.929, -119.7181],
+                "category": [0, 2],
+                "visibility_sm": [10.0, 2.0],
+                "ceiling_ft": [None, 600],
+                "wind_dir_deg": [310, None],
+                "wind_speed_kt": [12, 4],
+                "observed": [1698843180, 1698843180]
+            }
+        }
+
+
+class MetarObservation(BaseModel):
+    """One past METAR observation of a station."""
+    observation_time: datetime = Field(..., description="Observation timestamp")
+    flight_category: str = Field(..., description="Flight category (VFR, MVFR, IFR, LIFR, Unknown)")
+    visibility_sm: Optional[float] = Field(None, description="Visibility in statute miles")
+    ceiling_ft: Optional[int] = Field(None, description="Ceiling in feet AGL (null when unlimited)")
+    wind_dir_deg: Optional[int] = Field(
+        None,
+        description="Wind direction in degrees (null when variable)"
+    )
+    wind_speed_kt: Optional[int] = Field(None, description="Wind speed in knots")
+    wind_gust_kt: Optional[int] = Field(None, description="Wind gusts in knots")
+    temperature_c: Optional[float] = Field(None, description="Temperature in Celsius")
+    dewpoint_c: Optional[float] = Field(None, description="Dewpoint in Celsius")
+    altimeter_in_hg: Optional[float] = Field(None, description="Altimeter setting in inHg")
+    raw_text: str = Field(..., description="Raw METAR text")
+
+
+class MetarTrend(BaseModel):
+    """Trend of conditions over a station's recent observations."""
+    trend: str = Field(..., description="improving, deteriorating, steady or unknown")
+    from_category: Optional[str] = Field(
+        None,
+        description="Flight category of the oldest observation"
+    )
+    to_category: Optional[str] = Field(
+        None,
+        description="Flight category of the newest observation"
+    )
+    visibility_change_sm: Optional[float] = Field(
+        None,
+        description="Fitted visibility change over the period (capped at 10 sm)"
+    )
+    ceiling_change_ft: Optional[int] = Field(
+        None,
+        description="Fitted ceiling change over the period (no ceiling counts as 12000 ft)"
+    )
+
+
+class MetarHistoryResponse(BaseModel):
+    """Recent METAR observations of a station and their trend."""
+    icao: str = Field(..., description="ICAO station identifier")
+    hours: float = Field(..., description="Period covered in hours")
+    count: int = Field(..., description="Number of observations")
+    trend: MetarTrend = Field(..., description="Trend of conditions over the period")
+    observations: List[MetarObservation] = Field(
+        default_factory=list,
+        description="Observations, oldest first"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "icao": "KSFO",
+                "hours": 6,
+                "count": 2,
+                "trend": {
+                    "trend": "improving",
+                    "from_category": "IFR",
+                    "to_category": "MVFR",
+                    "visibility_change_sm": 3.0,
+                    "ceiling_change_ft": 1200
+                },
+                "observations": [
+                    {
+                        "observation_time": "2023-12-01T11:56:00Z",
+                        "flight_category": "IFR",
+                        "visibility_sm": 2.0,
+                        "ceiling_ft": 600,
+                        "wind_dir_deg": None,
+                        "wind_speed_kt": 3,
+                        "raw_text": "KSFO 011156Z VRB03KT 2SM BR OVC006 12/11 A3005"
+                    },
+                    {
+                        "observation_time": "2023-12-01T12:56:00Z",
+                        "flight_category": "MVFR",
+                        "visibility_sm": 5.0,
+                        "ceiling_ft": 1800,
+                        "wind_dir_deg": 290,
+                        "wind_speed_kt": 8,
+                        "raw_text": "KSFO 011256Z 29008KT 5SM HZ BKN018 14/10 A3006"
+                    }
+                ]
+            }
+        }
+
+
+class TafPeriod(BaseModel):
+    """Forecast conditions of one TAF interval."""
+    change: str = Field(..., description="Group type: BASE, FM, BECMG, TEMPO or PROB")
+    probability: Optional[int] = Field(None, description="Probability in percent (PROB groups)")
+    start: datetime = Field(..., description="Start of the interval")
+    end: datetime = Field(..., description="End of the interval")
+    wind_dir_degrees: Optional[int] = Field(
+        None,
+        description="Wind direction in degrees (null when variable)"
+    )
+    wind_speed_kt: Optional[int] = Field(None, description="Wind speed in knots")
+    wind_gust_kt: Optional[int] = Field(None, description="Wind gusts in knots")
+    visibility_statute_mi: Optional[float] = Field(None, description="Visibility in statute miles")
+    wx_string: Optional[str] = Field(None, description="Forecast weather phenomena")
+    cloud_layers: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Cloud layers (cover and base in feet AGL)"
+    )
+    vertical_visibility_ft: Optional[int] = Field(None, description="Vertical visibility in feet")
+    ceiling_ft: Optional[int] = Field(None, description="Ceiling in feet AGL (null when unlimited)")
+    flight_category: str = Field(..., description="Flight category of the conditions")
+
+
+class TafResponse(BaseModel):
+    """TAF conditions at a station at a given time."""
+    station: str = Field(..., description="Station identifier")
+    raw_text: str = Field(..., description="Raw TAF text")
+    issue_time: datetime = Field(..., description="TAF issue time")
+    valid_from: datetime = Field(..., description="Start of the valid period")
+    valid_to: datetime = Field(..., description="End of the valid period")
+    time: datetime = Field(..., description="Time the conditions apply to")
+    prevailing: TafPeriod = Field(..., description="Prevailing conditions at the time")
+    temporary: List[TafPeriod] = Field(
+        default_factory=list,
+        description="TEMPO/PROB/BECMG groups in effect, laid over the prevailing conditions"
+    )
+    flight_category: str = Field(
+        ...,
+        description="Worst flight category among the prevailing and temporary conditions"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "station": "KSJC",
+                "raw_text": ("TAF KSJC 191720Z 1918/2024 31012KT P6SM FEW030 FM200300 VRB04KT "
+                             "5SM BR BKN012 TEMPO 2008/2012 2SM BR OVC006"),
+                "issue_time": "2023-11-19T17:20:00Z",
+                "valid_from": "2023-11-19T18:00:00Z",
+                "valid_to": "2023-11-21T00:00:00Z",
+                "time": "2023-11-20T09:00:00Z",
+                "prevailing": {
+                    "change": "FM",
+                    "start": "2023-11-20T03:00:00Z",
+                    "end": "2023-11-21T00:00:00Z",
+                    "wind_speed_kt": 4,
+                    "visibility_statute_mi": 5.0,
+                    "wx_string": "BR",
+                    "cloud_layers": [{"cover": "BKN", "base": 1200}],
+                    "ceiling_ft": 1200,
+                    "flight_category": "MVFR"
+                },
+                "temporary": [
+                    {
+                        "change": "TEMPO",
+                        "start": "2023-11-20T08:00:00Z",
+                        "end": "2023-11-20T12:00:00Z",
+                        "wind_speed_kt": 4,
+                        "visibility_statute_mi": 2.0,
+                        "wx_string": "BR",
+                        "cloud_layers": [{"cover": "OVC", "base": 600}],
+                        "ceiling_ft": 600,
+                        "flight_category": "IFR"
+                    }
+                ],
+                "flight_category": "IFR"
+            }
+        }
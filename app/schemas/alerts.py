@@ -0,0 +1,56 @@
+"""
+Condition alert API Pydantic schemas.
+"""
+
+from typing import List, Union
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class AlertSubscriptionRequest(BaseModel):
+    """Request to be alerted when a condition starts or stops holding at a station."""
+    client_id: str = Field(
+        ...,
+        min_length=1,
+        max_length=128,
+        description="Client identifier; alerts are streamed per client"
+    )
+    station: str = Field(..., min_length=3, max_length=4, description="ICAO station identifier")
+    condition: str = Field(
+        ...,
+        description="category_below, visibility_below_sm, ceiling_below_ft, wind_above_kt "
+                    "or gust_above_kt"
+    )
+    threshold: Union[float, str] = Field(
+        ...,
+        description="Flight category name for category_below, otherwise a number"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "client_id": "pilot-42",
+                "station": "KPAO",
+                "condition": "category_below",
+                "threshold": "VFR"
+            }
+        }
+
+
+class AlertSubscription(BaseModel):
+    """A stored alert subscription."""
+    id: int = Field(..., description="Subscription identifier")
+    client_id: str = Field(..., description="Client identifier")
+    station: str = Field(..., description="ICAO station identifier")
+    condition: str = Field(..., description="Condition")
+    threshold: Union[float, str] = Field(..., description="Threshold")
+    created: datetime = Field(..., description="Subscription time")
+
+
+class AlertSubscriptionList(BaseModel):
+    """Subscriptions of a client."""
+    client_id: str = Field(..., description="Client identifier")
+    subscriptions: List[AlertSubscription] = Field(
+        default_factory=list,
+        description="Subscriptions"
+    )
@@ -2,8 +2,8 @@
 Flight Planning API Pydantic schemas.
 """
 
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
 from .common import Coordinates
 
@@ -13,12 +13,63 @@ class FlightPlanRequest(BaseModel):
     start_code: str = Field(..., min_length=3, max_length=4, description="Starting airport ICAO code")
     end_code: str = Field(..., min_length=3, max_length=4, description="Destination airport ICAO code")
     aircraft_range_nm: int = Field(..., ge=50, le=5000, description="Aircraft range in nautical miles")
-    groundspeed_kt: int = Field(..., ge=50, le=500, description="Ground speed in knots")
+    groundspeed_kt: Optional[int] = Field(
+        None,
+        ge=50,
+        le=500,
+        description="Ground speed in knots (required without an aircraft profile)"
+    )
     fuel_capacity_gal: float = Field(50.0, ge=1.0, le=1000.0, description="Aircraft fuel capacity in gallons")
     fuel_burn_gph: float = Field(12.0, ge=1.0, le=100.0, description="Fuel burn rate in gallons per hour")
+    aircraft: Optional[str] = Field(
+        None,
+        max_length=20,
+        description="Aircraft performance profile (see /api/aircraft_profiles); leg time and "
+                    "fuel then come from its climb, cruise and descent tables instead of "
+                    "groundspeed_kt and fuel_burn_gph"
+    )
+    power_setting: Optional[str] = Field(
+        None,
+        max_length=10,
+        description="Cruise power setting of the aircraft profile"
+    )
     avoid_terrain: bool = Field(False, description="Whether to avoid high terrain routes")
     plan_fuel_stops: bool = Field(True, description="Whether to plan fuel stops with reserves")
     cruising_altitude_ft: int = Field(6500, ge=1000, le=17500, description="Planned cruising altitude in feet")
+    reserve_minutes: int = Field(
+        30,
+        ge=0,
+        le=120,
+        description="Minimum fuel reserve on landing, in minutes of cruise burn"
+    )
+    departure_fuel_gal: Optional[float] = Field(
+        None,
+        ge=0,
+        le=1000.0,
+        description="Fuel on board at departure (defaults to full tanks)"
+    )
+    alternates: int = Field(
+        0,
+        ge=0,
+        le=5,
+        description="Number of distinct alternate routes to return"
+    )
+    optimize_for: Literal["distance", "time"] = Field(
+        "distance",
+        description="Route objective: shortest distance, or shortest time using forecast winds "
+                    "aloft (groundspeed_kt is then treated as true airspeed)"
+    )
+    optimize_altitude: bool = Field(
+        False,
+        description="Pick the fastest legal hemispheric VFR altitude for each leg from forecast "
+                    "winds and terrain clearance instead of using cruising_altitude_ft"
+    )
+    
+    @model_validator(mode='after')
+    def check_performance(self):
+        if self.groundspeed_kt is None and not self.aircraft:
+            raise ValueError("Either groundspeed_kt or aircraft is required")
+        return self
     
     class Config:
         json_schema_extra = {
@@ -31,7 +82,38 @@ class FlightPlanRequest(BaseModel):
                 "fuel_burn_gph": 12.0,
                 "avoid_terrain": False,
                 "plan_fuel_stops": True,
-                "cruising_altitude_ft": 6500
+                "cruising_altitude_ft": 6500,
+                "optimize_for": "distance"
+            }
+        }
+
+
+class BatchFlightPlanRequest(BaseModel):
+    """Batch flight plan request schema."""
+    requests: List[FlightPlanRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        description="Flight plan requests to plan together"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "requests": [
+                    {
+                        "start_code": "KPAO",
+                        "end_code": "KSBA",
+                        "aircraft_range_nm": 400,
+                        "groundspeed_kt": 120
+                    },
+                    {
+                        "start_code": "KPAO",
+                        "end_code": "KSAN",
+                        "aircraft_range_nm": 400,
+                        "groundspeed_kt": 120
+                    }
+                ]
             }
         }
 
@@ -43,9 +125,28 @@ class FlightLeg(BaseModel):
     distance_nm: float = Field(..., ge=0, description="Distance in nautical miles")
     cruise_altitude_ft: int = Field(..., description="Cruise altitude in feet")
     estimated_time_hr: float = Field(..., ge=0, description="Estimated flight time in hours")
+    fuel_burn_gal: Optional[float] = Field(
+        None,
+        ge=0,
+        description="Leg fuel burn from the aircraft profile, including climb and descent"
+    )
     magnetic_heading: Optional[int] = Field(None, ge=0, le=360, description="Magnetic heading in degrees")
     true_heading: Optional[int] = Field(None, ge=0, le=360, description="True heading in degrees")
+    true_course: Optional[int] = Field(None, ge=0, le=360, description="True course in degrees")
+    magnetic_variation: Optional[float] = Field(
+        None,
+        description="Magnetic variation in degrees (east positive)"
+    )
     wind_component: Optional[Dict[str, float]] = Field(None, description="Wind component analysis")
+    max_terrain_ft: Optional[int] = Field(
+        None,
+        description="Highest terrain along the leg in feet, when terrain data is available"
+    )
+    airspace: Optional[List[str]] = Field(None, description="Airspaces crossed at cruise altitude")
+    altitude_options: Optional[List[Dict[str, Any]]] = Field(
+        None,
+        description="Evaluated VFR altitudes for the leg (time, groundspeed, headwind, usable)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -71,7 +172,8 @@ class FuelStop(BaseModel):
     name: str = Field(..., description="Airport name")
     fuel_burn_gal: float = Field(..., ge=0, description="Fuel burn to reach this stop")
     total_fuel_burn_gal: float = Field(..., ge=0, description="Total fuel burn from start")
-    fuel_reserve_gal: float = Field(..., ge=0, description="Fuel reserve remaining")
+    fuel_reserve_gal: float = Field(..., ge=0, description="Fuel remaining on landing at this stop")
+    refuel_gal: Optional[float] = Field(None, ge=0, description="Fuel uplifted at this stop")
     coordinates: Coordinates = Field(..., description="Airport coordinates")
     
     class Config:
@@ -95,6 +197,11 @@ class FuelPlanning(BaseModel):
     total_fuel_burn_gal: float = Field(..., ge=0, description="Total fuel burn for entire route")
     fuel_stops: List[FuelStop] = Field(..., description="List of fuel stops")
     reserve_fuel_gal: float = Field(..., ge=0, description="Reserve fuel requirement")
+    landing_fuel_gal: Optional[float] = Field(
+        None,
+        ge=0,
+        description="Fuel remaining on landing at the destination"
+    )
     total_fuel_required_gal: float = Field(..., ge=0, description="Total fuel required including reserves")
     
     class Config:
@@ -126,6 +233,10 @@ class WeatherAnalysis(BaseModel):
     significant_weather: List[str] = Field(default_factory=list, description="Significant weather along route")
     wind_analysis: Dict[str, Any] = Field(default_factory=dict, description="Wind analysis")
     visibility_forecast: Dict[str, Any] = Field(default_factory=dict, description="Visibility forecast")
+    arrival_forecasts: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="TAF conditions at fuel stops and destination at arrival time"
+    )
     
     class Config:
         json_schema_extra = {
@@ -198,4 +309,185 @@ class FlightPlanResponse(BaseModel):
                 },
                 "warnings": ["High terrain near KDEN", "Temporary flight restrictions in effect"]
             }
-        } 
\ No newline at end of file
+        }
+
+
+class ReachabilityRequest(BaseModel):
+    """Reachability (range ring) request schema."""
+    start_code: str = Field(
+        ...,
+        min_length=3,
+        max_length=4,
+        description="Departure airport ICAO code"
+    )
+    groundspeed_kt: int = Field(..., ge=50, le=500, description="Ground speed in knots")
+    fuel_capacity_gal: float = Field(
+        50.0,
+        ge=1.0,
+        le=1000.0,
+        description="Aircraft fuel capacity in gallons"
+    )
+    fuel_burn_gph: float = Field(
+        12.0,
+        ge=1.0,
+        le=100.0,
+        description="Fuel burn rate in gallons per hour"
+    )
+    reserve_minutes: int = Field(
+        30,
+        ge=0,
+        le=120,
+        description="Minimum fuel reserve on landing, in minutes of cruise burn"
+    )
+    departure_fuel_gal: Optional[float] = Field(
+        None,
+        ge=0,
+        le=1000.0,
+        description="Fuel on board at departure (defaults to full tanks)"
+    )
+    max_time_hr: Optional[float] = Field(
+        None,
+        gt=0,
+        le=24,
+        description="Total flight time budget in hours"
+    )
+    max_stops: int = Field(0, ge=0, le=3, description="Maximum number of intermediate fuel stops")
+    include_polygon: bool = Field(
+        False,
+        description="Whether to include a simplified range polygon"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start_code": "KPAO",
+                "groundspeed_kt": 120,
+                "fuel_capacity_gal": 50.0,
+                "fuel_burn_gph": 10.0,
+                "max_time_hr": 2.0,
+                "max_stops": 1,
+                "include_polygon": True
+            }
+        }
+
+
+class ReachableAirport(BaseModel):
+    """Airport reachable from the departure."""
+    icao: str = Field(..., description="Airport ICAO code")
+    name: str = Field(..., description="Airport name")
+    latitude: float = Field(..., description="Latitude")
+    longitude: float = Field(..., description="Longitude")
+    distance_nm: float = Field(
+        ...,
+        ge=0,
+        description="Direct distance from the departure in nautical miles"
+    )
+    time_hr: float = Field(..., ge=0, description="Fastest total flight time in hours")
+    fuel_burn_gal: float = Field(..., ge=0, description="Total fuel burned in gallons")
+    landing_fuel_gal: float = Field(..., description="Fuel on board on arrival in gallons")
+    stops: int = Field(..., ge=0, description="Number of intermediate fuel stops")
+    via: List[str] = Field(default_factory=list, description="Fuel stops on the way, in order")
+
+
+class ReachabilityResponse(BaseModel):
+    """Reachability response schema."""
+    departure: str = Field(..., description="Departure airport ICAO code")
+    airport_count: int = Field(..., ge=0, description="Number of reachable airports")
+    airports: List[ReachableAirport] = Field(..., description="Reachable airports, fastest first")
+    range_polygon: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Simplified reach envelope as a GeoJSON Polygon"
+    )
+
+
+class AircraftProfileInfo(BaseModel):
+    """Aircraft performance profile summary."""
+    name: str = Field(..., description="Profile name")
+    description: str = Field(..., description="Aircraft description")
+    fuel_capacity_gal: float = Field(..., ge=0, description="Usable fuel capacity in gallons")
+    service_ceiling_ft: int = Field(..., ge=0, description="Service ceiling in feet")
+    default_power: str = Field(..., description="Default cruise power setting")
+    power_settings: Dict[str, List[Dict[str, float]]] = Field(
+        ...,
+        description="Cruise true airspeed and fuel flow by altitude for each power setting"
+    )
+    time_to_climb_min: Dict[int, float] = Field(
+        ...,
+        description="Minutes to climb from sea level by altitude"
+    )
+
+
+class DepartureWindowRequest(FlightPlanRequest):
+    """Departure window request: a flight plan request plus the window to scan."""
+    earliest_departure: Optional[datetime] = Field(
+        None,
+        description="Start of the window (defaults to now)"
+    )
+    window_hours: int = Field(
+        48,
+        ge=1,
+        le=72,
+        description="Length of the departure window in hours"
+    )
+    step_minutes: int = Field(
+        30,
+        ge=15,
+        le=180,
+        description="Spacing of candidate departure times in minutes"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start_code": "KPAO",
+                "end_code": "KSBA",
+                "aircraft_range_nm": 400,
+                "groundspeed_kt": 120,
+                "cruising_altitude_ft": 6500,
+                "window_hours": 48,
+                "step_minutes": 30
+            }
+        }
+
+
+class DepartureSlot(BaseModel):
+    """Forecast score for one candidate departure time."""
+    departure_time: datetime = Field(..., description="Departure time (UTC)")
+    score: float = Field(..., ge=0, le=100, description="Overall score, 100 is best")
+    estimated_time_hr: Optional[float] = Field(
+        None,
+        ge=0,
+        description="Wind-corrected flight time in hours, excluding ground time at stops"
+    )
+    average_headwind_kt: float = Field(
+        ...,
+        description="Distance-weighted average headwind (negative is tailwind)"
+    )
+    min_visibility_sm: Optional[float] = Field(
+        None,
+        description="Lowest forecast visibility along the route at ETA"
+    )
+    max_low_cloud_pct: Optional[float] = Field(
+        None,
+        description="Highest forecast low cloud cover along the route at ETA"
+    )
+    max_precipitation_probability: Optional[float] = Field(
+        None,
+        description="Highest precipitation probability along the route at ETA"
+    )
+    forecast_coverage: float = Field(
+        ...,
+        ge=0,
+        le=1,
+        description="Fraction of route samples with forecast data"
+    )
+
+
+class DepartureWindowResponse(BaseModel):
+    """Departure window response schema."""
+    route: List[str] = Field(..., description="Planned route airports")
+    departures: List[DepartureSlot] = Field(
+        ...,
+        description="Every candidate departure in time order"
+    )
+    best: List[DepartureSlot] = Field(..., description="Highest scoring departures")
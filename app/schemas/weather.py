@@ -94,6 +94,22 @@ class AirportWeather(BaseModel):
     visibility: float = Field(..., description="Visibility in statute miles")
     ceiling: float = Field(..., description="Ceiling in feet AGL (0 if unlimited/unknown)")
     metar: str = Field(..., description="Raw METAR string for the airport")
+    station: Optional[str] = Field(
+        None,
+        description="Reporting station when the METAR is from a nearby airport"
+    )
+    station_distance_nm: Optional[float] = Field(
+        None,
+        description="Distance to the reporting station in nautical miles"
+    )
+    station_bearing_deg: Optional[float] = Field(
+        None,
+        description="True bearing from the airport to the reporting station"
+    )
+    nearby_stations: Optional[List[Dict[str, Any]]] = Field(
+        None,
+        description="Nearest reporting stations used as a fallback"
+    )
 
 
 class AreaForecastRequest(BaseModel):
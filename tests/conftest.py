@@ -25,3 +25,144 @@ def app():
 def client(app):
     """A test client for the FastAPI app."""
     return TestClient(app)
+
+
+SAMPLE_AIRPORTS = [
+    {'icao': 'KPAO', 'iata': 'PAO', 'name': 'Palo Alto Airport',
+     'lat': 37.4611, 'lon': -122.1150, 'elevation': 7, 'type': 'small_airport'},
+    {'icao': 'KSJC', 'iata': 'SJC', 'name': 'San Jose International',
+     'lat': 37.3626, 'lon': -121.9290, 'elevation': 62, 'type': 'large_airport'},
+    {'icao': 'KFAT', 'iata': 'FAT', 'name': 'Fresno Yosemite International',
+     'lat': 36.7762, 'lon': -119.7181, 'elevation': 336, 'type': 'medium_airport'},
+    {'icao': 'KBFL', 'iata': 'BFL', 'name': 'Meadows Field',
+     'lat': 35.4336, 'lon': -119.0568, 'elevation': 510, 'type': 'medium_airport'},
+    {'icao': 'KSMX', 'iata': 'SMX', 'name': 'Santa Maria Public',
+     'lat': 34.8989, 'lon': -120.4575, 'elevation': 261, 'type': 'medium_airport'},
+    {'icao': 'KSBA', 'iata': 'SBA', 'name': 'Santa Barbara Municipal',
+     'lat': 34.4262, 'lon': -119.8404, 'elevation': 13, 'type': 'medium_airport'},
+    {'icao': 'KLAX', 'iata': 'LAX', 'name': 'Los Angeles International',
+     'lat': 33.9425, 'lon': -118.4081, 'elevation': 125, 'type': 'large_airport'},
+    {'icao': 'KSAN', 'iata': 'SAN', 'name': 'San Diego International',
+     'lat': 32.7336, 'lon': -117.1897, 'elevation': 17, 'type': 'large_airport'},
+    {'icao': 'KRNO', 'iata': 'RNO', 'name': 'Reno/Tahoe International',
+     'lat': 39.4991, 'lon': -119.7681, 'elevation': 4415, 'type': 'large_airport'},
+]
+
+
+@pytest.fixture
+def sample_airports():
+    """Patch the airport cache with a small set of California airports."""
+    from unittest.mock import patch
+    airports = [dict(airport) for airport in SAMPLE_AIRPORTS]
+    with patch('app.models.airport_index.load_airport_cache', return_value=airports):
+        yield airports
+
+
+@pytest.fixture
+def metar_table():
+    """Build METAR snapshot tables from (station, visibility, cloud layers, wind, gust) tuples."""
+    from app.models.metar_snapshot import NUMERIC_COLUMNS, MetarTable
+
+    def build(observations, observed):
+        names = ['station', 'observed', 'vertical_visibility_ft', 'raw_text', 'wx_string',
+                 'cloud_layers'] + list(NUMERIC_COLUMNS.values())
+        columns = {name: [] for name in names}
+        for station, visibility, layers, wind, gust in observations:
+            row = {name: float('nan') for name in NUMERIC_COLUMNS.values()}
+            row.update(station=station, observed=observed, vertical_visibility_ft=float('nan'),
+                       wx_string=None, raw_text=f'{station} {visibility}SM', cloud_layers=layers,
+                       visibility_sm=visibility, wind_speed_kt=wind, wind_gust_kt=gust)
+            for name, value in row.items():
+                columns[name].append(value)
+        return MetarTable(columns)
+
+    return build
+
+
+RESTRICTED_OPENAIR = """
+* Test restricted area on the direct KPAO-KFAT line
+AC R
+AN R-TEST
+AL SFC
+AH FL180
+V X=37:07:12 N 120:55:12 W
+DC 5
+
+AC D
+AN PALO ALTO
+AL SFC
+AH 1500 MSL
+DP 37:30:00 N 122:10:00 W
+DP 37:30:00 N 122:05:00 W
+DP 37:25:00 N 122:05:00 W
+DP 37:25:00 N 122:10:00 W
+"""
+
+
+@pytest.fixture
+def restricted_openair():
+    """OpenAIR text with a restricted circle on the direct KPAO-KFAT line."""
+    return RESTRICTED_OPENAIR
+
+
+@pytest.fixture
+def write_hgt():
+    """Write 3-arc-second .hgt tiles (1201x1201 big-endian metres)."""
+    import numpy as np
+
+    def write(directory, name, elevations):
+        path = directory / name
+        np.asarray(elevations, dtype='>i2').tofile(path)
+        return path
+
+    return write
+
+
+@pytest.fixture
+def dipole_cof(tmp_path):
+    """A minimal WMM coefficient file describing a tilted dipole."""
+    path = tmp_path / 'WMM.COF'
+    path.write_text(
+        "    2025.0            WMM-TEST        11/13/2024\n"
+        "  1  0   -30000.0      0.0        0.0        0.0\n"
+        "  1  1      0.0     5000.0        0.0        0.0\n"
+        "999999999999999999999999999999999999999999999999\n"
+    )
+    return path
+
+
+@pytest.fixture
+def ifr_metars():
+    """METAR fetcher reporting IFR at KSJC and VFR elsewhere."""
+    def fetch(codes):
+        return {
+            code: {
+                'raw_text': (f"{code} 011200Z 00000KT "
+                             f"{'2SM BR OVC006' if code == 'KSJC' else '10SM CLR'} 15/10 A3000"),
+                'flight_category': 'IFR' if code == 'KSJC' else 'VFR',
+                'visibility_statute_mi': 2.0 if code == 'KSJC' else 10.0,
+                'wind_gust_kt': None,
+            }
+            for code in codes
+        }
+
+    return fetch
+
+
+@pytest.fixture
+def isolated_metar_snapshot():
+    """Start without a METAR snapshot and give its listeners fresh history, alerts and hub."""
+    from unittest.mock import patch
+    from app.config import settings
+    from app.models.alerts import AlertEngine
+    from app.models.live_weather import WeatherHub
+    from app.models.metar_history import MetarHistory
+
+    history = MetarHistory(settings.metar_history_capacity, settings.metar_history_hours)
+    engine = AlertEngine(settings.alert_queue_size)
+    hub = WeatherHub(settings.live_weather_max_stations, settings.live_weather_queue_size)
+    with patch('app.models.metar_snapshot._snapshot', None), \
+            patch('app.models.metar_history._history', history), \
+            patch('app.models.alerts._engine', engine), \
+            patch('app.models.live_weather._hub', hub):
+        yield
@@ -0,0 +1,27 @@
+def test_openair_parser_and_rtree_query(restricted_openair):
+    """OpenAIR circles and polygons load, and batched queries respect altitude limits."""
+    import numpy as np
+    from app.models.airspace import AirspaceIndex, parse_openair
+
+    airspaces = parse_openair(restricted_openair)
+    assert [(a['name'], a['class'], a['floor'], a['ceiling']) for a in airspaces] == [
+        ('R-TEST', 'R', 0.0, 18000.0), ('PALO ALTO', 'D', 0.0, 1500.0)]
+
+    # Many random boxes exercise a multi-level tree; compare against brute force
+    rng = np.random.default_rng(1)
+    corners = rng.uniform([30, -125], [40, -115], size=(300, 2))
+    boxes = [{'name': str(i), 'class': 'E', 'floor': 0.0, 'ceiling': 99999.0,
+              'points': [(lat, lon), (lat, lon + 0.2), (lat + 0.2, lon + 0.2), (lat + 0.2, lon)]}
+             for i, (lat, lon) in enumerate(corners)]
+    index = AirspaceIndex(airspaces + boxes)
+    assert len(index.levels) > 1
+
+    lat1, lon1 = rng.uniform([30, -125], [40, -115], size=(50, 2)).T
+    lat2, lon2 = lat1 + rng.uniform(-1, 1, 50), lon1 + rng.uniform(-1, 1, 50)
+    batched = index.query_segments(lat1, lon1, lat2, lon2, altitude_ft=6500)
+    for q in range(50):
+        single = index.query_segments(lat1[q], lon1[q], lat2[q], lon2[q], altitude_ft=6500)[0]
+        assert sorted(batched[q]) == sorted(single)
+    assert 0 not in index.query_segments(37.0, -121.5, 37.0, -120.5, altitude_ft=20000)[0]
+    assert 0 in index.query_segments(37.0, -121.5, 37.2, -120.5, altitude_ft=6500)[0]
+    assert 1 not in index.query_segments(37.46, -122.11, 37.36, -121.93, altitude_ft=6500)[0]
@@ -0,0 +1,126 @@
+import pytest
+from unittest.mock import patch
+
+
+def test_alert_engine_evaluates_only_changed_stations(metar_table):
+    """Subscriptions fire when conditions start and stop holding, for changed stations only."""
+    import asyncio
+    from app.models.alerts import AlertEngine
+
+    engine = AlertEngine(max_pending=10)
+    below_vfr = engine.subscribe('pilot', 'kpao', 'category_below', 'vfr')
+    gusts = engine.subscribe('pilot', 'KSQL', 'gust_above_kt', 20)
+    other = engine.subscribe('other', 'KPAO', 'ceiling_below_ft', 500)
+    for i in range(5000):
+        engine.subscribe(f'client-{i}', f'K{i:03d}', 'wind_above_kt', 15)
+    with pytest.raises(ValueError):
+        engine.subscribe('pilot', 'KPAO', 'category_below', 'XFR')
+    with pytest.raises(ValueError):
+        engine.subscribe('pilot', 'KPAO', 'snow_above', 1)
+    assert below_vfr['station'] == 'KPAO' and below_vfr['threshold'] == 'VFR'
+
+    clear = metar_table([('KPAO', 10.0, [], 5.0, float('nan')),
+                         ('KSQL', 10.0, [], 12.0, 18.0)], 1000.0)
+    assert engine.evaluate(clear) == 0
+    assert engine.evaluations == 2
+
+    # KPAO goes IFR; KSQL keeps its observation and is not evaluated again
+    low = metar_table([('KPAO', 2.0, [{'cover': 'OVC', 'base': 700}], 5.0, float('nan')),
+                       ('KSQL', 10.0, [], 12.0, 18.0)], 4600.0)
+    low.observed[low.index['KSQL']] = 1000.0
+    assert engine.evaluate(low, low.changed_rows(clear)) == 1
+    assert engine.evaluations == 3
+    events = engine.channel('pilot').events_after(0)
+    assert [(i, e['event'], e['subscription_id'], e['flight_category']) for i, e in events] == \
+        [(1, 'triggered', below_vfr['id'], 'IFR')]
+    assert engine.channel('other').events_after(0) == []
+    assert engine.channel('nobody') is None
+
+    # Still IFR: no repeat; removing a subscription keeps the others' state and drops an
+    # unused channel
+    assert engine.unsubscribe(other['id'], 'pilot') is False
+    assert engine.unsubscribe(other['id'], 'other')
+    assert engine.channel('other') is None
+    again = metar_table([('KPAO', 2.0, [{'cover': 'OVC', 'base': 600}], 5.0, float('nan'))], 8200.0)
+    assert engine.evaluate(again) == 0
+    better = metar_table([('KPAO', 10.0, [], 8.0, float('nan')),
+                          ('KSQL', 10.0, [], 22.0, 28.0)], 11800.0)
+    assert engine.evaluate(better) == 2
+
+    async def receive():
+        return await engine.channel('pilot').next_events(1, timeout=1.0)
+
+    assert sorted((i, e['event'], e['station']) for i, e in asyncio.run(receive())) == \
+        [(2, 'cleared', 'KPAO'), (3, 'triggered', 'KSQL')]
+    assert [s['id'] for s in engine.subscriptions('pilot')] == [below_vfr['id'], gusts['id']]
+
+
+def test_alert_subscription_endpoints_and_event_stream(client, metar_table):
+    """Alerts from a new snapshot reach the client's server-sent events stream."""
+    import asyncio
+    import json as json_module
+    from app.models.alerts import AlertEngine, evaluate_metar_snapshot
+    from app.routers.alerts import _event_stream
+
+    engine = AlertEngine()
+    with patch('app.routers.alerts.get_alert_engine', return_value=engine), \
+            patch('app.models.alerts._engine', engine), \
+            patch('app.routers.alerts.settings.alert_keepalive_s', 0.05):
+        response = client.post('/api/alerts/subscriptions', json={
+            'client_id': 'pilot', 'station': 'KPAO', 'condition': 'category_below',
+            'threshold': 'VFR'})
+        assert response.status_code == 200, response.text
+        subscription = response.json()
+        bad = client.post('/api/alerts/subscriptions', json={
+            'client_id': 'pilot', 'station': 'KPAO', 'condition': 'gust_above_kt',
+            'threshold': 'lots'})
+        assert bad.status_code == 400
+        listed = client.get('/api/alerts/subscriptions', params={'client_id': 'pilot'}).json()
+        assert [s['id'] for s in listed['subscriptions']] == [subscription['id']]
+
+        assert client.get('/api/alerts/stream', params={'client_id': 'nobody'}).status_code == 404
+        evaluate_metar_snapshot(metar_table([('KPAO', 1.0, [], 3.0, float('nan'))], 1000.0), None)
+
+        # The test client buffers whole responses, so the endless stream is read from its generator
+        class Disconnects:
+            polls = 0
+
+            async def is_disconnected(self):
+                self.polls += 1
+                return self.polls > 2
+
+        async def read(last_event_id=None):
+            return [chunk async for chunk in _event_stream(Disconnects(), 'pilot', last_event_id)]
+
+        def alerts(chunks):
+            fields = [dict(line.split(': ', 1) for line in chunk.splitlines() if line)
+                      for chunk in chunks if chunk.startswith('event: alert')]
+            return [(int(f['id']), json_module.loads(f['data'])) for f in fields]
+
+        chunks = asyncio.run(read())
+        assert chunks[0] == ': connected\n\n' and chunks[-1] == ': keepalive\n\n'
+        [(event_id, event)] = alerts(chunks)
+        assert event_id == 1
+        assert (event['event'], event['station'], event['flight_category']) == \
+            ('triggered', 'KPAO', 'IFR')
+
+        # Concurrent streams of a client each get every alert; a reconnect resumes after
+        # Last-Event-ID
+        async def read_twice():
+            readers = [asyncio.ensure_future(read()) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            recovered = metar_table([('KPAO', 10.0, [], 3.0, float('nan'))], 4600.0)
+            evaluate_metar_snapshot(recovered, None)
+            return await asyncio.gather(*readers)
+
+        first, second = asyncio.run(read_twice())
+        assert [i for i, _ in alerts(first)] == [i for i, _ in alerts(second)] == [2]
+        assert [i for i, _ in alerts(asyncio.run(read(last_event_id=0)))] == [1, 2]
+        assert engine.channel('pilot').streams == 0
+
+        assert client.delete(f"/api/alerts/subscriptions/{subscription['id']}",
+                             params={'client_id': 'other'}).status_code == 404
+        assert client.delete(f"/api/alerts/subscriptions/{subscription['id']}",
+                             params={'client_id': 'pilot'}).status_code == 200
+        assert len(engine) == 0 and engine.channel('pilot') is None
+        assert client.get('/api/alerts/stream', params={'client_id': 'pilot'}).status_code == 404
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+
+def test_flight_category_engine_classifies_arrays():
+    """One vectorized pass matches the per-METAR rule and handles missing data."""
+    from app.models.airport import get_flight_category
+    from app.models.flight_category import (category_names, classify, classify_metars,
+                                            forecast_ceiling, layer_matrix, lowest_ceiling,
+                                            worst_category)
+
+    visibility = [10.0, 10.0, 4.0, 10.0, 2.0, 0.5, 10.0, float('nan')]
+    ceiling = [float('nan'), 3000.0, float('nan'), 2500.0, 5000.0, float('nan'), 400.0, 800.0]
+    assert category_names(classify(visibility, ceiling)).tolist() == \
+        ['VFR', 'VFR', 'MVFR', 'MVFR', 'IFR', 'LIFR', 'LIFR', 'Unknown']
+
+    layers = [[{'cover': 'FEW', 'base': 800}, {'cover': 'BKN', 'base': 2500},
+               {'cover': 'OVC', 'base': 1200}],
+              [{'cover': 'SCT', 'base': 400}], []]
+    assert lowest_ceiling(*layer_matrix(layers)).tolist()[0] == 1200.0
+    assert lowest_ceiling(*layer_matrix(layers), [float('nan'), 300.0, float('nan')])[1] == 300.0
+
+    metars = [{'visibility_statute_mi': 10.0, 'cloud_layers': layer} for layer in layers]
+    assert classify_metars(metars) == ['MVFR', 'VFR', 'VFR']
+    assert [get_flight_category(metar) for metar in metars] == classify_metars(metars)
+    assert get_flight_category({'cloud_layers': []}) == 'Unknown'
+
+    ceilings = forecast_ceiling([[70.0, 0.0], [10.0, 90.0], [50.0, 50.0]], [2000.0, 10000.0])
+    assert ceilings[:2].tolist() == [2000.0, 10000.0] and ceilings[2] != ceilings[2]
+    assert worst_category(classify([10.0, 2.0, float('nan')], [float('nan')] * 3)) == 'IFR'
+
+
+def test_route_weather_summary_uses_flight_category_engine(client):
+    """Waypoint categories come from forecast visibility and layered cloud cover."""
+    async def fetch(lat, lon, days=1, overlays=None):
+        low = 80.0 if lon > -121.0 else 20.0
+        return {'current': {'windspeed': 5, 'winddirection': 270, 'temperature': 15},
+                'hourly': {'time': ['t0'], 'cloudcover': [low], 'visibility': [16000.0],
+                           'cloudcover_low': [low], 'cloudcover_mid': [0.0],
+                           'cloudcover_high': [0.0], 'precipitation_probability': [0]}}
+
+    with patch('app.routers.route_weather.get_weather_data_async', side_effect=fetch):
+        response = client.post('/api/route_weather_summary', json={
+            'waypoints': [{'lat': 37.46, 'lon': -122.12}, {'lat': 36.78, 'lon': -119.72}],
+            'interval_nm': 50})
+    assert response.status_code == 200, response.content
+    data = response.json()
+    categories = [w['flight_category'] for w in data['waypoint_weather']]
+    assert categories[0] == 'VFR' and categories[-1] == 'MVFR'
+    assert data['summary']['overall_conditions'] == 'MVFR'
@@ -9,7 +9,7 @@ def test_plan_route_kpao_7s5(client):
     """Test planning a VFR route between KPAO and 7S5 with realistic range and speed."""
     
     # Mock the airport functions to avoid cache issues
-    with patch('app.models.flight_planner.get_airport_coordinates') as mock_airport:
+    with patch('app.models.airport.get_airport_coordinates') as mock_airport:
         mock_airport.side_effect = lambda code: {
             'icao': code,
             'latitude': 37.5,
@@ -60,3 +60,617 @@ def test_plan_route_kpao_7s5(client):
                 assert len(data.get('fuel_planning', {}).get('fuel_stops', [])) > 0
             # Estimated time should be reasonable
             assert data['estimated_time_hr'] > 0
+
+
+def test_plan_route_direct_within_range(sample_airports):
+    """Short routes are flown direct with no fuel stops."""
+    from app.models.flight_planner import plan_route
+
+    result = plan_route('KPAO', 'KSJC', 400, 120)
+    assert 'error' not in result
+    assert [leg['from'] for leg in result['legs']] == ['KPAO']
+    assert result['fuel_stops'] == []
+
+
+def test_plan_route_adds_fuel_stop(sample_airports):
+    """Routes beyond aircraft range stop at an intermediate airport."""
+    from app.models.flight_planner import plan_route
+
+    result = plan_route('KPAO', 'KSAN', 250, 120)
+    assert 'error' not in result
+    assert len(result['legs']) > 1
+    assert result['legs'][0]['from'] == 'KPAO'
+    assert result['legs'][-1]['to'] == 'KSAN'
+    assert all(leg['distance_nm'] <= 250 for leg in result['legs'])
+    assert len(result['fuel_planning']['fuel_stops']) == len(result['fuel_stops'])
+
+
+def test_plan_routes_batch_streams_results(client, sample_airports):
+    """The batch endpoint streams one NDJSON result per request."""
+    payload = {
+        'requests': [
+            {'start_code': 'KPAO', 'end_code': 'KSJC', 'aircraft_range_nm': 400,
+             'groundspeed_kt': 120},
+            {'start_code': 'KPAO', 'end_code': 'KSAN', 'aircraft_range_nm': 250,
+             'groundspeed_kt': 120},
+            {'start_code': 'KPAO', 'end_code': 'ZZZZ', 'aircraft_range_nm': 250,
+             'groundspeed_kt': 120},
+        ]
+    }
+    response = client.post('/api/plan_routes', json=payload)
+    assert response.status_code == 200, response.content
+    lines = response.text.splitlines()
+    results = {r['index']: r for r in (json.loads(line) for line in lines if line)}
+    assert sorted(results) == [0, 1, 2]
+    assert results[0]['plan']['legs'][0]['to_airport'] == 'KSJC'
+    assert results[1]['plan']['legs'][-1]['to_airport'] == 'KSAN'
+    assert results[2]['error'] == 'Invalid airport code(s)'
+
+
+def test_plan_route_cache_reuses_search_for_new_fuel_parameters(sample_airports):
+    """Repeated requests hit the route cache and rebuild fuel planning from it."""
+    from app.models import flight_planner
+
+    cache = flight_planner.get_route_plan_cache()
+    first = flight_planner.plan_route('KPAO', 'KSAN', 250, 120, fuel_burn_gph=10)
+    with patch.object(flight_planner, '_search_route', side_effect=AssertionError('search rerun')):
+        second = flight_planner.plan_route('PAO', 'KSAN', 250, 120, fuel_burn_gph=20)
+    assert cache.stats()['hits'] >= 1
+    assert second['legs'] == first['legs']
+    assert second['fuel_planning']['total_fuel_burn_gal'] == pytest.approx(
+        2 * first['fuel_planning']['total_fuel_burn_gal'])
+
+
+def test_plan_route_cache_invalidated_on_airport_reload(sample_airports):
+    """A reloaded airport cache invalidates memoized routes."""
+    from app.models import flight_planner
+
+    flight_planner.plan_route('KPAO', 'KSJC', 400, 120)
+    flight_planner.plan_route('KPAO', 'KSAN', 250, 120)
+    assert flight_planner.get_route_plan_cache().stats()['size'] == 2
+    with patch('app.models.airport_index.load_airport_cache', return_value=list(sample_airports)):
+        flight_planner.plan_route('KPAO', 'KSJC', 400, 120)
+        stats = flight_planner.get_route_plan_cache().stats()
+    assert stats['size'] == 1
+
+
+def test_airport_dataset_version_stable_without_airport_cache():
+    """Repeated empty loads of a missing airport cache do not rebuild the index."""
+    from app.models.airport_index import get_airport_dataset_version
+
+    with patch('app.models.airport_index.load_airport_cache', side_effect=lambda: []):
+        version = get_airport_dataset_version()
+        assert get_airport_dataset_version() == version
+
+
+def _uniform_wind_fetcher(speed_kt, direction_deg):
+    """Build a forecast fetcher returning the same wind at every level and point."""
+    import time as time_module
+    from app.models.forecast_cache import PRESSURE_LEVELS_HPA
+
+    def fetch(points):
+        start = int(time_module.time() // 3600 * 3600)
+        hourly = {'time': [start + 3600 * h for h in range(6)]}
+        for level in PRESSURE_LEVELS_HPA:
+            hourly[f'windspeed_{level}hPa'] = [speed_kt] * 6
+            hourly[f'winddirection_{level}hPa'] = [direction_deg] * 6
+        return [hourly for _ in points]
+    return fetch
+
+
+def test_wind_triangle_headwind_and_correction():
+    """A direct crosswind from the left needs a left correction and slows the aircraft."""
+    from app.models.navigation import wind_triangle, wind_components_from_direction
+
+    u, v = wind_components_from_direction(20.0, 270.0)  # From the west
+    groundspeed, heading, headwind, crosswind = wind_triangle(0.0, 100.0, u, v)
+    assert groundspeed == pytest.approx((100.0 ** 2 - 20.0 ** 2) ** 0.5)
+    assert heading == pytest.approx(360.0 - 11.537, abs=0.01)
+    assert headwind == pytest.approx(0.0, abs=1e-9)
+    assert crosswind == pytest.approx(20.0)
+
+
+def test_plan_route_time_optimal_uses_forecast_winds(sample_airports):
+    """Time-optimal routing applies winds aloft and fills heading and wind fields."""
+    from app.models.flight_planner import plan_route
+    from app.models.forecast_cache import ForecastCache
+
+    calls = []
+    fetcher = _uniform_wind_fetcher(30.0, 330.0)  # Tailwind for a south-easterly flight
+    cache = ForecastCache(fetcher=lambda points: calls.append(len(points)) or fetcher(points))
+    with patch('app.models.flight_planner.get_forecast_cache', return_value=cache):
+        result = plan_route('KPAO', 'KSAN', 250, 120, optimize_for='time')
+
+    assert 'error' not in result
+    assert len(calls) >= 1  # Batched grid fetches, not one call per edge
+    for leg in result['legs']:
+        assert leg['wind_component']['headwind'] < 0
+        assert leg['estimated_time_hr'] < leg['distance_nm'] / 120
+        assert 0 <= leg['true_heading'] < 360
+
+
+def test_plan_route_without_forecast_warns_and_is_not_cached(sample_airports):
+    """A forecast outage is remembered, flagged on the plan and not memoized."""
+    from app.models import flight_planner
+    from app.models.forecast_cache import MAX_LOCATIONS_PER_REQUEST, ForecastCache
+
+    calls = []
+
+    def unavailable(points):
+        calls.append(len(points))
+        raise ConnectionError('forecast source down')
+
+    cache = ForecastCache(fetcher=unavailable)
+    search = patch.object(flight_planner, '_search_route', wraps=flight_planner._search_route)
+    with patch('app.models.flight_planner.get_forecast_cache', return_value=cache), \
+            search as searches:
+        result = flight_planner.plan_route('KPAO', 'KSAN', 250, 120, optimize_for='time')
+        assert 'error' not in result
+        assert len(calls) == 1 and calls[0] <= MAX_LOCATIONS_PER_REQUEST
+        assert any(w.startswith('No forecast winds for leg(s) KPAO-') for w in result['warnings'])
+
+        # Failed nodes are not requested again until failure_ttl has passed, and the
+        # calm-wind route was not memoized
+        flight_planner.plan_route('KPAO', 'KSAN', 250, 120, optimize_for='time')
+        assert len(calls) == 1 and searches.call_count == 2
+        cache.failure_ttl = 0
+        cache.fetcher = _uniform_wind_fetcher(30.0, 330.0)
+        result = flight_planner.plan_route('KPAO', 'KSAN', 250, 120, optimize_for='time')
+        assert not any('forecast' in w for w in result.get('warnings', []))
+        flight_planner.plan_route('KPAO', 'KSAN', 250, 120, optimize_for='time')
+        assert searches.call_count == 3
+
+
+def test_fuel_constrained_path_prefers_stop_with_fuel():
+    """Labels carry fuel on board, so a shorter path through a no-fuel stop is rejected."""
+    from app.models.route_search import fuel_constrained_path
+
+    edges = [('A', 'B', 100), ('B', 'C', 100), ('A', 'D', 120), ('D', 'C', 120), ('A', 'C', 190)]
+    graph = {node: [] for node in 'ABCD'}
+    for a, b, dist in edges:
+        graph[a].append({'to': b, 'distance': dist})
+        graph[b].append({'to': a, 'distance': dist})
+
+    path, states = fuel_constrained_path(
+        graph, 'A', 'C',
+        cost=lambda _, edge: edge['distance'],
+        fuel_burn=lambda _, edge: edge['distance'] / 100.0,
+        departure_fuel=2.0, capacity=2.2, reserve=0.2,
+        can_refuel=lambda node: node == 'D',
+    )
+    assert path == ['A', 'D', 'C']
+    assert states[1] == (pytest.approx(0.8), 2.2)
+    assert states[-1][0] == pytest.approx(1.0)
+
+    from app.models.route_search import SearchLimitExceeded
+    with pytest.raises(SearchLimitExceeded):
+        fuel_constrained_path(
+            graph, 'A', 'C',
+            cost=lambda _, edge: edge['distance'],
+            fuel_burn=lambda _, edge: edge['distance'] / 100.0,
+            departure_fuel=2.0, capacity=2.2, reserve=0.2,
+            can_refuel=lambda node: node == 'D',
+            max_labels=1,
+        )
+
+
+def test_plan_route_respects_fuel_reserve(sample_airports):
+    """Partial departure fuel forces a fuel stop and every landing keeps the reserve."""
+    from app.models.flight_planner import plan_route
+
+    direct = plan_route('KPAO', 'KBFL', 400, 120, fuel_capacity_gal=50, fuel_burn_gph=10)
+    assert direct['fuel_stops'] == []
+
+    result = plan_route('KPAO', 'KBFL', 400, 120, fuel_capacity_gal=50, fuel_burn_gph=10,
+                        reserve_minutes=30, departure_fuel_gal=15)
+    assert 'error' not in result
+    assert len(result['fuel_stops']) == 1
+    reserve = result['fuel_planning']['reserve_fuel_gal']
+    assert reserve == pytest.approx(5.0)
+    for stop in result['fuel_planning']['fuel_stops']:
+        assert stop['fuel_reserve_gal'] >= reserve
+    assert result['fuel_planning']['landing_fuel_gal'] >= reserve
+
+
+def test_plan_route_fuel_stop_when_headwind_shortens_direct_leg(sample_airports):
+    """A direct leg within still-air range that headwinds push below reserves gets a stop."""
+    from app.models.flight_planner import plan_route
+    from app.models.forecast_cache import ForecastCache
+
+    # 26 gal at 12 gph with 30 min reserve reaches 200 nm in still air; KPAO-KBFL is 191 nm
+    cache = ForecastCache(fetcher=_uniform_wind_fetcher(40.0, 130.0))
+    with patch('app.models.flight_planner.get_forecast_cache', return_value=cache):
+        result = plan_route('KPAO', 'KBFL', 400, 120, optimize_for='time',
+                            departure_fuel_gal=26)
+    assert 'error' not in result, result
+    assert result['fuel_stops'] == ['KSJC']
+    fuel = result['fuel_planning']
+    assert fuel['landing_fuel_gal'] >= fuel['reserve_fuel_gal']
+
+
+def test_k_shortest_paths_returns_distinct_paths_in_order():
+    """Deviation paths off the shortest-path tree come back cheapest first."""
+    from app.models.route_search import k_shortest_paths
+
+    edges = [('A', 'B', 1), ('B', 'D', 1), ('A', 'C', 1), ('C', 'D', 2), ('B', 'C', 1),
+             ('A', 'D', 5)]
+    graph = {node: [] for node in 'ABCD'}
+    for a, b, dist in edges:
+        graph[a].append({'to': b, 'distance': dist})
+        graph[b].append({'to': a, 'distance': dist})
+
+    paths = k_shortest_paths(graph, 'A', 'D', 4)
+    assert [cost for cost, _ in paths] == [2, 3, 3, 4]
+    assert paths[0][1] == ['A', 'B', 'D']
+    assert len({tuple(path) for _, path in paths}) == 4
+    assert all(len(set(path)) == len(path) for _, path in paths)
+
+
+def test_plan_route_alternates(sample_airports):
+    """Alternates are distinct from the chosen route and no shorter."""
+    from app.models.flight_planner import plan_route
+
+    result = plan_route('KPAO', 'KSAN', 250, 120, alternates=2)
+    assert 'error' not in result
+    chosen = [result['legs'][0]['from']] + [leg['to'] for leg in result['legs']]
+    assert 1 <= len(result['alternate_routes']) <= 2
+    for alternate in result['alternate_routes']:
+        assert alternate['route'] != chosen
+        assert alternate['route'][0] == 'KPAO' and alternate['route'][-1] == 'KSAN'
+        assert alternate['extra_distance_nm'] >= -1e-6
+
+
+def test_plan_route_avoid_terrain_rejects_low_legs(sample_airports, tmp_path, write_hgt):
+    """Legs without terrain clearance at cruise altitude are rejected when avoiding terrain."""
+    import numpy as np
+    from app.models.flight_planner import plan_route
+    from app.models.terrain import TerrainEngine
+
+    write_hgt(tmp_path, 'N37W122.hgt', np.full((1201, 1201), 2500, dtype=np.int16))
+    engine = TerrainEngine(str(tmp_path))
+    with patch('app.models.flight_planner.get_terrain_engine', return_value=engine):
+        assert 'error' not in plan_route('KPAO', 'KSJC', 400, 120)
+        blocked = plan_route('KPAO', 'KSJC', 400, 120, avoid_terrain=True)
+        high = plan_route('KPAO', 'KSJC', 400, 120, avoid_terrain=True, cruising_altitude_ft=12500)
+
+    assert 'No route found' in blocked['error']
+    assert high['legs'][0]['max_terrain_ft'] == pytest.approx(8203, abs=1)
+
+
+def test_plan_route_detours_around_restricted_airspace(sample_airports, restricted_openair):
+    """A direct leg through restricted airspace is replaced by a detour via another airport."""
+    from app.models.airspace import AirspaceIndex, parse_openair
+    from app.models.flight_planner import plan_route
+
+    sample_airports.append({'icao': 'KMOD', 'iata': 'MOD', 'name': 'Modesto City-County',
+                            'lat': 37.6258, 'lon': -120.9544, 'elevation': 97,
+                            'type': 'medium_airport'})
+    index = AirspaceIndex(parse_openair(restricted_openair))
+    with patch('app.models.flight_planner.get_airspace_index', return_value=index):
+        result = plan_route('KPAO', 'KFAT', 400, 120)
+        above = plan_route('KPAO', 'KFAT', 400, 120, cruising_altitude_ft=18500)
+
+    assert [leg['to'] for leg in result['legs']] == ['KMOD', 'KFAT']
+    assert not any('R-TEST' in warning for warning in result.get('warnings', []))
+    assert [leg['to'] for leg in above['legs']] == ['KFAT']
+
+
+def test_plan_route_sets_magnetic_heading(sample_airports, dipole_cof):
+    """Legs carry true course and a magnetic heading corrected for variation."""
+    from app.config import settings
+    from app.models.flight_planner import plan_route
+
+    with patch.object(settings, 'wmm_cof_file', str(dipole_cof)):
+        leg = plan_route('KPAO', 'KSJC', 400, 120)['legs'][0]
+    assert leg['true_heading'] == leg['true_course'] == pytest.approx(124, abs=1)
+    magnetic = (leg['true_heading'] - leg['magnetic_variation']) % 360
+    assert leg['magnetic_heading'] == pytest.approx(magnetic, abs=1)
+
+
+def _level_wind_fetcher(speeds_by_level, direction_deg):
+    """Forecast fetcher with a wind speed per pressure level and a uniform direction."""
+    import time as time_module
+    from app.models.forecast_cache import PRESSURE_LEVELS_HPA
+
+    def fetch(points):
+        start = int(time_module.time() // 3600 * 3600)
+        hourly = {'time': [start + 3600 * h for h in range(6)]}
+        for level, speed in zip(PRESSURE_LEVELS_HPA, speeds_by_level):
+            hourly[f'windspeed_{level}hPa'] = [speed] * 6
+            hourly[f'winddirection_{level}hPa'] = [direction_deg] * 6
+        return [hourly for _ in points]
+    return fetch
+
+
+@pytest.mark.parametrize('direction, expected', [(310.0, 11500), (130.0, 3500)])
+def test_plan_route_optimize_altitude_picks_fastest_legal_altitude(
+        sample_airports, direction, expected):
+    """Winds strengthening with height push tailwind legs up and headwind legs down."""
+    from app.models.flight_planner import plan_route, VFR_EAST_ODD
+    from app.models.forecast_cache import ForecastCache
+
+    cache = ForecastCache(fetcher=_level_wind_fetcher([0, 5, 10, 30, 45, 60], direction))
+    with patch('app.models.flight_planner.get_forecast_cache', return_value=cache):
+        result = plan_route('KPAO', 'KSAN', 250, 120, optimize_altitude=True)
+
+    assert 'error' not in result
+    for leg in result['legs']:
+        assert leg['cruise_altitude_ft'] == expected
+        assert [o['altitude_ft'] for o in leg['altitude_options']] == VFR_EAST_ODD
+        best = min(o['estimated_time_hr'] for o in leg['altitude_options'])
+        assert leg['estimated_time_hr'] == pytest.approx(best)
+
+
+def test_get_vfr_altitude_follows_hemispheric_rule(sample_airports):
+    """Eastbound legs get odd-thousand altitudes; an even altitude is flagged."""
+    from app.models.flight_planner import get_vfr_altitude, plan_route
+
+    assert get_vfr_altitude(37.46, -122.12, 37.36, -121.93) == 3500
+    assert get_vfr_altitude(37.46, -122.12, 37.36, -121.93, 6500) == 5500
+    assert get_vfr_altitude(37.36, -121.93, 37.46, -122.12, 6500) == 6500
+    warnings = plan_route('KPAO', 'KSJC', 400, 120, cruising_altitude_ft=6500)['warnings']
+    assert any('consider 5500 ft' in warning for warning in warnings)
+
+
+def test_reachable_airports_respects_fuel_time_and_stops(sample_airports):
+    """One tank reaches nearby airports; a fuel stop extends the reach further."""
+    from app.models.reachability import reachable_airports
+
+    # 50 gal at 10 gph with 30 min reserve: 4.5 hr at 100 kt = 450 nm per tank
+    one_tank = reachable_airports('KPAO', 100, fuel_capacity_gal=50, fuel_burn_gph=10,
+                                  max_time_hr=2.0)
+    codes = {a['icao'] for a in one_tank['airports']}
+    assert {'KSJC', 'KFAT', 'KRNO'} <= codes
+    assert 'KSAN' not in codes and 'KLAX' not in codes
+    assert all(a['time_hr'] <= 2.0 and a['stops'] == 0 for a in one_tank['airports'])
+
+    short_tank = reachable_airports('KPAO', 100, fuel_capacity_gal=30, fuel_burn_gph=10)
+    with_stop = reachable_airports('KPAO', 100, fuel_capacity_gal=30, fuel_burn_gph=10, max_stops=1,
+                                   include_polygon=True)
+    assert 'KSAN' not in {a['icao'] for a in short_tank['airports']}
+    san = next(a for a in with_stop['airports'] if a['icao'] == 'KSAN')
+    assert san['stops'] == 1 and len(san['via']) == 1
+    assert san['landing_fuel_gal'] >= 5.0 - 1e-9
+    ring = with_stop['range_polygon']['coordinates'][0]
+    assert len(ring) == 73 and ring[0] == ring[-1]
+
+
+def test_reachable_endpoint(client, sample_airports):
+    """The reachable endpoint returns airports fastest first."""
+    response = client.post('/api/reachable', json={'start_code': 'KPAO', 'groundspeed_kt': 120,
+                                                   'max_time_hr': 1.5})
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data['departure'] == 'KPAO'
+    assert data['airports'][0]['icao'] == 'KSJC'
+    times = [a['time_hr'] for a in data['airports']]
+    assert times == sorted(times) and data['airport_count'] == len(times)
+
+
+def test_aircraft_profile_leg_performance_tables():
+    """Climb tables accumulate with altitude; short legs scale climb and descent down."""
+    from app.models.aircraft import get_aircraft_profile
+
+    profile = get_aircraft_profile('c172s')
+    assert profile.name == 'C172S'
+    assert (profile.climb_time_hr[1:] > profile.climb_time_hr[:-1]).all()
+    with pytest.raises(ValueError):
+        profile.power('99%')
+
+    distances = [[5.0], [100.0], [300.0]]
+    time_hr, fuel_gal = profile.leg_performance(distances, [3500, 7500], '65%')
+    assert time_hr.shape == fuel_gal.shape == (3, 2)
+    # Long legs: climbing higher costs more fuel on the way up but the tables stay sane
+    assert 100 / 115 < time_hr[1, 0] < 100 / 95
+    assert (fuel_gal[2] > fuel_gal[1]).all() and (fuel_gal[1] > fuel_gal[0]).all()
+    # A 5 nm hop cannot reach 7500 ft: climb and descent are scaled to fit the distance
+    full_climb = profile._climb(profile.climb_time_hr, 0.0, 7500.0)
+    assert time_hr[0, 1] < full_climb
+    headwind_time, _ = profile.leg_performance(100.0, 5500, groundspeed_factor=0.8)
+    still_time, _ = profile.leg_performance(100.0, 5500)
+    assert headwind_time > still_time
+
+
+def test_plan_route_with_aircraft_profile(sample_airports):
+    """Aircraft profiles drive leg time, per-leg fuel and the default tank size."""
+    from app.models.flight_planner import plan_route
+
+    result = plan_route('KPAO', 'KSAN', 1000, None, fuel_capacity_gal=None, aircraft='SR22',
+                        cruising_altitude_ft=8500)
+    assert 'error' not in result
+    leg = result['legs'][0]
+    assert leg['fuel_burn_gal'] > 0
+    # Climb at 120 kt makes the leg slower than cruise TAS alone
+    assert leg['estimated_time_hr'] > leg['distance_nm'] / 168.0
+    assert result['fuel_planning']['total_fuel_burn_gal'] == pytest.approx(
+        sum(leg['fuel_burn_gal'] for leg in result['legs']))
+
+    # Half tanks in a C172S need a stop
+    small = plan_route('KPAO', 'KSAN', 1000, None, fuel_capacity_gal=None, aircraft='C172S',
+                       power_setting='75%', cruising_altitude_ft=7500, departure_fuel_gal=26.5)
+    assert small['fuel_stops']
+    fuel = small['fuel_planning']
+    assert fuel['landing_fuel_gal'] >= fuel['reserve_fuel_gal'] - 1e-9
+    from app.models.forecast_cache import ForecastCache
+    cache = ForecastCache(fetcher=_level_wind_fetcher([0, 5, 10, 30, 45, 60], 130.0))
+    with patch('app.models.flight_planner.get_forecast_cache', return_value=cache):
+        swept = plan_route('KPAO', 'KSAN', 1000, None, aircraft='C172S', optimize_altitude=True,
+                           optimize_for='time')
+    assert 'error' not in swept
+    for leg in swept['legs']:
+        options = leg['altitude_options']
+        assert all(option['fuel_burn_gal'] > 0 for option in options if option['usable'])
+        chosen = next(o for o in options if o['altitude_ft'] == leg['cruise_altitude_ft'])
+        assert leg['fuel_burn_gal'] == pytest.approx(chosen['fuel_burn_gal'])
+
+    unknown = plan_route('KPAO', 'KSAN', 1000, None, aircraft='B747')
+    assert unknown['error'].startswith('Unknown aircraft')
+    invalid = plan_route('KPAO', 'KSAN', 1000, None, aircraft='C172S', power_setting='99%')
+    assert 'power setting' in invalid['error']
+
+
+def test_aircraft_profiles_endpoint_and_plan_request(client, sample_airports):
+    """Profiles are listed, and a plan request may give an aircraft instead of a groundspeed."""
+    response = client.get('/api/aircraft_profiles')
+    assert response.status_code == 200, response.content
+    names = {profile['name'] for profile in response.json()}
+    assert {'C172S', 'PA28-181', 'SR22'} <= names
+
+    response = client.post('/api/plan_route', json={
+        'start_code': 'KPAO', 'end_code': 'KFAT', 'aircraft_range_nm': 400, 'aircraft': 'PA28-181'})
+    assert response.status_code == 200, response.content
+    assert response.json()['legs'][0]['fuel_burn_gal'] > 0
+
+    response = client.post('/api/plan_route', json={
+        'start_code': 'KPAO', 'end_code': 'KFAT', 'aircraft_range_nm': 400})
+    assert response.status_code == 422
+
+
+def _window_fetcher(start, rain_until_hr, headwind_from_deg=None):
+    """Forecast fetcher: rain everywhere until an hour offset, clear afterwards."""
+    from app.models.forecast_cache import PRESSURE_LEVELS_HPA
+
+    def fetch(points):
+        hours = range(72)
+        hourly = {
+            'time': [start + 3600 * h for h in hours],
+            'visibility': [3000.0 if h < rain_until_hr else 30000.0 for h in hours],
+            'cloudcover_low': [90.0 if h < rain_until_hr else 10.0 for h in hours],
+            'precipitation_probability': [90.0 if h < rain_until_hr else 0.0 for h in hours],
+        }
+        for level in PRESSURE_LEVELS_HPA:
+            hourly[f'windspeed_{level}hPa'] = [20.0 if headwind_from_deg is not None else 0.0] * 72
+            hourly[f'winddirection_{level}hPa'] = [headwind_from_deg or 0.0] * 72
+        return [hourly for _ in points]
+    return fetch
+
+
+def test_score_departure_window_prefers_clear_hours():
+    """The whole window is scored at once and departures after the rain score best."""
+    from app.models.departure_window import score_departure_window
+    from app.models.forecast_cache import ForecastCache
+
+    start = 1_700_000_000 // 3600 * 3600
+    fetched = []
+    fetcher = _window_fetcher(start, rain_until_hr=10, headwind_from_deg=150.0)
+    cache = ForecastCache(fetcher=lambda points: fetched.append(len(points)) or fetcher(points))
+    # KPAO -> KSBA -> KSAN: south-easterly courses into a south-easterly wind
+    result = score_departure_window([(37.46, -122.12), (34.43, -119.84), (32.73, -117.19)], 120,
+                                    [6500, 5500], start_time=start, window_hours=24,
+                                    step_minutes=30, forecast_cache=cache)
+
+    slots = result['departures']
+    assert len(slots) == 49
+    assert sum(fetched) == len(cache)  # every grid node fetched once for the whole window
+    assert slots[0]['max_precipitation_probability'] == pytest.approx(90.0)
+    assert slots[0]['score'] < slots[-1]['score']
+    assert slots[-1]['max_precipitation_probability'] == pytest.approx(0.0)
+    assert slots[-1]['average_headwind_kt'] > 10
+    assert all(slot['estimated_time_hr'] > 330 / 120 for slot in slots)
+    assert result['best'][0]['departure_time'].timestamp() >= start + 10 * 3600
+
+
+def test_departure_window_endpoint(client, sample_airports):
+    """The departure window endpoint plans the route and scores the window."""
+    from app.models.forecast_cache import ForecastCache
+
+    start = 1_700_000_000 // 3600 * 3600
+    cache = ForecastCache(fetcher=_window_fetcher(start, rain_until_hr=6))
+    with patch('app.models.departure_window.get_forecast_cache', return_value=cache):
+        response = client.post('/api/departure_window', json={
+            'start_code': 'KPAO', 'end_code': 'KFAT', 'aircraft_range_nm': 400,
+            'groundspeed_kt': 120, 'earliest_departure': '2023-11-14T22:00:00Z',
+            'window_hours': 12, 'step_minutes': 60})
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data['route'] == ['KPAO', 'KFAT']
+    assert len(data['departures']) == 13
+    assert data['best'][0]['score'] == pytest.approx(100.0)
+
+
+def test_analyze_route_weather_combines_forecast_and_metars(sample_airports, ifr_metars):
+    """Forecasts at ETA and METARs near the legs feed the plan's weather analysis."""
+    import asyncio
+    import time as time_module
+    from app.models.flight_planner import plan_route
+    from app.models.flight_weather import analyze_route_weather, clear_metar_cache
+    from app.models.forecast_cache import ForecastCache
+
+    clear_metar_cache()
+    start = int(time_module.time() // 3600 * 3600)
+    cache = ForecastCache(fetcher=_window_fetcher(start, rain_until_hr=24))
+    route = plan_route('KPAO', 'KBFL', 400, 120)
+    requested = []
+    analysis = asyncio.run(analyze_route_weather(
+        route, budget_s=5.0, forecast_cache=cache,
+        metar_fetcher=lambda codes: requested.extend(codes) or ifr_metars(codes)))
+
+    assert {'KPAO', 'KBFL', 'KSJC'} <= set(requested)
+    assert analysis['overall_conditions'] == 'IFR conditions along route'
+    significant = analysis['significant_weather']
+    assert any(item.startswith('IFR reported at KSJC') for item in significant)
+    assert any('Precipitation likely on leg KPAO-KBFL' in item for item in significant)
+    assert analysis['visibility_forecast']['minimum_visibility'] == pytest.approx(1.9, abs=0.1)
+
+    # METARs are cached: a second analysis does not ask again
+    requested.clear()
+    asyncio.run(analyze_route_weather(route, budget_s=5.0, forecast_cache=cache,
+                                      metar_fetcher=lambda codes: requested.extend(codes) or {}))
+    assert requested == []
+
+
+def test_analyze_route_weather_degrades_within_budget(client, sample_airports, ifr_metars):
+    """Slow sources are abandoned at the budget; the plan is returned without weather."""
+    import asyncio
+    import time as time_module
+    from app.models.flight_planner import plan_route
+    from app.models.flight_weather import analyze_route_weather, clear_metar_cache
+    from app.models.forecast_cache import ForecastCache
+
+    clear_metar_cache()
+
+    def slow(result):
+        def fetch(points):
+            time_module.sleep(0.5)
+            return result(points)
+        return fetch
+
+    route = plan_route('KPAO', 'KBFL', 400, 120)
+    cache = ForecastCache(fetcher=slow(lambda points: [{} for _ in points]))
+    started = time_module.monotonic()
+    analysis = asyncio.run(analyze_route_weather(route, budget_s=0.1, forecast_cache=cache,
+                                                 metar_fetcher=slow(ifr_metars)))
+    assert analysis is None
+    assert time_module.monotonic() - started < 0.5 + 0.3
+    # Let the abandoned fetch finish so its METARs do not leak into the next check
+    time_module.sleep(0.6)
+    clear_metar_cache()
+
+    with patch('app.models.flight_weather.get_forecast_cache', return_value=cache), \
+            patch('app.models.flight_weather.get_metar_data', side_effect=slow(lambda codes: {})), \
+            patch('app.models.flight_weather.settings.flight_weather_budget_s', 0.05):
+        response = client.post('/api/plan_route', json={
+            'start_code': 'KPAO', 'end_code': 'KBFL', 'aircraft_range_nm': 400,
+            'groundspeed_kt': 120})
+    assert response.status_code == 200, response.content
+    data = response.json()
+    assert data['weather_analysis'] is None
+    assert any('Weather analysis unavailable' in warning for warning in data['warnings'])
+
+
+def test_airport_index_nearest_and_updates(sample_airports):
+    """k-nearest queries widen their search ring; add and discard keep the grid in sync."""
+    from app.models.airport_index import AirportIndex, normalize_airport
+
+    index = AirportIndex(sample_airports[1:])
+    nearest = index.nearest(37.4611, -122.1150, k=2, max_radius_nm=200)
+    assert [airport['icao'] for airport, _ in nearest] == ['KSJC', 'KFAT']
+    assert nearest[0][1] == pytest.approx(10.7, abs=0.2)
+    assert index.nearest(37.4611, -122.1150, k=2, max_radius_nm=50) == nearest[:1]
+
+    assert index.discard('KSJC') and not index.discard('KSJC')
+    assert index.get('SJC') is None
+    assert index.nearest(37.4611, -122.1150, k=1, max_radius_nm=200)[0][0]['icao'] == 'KFAT'
+    assert index.add(normalize_airport(sample_airports[0]))
+    assert not index.add(normalize_airport(sample_airports[0]))
+    assert index.nearest(37.4611, -122.1150)[0][0]['icao'] == 'KPAO'
@@ -0,0 +1,164 @@
+from unittest.mock import patch
+
+
+def _g2_int(value, length):
+    """GRIB2 sign-and-magnitude integer."""
+    return ((1 << (8 * length - 1)) | -value if value < 0 else value).to_bytes(length, 'big')
+
+
+def _g2_bits(values, widths):
+    bits = ''.join(format(int(v), f'0{w}b') for v, w in zip(values, widths) if w)
+    bits += '0' * (-len(bits) % 8)
+    return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8))
+
+
+def _g2_section(number, body):
+    return (len(body) + 5).to_bytes(4, 'big') + bytes([number]) + body
+
+
+def _g2_message(rows_north_to_south, lat1, lon1, step, reference, hour, parameter, surface,
+                complex_packing=False):
+    """Encode one field on a regular lat/lon grid (scanning north to south, D=1)."""
+    import struct
+    from datetime import datetime, timezone
+
+    category, number, discipline = parameter
+    surface_type, surface_value = surface
+    grid = [[round(v * 10) for v in row] for row in rows_north_to_south]
+    nj, ni = len(grid), len(grid[0])
+    flat = [v for row in grid for v in row]
+    ref = datetime.fromtimestamp(reference, tz=timezone.utc)
+
+    section1 = (_g2_int(7, 2) + _g2_int(0, 2) + bytes([2, 1, 1]) + _g2_int(ref.year, 2)
+                + bytes([ref.month, ref.day, ref.hour, ref.minute, ref.second, 0, 1]))
+    section3 = (bytes([0]) + _g2_int(ni * nj, 4) + bytes([0, 0]) + _g2_int(0, 2)
+                + bytes([6, 0]) + bytes(4) + bytes([0]) + bytes(4) + bytes([0]) + bytes(4)
+                + _g2_int(ni, 4) + _g2_int(nj, 4) + bytes(4) + b'\xff' * 4
+                + _g2_int(round(lat1 * 1e6), 4) + _g2_int(round(lon1 * 1e6), 4) + bytes([48])
+                + _g2_int(round((lat1 - (nj - 1) * step) * 1e6), 4)
+                + _g2_int(round((lon1 + (ni - 1) * step) * 1e6), 4)
+                + _g2_int(round(step * 1e6), 4) * 2 + bytes([0]))
+    section4 = (_g2_int(0, 2) + _g2_int(0, 2) + bytes([category, number, 2, 0, 96]) + bytes(3)
+                + bytes([1]) + _g2_int(hour, 4) + bytes([surface_type, 0])
+                + _g2_int(surface_value, 4) + bytes([255, 0]) + bytes(4))
+
+    reference_value = min(flat)
+    if not complex_packing:
+        packed = [v - reference_value for v in flat]
+        nbits = max(packed).bit_length()
+        section5 = (_g2_int(len(flat), 4) + _g2_int(0, 2) + struct.pack('>f', reference_value)
+                    + _g2_int(0, 2) + _g2_int(1, 2) + bytes([nbits, 0]))
+        data = _g2_bits(packed, [nbits] * len(packed))
+    else:
+        # Second-order spatial differencing, then groups of 4 values
+        steps = [flat[n] - 2 * flat[n - 1] + flat[n - 2] for n in range(2, len(flat))]
+        minimum = min(steps)
+        stored = [0, 0] + [s - minimum for s in steps]
+        groups = [stored[i:i + 4] for i in range(0, len(stored), 4)]
+        refs = [min(g) for g in groups]
+        widths = [(max(g) - min(g)).bit_length() for g in groups]
+        ref_bits, width_bits = max(max(refs).bit_length(), 1), max(max(widths).bit_length(), 1)
+        section5 = (_g2_int(len(flat), 4) + _g2_int(3, 2) + struct.pack('>f', 0.0)
+                    + _g2_int(0, 2) + _g2_int(1, 2) + bytes([ref_bits, 0, 1, 0]) + bytes(8)
+                    + _g2_int(len(groups), 4) + bytes([0, width_bits]) + _g2_int(4, 4) + bytes([1])
+                    + _g2_int(len(groups[-1]), 4) + bytes([0, 2, 2]))
+        data = (_g2_int(flat[0], 2) + _g2_int(flat[1], 2) + _g2_int(minimum, 2)
+                + _g2_bits(refs, [ref_bits] * len(refs))
+                + _g2_bits(widths, [width_bits] * len(widths))
+                + _g2_bits([0] * len(groups), [0] * len(groups))
+                + _g2_bits([v - r for g, r, w in zip(groups, refs, widths) for v in g],
+                           [w for g, w in zip(groups, widths) for _ in g]))
+
+    body = (_g2_section(1, section1) + _g2_section(3, section3) + _g2_section(4, section4)
+            + _g2_section(5, section5) + _g2_section(6, bytes([255])) + _g2_section(7, data)
+            + b'7777')
+    return b'GRIB' + bytes([0, 0, discipline, 2]) + (len(body) + 16).to_bytes(8, 'big') + body
+
+
+def test_grib_decoder_reads_simple_and_complex_packing(tmp_path):
+    """Both packings decode to the encoded field, normalized to rows from south to north."""
+    import numpy as np
+    from app.models.grib_forecast import read_grib_fields
+
+    rows = [[10.0, 10.5, 11.0, 13.2, 9.9],
+            [12.0, 11.1, 10.4, 8.8, 7.0],
+            [-3.5, 0.0, 2.5, 20.1, 6.6]]
+    path = tmp_path / 'gfs.t00z.pgrb2.0p25.f003.grib2'
+    path.write_bytes(b'junk'
+                     + _g2_message(rows, 38.0, 237.0, 0.25, 1700000000, 3, (0, 0, 0), (103, 2))
+                     + _g2_message(rows, 38.0, 237.0, 0.25, 1700000000, 3, (2, 2, 0), (100, 85000),
+                                   complex_packing=True)
+                     + _g2_message(rows, 38.0, 237.0, 0.25, 1700000000, 3, (3, 5, 0), (100, 85000)))
+
+    fields = list(read_grib_fields(str(path)))
+    assert [f.variable for f in fields] == ['temperature_2m', 'u_850hPa']
+    assert fields[0].valid_time == 1700000000 + 3 * 3600
+    assert fields[0].grid == (5, 3, 38000000, 237000000, 250000, 250000, 0)
+    for field in fields:
+        np.testing.assert_allclose(field.decode(), np.array(rows[::-1]), atol=1e-4)
+
+
+def test_grib_forecast_backend_answers_point_and_route_queries(tmp_path):
+    """Ingested fields are memory-mapped, interpolated and served through the weather interfaces."""
+    import asyncio
+    import time as time_module
+    import numpy as np
+    import app.models.grib_forecast as grib
+    from app.config import settings
+    from app.models.forecast_cache import ForecastCache
+    from app.models.weather_async import get_weather_data_async
+
+    reference = int(time_module.time() // 3600 * 3600) - 3600
+    data_dir = tmp_path / 'grib'
+    data_dir.mkdir()
+
+    def uniform(value):
+        return [[value] * 3 for _ in range(3)]
+
+    for hour, temperature_k in ((0, 283.0), (6, 295.0)):
+        messages = [
+            _g2_message([[280.0, 282.0, 284.0], [281.0, 283.0, 285.0], [282.0, 284.0, 286.0]]
+                        if hour == 0 else uniform(temperature_k), 38.0, 237.0, 1.0, reference, hour,
+                        (0, 0, 0), (103, 2)),
+            _g2_message(uniform(0.0), 38.0, 237.0, 1.0, reference, hour, (2, 2, 0), (103, 10)),
+            _g2_message(uniform(-10.0), 38.0, 237.0, 1.0, reference, hour, (2, 3, 0), (103, 10)),
+        ]
+        for level in (1000, 925, 850, 700, 600, 500):
+            messages.append(_g2_message(uniform(10.0), 38.0, 237.0, 1.0, reference, hour, (2, 2, 0),
+                                        (100, level * 100), complex_packing=True))
+        for level in (1000, 925, 850, 700, 600, 500):
+            messages.append(_g2_message(uniform(0.0), 38.0, 237.0, 1.0, reference, hour, (2, 3, 0),
+                                        (100, level * 100)))
+        (data_dir / f'gfs.f{hour:03d}.grib2').write_bytes(b''.join(messages))
+
+    forecast = grib.ingest_grib_directory(str(data_dir), str(tmp_path / 'arrays'))
+    assert isinstance(forecast.arrays['temperature_2m'], np.memmap)
+    assert list(forecast.times) == [reference, reference + 6 * 3600]
+    values = forecast.sample(['temperature_2m', 'visibility'], [37.0, 36.5, 40.0],
+                             [-122.0, -122.5, -122.0], reference)
+    np.testing.assert_allclose(values['temperature_2m'][:2], [9.85, 9.35], atol=1e-3)
+    assert np.isnan(values['temperature_2m'][2]) and np.isnan(values['visibility']).all()
+    midway = forecast.sample(['temperature_2m'], [37.0], [-122.0], reference + 3 * 3600)
+    np.testing.assert_allclose(midway['temperature_2m'], [(9.85 + 21.85) / 2], atol=1e-3)
+
+    route = forecast.along_route([36.5, 37.5], [-122.5, -121.5],
+                                 [reference, reference + 6 * 3600], 5500, ['temperature_2m'])
+    np.testing.assert_allclose(route['wind_u_kt'], 10.0 * 1.94384, rtol=1e-4)
+    assert np.all(np.diff(route['time']) > 0)
+    assert route['leg_index'].tolist() == [0] * len(route['time'])
+
+    again = grib.ingest_grib_directory(str(data_dir), str(tmp_path / 'arrays'))
+    assert again.directory == forecast.directory
+
+    with patch.object(settings, 'forecast_backend', 'grib'), \
+         patch.object(grib, '_forecast', forecast), patch.object(grib, '_forecast_loaded', True):
+        weather = asyncio.run(get_weather_data_async(37.0, -122.0, days=1))
+        assert weather['source'] == 'grib'
+        assert weather['current']['windspeed'] == round(10.0 * 2.23694, 1)
+        assert weather['current']['winddirection'] == 0.0
+        assert weather['hourly']['time'][0] >= reference and 'visibility' not in weather['hourly']
+        assert weather['forecast'][0]['temp_max'] is not None
+
+        cache = ForecastCache(grid_deg=0.5)
+        u, v = cache.winds_aloft([37.0], [-122.0], 5500, when=reference + 3600)
+        np.testing.assert_allclose([u[0], v[0]], [10.0 * 1.94384, 0.0], atol=0.05)
@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+
+def test_live_weather_websocket_pushes_deltas_of_watched_stations(client, metar_table):
+    """Subscribers get current weather, then only the changed fields of their changed stations."""
+    from app.models.live_weather import WeatherHub
+
+    nan = float('nan')
+    overcast = [{'cover': 'OVC', 'base': 600}]
+    before = metar_table([('KSJC', 10.0, [], 8.0, nan), ('KFAT', 2.0, overcast, 4.0, nan),
+                          ('KLAX', 10.0, [], 10.0, nan)], 1000.0)
+    after = metar_table([('KSJC', 10.0, [], 14.0, 22.0), ('KFAT', 2.0, overcast, 4.0, nan),
+                         ('KLAX', 3.0, [], 10.0, nan)], 4600.0)
+    after.observed[after.index['KFAT']] = 1000.0
+
+    hub = WeatherHub(max_stations=3)
+    with patch('app.routers.live_weather.get_weather_hub', return_value=hub), \
+            patch('app.models.live_weather.get_metar_snapshot', return_value=before):
+        with client.websocket_connect('/ws/weather') as ws:
+            ws.send_json({'action': 'subscribe', 'stations': ['ksjc', 'KFAT', 'KPAO']})
+            snapshot = ws.receive_json()
+            assert snapshot['type'] == 'snapshot'
+            assert sorted(snapshot['stations']) == ['KFAT', 'KSJC']
+            assert snapshot['stations']['KFAT']['flight_category'] == 'IFR'
+            assert hub.watched() == ['KFAT', 'KPAO', 'KSJC']
+
+            ws.send_json({'action': 'subscribe', 'stations': ['KLAX']})
+            assert ws.receive_json()['type'] == 'error'
+            ws.send_text('not json')
+            assert ws.receive_json()['type'] == 'error'
+
+            assert hub.publish(after, before) == 1
+            delta = ws.receive_json()
+            assert delta['type'] == 'delta' and list(delta['stations']) == ['KSJC']
+            observed = after.record(0)['observation_time']
+            assert delta['stations']['KSJC'] == {'observation_time': observed,
+                                                 'wind_speed_kt': 14, 'wind_gust_kt': 22}
+
+            ws.send_json({'action': 'unsubscribe', 'stations': ['KSJC', 'KFAT', 'KPAO']})
+            ws.send_json({'action': 'subscribe', 'stations': []})
+            assert ws.receive_json()['stations'] == {}
+            assert hub.watched() == [] and hub.publish(after, before) == 0
+    assert hub.watched() == []
@@ -0,0 +1,20 @@
+import pytest
+
+
+def test_magnetic_grid_matches_dipole_and_is_cached(tmp_path, dipole_cof):
+    """The cached declination grid reproduces the analytic dipole declination."""
+    import math
+    from app.models.magnetic import MagneticModel, declination, load_cof
+
+    model = MagneticModel.build(str(dipole_cof), grid_deg=2.0, year=2025)
+    assert list(tmp_path.glob('declination_*.npy'))
+
+    # On the equator the dipole gives east component -h11 and north component -g10
+    equator = -math.degrees(math.atan2(5000, 30000))
+    assert model.variation(0.0, 0.0) == pytest.approx(equator, abs=0.01)
+    epoch, coefficients = load_cof(str(dipole_cof))
+    lats, lons = [37.4, -12.3, 60.1], [-122.1, 140.5, 10.0]
+    exact = declination(lats, lons, epoch, coefficients, 2025.5)
+    assert model.variation(lats, lons) == pytest.approx(exact, abs=0.3)
+    rebuilt = MagneticModel.build(str(dipole_cof), grid_deg=2.0, year=2025)
+    assert rebuilt.grid.tobytes() == model.grid.tobytes()
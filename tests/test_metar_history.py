@@ -0,0 +1,91 @@
+import os
+from unittest.mock import patch
+
+METAR_FEED = os.path.join(os.path.dirname(__file__), 'data', 'metars.cache.csv')
+
+
+def test_metar_history_ring_buffer_and_trend(isolated_metar_snapshot):
+    """Observations are kept per station in a bounded ring; trends come from categories and fits."""
+    from datetime import datetime, timezone
+    from app.models.metar_history import (
+        MetarHistory, get_metar_history, metar_trend, observation_records
+    )
+    from app.models.metar_snapshot import refresh_metar_snapshot
+
+    start = datetime(2023, 11, 1, 6, 0, tzinfo=timezone.utc).timestamp()
+
+    def metar(hour, visibility, layers, category):
+        observed = datetime.fromtimestamp(start + hour * 3600, tz=timezone.utc)
+        return {'raw_text': f'KSJC {hour:02d}',
+                'observation_time': observed.strftime("%Y-%m-%d %H:%M UTC"),
+                'visibility_statute_mi': visibility, 'cloud_layers': layers, 'wind_speed_kt': 5,
+                'altim_in_hg': 30.01, 'flight_category': category}
+
+    history = MetarHistory(capacity=4)
+    reports = [metar(0, 10.0, [], 'VFR'), metar(1, 6.0, [{'cover': 'BKN', 'base': 4000}], 'VFR'),
+               metar(2, 4.0, [{'cover': 'OVC', 'base': 2500}], 'MVFR'),
+               metar(3, 2.0, [{'cover': 'OVC', 'base': 800}], 'IFR'),
+               metar(4, 1.5, [{'cover': 'OVC', 'base': 600}], 'IFR')]
+    assert sum(history.record_metars({'ksjc': report}) for report in reports) == 5
+    # The same observation seen again (e.g. through the snapshot) is not stored twice
+    assert history.record_metars({'KSJC': reports[-1]}) == 0
+
+    now = start + 4 * 3600
+    window = history.history('KSJC', 24, now=now)
+    assert window['raw_text'] == ['KSJC 01', 'KSJC 02', 'KSJC 03', 'KSJC 04']
+    assert window['ceiling_ft'].tolist() == [4000, 2500, 800, 600]
+    trend = metar_trend(window)
+    assert (trend['trend'], trend['from_category'], trend['to_category']) == \
+        ('deteriorating', 'VFR', 'IFR')
+    assert trend['visibility_change_sm'] < -3 and trend['ceiling_change_ft'] < -2000
+
+    same_category = history.history('KSJC', 1.5, now=now)
+    assert metar_trend(same_category)['trend'] == 'steady'
+    assert metar_trend(history.history('KSJC', 0.5, now=now))['trend'] == 'unknown'
+    assert history.history('KPAO', 24, now=now) is None
+
+    # Observations older than the retention window are discarded however large the ring is
+    recent = MetarHistory(capacity=8, max_hours=2)
+    for report in reports:
+        recent.record_metars({'KSJC': report})
+    assert recent.history('KSJC', 24, now=now)['raw_text'] == ['KSJC 02', 'KSJC 03', 'KSJC 04']
+    assert recent.history('KSJC', 24, now=now + 3600)['raw_text'] == ['KSJC 03', 'KSJC 04']
+    record = observation_records(same_category)[-1]
+    assert (record['flight_category'], record['ceiling_ft'], record['visibility_sm'],
+            record['altimeter_in_hg']) == ('IFR', 600, 1.5, 30.01)
+
+    # Every ingested snapshot feeds the shared history
+    refresh_metar_snapshot(METAR_FEED)
+    observed = datetime(2023, 11, 1, 12, 53, tzinfo=timezone.utc).timestamp()
+    kfat = get_metar_history().history('KFAT', 1, now=observed + 60)
+    assert kfat['observed'].tolist() == [observed] and kfat['category'].tolist() == [2]
+
+
+def test_metar_history_endpoint(client):
+    """The history endpoint reports observations and the trend from the in-memory history."""
+    import time as time_module
+    from datetime import datetime, timezone
+    from app.models.metar_history import MetarHistory
+
+    history = MetarHistory(capacity=8)
+    now = time_module.time()
+    reports = [(3, 2.0, 700, 'IFR'), (2, 4.0, 1500, 'MVFR'), (1, 8.0, 3500, 'VFR')]
+    for hours_ago, visibility, base, category in reports:
+        observed = datetime.fromtimestamp(now - hours_ago * 3600, tz=timezone.utc)
+        history.record_metars({'KSFO': {
+            'raw_text': f'KSFO {hours_ago}',
+            'observation_time': observed.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'visibility_statute_mi': visibility,
+            'flight_category': category,
+            'cloud_layers': [{'cover': 'BKN', 'base': base}],
+        }})
+
+    with patch('app.routers.airport.get_metar_history', return_value=history):
+        response = client.get('/api/metar/ksfo/history', params={'hours': 4})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data['icao'] == 'KSFO' and data['count'] == 3
+        assert [o['flight_category'] for o in data['observations']] == ['IFR', 'MVFR', 'VFR']
+        assert data['trend']['trend'] == 'improving' and data['trend']['to_category'] == 'VFR'
+        assert client.get('/api/metar/KPAO/history').status_code == 404
+        assert client.get('/api/metar/KSFO/history', params={'hours': 25}).status_code == 422
@@ -0,0 +1,35 @@
+import pytest
+import os
+from unittest.mock import patch
+
+METAR_FEED = os.path.join(os.path.dirname(__file__), 'data', 'metars.cache.csv')
+
+
+def test_metar_bbox_map_from_snapshot(client, sample_airports):
+    """Category maps are column arrays filtered from the snapshot, positioned from airports."""
+    import numpy as np
+    from app.models.airport_index import get_airport_index
+    from app.models.metar_map import query_metar_bbox
+    from app.models.metar_snapshot import load_metar_snapshot
+
+    table = load_metar_snapshot(METAR_FEED)
+    table.latitude[table.index['KSJC']] = np.nan
+    result = query_metar_bbox(-123, 35, -119, 38, table=table, airport_index=get_airport_index())
+    assert result['station'] == ['KSJC', 'KFAT', 'KBFL']
+    assert result['lat'][0] == pytest.approx(37.3626)
+    assert [result['categories'][c] for c in result['category']] == ['VFR', 'IFR', 'LIFR']
+    assert result['ceiling_ft'] == [None, 600, 100] and result['wind_dir_deg'][1] is None
+    assert query_metar_bbox(170, 30, -170, 40, table=table)['count'] == 0
+
+    bbox = {'west': -123, 'south': 33, 'east': -117, 'north': 38}
+
+    with patch('app.models.metar_snapshot._snapshot', table):
+        response = client.get('/api/metar/bbox', params=dict(bbox, category='ifr,LIFR'))
+        assert response.status_code == 200, response.content
+        data = response.json()
+        assert data['station'] == ['KFAT', 'KBFL'] and data['count'] == 2
+        response = client.get('/api/metar/bbox', params=dict(bbox, category='FOG'))
+        assert response.status_code == 400
+
+    with patch('app.models.metar_snapshot._snapshot', None):
+        assert client.get('/api/metar/bbox', params=bbox).status_code == 503
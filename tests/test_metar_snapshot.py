@@ -0,0 +1,59 @@
+import os
+from unittest.mock import patch
+
+
+METAR_FEED = os.path.join(os.path.dirname(__file__), 'data', 'metars.cache.csv')
+
+
+def test_metar_snapshot_parses_bulk_feed(tmp_path):
+    """The bulk feed becomes a columnar table holding the newest METAR per station."""
+    import gzip
+    from app.models.metar_snapshot import CATEGORIES, load_metar_snapshot
+
+    table = load_metar_snapshot(METAR_FEED)
+    assert sorted(table.stations) == ['KBFL', 'KFAT', 'KLAX', 'KSBA', 'KSJC']
+    rows = [table.index[s] for s in ['KSJC', 'KFAT', 'KBFL', 'KSBA']]
+    assert [CATEGORIES[c] for c in table.category[rows]] == ['VFR', 'IFR', 'LIFR', 'MVFR']
+    assert table.ceiling_ft[table.index['KBFL']] == 100
+    assert table.visibility_sm[table.index['KSJC']] == 10.0
+
+    ksjc, kfat = table.record(table.index['KSJC']), table.record(table.index['KFAT'])
+    assert ksjc['raw_text'].startswith('KSJC 011253Z')
+    assert ksjc['observation_time'] == '2023-11-01 12:53 UTC'
+    assert (ksjc['wind_dir_degrees'], ksjc['wind_speed_kt'], ksjc['wind_gust_kt']) == (310, 12, 20)
+    assert kfat['wind_dir_degrees'] is None and kfat['wind_gust_kt'] is None
+    assert kfat['cloud_layers'] == [{'cover': 'OVC', 'base': 600}] and kfat['ceiling_ft'] == 600
+
+    compressed = tmp_path / 'metars.cache.csv.gz'
+    with open(METAR_FEED, 'rb') as src, gzip.open(compressed, 'wb') as dst:
+        dst.write(src.read())
+    assert list(load_metar_snapshot(str(compressed)).stations) == list(table.stations)
+
+
+def test_metar_reads_served_from_snapshot(client, sample_airports, tmp_path,
+                                          isolated_metar_snapshot):
+    """With a snapshot loaded, METAR reads are local lookups and never call ADDS."""
+    from app.models.airport import get_metar_data
+    from app.models.metar_snapshot import get_metar_snapshot, lookup_metars, refresh_metar_snapshot
+
+    with patch('app.models.airport.requests.get', side_effect=AssertionError('ADDS queried')):
+        table = refresh_metar_snapshot(METAR_FEED)
+        assert get_metar_snapshot() is table
+
+        metars = get_metar_data(['KSJC', 'KPAO'])
+        assert list(metars) == ['KSJC']
+        assert metars['KSJC']['flight_category'] == 'VFR'
+
+        response = client.get('/api/metar?codes=KSJC,kfat')
+        assert response.status_code == 200, response.content
+        data = response.json()['metar_data']
+        assert data['KFAT']['flight_category'] == 'IFR'
+        assert data['KFAT']['sky_conditions'] == ['OVC006']
+        assert data['KFAT']['weather_phenomena'] == ['BR']
+        assert data['KSJC']['observation_time'].startswith('2023-11-01T12:53')
+
+        # A failed refresh keeps the previous snapshot; a stale one is not served
+        assert refresh_metar_snapshot(str(tmp_path / 'missing.csv')) is None
+        assert get_metar_snapshot() is table
+        with patch('app.models.metar_snapshot.settings.metar_snapshot_max_age_s', -1):
+            assert lookup_metars(['KSJC']) is None
@@ -0,0 +1,63 @@
+import pytest
+import json
+from unittest.mock import patch
+
+
+def test_metar_station_index_learns_from_responses(sample_airports, tmp_path):
+    """Stations join the index when they report and leave after repeated silence."""
+    from app.models.airport_index import get_airport_index
+    from app.models.metar_stations import MetarStationIndex, STATION_MISS_LIMIT
+
+    path = tmp_path / 'metar_stations.json'
+    stations = MetarStationIndex(get_airport_index(), path=str(path))
+    assert 'KSJC' in stations and 'KPAO' not in stations
+
+    assert stations.observe(['KPAO', 'KSJC'], {'KPAO': {}, 'KSJC': {}})
+    assert 'KPAO' in stations
+    assert json.loads(path.read_text()) == sorted(stations.stations())
+
+    for _ in range(STATION_MISS_LIMIT - 1):
+        stations.observe(['KSJC'], {})
+    stations.observe(['KSJC'], {'KSJC': {}})
+    assert 'KSJC' in stations
+    for _ in range(STATION_MISS_LIMIT):
+        stations.observe(['KSJC'], {})
+    assert 'KSJC' not in stations
+    assert stations.nearest(37.4611, -122.1150, k=1, exclude=['KPAO']) == []
+
+    reloaded = MetarStationIndex(get_airport_index(), json.loads(path.read_text()))
+    assert reloaded.stations() == stations.stations()
+
+
+def test_airport_weather_falls_back_to_nearest_station(client, sample_airports, ifr_metars):
+    """Airports without a METAR report the nearest reporting station with distance and bearing."""
+    from app.models.airport_index import get_airport_index
+    from app.models.metar_stations import MetarStationIndex
+
+    airport = dict(sample_airports[0], coordinates={'latitude': 37.4611, 'longitude': -122.1150})
+    stations = MetarStationIndex(get_airport_index())
+    requested = []
+
+    def fetch(codes):
+        requested.append(list(codes))
+        return {code: ifr_metars([code])[code] for code in codes if code != 'KPAO'}
+
+    with patch('app.routers.weather.get_airport_coordinates', return_value=airport), \
+            patch('app.routers.weather.get_metar_data', side_effect=fetch), \
+            patch('app.routers.weather.get_metar_station_index', return_value=stations), \
+            patch('app.routers.weather.settings.metar_fallback_radius_nm', 200.0):
+        response = client.get('/api/weather/KPAO')
+        assert response.status_code == 200, response.content
+        data = response.json()
+        assert requested == [['KPAO'], ['KSJC', 'KFAT', 'KRNO', 'KSMX']]
+        assert data['airport'] == 'KPAO'
+        assert data['station'] == 'KSJC'
+        assert data['metar'].startswith('KSJC')
+        assert data['station_distance_nm'] == pytest.approx(10.7, abs=0.1)
+        assert data['station_bearing_deg'] == pytest.approx(123, abs=3)
+        assert [s['station'] for s in data['nearby_stations']] == ['KSJC', 'KFAT']
+
+    with patch('app.routers.weather.get_airport_coordinates', return_value=airport), \
+            patch('app.routers.weather.get_metar_data', return_value={}), \
+            patch('app.routers.weather.get_metar_station_index', return_value=stations):
+        assert client.get('/api/weather/KPAO').status_code == 503
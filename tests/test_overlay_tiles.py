@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+
+def test_overlay_urls_use_slippy_tiles_through_proxy():
+    """Overlay URLs point at the key-free proxy and use web mercator tile rows."""
+    from app.models.overlay_tiles import lat_lon_to_tile
+    from app.models.weather import get_overlay_urls
+
+    assert lat_lon_to_tile(0.0, 0.0, 4) == (8, 8)
+    assert lat_lon_to_tile(37.4611, -122.1150, 10) == (164, 396)
+    assert lat_lon_to_tile(89.9, 179.99, 3) == (7, 0)
+
+    urls = get_overlay_urls(37.4611, -122.1150, ['clouds', 'temp', 'bogus'], 'secret')
+    assert urls == {'clouds': '/tiles/overlay/clouds/10/164/396.png',
+                    'temp': '/tiles/overlay/temp/10/164/396.png'}
+    assert get_overlay_urls(37.4611, -122.1150, ['clouds'], None) == {}
+
+
+def test_overlay_tile_cache_evicts_least_recently_used(tmp_path):
+    """The disk cache stays under its byte limit and rebuilds its order on restart."""
+    from app.models.overlay_tiles import OverlayTileCache
+
+    cache = OverlayTileCache(str(tmp_path), max_bytes=250)
+    for x in range(3):
+        cache.put(('clouds_new', 5, x, 0, 1), bytes(100))
+    assert cache.get(('clouds_new', 5, 0, 0, 1)) is None
+    assert cache.stats()['bytes'] == 200
+
+    assert cache.get(('clouds_new', 5, 1, 0, 1)) == bytes(100)
+    cache.put(('clouds_new', 5, 3, 0, 1), bytes(100))
+    assert cache.get(('clouds_new', 5, 2, 0, 1)) is None
+    assert cache.get(('clouds_new', 5, 1, 0, 1)) is not None
+
+    reloaded = OverlayTileCache(str(tmp_path), max_bytes=250)
+    assert reloaded.stats()['tiles'] == 2 and reloaded.get(('clouds_new', 5, 3, 0, 1)) == bytes(100)
+
+
+def test_overlay_proxy_coalesces_concurrent_fetches(client, tmp_path):
+    """Concurrent misses share one upstream fetch; a new time bucket refetches."""
+    import asyncio
+    from app.models.overlay_tiles import OverlayTileCache, OverlayTileProxy
+
+    calls = []
+
+    async def fetcher(layer, z, x, y):
+        calls.append((layer, z, x, y))
+        await asyncio.sleep(0.05)
+        return b'\x89PNG' + bytes([len(calls)])
+
+    proxy = OverlayTileProxy(OverlayTileCache(str(tmp_path), 10000), bucket_s=600, fetcher=fetcher)
+
+    async def burst(now):
+        return await asyncio.gather(*[proxy.get_tile('precipitation', 6, 10, 24, now=now)
+                                      for _ in range(8)])
+
+    tiles = asyncio.run(burst(1200.0))
+    assert calls == [('precipitation_new', 6, 10, 24)] and len(set(tiles)) == 1
+    assert asyncio.run(burst(1799.0)) == tiles and len(calls) == 1
+    assert asyncio.run(burst(1800.0))[0] != tiles[0] and len(calls) == 2
+
+    with patch('app.routers.tiles.get_overlay_proxy', return_value=proxy), \
+         patch.object(proxy, 'bucket', return_value=3):
+        response = client.get('/tiles/overlay/precipitation/6/10/24.png')
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'image/png'
+        assert response.headers['cache-control'].startswith('public, max-age=')
+        assert client.get('/tiles/overlay/radar/6/10/24.png').status_code == 404
+        assert client.get('/tiles/overlay/clouds/2/4/0.png').status_code == 404
@@ -0,0 +1,97 @@
+import pytest
+import os
+from unittest.mock import patch
+
+TAF_FEED = os.path.join(os.path.dirname(__file__), 'data', 'tafs.cache.csv')
+
+
+def test_taf_store_decodes_change_groups_and_looks_up_by_time():
+    """FM/BECMG groups form prevailing intervals; TEMPO/PROB groups overlay them at lookup."""
+    from datetime import datetime
+    from app.models.taf import load_taf_store, parse_taf
+
+    def at(text):
+        return datetime.fromisoformat(text + '+00:00').timestamp()
+
+    store = load_taf_store(TAF_FEED)
+    assert sorted(store.tafs) == ['EGLL', 'KBFL', 'KFAT', 'KSBA', 'KSJC']
+    assert store.tafs['KSBA']['raw_text'].startswith('TAF AMD KSBA 191720Z')
+
+    ksjc = store.tafs['KSJC']
+    assert [(p['change'], p['category']) for p in ksjc['prevailing']] == [
+        ('BASE', 0), ('FM', 1), ('FM', 0)]
+    assert ksjc['prevailing'][1]['start'] == at('2023-11-20T03:00:00')
+    assert ksjc['prevailing'][0]['end'] == at('2023-11-20T03:00:00')
+
+    early = store.lookup('ksjc', at('2023-11-19T19:00:00'))
+    assert early['flight_category'] == 'VFR' and early['temporary'] == []
+    prevailing = early['prevailing']
+    assert (prevailing['wind_dir_degrees'], prevailing['wind_gust_kt']) == (310, 22)
+    tempo = store.lookup('KSJC', at('2023-11-20T09:00:00'))
+    assert tempo['prevailing']['flight_category'] == 'MVFR'
+    assert tempo['prevailing']['ceiling_ft'] == 1200
+    assert [(p['change'], p['flight_category'], p['ceiling_ft'], p['wind_speed_kt'])
+            for p in tempo['temporary']] == [('TEMPO', 'IFR', 600, 4)]
+    assert tempo['flight_category'] == 'IFR'
+    assert store.lookup('KSJC', at('2023-11-21T00:00:00')) is None
+    assert store.lookup('KPAO', at('2023-11-20T09:00:00')) is None
+
+    # BECMG: an overlay during the window, prevailing from its end
+    during = store.lookup('KBFL', at('2023-11-20T05:00:00'))
+    assert during['temporary'][0]['flight_category'] == 'LIFR'
+    becoming = store.lookup('KBFL', at('2023-11-20T07:00:00'))['prevailing']
+    assert becoming['change'] == 'BECMG'
+    assert (becoming['visibility_statute_mi'], becoming['ceiling_ft']) == (0.5, 200)
+    assert becoming['wind_speed_kt'] == 3 and becoming['wx_string'] == 'FG'
+
+    prob = store.lookup('KFAT', at('2023-11-20T11:00:00'))['temporary'][0]
+    assert (prob['change'], prob['probability'], prob['visibility_statute_mi']) == ('PROB', 30, 1.5)
+    metric = store.lookup('EGLL', at('2023-11-20T01:00:00'))
+    assert metric['prevailing']['visibility_statute_mi'] == pytest.approx(6.21)
+    assert [(p['change'], p['probability'], p['flight_category'])
+            for p in metric['temporary']] == [('TEMPO', 40, 'IFR')]
+
+    # Valid periods ending at hour 24 and spanning a month end
+    rollover = parse_taf('KSJC 302320Z 0100/0124 00000KT CAVOK',
+                         datetime.fromisoformat('2023-11-30T23:20:00+00:00'))
+    assert rollover['valid_from'] == at('2023-12-01T00:00:00')
+    assert rollover['valid_to'] == at('2023-12-02T00:00:00')
+    with pytest.raises(ValueError):
+        parse_taf('TAF KXXX NIL')
+
+
+def test_taf_endpoint_and_plan_arrival_conditions(client, sample_airports):
+    """The TAF endpoint and the plan's weather analysis read the store at the arrival time."""
+    import asyncio
+    from datetime import datetime
+    from app.models.flight_planner import plan_route
+    from app.models.flight_weather import analyze_route_weather, clear_metar_cache
+    from app.models.forecast_cache import ForecastCache
+    from app.models.taf import refresh_taf_store
+
+    with patch('app.models.taf._store', None):
+        assert client.get('/api/taf/KSJC').status_code == 503
+        refresh_taf_store(TAF_FEED)
+
+        response = client.get('/api/taf/KSJC', params={'at': '2023-11-20T09:00:00Z'})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data['flight_category'] == 'IFR' and data['prevailing']['change'] == 'FM'
+        assert data['temporary'][0]['cloud_layers'] == [{'cover': 'OVC', 'base': 600}]
+        assert client.get('/api/taf/KSJC', params={'at': '2023-11-22T00:00:00Z'}).status_code == 404
+
+        clear_metar_cache()
+        route = plan_route('KPAO', 'KBFL', 400, 120)
+        departure = datetime.fromisoformat('2023-11-20T06:00:00+00:00').timestamp()
+        analysis = asyncio.run(analyze_route_weather(
+            route, departure_time=departure, budget_s=5.0,
+            forecast_cache=ForecastCache(fetcher=lambda points: [{} for _ in points]),
+            metar_fetcher=lambda codes: {}))
+    clear_metar_cache()
+
+    assert analysis['overall_conditions'] == 'Low IFR conditions along route'
+    assert any(item.startswith('LIFR forecast at KBFL on arrival at 07')
+               for item in analysis['significant_weather'])
+    assert analysis['visibility_forecast']['areas_of_concern'] == ['KBFL']
+    assert [(a['icao'], a['prevailing_category'])
+            for a in analysis['arrival_forecasts']] == [('KBFL', 'LIFR')]
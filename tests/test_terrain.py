@@ -0,0 +1,24 @@
+import pytest
+
+
+def test_terrain_engine_segment_maximum_from_pyramid(tmp_path, write_hgt):
+    """Segment queries see a ridge through the memory-mapped tile and cache the pyramid."""
+    import numpy as np
+    from app.models.terrain import TerrainEngine, FEET_PER_METER
+
+    elevations = np.full((1201, 1201), 100, dtype=np.int16)
+    elevations[:, 600:612] = 2000  # North-south ridge near longitude -121.5
+    write_hgt(tmp_path, 'N37W122.hgt', elevations)
+    engine = TerrainEngine(str(tmp_path))
+
+    across = engine.max_elevation_along([37.5], [-121.9], [37.5], [-121.1])
+    alongside = engine.max_elevation_along([37.2], [-121.9], [37.8], [-121.9])
+    outside = engine.max_elevation_along([36.5], [-120.5], [36.6], [-120.4])
+    assert across[0] == pytest.approx(2000 * FEET_PER_METER)
+    assert alongside[0] < 2000 * FEET_PER_METER
+    assert np.isnan(outside[0])
+    assert list(tmp_path.glob('N37W122.max*.npz'))
+
+    clear, _ = engine.segments_clear([37.5, 37.2], [-121.9, -121.9], [37.5, 37.8], [-121.1, -121.9],
+                                     altitude_ft=6500, clearance_ft=1000)
+    assert clear.tolist() == [False, True]
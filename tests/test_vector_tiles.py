@@ -0,0 +1,125 @@
+import os
+
+METAR_FEED = os.path.join(os.path.dirname(__file__), 'data', 'metars.cache.csv')
+
+
+def _pb_varint(buf, i):
+    value = shift = 0
+    while True:
+        byte = buf[i]
+        value |= (byte & 0x7F) << shift
+        i += 1
+        shift += 7
+        if not byte & 0x80:
+            return value, i
+
+
+def _pb_fields(buf):
+    """(field number, value) pairs of a protobuf message (varint and length-delimited fields)."""
+    fields, i = [], 0
+    while i < len(buf):
+        key, i = _pb_varint(buf, i)
+        if key & 7 == 0:
+            value, i = _pb_varint(buf, i)
+        else:
+            size, i = _pb_varint(buf, i)
+            value, i = buf[i:i + size], i + size
+        fields.append((key >> 3, value))
+    return fields
+
+
+def _pb_packed(buf):
+    values, i = [], 0
+    while i < len(buf):
+        value, i = _pb_varint(buf, i)
+        values.append(value)
+    return values
+
+
+def _decode_mvt(data):
+    """Decode point layers of a vector tile into {layer: (extent, [properties with '_xy'])}."""
+    def unzigzag(n):
+        return (n >> 1) ^ -(n & 1)
+
+    layers = {}
+    for _, layer in _pb_fields(data):
+        fields = _pb_fields(layer)
+        keys = [value.decode() for number, value in fields if number == 3]
+        values = []
+        for number, value in fields:
+            if number == 4:
+                kind, raw = _pb_fields(value)[0]
+                values.append(raw.decode() if kind == 1 else unzigzag(raw))
+        features = []
+        for number, value in fields:
+            if number == 2:
+                feature = dict(_pb_fields(value))
+                tags = _pb_packed(feature[2])
+                properties = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}
+                command, dx, dy = _pb_packed(feature[4])
+                assert command == 9 and feature[3] == 1
+                properties['_xy'] = (unzigzag(dx), unzigzag(dy))
+                features.append(properties)
+        extent = dict((n, v) for n, v in fields if n in (5, 15))
+        assert extent[15] == 2
+        layers[dict(fields)[1].decode()] = (extent[5], features)
+    return layers
+
+
+def _tile_of(lat, lon, z):
+    import math
+    n = 2 ** z
+    phi = math.radians(lat)
+    y = (1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2 * n
+    return z, int((lon + 180) / 360 * n), int(y)
+
+
+def test_airport_tile_features_thin_by_zoom(sample_airports):
+    """Small airports appear only at higher zooms; nearby points are thinned at low zooms."""
+    from app.models.airport_index import AirportIndex, get_airport_index
+    from app.models.metar_snapshot import load_metar_snapshot
+    from app.models.vector_tiles import airport_tile_features
+
+    table = load_metar_snapshot(METAR_FEED)
+    low = {f['properties']['icao']: f for f in airport_tile_features(*_tile_of(37.36, -121.93, 5),
+                                                                     get_airport_index(), table)}
+    assert {'KSJC', 'KFAT'} <= set(low) and 'KPAO' not in low
+    assert low['KFAT']['properties']['flight_category'] == 'IFR'
+    assert 'flight_category' not in low['KRNO']['properties']
+    assert all(-64 <= f['x'] <= 4096 + 64 and -64 <= f['y'] <= 4096 + 64 for f in low.values())
+
+    high = airport_tile_features(*_tile_of(37.46, -122.115, 9), get_airport_index())
+    assert 'KPAO' in [f['properties']['icao'] for f in high]
+
+    twins = AirportIndex([dict(sample_airports[1]), dict(sample_airports[1], icao='KXXX', iata=None,
+                                                         lon=-121.92)])
+    thinned = airport_tile_features(*_tile_of(37.36, -121.93, 3), twins)
+    assert [f['properties']['icao'] for f in thinned] == ['KSJC']
+    assert len(airport_tile_features(*_tile_of(37.36, -121.93, 12), twins)) == 2
+
+    unsurveyed = AirportIndex([dict(sample_airports[1], elevation='N/A')])
+    [feature] = airport_tile_features(*_tile_of(37.36, -121.93, 12), unsurveyed)
+    assert 'elevation' not in feature['properties']
+
+
+def test_airport_tile_endpoint_serves_cached_mvt(client, sample_airports):
+    """Tiles decode as MVT point layers and repeat requests are served from the LRU cache."""
+    from app.models.vector_tiles import get_tile_cache
+
+    z, x, y = _tile_of(37.36, -121.93, 6)
+    response = client.get(f'/tiles/airports/{z}/{x}/{y}.mvt')
+    assert response.status_code == 200, response.content
+    assert response.headers['content-type'] == 'application/vnd.mapbox-vector-tile'
+    extent, features = _decode_mvt(response.content)['airports']
+    assert extent == 4096
+    ksjc = next(f for f in features if f['icao'] == 'KSJC')
+    assert ksjc['type'] == 'large_airport' and ksjc['elevation'] == 62
+    assert 0 <= ksjc['_xy'][0] < 4096 and 0 <= ksjc['_xy'][1] < 4096
+
+    hits = get_tile_cache().stats()['hits']
+    assert client.get(f'/tiles/airports/{z}/{x}/{y}.mvt').content == response.content
+    assert get_tile_cache().stats()['hits'] == hits + 1
+
+    assert client.get('/tiles/airports/2/4/0.mvt').status_code == 404
+    empty = client.get('/tiles/airports/6/0/0.mvt')
+    assert empty.status_code == 200 and empty.content == b''
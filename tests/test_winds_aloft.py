@@ -0,0 +1,78 @@
+import os
+from unittest.mock import patch
+
+WINDS_ALOFT_PRODUCT = os.path.join(os.path.dirname(__file__), 'data', 'winds_aloft.txt')
+
+
+def test_winds_aloft_parser_decodes_fb_product():
+    """FB groups decode light-and-variable, 100+ kt and unsigned high-altitude temperatures."""
+    import math
+    from datetime import datetime, timezone
+    from app.models.winds_aloft import decode_wind_group, parse_winds_aloft
+
+    assert decode_wind_group('2315+14') == (230.0, 15.0, 14.0)
+    assert decode_wind_group('266038') == (260.0, 60.0, -38.0)
+    assert decode_wind_group('7610-28') == (260.0, 110.0, -28.0)
+    assert decode_wind_group('9900')[:2] == (0.0, 0.0)
+    assert all(math.isnan(x) for x in decode_wind_group('    '))
+
+    issued = datetime(2026, 10, 19, 13, 59, tzinfo=timezone.utc).timestamp()
+    with open(WINDS_ALOFT_PRODUCT) as f:
+        bulletins = parse_winds_aloft(f.read(), reference_time=issued)
+    assert [b['valid'] for b in bulletins] == [
+        datetime(2026, 10, 19, 18, tzinfo=timezone.utc).timestamp(),
+        datetime(2026, 10, 20, 0, tzinfo=timezone.utc).timestamp(),
+    ]
+    assert bulletins[0]['altitudes'] == [3000, 6000, 9000, 12000, 18000, 24000, 30000, 34000, 39000]
+    rno = bulletins[0]['stations']['RNO']
+    assert math.isnan(rno[0][1]) and rno[1] == (280.0, 20.0, 7.0)
+    assert rno[6] == (270.0, 103.0, -45.0)
+    assert bulletins[0]['stations']['LAX'][0][:2] == (0.0, 0.0)
+
+
+def test_winds_aloft_grid_interpolates_for_planner_and_point_detail(client, sample_airports):
+    """The grid interpolates stations, altitudes and times and replaces surface 'winds aloft'."""
+    import numpy as np
+    from datetime import datetime, timezone
+    from unittest.mock import AsyncMock
+    from app.config import settings
+    from app.models.airport_index import get_airport_index
+    from app.models.winds_aloft import get_wind_source, load_winds_aloft
+
+    issued = datetime(2026, 10, 19, 13, 59, tzinfo=timezone.utc).timestamp()
+    grid = load_winds_aloft([WINDS_ALOFT_PRODUCT], reference_time=issued,
+                            airport_index=get_airport_index())
+    assert grid.stations == ['BFL', 'FAT', 'LAX', 'RNO', 'SAN', 'SJC']
+    valid = grid.times[0]
+
+    at_sjc = grid.conditions([37.3626] * 2, [-121.929] * 2, [6000, 7500], when=valid)
+    np.testing.assert_allclose(at_sjc['wind_direction_deg'][0], 280.0, atol=0.01)
+    np.testing.assert_allclose(at_sjc['wind_speed_kt'][0], 10.0, atol=0.01)
+    np.testing.assert_allclose(at_sjc['temperature_c'], [11.0, 8.0])
+
+    later = grid.conditions([37.3626], [-121.929], 6000, when=(grid.times[0] + grid.times[1]) / 2)
+    assert 280.0 < later['wind_direction_deg'][0] < 300.0
+    assert 10.0 < later['wind_speed_kt'][0] < 13.0
+
+    at_reno = grid.conditions([39.4991], [-119.768], 3000, when=valid)
+    np.testing.assert_allclose(at_reno['wind_speed_kt'], 20.0, atol=0.01)
+    np.testing.assert_allclose(at_reno['temperature_c'], 7.0 + 3000 * 0.00198)
+
+    u, v = grid.winds_aloft_profile([36.0, 35.0], [-120.0, -119.5], [6000, 9000], when=valid)
+    assert u.shape == (2, 2) and np.all(u > 0) and np.all(np.hypot(u, v) < 25)
+
+    with patch.object(settings, 'planner_wind_source', 'fb'), \
+         patch('app.models.winds_aloft.get_winds_aloft', return_value=grid):
+        assert get_wind_source('forecast cache') is grid
+    assert get_wind_source('forecast cache') == 'forecast cache'
+
+    weather = {'current': {'temperature': 15, 'windspeed': 5, 'winddirection': 300},
+               'hourly': {'windspeed_10m': [3]}}
+    with patch('app.routers.route_weather.get_winds_aloft', return_value=grid), \
+         patch('app.routers.route_weather.get_weather_data_async', AsyncMock(return_value=weather)):
+        response = client.post('/api/point_weather_detail',
+                               json={'lat': 37.3626, 'lon': -121.929, 'altitude_ft': 7500})
+    assert response.status_code == 200, response.text
+    aloft = response.json()['winds_aloft']
+    assert [w['altitude_ft'] for w in aloft] == [3000, 6000, 7500, 9000, 12000, 18000]
+    assert all(w['wind_speed_kt'] > 0 for w in aloft)